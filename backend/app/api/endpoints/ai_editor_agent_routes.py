@@ -2,18 +2,56 @@
 
 import logging
 import os
+import re
 from typing import Optional
 
-from fastapi import APIRouter, Query, Body
-from fastapi.responses import Response
+from fastapi import APIRouter, Query, Body, Header
+from fastapi.responses import FileResponse, Response
+from core.metrics import CACHE_HIT_RATIO, CONTENT_TYPE, RENDER_QUEUE_DEPTH, expose, update_cache_hit_ratios
+from core.tracing import span_buffer, tracer
 from multi_tool_agent import agent
 from multi_tool_agent.cleanup import cleanup_all
+from models.edit_models import EditQueue
 from models.request_models import UserQuery
 from services.database_session_service import database_session_service
+from services.render_job_service import render_job_service
+from services.render_profiles import PROFILES, PROXY_PROFILE
+from services.render_queue_service import render_queue_service
+from services.render_store import render_store
+from services.text_layout import text_layout_engine
+from services.thumbnail_sprite_service import thumbnail_sprite_service
 from services.video_export_service import get_video_export_service
+from services.video_pipeline_service import video_pipeline_service
+from services.waveform_service import PEAK_LEVELS, waveform_service
 
 router = APIRouter()
 
+RENDER_KEY_PATTERN = re.compile(r"[0-9a-f]{64}")
+# Render keys are content hashes, so a key's bytes never change.
+RENDER_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def _render_full_quality(session_pk: int) -> Optional[str]:
+    """Full-quality render of a session's edit queue; None if it has no applied edits."""
+    edit_queue_data = database_session_service.get_state(session_pk, "edit_queue")
+    if not edit_queue_data:
+        return None
+    
+    edit_queue = EditQueue.from_dict(edit_queue_data)
+    if not edit_queue.get_applied_edits():
+        return None
+    
+    video_url = video_pipeline_service.render_full_quality(edit_queue)
+    database_session_service.set_state(session_pk, "edit_queue", edit_queue.to_dict())
+    return video_url
+
+
+def _thumbnail_urls(video_url: Optional[str]) -> dict[str, Optional[str]]:
+    """Scrubbing sprite and its WebVTT index of a render, None until stored."""
+    key = render_store.key_from_url(video_url) if video_url else None
+    urls = thumbnail_sprite_service.urls(key) if key else None
+    return urls or {"sprite_url": None, "vtt_url": None}
+
 
 @router.get("/test")
 def healthcheck():
@@ -31,6 +69,66 @@ def get_config():
         config_data = json.load(f)
     return config_data
 
+@router.get("/render-store/stats")
+def get_render_store_stats():
+    """Render store hit, miss and eviction counters"""
+    return render_store.stats()
+
+@router.get("/render-jobs/{job_id}")
+def get_render_job(job_id: str):
+    """Status of a background render started by an edit-queue tool"""
+    import json
+    job = render_job_service.get(job_id) or render_queue_service.get(job_id)
+    if not job:
+        return Response(content=json.dumps({"message": "Render job not found"}), status_code=404)
+    job_data = job.to_dict()
+    job_data.update(_thumbnail_urls(job.video_url if job.status == "succeeded" else None))
+    return Response(content=json.dumps(job_data), status_code=200)
+
+@router.get("/metrics")
+def get_metrics():
+    """Prometheus metrics of this API process"""
+    for status, count in render_job_service.depth().items():
+        RENDER_QUEUE_DEPTH.labels(queue="api", status=status).set(count)
+    for status, count in render_queue_service.depth().items():
+        RENDER_QUEUE_DEPTH.labels(queue="workers", status=status).set(count)
+    update_cache_hit_ratios()
+    layout_cache = text_layout_engine.layout.cache_info()
+    layout_lookups = layout_cache.hits + layout_cache.misses
+    CACHE_HIT_RATIO.labels(cache="text_layout").set(layout_cache.hits / layout_lookups if layout_lookups else 0.0)
+    return Response(content=expose(), media_type=CONTENT_TYPE)
+
+@router.get("/traces")
+def list_traces(limit: int = Query(50, ge=1, le=500), session_id: Optional[str] = Query(None)):
+    """Most recent traces held in memory, newest first"""
+    return {"traces": span_buffer.traces(limit=limit, session_id=session_id)}
+
+@router.get("/traces/{trace_id}")
+def get_trace(trace_id: str):
+    """Spans of one chat turn or render, oldest first"""
+    import json
+    spans = span_buffer.trace(trace_id)
+    if not spans:
+        return Response(content=json.dumps({"message": "Trace not found"}), status_code=404)
+    return {"trace_id": trace_id, "spans": spans}
+
+@router.api_route("/media/renders/{key}.mp4", methods=["GET", "HEAD"])
+def get_render_media(key: str, if_none_match: Optional[str] = Header(None)):
+    """Render from the API host's local render cache, with Range and
+    conditional requests, so previews do not wait on the bucket"""
+    if not RENDER_KEY_PATTERN.fullmatch(key):
+        return Response(content="Invalid render key", status_code=400)
+    
+    etag = f'"{key}"'
+    headers = {"ETag": etag, "Cache-Control": RENDER_CACHE_CONTROL}
+    if if_none_match and (if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]):
+        return Response(status_code=304, headers=headers)
+    
+    local_path = render_store.fetch_local(key)
+    if not local_path:
+        return Response(content="Render not found", status_code=404)
+    return FileResponse(local_path, media_type="video/mp4", headers=headers)
+
 @router.post("/call_ai_editor_agent")
 async def call_ai_editor_agent(userQuery: UserQuery):
     """Call AI Editor agent to edit videos"""
@@ -50,7 +148,10 @@ async def call_ai_editor_agent(userQuery: UserQuery):
             agent_session_id = userQuery.session_id
             print(f"DEBUG: Using frontend session as agent session: {agent_user_id}/{agent_session_id}")
         
-        response = agent.call_agent(userQuery.query, userQuery.feature_id, agent_user_id, agent_session_id)
+        with tracer.span("agent.turn", session_id=agent_session_id, feature_id=userQuery.feature_id) as span:
+            response = agent.call_agent(userQuery.query, userQuery.feature_id, agent_user_id, agent_session_id)
+        # The turn's spans, from /traces/{trace_id}.
+        trace_headers = {"X-Trace-Id": span.trace_id}
         print(f"Agent returned response type: {type(response)}, value: {repr(response)}")
         
         if not response:
@@ -58,14 +159,15 @@ async def call_ai_editor_agent(userQuery: UserQuery):
             return Response(
                 content=json.dumps({"text": "I apologize, but I encountered an issue processing your request. Could you please try rephrasing or providing more details?", "media": {}}),
                 media_type="application/json",
-                status_code=200
+                status_code=200,
+                headers=trace_headers
             )
         
         try:
             json_data = json.loads(response)
-            return Response(content=response, media_type="application/json", status_code=200)
+            return Response(content=response, media_type="application/json", status_code=200, headers=trace_headers)
         except (json.JSONDecodeError, TypeError):
-            return Response(content=response, status_code=200)
+            return Response(content=response, status_code=200, headers=trace_headers)
             
     except Exception as ex:
         logging.error("AI Editor Agent - ERROR:  %s", str(ex))
@@ -197,6 +299,10 @@ async def create_session_version(
 ):
     """Create a new version snapshot for a session"""
     try:
+        full_quality_url = _render_full_quality(session_pk)
+        if full_quality_url:
+            video_url = full_quality_url
+        
         version_id = database_session_service.create_version(
             session_pk=session_pk,
             video_url=video_url
@@ -336,15 +442,108 @@ async def get_edit_queue(
         return Response(content=f"ERROR: {ex}", status_code=500)
 
 
+@router.get("/sessions/edit-result")
+async def get_edit_result(
+    session_pk: int = Query(...),
+    edit_id: str = Query(...),
+    profile: str = Query(PROXY_PROFILE.name)
+):
+    """URL of the video as of one applied edit, rendered on first request"""
+    try:
+        import json
+        if profile not in PROFILES:
+            return Response(content=f"Unknown render profile: {profile}", status_code=400)
+        
+        edit_queue_data = database_session_service.get_state(session_pk, "edit_queue")
+        if not edit_queue_data:
+            return Response(content="Edit queue not found", status_code=404)
+        
+        edit_queue = EditQueue.from_dict(edit_queue_data)
+        video_url = video_pipeline_service.get_edit_result_url(edit_queue, edit_id, PROFILES[profile])
+        if not video_url:
+            return Response(content="Applied edit not found", status_code=404)
+        
+        # The queue may have changed while the intermediate rendered.
+        stored_queue = EditQueue.from_dict(database_session_service.get_state(session_pk, "edit_queue") or edit_queue_data)
+        stored_queue.merge_derived_params(edit_queue)
+        stored_queue.cache_render(edit_queue.get_edit(edit_id).prefix_hash, video_url)
+        database_session_service.set_state(session_pk, "edit_queue", stored_queue.to_dict())
+        
+        return Response(
+            content=json.dumps({"edit_id": edit_id, "video_url": video_url, **_thumbnail_urls(video_url)}),
+            status_code=200
+        )
+    except Exception as ex:
+        logging.error("Get edit result - ERROR: %s", str(ex))
+        return Response(content=f"ERROR: {ex}", status_code=500)
+
+
+@router.get("/waveform")
+async def get_waveform(
+    session_pk: Optional[int] = Query(None),
+    edit_id: Optional[str] = Query(None),
+    media_url: Optional[str] = Query(None),
+    samples_per_peak: Optional[int] = Query(None)
+):
+    """Binary min/max waveform peaks of a session's source video, one of its
+    voiceover clips (edit_id), or any source or render URL"""
+    try:
+        if samples_per_peak is not None and samples_per_peak not in PEAK_LEVELS:
+            return Response(
+                content=f"samples_per_peak must be one of {', '.join(map(str, PEAK_LEVELS))}",
+                status_code=400
+            )
+        
+        if session_pk is not None:
+            edit_queue_data = database_session_service.get_state(session_pk, "edit_queue")
+            if not edit_queue_data:
+                return Response(content="Edit queue not found", status_code=404)
+            edit_queue = EditQueue.from_dict(edit_queue_data)
+            if edit_id:
+                edit = edit_queue.get_edit(edit_id)
+                if not edit or edit.type != "voiceover":
+                    return Response(content="Voiceover edit not found", status_code=404)
+                media = edit.params.get("audio_path")
+                if not media or not os.path.exists(media):
+                    return Response(content="Voiceover audio has not been generated yet", status_code=404)
+            else:
+                media = edit_queue.original_video_url
+        elif media_url:
+            media = media_url
+        else:
+            return Response(content="Either session_pk or media_url is required", status_code=400)
+        
+        peaks = waveform_service.peaks(media)
+        return Response(content=peaks.to_bytes(samples_per_peak), media_type="application/octet-stream", status_code=200)
+    except Exception as ex:
+        logging.error("Get waveform - ERROR: %s", str(ex))
+        return Response(content=f"ERROR: {ex}", status_code=500)
+
+
 @router.post("/export")
 async def export_video(
     video_path: str = Query(...),
     user_id: str = Query(...),
     feature_id: str = Query(...),
-    video_id: str = Query(...)
+    video_id: str = Query(...),
+    session_id: Optional[str] = Query(None)
 ):
-    """Export final video to GCS"""
+    """Export final video to GCS, rendering the session's edits at full quality"""
     try:
+        if session_id:
+            app_name = os.getenv("APP_NAME", "wpromote-codesprint-2025")
+            session = database_session_service.get_session(
+                app_name=app_name,
+                user_id=user_id,
+                session_id=session_id
+            )
+            if not session:
+                return Response(content="Session not found", status_code=404)
+            
+            full_quality_url = _render_full_quality(session["pk"])
+            if full_quality_url:
+                video_path = render_store.fetch_local_url(full_quality_url) or video_path
+        
         export_service = get_video_export_service()
         public_url = export_service.export_video(
             video_path=video_path,
@@ -0,0 +1,14 @@
+"""Offline benchmarks of the edit pipeline.
+
+Renders representative edit queues of synthetic sources (lavfi test
+patterns with a tone, generated once under data/benchmarks/media) through
+VideoPipelineService, with Cloud Storage replaced by a directory and TTS by
+a tone generator, and records wall time, CPU time, peak RSS and bytes
+transferred per case:
+
+    python -m benchmarks run --resolutions 720p,1080p,4k --durations 15,300 --queue-lengths 1,4,16
+    python -m benchmarks compare data/benchmarks/results/before.json data/benchmarks/results/after.json
+
+``compare`` exits non-zero when any metric of any case regressed past its
+threshold.
+"""
@@ -0,0 +1,102 @@
+import argparse
+import itertools
+import json
+import logging
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from benchmarks.compare import DEFAULT_THRESHOLDS, compare_results, format_report
+from benchmarks.media import RESOLUTIONS
+from benchmarks.runner import APP_DIR, BenchmarkCase, run_case, run_suite
+from benchmarks.scenarios import SCENARIOS
+
+DEFAULT_DATA_DIR = APP_DIR / "data" / "benchmarks"
+
+
+def _csv(value: str) -> list[str]:
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def _run(args: argparse.Namespace) -> int:
+    for scenario in args.scenarios:
+        if scenario not in SCENARIOS:
+            sys.exit(f"Unknown scenario: {scenario} (expected one of {', '.join(SCENARIOS)})")
+    for resolution in args.resolutions:
+        if resolution not in RESOLUTIONS:
+            sys.exit(f"Unknown resolution: {resolution} (expected one of {', '.join(RESOLUTIONS)})")
+
+    cases = [
+        BenchmarkCase(scenario, int(length), resolution, int(duration), args.profile)
+        for scenario, length, resolution, duration in itertools.product(
+            args.scenarios, args.queue_lengths, args.resolutions, args.durations
+        )
+    ]
+    output = args.output or args.data_dir / "results" / f"{datetime.now():%Y%m%d-%H%M%S}.json"
+    suite = run_suite(
+        cases,
+        output_path=str(output),
+        media_dir=str(args.data_dir / "media"),
+        work_root=str(args.data_dir / "runs"),
+        repeats=args.repeats,
+        keep_work=args.keep_work
+    )
+    return 1 if any("error" in result for result in suite["cases"]) else 0
+
+
+def _compare(args: argparse.Namespace) -> int:
+    baseline = json.loads(Path(args.baseline).read_text())
+    current = json.loads(Path(args.current).read_text())
+    thresholds = {metric: args.threshold for metric in DEFAULT_THRESHOLDS} if args.threshold is not None else None
+    changes, unmatched = compare_results(baseline, current, thresholds)
+    print(format_report(changes, unmatched))
+    return 1 if any(change.regression for change in changes) else 0
+
+
+def _case(args: argparse.Namespace) -> int:
+    case = BenchmarkCase(**json.loads(args.case))
+    result = run_case(case, args.source, args.work_dir)
+    Path(args.result).write_text(json.dumps(result))
+    return 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Offline benchmarks of VideoPipelineService.apply_edit_queue on synthetic media"
+    )
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subcommands.add_parser("run", help="Run a matrix of cases and write their results as JSON")
+    run_parser.add_argument("--scenarios", type=_csv, default=list(SCENARIOS), help="Comma-separated edit queue scenarios")
+    run_parser.add_argument("--queue-lengths", type=_csv, default=["1", "4"], help="Comma-separated edit counts")
+    run_parser.add_argument("--resolutions", type=_csv, default=["720p", "1080p"], help="Comma-separated: 720p, 1080p, 4k")
+    run_parser.add_argument("--durations", type=_csv, default=["15", "60"], help="Comma-separated source lengths in seconds")
+    run_parser.add_argument("--profile", default="full", choices=["full", "proxy"], help="Render profile")
+    run_parser.add_argument("--repeats", type=int, default=1, help="Runs per case; results are their median")
+    run_parser.add_argument("--output", type=Path, help="Results file (default: <data-dir>/results/<time>.json)")
+    run_parser.add_argument("--data-dir", type=Path, default=DEFAULT_DATA_DIR, help="Synthetic media and scratch space")
+    run_parser.add_argument("--keep-work", action="store_true", help="Keep each case's renders and storage")
+    run_parser.set_defaults(handler=_run)
+
+    compare_parser = subcommands.add_parser("compare", help="Flag regressions between two results files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, help="Allowed relative increase for every metric")
+    compare_parser.set_defaults(handler=_compare)
+
+    # One case in a fresh process, started by "run".
+    case_parser = subcommands.add_parser("case")
+    case_parser.add_argument("--case", required=True)
+    case_parser.add_argument("--source", required=True)
+    case_parser.add_argument("--work-dir", required=True)
+    case_parser.add_argument("--result", required=True)
+    case_parser.set_defaults(handler=_case)
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    sys.exit(args.handler(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+from dataclasses import dataclass
+from typing import Any, Optional
+
+# Allowed relative increase per metric before it counts as a regression.
+DEFAULT_THRESHOLDS = {
+    "wall_seconds": 0.10,
+    "cpu_seconds": 0.10,
+    "peak_rss_bytes": 0.15,
+    "peak_ffmpeg_rss_bytes": 0.15,
+    "bytes_transferred": 0.02,
+}
+
+# Changes smaller than this are timer noise on short cases, whatever their ratio.
+NOISE_FLOORS = {
+    "wall_seconds": 0.05,
+    "cpu_seconds": 0.05,
+}
+
+
+@dataclass(frozen=True)
+class MetricChange:
+    case: str
+    metric: str
+    baseline: float
+    current: float
+    regression: bool
+
+    @property
+    def change(self) -> Optional[float]:
+        """Relative change from the baseline; None when the baseline is zero."""
+        if not self.baseline:
+            return None
+        return self.current / self.baseline - 1
+
+
+def compare_results(
+    baseline: dict[str, Any],
+    current: dict[str, Any],
+    thresholds: Optional[dict[str, float]] = None
+) -> tuple[list[MetricChange], list[str]]:
+    """Metric changes of every case present and successful in both runs,
+    and the ids of cases that are missing or failed in either."""
+    thresholds = {**DEFAULT_THRESHOLDS, **(thresholds or {})}
+    baseline_cases = {result["case"]: result for result in baseline["cases"]}
+    current_cases = {result["case"]: result for result in current["cases"]}
+
+    changes = []
+    unmatched = []
+    for case in sorted(baseline_cases.keys() | current_cases.keys()):
+        before, after = baseline_cases.get(case), current_cases.get(case)
+        if not before or not after or "error" in before or "error" in after:
+            unmatched.append(case)
+            continue
+        for metric, threshold in thresholds.items():
+            if metric not in before or metric not in after:
+                continue
+            increase = after[metric] - before[metric]
+            regression = increase > before[metric] * threshold and increase > NOISE_FLOORS.get(metric, 0)
+            changes.append(MetricChange(case, metric, before[metric], after[metric], regression))
+    return changes, unmatched
+
+
+def _format_value(metric: str, value: float) -> str:
+    if metric.endswith("_bytes") or metric.startswith("bytes_"):
+        return f"{value / 2 ** 20:.1f} MiB"
+    return f"{value:.2f}s"
+
+
+def format_report(changes: list[MetricChange], unmatched: list[str]) -> str:
+    lines = []
+    for change in changes:
+        relative = f"{change.change:+.1%}" if change.change is not None else "n/a"
+        flag = "  REGRESSION" if change.regression else ""
+        lines.append(
+            f"{change.case:<48} {change.metric:<22} "
+            f"{_format_value(change.metric, change.baseline):>12} -> "
+            f"{_format_value(change.metric, change.current):>12} {relative:>8}{flag}"
+        )
+    for case in unmatched:
+        lines.append(f"{case:<48} not comparable (missing or failed in one run)")
+
+    regressions = sum(change.regression for change in changes)
+    lines.append(f"{regressions} regression(s) in {len({change.case for change in changes})} compared case(s)")
+    return "\n".join(lines)
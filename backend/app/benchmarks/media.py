@@ -0,0 +1,61 @@
+import os
+import subprocess
+import tempfile
+from pathlib import Path
+
+RESOLUTIONS = {
+    "720p": (1280, 720),
+    "1080p": (1920, 1080),
+    "4k": (3840, 2160),
+}
+
+SOURCE_FPS = 30
+# Two-second GOPs, like the phone and ad-platform uploads the editor gets.
+SOURCE_GOP_SECONDS = 2
+
+
+def source_name(resolution: str, duration_seconds: int) -> str:
+    return f"source-{resolution}-{duration_seconds}s.mp4"
+
+
+def source_command(resolution: str, duration_seconds: int, output_path: str) -> list[str]:
+    """ffmpeg command for a synthetic H.264/AAC source: the moving testsrc2
+    pattern (so the encoder has real motion to code) with a 440 Hz tone."""
+    width, height = RESOLUTIONS[resolution]
+    return [
+        "ffmpeg", "-y", "-v", "error",
+        "-f", "lavfi", "-i", f"testsrc2=size={width}x{height}:rate={SOURCE_FPS}:duration={duration_seconds}",
+        "-f", "lavfi", "-i", f"sine=frequency=440:sample_rate=48000:duration={duration_seconds}",
+        "-c:v", "libx264",
+        "-preset", "veryfast",
+        "-pix_fmt", "yuv420p",
+        "-g", str(SOURCE_FPS * SOURCE_GOP_SECONDS),
+        "-c:a", "aac",
+        "-b:a", "128k",
+        "-ac", "2",
+        "-shortest",
+        "-movflags", "+faststart",
+        output_path
+    ]
+
+
+def ensure_source(media_dir: str, resolution: str, duration_seconds: int) -> Path:
+    """Path of the synthetic source, generated on first use and reused by
+    later runs so every run measures the same bytes."""
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f"Unknown resolution: {resolution} (expected one of {', '.join(RESOLUTIONS)})")
+
+    source_path = Path(media_dir) / source_name(resolution, duration_seconds)
+    if source_path.exists():
+        return source_path
+
+    source_path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=source_path.parent, suffix=".part.mp4", delete=False) as part_file:
+        part_path = part_file.name
+    try:
+        subprocess.run(source_command(resolution, duration_seconds, part_path), check=True)
+        os.replace(part_path, source_path)
+    finally:
+        if os.path.exists(part_path):
+            os.unlink(part_path)
+    return source_path
@@ -0,0 +1,199 @@
+import json
+import logging
+import os
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Optional
+
+from benchmarks import stand_ins
+from benchmarks.media import ensure_source
+from benchmarks.scenarios import SCENARIOS
+
+logger = logging.getLogger(__name__)
+
+APP_DIR = Path(__file__).parent.parent
+SOURCE_BUCKET = "benchmark-sources"
+
+# Numeric results that are the median of a case's repeats.
+MEASURED_KEYS = (
+    "wall_seconds",
+    "cpu_seconds",
+    "peak_rss_bytes",
+    "peak_ffmpeg_rss_bytes",
+    "bytes_uploaded",
+    "bytes_downloaded",
+    "bytes_transferred",
+)
+
+
+@dataclass(frozen=True)
+class BenchmarkCase:
+    scenario: str
+    queue_length: int
+    resolution: str
+    duration_seconds: int
+    profile: str = "full"
+
+    @property
+    def id(self) -> str:
+        return f"{self.scenario}-{self.queue_length}x-{self.resolution}-{self.duration_seconds}s-{self.profile}"
+
+
+def _cpu_seconds() -> float:
+    """User and system time of this process and every ffmpeg it has waited for."""
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+
+def run_case(case: BenchmarkCase, source_path: str, work_dir: str) -> dict[str, Any]:
+    """Render one case's edit queue from a cold start and measure it. Runs in
+    a fresh process (see ``run_suite``): the services read their settings
+    and create their clients at import, and peak RSS cannot be reset."""
+    work_dir = Path(work_dir)
+    os.environ.update({
+        "DATABASE_PATH": str(work_dir / "sessions.db"),
+        "RENDER_CACHE_DIR": str(work_dir / "render_cache"),
+        "TEXT_OVERLAY_CACHE_DIR": str(work_dir / "text_overlay_cache"),
+        "LUT_CACHE_DIR": str(work_dir / "lut_cache"),
+        "WAVEFORM_CACHE_DIR": str(work_dir / "waveform_cache"),
+        "STREAM_IO": "false",
+        # Uploads are part of what a render costs, so they finish inside it.
+        "RENDER_UPLOAD_WORKERS": "0",
+        "SPRITE_WORKERS": "0",
+    })
+    storage_client = stand_ins.install(str(work_dir / "storage"))
+
+    from models.edit_models import EditQueue
+    from services.render_profiles import PROFILES
+    from services.video_pipeline_service import video_pipeline_service
+
+    source_blob = storage_client.bucket(SOURCE_BUCKET).blob(Path(source_path).name)
+    source_blob.path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        os.link(source_path, source_blob.path)
+    except OSError:
+        shutil.copyfile(source_path, source_blob.path)
+    source_url = f"gs://{SOURCE_BUCKET}/{source_blob.name}"
+
+    edit_queue = EditQueue(
+        session_id=case.id,
+        original_video_url=source_url,
+        edits=SCENARIOS[case.scenario](case.queue_length, case.duration_seconds),
+        current_video_url=source_url
+    )
+
+    wall_start = time.perf_counter()
+    cpu_start = _cpu_seconds()
+    video_url = video_pipeline_service.apply_edit_queue(edit_queue, profile=PROFILES[case.profile])
+    wall_seconds = time.perf_counter() - wall_start
+    cpu_seconds = _cpu_seconds() - cpu_start
+
+    transfers = storage_client.transfers
+    # ru_maxrss is in kilobytes on Linux.
+    return {
+        "case": case.id,
+        **asdict(case),
+        "wall_seconds": wall_seconds,
+        "cpu_seconds": cpu_seconds,
+        "peak_rss_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+        "peak_ffmpeg_rss_bytes": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * 1024,
+        "bytes_uploaded": transfers.bytes_uploaded,
+        "bytes_downloaded": transfers.bytes_downloaded,
+        "bytes_transferred": transfers.bytes_uploaded + transfers.bytes_downloaded,
+        "video_url": video_url,
+    }
+
+
+def _run_case_in_subprocess(case: BenchmarkCase, source_path: Path, work_dir: Path) -> dict[str, Any]:
+    shutil.rmtree(work_dir, ignore_errors=True)
+    work_dir.mkdir(parents=True)
+    result_path = work_dir / "result.json"
+    command = [
+        sys.executable, "-m", "benchmarks", "case",
+        "--case", json.dumps(asdict(case)),
+        "--source", str(source_path),
+        "--work-dir", str(work_dir),
+        "--result", str(result_path),
+    ]
+    completed = subprocess.run(command, cwd=APP_DIR, capture_output=True, text=True)
+    if completed.returncode != 0:
+        error = completed.stderr.strip().splitlines()[-1:] or [f"exit code {completed.returncode}"]
+        return {"case": case.id, **asdict(case), "error": error[0]}
+    return json.loads(result_path.read_text())
+
+
+def _median_result(results: list[dict[str, Any]]) -> dict[str, Any]:
+    succeeded = [result for result in results if "error" not in result]
+    if not succeeded:
+        return results[-1]
+    median = dict(succeeded[0])
+    for key in MEASURED_KEYS:
+        median[key] = statistics.median(result[key] for result in succeeded)
+    median["repeats"] = len(succeeded)
+    return median
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        completed = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=APP_DIR, capture_output=True, text=True, check=True
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return completed.stdout.strip()
+
+
+def run_suite(
+    cases: list[BenchmarkCase],
+    output_path: str,
+    media_dir: str,
+    work_root: str,
+    repeats: int = 1,
+    keep_work: bool = False
+) -> dict[str, Any]:
+    """Run every case (each repeat in its own process, from cold caches) and
+    write the results to ``output_path`` as JSON."""
+    results = []
+    for index, case in enumerate(cases, start=1):
+        source_path = ensure_source(media_dir, case.resolution, case.duration_seconds)
+        work_dir = Path(work_root) / case.id
+        logger.info(f"[{index}/{len(cases)}] {case.id}")
+        runs = []
+        for _ in range(repeats):
+            runs.append(_run_case_in_subprocess(case, source_path, work_dir))
+            if not keep_work:
+                shutil.rmtree(work_dir, ignore_errors=True)
+        result = _median_result(runs)
+        if "error" in result:
+            logger.error(f"{case.id} failed: {result['error']}")
+        else:
+            logger.info(
+                f"{case.id}: {result['wall_seconds']:.2f}s wall, {result['cpu_seconds']:.2f}s CPU, "
+                f"{result['peak_ffmpeg_rss_bytes'] / 2 ** 20:.0f} MiB peak ffmpeg RSS, "
+                f"{result['bytes_transferred'] / 2 ** 20:.1f} MiB transferred"
+            )
+        results.append(result)
+
+    suite = {
+        "created_at": datetime.now().isoformat(),
+        "git_commit": _git_commit(),
+        "host": {
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+        },
+        "cases": results,
+    }
+    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+    Path(output_path).write_text(json.dumps(suite, indent=2))
+    logger.info(f"Wrote {len(results)} results to {output_path}")
+    return suite
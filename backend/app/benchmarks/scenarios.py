@@ -0,0 +1,83 @@
+from typing import Callable
+
+from models.edit_models import Edit
+
+LOOKS = ("warm", "vivid", "cinematic", "mono")
+
+
+def _edit(index: int, edit_type: str, **params) -> Edit:
+    return Edit(
+        id=f"bench-{index}",
+        type=edit_type,
+        params=params,
+        timestamp="2025-01-01T00:00:00",
+        status="applied"
+    )
+
+
+def _span_ms(index: int, count: int, duration_seconds: int) -> tuple[int, int]:
+    slot_ms = duration_seconds * 1000 // count
+    return index * slot_ms, min((index + 1) * slot_ms, index * slot_ms + 3000)
+
+
+def text_overlays(length: int, duration_seconds: int) -> list[Edit]:
+    """Supers spread over the video, one per slot."""
+    edits = []
+    for index in range(length):
+        start_ms, end_ms = _span_ms(index, length, duration_seconds)
+        edits.append(_edit(
+            index, "text_overlay",
+            text=f"Benchmark super number {index + 1}",
+            start_ms=start_ms,
+            end_ms=end_ms,
+            position=("top", "center", "bottom")[index % 3]
+        ))
+    return edits
+
+
+def voiceovers(length: int, duration_seconds: int) -> list[Edit]:
+    """Voiceover clips spread over the video; each one goes through TTS."""
+    return [
+        _edit(
+            index, "voiceover",
+            text=f"This is voiceover line number {index + 1} of the benchmark",
+            start_ms=_span_ms(index, length, duration_seconds)[0]
+        )
+        for index in range(length)
+    ]
+
+
+def mixed(length: int, duration_seconds: int) -> list[Edit]:
+    """What a chat session builds up: supers, voiceovers and color grades
+    interleaved."""
+    edits = []
+    for index in range(length):
+        start_ms, end_ms = _span_ms(index, length, duration_seconds)
+        kind = index % 3
+        if kind == 0:
+            edits.append(_edit(index, "text_overlay", text=f"Mixed super {index + 1}", start_ms=start_ms, end_ms=end_ms))
+        elif kind == 1:
+            edits.append(_edit(index, "voiceover", text=f"Mixed voiceover {index + 1}", start_ms=start_ms))
+        else:
+            edits.append(_edit(index, "filter", look=LOOKS[index // 3 % len(LOOKS)]))
+    return edits
+
+
+def trimmed(length: int, duration_seconds: int) -> list[Edit]:
+    """Supers followed by a trim to the middle half, which sends the queue
+    down the per-edit path."""
+    edits = text_overlays(max(length - 1, 0), duration_seconds)
+    edits.append(_edit(
+        len(edits), "trim",
+        start_ms=duration_seconds * 250,
+        end_ms=duration_seconds * 750
+    ))
+    return edits
+
+
+SCENARIOS: dict[str, Callable[[int, int], list[Edit]]] = {
+    "text_overlays": text_overlays,
+    "voiceovers": voiceovers,
+    "mixed": mixed,
+    "trimmed": trimmed,
+}
@@ -0,0 +1,144 @@
+import shutil
+import subprocess
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, BinaryIO, Optional
+
+from google.api_core.exceptions import NotFound
+
+
+class TransferCounter:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.bytes_uploaded = 0
+        self.bytes_downloaded = 0
+
+    def add(self, uploaded: int = 0, downloaded: int = 0) -> None:
+        with self._lock:
+            self.bytes_uploaded += uploaded
+            self.bytes_downloaded += downloaded
+
+
+class FilesystemBlob:
+    def __init__(self, bucket: "FilesystemBucket", name: str):
+        self.bucket = bucket
+        self.name = name
+        self.generation: Optional[int] = None
+        self.cache_control: Optional[str] = None
+
+    @property
+    def path(self) -> Path:
+        return self.bucket.root / self.name
+
+    def exists(self) -> bool:
+        return self.path.is_file()
+
+    def reload(self) -> None:
+        if not self.exists():
+            raise NotFound(f"gs://{self.bucket.name}/{self.name}")
+        self.generation = self.path.stat().st_mtime_ns
+
+    def upload_from_filename(self, filename: str, content_type: Optional[str] = None) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(filename, self.path)
+        self.generation = self.path.stat().st_mtime_ns
+        self.bucket.client.transfers.add(uploaded=self.path.stat().st_size)
+
+    def download_to_filename(self, filename: str) -> None:
+        self.reload()
+        shutil.copyfile(self.path, filename)
+        self.bucket.client.transfers.add(downloaded=self.path.stat().st_size)
+
+    def open(self, mode: str = "rb", **kwargs: Any) -> BinaryIO:
+        if mode != "wb":
+            raise ValueError(f"Unsupported blob mode: {mode}")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        return _CountingWriter(self.path.open("wb"), self.bucket.client.transfers)
+
+    def delete(self) -> None:
+        self.reload()
+        self.path.unlink()
+
+
+class _CountingWriter:
+    def __init__(self, file: BinaryIO, transfers: TransferCounter):
+        self._file = file
+        self._transfers = transfers
+
+    def write(self, data: bytes) -> int:
+        self._transfers.add(uploaded=len(data))
+        return self._file.write(data)
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class FilesystemBucket:
+    def __init__(self, client: "FilesystemStorageClient", name: str):
+        self.client = client
+        self.name = name
+        self.root = client.root / name
+
+    def blob(self, name: str) -> FilesystemBlob:
+        return FilesystemBlob(self, name)
+
+    def copy_blob(self, blob: FilesystemBlob, destination_bucket: "FilesystemBucket", new_name: str) -> FilesystemBlob:
+        copy = destination_bucket.blob(new_name)
+        copy.path.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(blob.path, copy.path)
+        return copy
+
+
+class FilesystemStorageClient:
+    """Stand-in for ``google.cloud.storage.Client`` that keeps each bucket in
+    a directory under ``root`` and counts the bytes that would have crossed
+    the network. Covers what the render pipeline uses; signed URLs (and so
+    STREAM_IO) are not supported."""
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.transfers = TransferCounter()
+
+    def bucket(self, name: str) -> FilesystemBucket:
+        return FilesystemBucket(self, name)
+
+
+class _SynthesizeSpeechResponse:
+    def __init__(self, audio_content: bytes):
+        self.audio_content = audio_content
+
+
+class StubSpeechClient:
+    """Stand-in for ``texttospeech.TextToSpeechClient`` that answers with a
+    tone as long as the text would take to read aloud, so voiceover edits
+    cost what they would without calling the API."""
+
+    WORDS_PER_SECOND = 2.5
+
+    def synthesize_speech(self, input: Any, voice: Any = None, audio_config: Any = None) -> _SynthesizeSpeechResponse:
+        seconds = max(1.0, len(input.text.split()) / self.WORDS_PER_SECOND)
+        with tempfile.NamedTemporaryFile(suffix=".mp3") as speech_file:
+            subprocess.run(
+                [
+                    "ffmpeg", "-y", "-v", "error",
+                    "-f", "lavfi", "-i", f"sine=frequency=220:sample_rate=24000:duration={seconds:.2f}",
+                    "-c:a", "libmp3lame", "-b:a", "64k",
+                    speech_file.name
+                ],
+                check=True
+            )
+            return _SynthesizeSpeechResponse(Path(speech_file.name).read_bytes())
+
+
+def install(storage_root: str) -> FilesystemStorageClient:
+    """Route every storage and TTS client the services create to the stand-ins.
+    Must run before the services are imported, since they create their
+    clients at import time."""
+    from google.cloud import storage, texttospeech
+
+    storage_client = FilesystemStorageClient(storage_root)
+    storage.Client = lambda *args, **kwargs: storage_client
+    texttospeech.TextToSpeechClient = lambda *args, **kwargs: StubSpeechClient()
+    return storage_client
@@ -11,6 +11,48 @@ class Settings(BaseSettings):
     API_PREFIX: str = "/api"
     GCS_BUCKET_NAME: str = "creative-audit-scratch-pad"
     CDN_DOMAIN: str = "creative-audit.prd.cdn.polaris.prd.ext.wpromote.com"
+    RENDER_CACHE_DIR: str = "data/render_cache"
+    RENDER_CACHE_MAX_BYTES: int = 2 * 1024 * 1024 * 1024
+    # Renders are served from the local tier at once and copied to the bucket
+    # on this many threads; 0 uploads them before the render returns.
+    RENDER_UPLOAD_WORKERS: int = 2
+    # A render missing from the bucket is not looked up there again for this
+    # long, unless this process stores it; renders by other processes show up
+    # once it expires.
+    RENDER_MISS_TTL_SECONDS: float = 300.0
+    TEXT_OVERLAY_CACHE_DIR: str = "data/text_overlay_cache"
+    LUT_CACHE_DIR: str = "data/lut_cache"
+    WAVEFORM_CACHE_DIR: str = "data/waveform_cache"
+    # Read sources over signed byte-range URLs and pipe uploaded renders into
+    # resumable uploads as fragmented MP4, instead of staging both in /tmp.
+    STREAM_IO: bool = False
+    STREAM_URL_EXPIRY_SECONDS: int = 3600
+    STREAM_UPLOAD_CHUNK_BYTES: int = 8 * 1024 * 1024
+    # Thumbnails per sprite sheet uploaded next to each render; 0 disables them.
+    SPRITE_THUMBNAIL_COUNT: int = 20
+    SPRITE_THUMBNAIL_WIDTH: int = 160
+    # Sprites are generated on this many threads after the render returns;
+    # 0 generates them before it returns.
+    SPRITE_WORKERS: int = 1
+    # Render jobs publish an HLS copy of their final encode as it runs.
+    HLS_PREVIEW: bool = True
+    HLS_SEGMENT_SECONDS: int = 2
+    RENDER_WORKERS: int = 2
+    RENDER_DEBOUNCE_SECONDS: float = 0.75
+    # "local" renders on a thread pool inside the API process; "queue" hands
+    # renders to standalone render_worker.py processes through sessions.db.
+    RENDER_BACKEND: str = "local"
+    RENDER_LEASE_SECONDS: float = 30.0
+    RENDER_HEARTBEAT_SECONDS: float = 5.0
+    RENDER_MAX_ATTEMPTS: int = 3
+    # Spans of chat turns and renders, appended to a JSONL file and kept in a
+    # ring buffer that /api/traces serves.
+    TRACING: bool = True
+    TRACE_LOG_PATH: str = "logs/traces.jsonl"
+    # The trace log rolls over to .1 ... .N at this size; 0 lets it grow.
+    TRACE_LOG_MAX_BYTES: int = 100 * 1024 * 1024
+    TRACE_LOG_BACKUPS: int = 3
+    TRACE_BUFFER_SPANS: int = 10000
     BACKEND_CORS_ORIGINS: list[AnyHttpUrl] = [
         "http://localhost",
         "http://localhost:4200",
@@ -0,0 +1,96 @@
+"""Process metrics in the Prometheus text exposition format, served at
+/api/metrics for dashboards and the autoscaler.
+
+Metrics are prometheus_client collectors on the app's own registry, so the
+exposition carries only these series. Stage latencies are observed from
+finished tracing spans, so a stage is timed once for both traces and metrics.
+"""
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+
+CONTENT_TYPE = CONTENT_TYPE_LATEST
+
+# Seconds; API requests and service calls.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Seconds; whole renders run for minutes.
+RENDER_BUCKETS = (1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1200.0)
+
+registry = CollectorRegistry()
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "editor_http_request_duration_seconds", "API request latency by route.",
+    ("method", "route", "status"), registry=registry, buckets=LATENCY_BUCKETS
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "editor_http_requests_in_progress", "API requests being handled.", registry=registry
+)
+RENDER_SECONDS = Histogram(
+    "editor_render_duration_seconds", "Edit queue render jobs, from start to final upload.",
+    ("status",), registry=registry, buckets=RENDER_BUCKETS
+)
+RENDER_QUEUE_DEPTH = Gauge(
+    "editor_render_queue_depth", "Render jobs waiting or rendering, in the API's pool or the shared queue.",
+    ("queue", "status"), registry=registry
+)
+FFMPEG_PROCESSES = Gauge(
+    "editor_ffmpeg_processes", "ffmpeg processes running in this process.", registry=registry
+)
+STAGE_SECONDS = Histogram(
+    "editor_stage_duration_seconds", "Latency of external calls and pipeline stages: tts, llm (Gemini), "
+    "ffmpeg, probe, download, upload.",
+    ("stage", "status"), registry=registry, buckets=LATENCY_BUCKETS
+)
+DB_QUERY_SECONDS = Histogram(
+    "editor_db_query_duration_seconds", "Session database (SQLite) operations.",
+    ("operation",), registry=registry, buckets=LATENCY_BUCKETS
+)
+CACHE_LOOKUPS = Counter(
+    "editor_cache_lookups", "Cache lookups by result (hit or miss).", ("cache", "result"), registry=registry
+)
+CACHE_HIT_RATIO = Gauge(
+    "editor_cache_hit_ratio", "Share of lookups served from cache since the process started.",
+    ("cache",), registry=registry
+)
+
+
+def expose() -> bytes:
+    return generate_latest(registry)
+
+
+def record_cache_lookup(cache: str, hit: bool) -> None:
+    CACHE_LOOKUPS.labels(cache=cache, result="hit" if hit else "miss").inc()
+
+
+def update_cache_hit_ratios() -> None:
+    lookups: dict[str, dict[str, float]] = {}
+    for metric in CACHE_LOOKUPS.collect():
+        for sample in metric.samples:
+            if sample.name.endswith("_total"):
+                lookups.setdefault(sample.labels["cache"], {})[sample.labels["result"]] = sample.value
+    for cache, results in lookups.items():
+        total = results.get("hit", 0.0) + results.get("miss", 0.0)
+        CACHE_HIT_RATIO.labels(cache=cache).set(results.get("hit", 0.0) / total if total else 0.0)
+
+
+# Span names timed as stages; render.job spans feed the render histogram.
+STAGE_SPANS = ("tts", "llm", "ffmpeg", "probe", "download", "upload")
+
+
+class SpanMetricsExporter:
+    """Tracing exporter that observes stage and render spans as histograms."""
+
+    def export(self, span) -> None:
+        if span.duration_ms is None:
+            return
+        seconds = span.duration_ms / 1000
+        if span.name == "render.job":
+            RENDER_SECONDS.labels(status=span.status).observe(seconds)
+        elif span.name in STAGE_SPANS:
+            STAGE_SECONDS.labels(stage=span.name, status=span.status).observe(seconds)
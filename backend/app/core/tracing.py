@@ -0,0 +1,239 @@
+"""Lightweight tracing of where a chat turn or render spends its time.
+
+Spans nest through a context variable and are exported when they end, to a
+JSONL file and to an in-memory ring buffer that the API serves per trace.
+Code that hands work to another thread captures ``current_span()`` and
+passes it as the new span's ``parent``.
+"""
+
+import contextlib
+import contextvars
+import functools
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Iterator, Optional
+
+from core.config import settings
+from core.metrics import SpanMetricsExporter
+
+logger = logging.getLogger(__name__)
+
+# Tags every span passes on to the spans nested in it.
+INHERITED_ATTRIBUTES = ("session_id", "job_id", "edit_id", "edit_type")
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+
+_INHERIT = object()
+
+
+@dataclass
+class Span:
+    trace_id: str
+    span_id: str
+    name: str
+    parent_id: Optional[str] = None
+    start_time: float = field(default_factory=time.time)
+    end_time: Optional[float] = None
+    duration_ms: Optional[float] = None
+    status: str = "ok"
+    error: Optional[str] = None
+    attributes: dict[str, Any] = field(default_factory=dict)
+    _start_counter: float = field(default_factory=time.perf_counter, repr=False)
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> dict[str, Any]:
+        data = asdict(self)
+        del data["_start_counter"]
+        return data
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+class JsonlSpanExporter:
+    """Appends each finished span to a JSONL file, kept open between spans.
+
+    Once the file would grow past ``max_bytes`` it is rolled over to
+    ``<path>.1``, shifting older files up to ``<path>.<backups>`` and dropping
+    the oldest, like logging's RotatingFileHandler. ``max_bytes=0`` never
+    rolls over.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 0, backups: int = 0):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._lock = threading.Lock()
+        self._file: Optional[BinaryIO] = None
+        self._size = 0
+
+    def export(self, span: Span) -> None:
+        line = (json.dumps(span.to_dict(), default=str) + "\n").encode()
+        with self._lock:
+            if self._file is None:
+                self._open()
+            elif self.max_bytes and self._size + len(line) > self.max_bytes:
+                self._roll_over()
+            self._file.write(line)
+            self._file.flush()
+            self._size += len(line)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _open(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = self.path.open("ab")
+        self._size = self._file.tell()
+
+    def _backup_path(self, index: int) -> Path:
+        return self.path.with_name(f"{self.path.name}.{index}")
+
+    def _roll_over(self) -> None:
+        self._file.close()
+        if self.backups > 0:
+            for index in range(self.backups - 1, 0, -1):
+                if self._backup_path(index).exists():
+                    self._backup_path(index).replace(self._backup_path(index + 1))
+            self.path.replace(self._backup_path(1))
+        else:
+            self.path.unlink()
+        self._open()
+
+
+class RingBufferExporter:
+    """Keeps the spans of the most recent traces in memory."""
+
+    def __init__(self, max_spans: int):
+        self._lock = threading.Lock()
+        self._spans: deque[Span] = deque(maxlen=max_spans)
+
+    def export(self, span: Span) -> None:
+        with self._lock:
+            self._spans.append(span)
+
+    def trace(self, trace_id: str) -> list[dict[str, Any]]:
+        """Spans of one trace, oldest first."""
+        with self._lock:
+            spans = [span for span in self._spans if span.trace_id == trace_id]
+        return [span.to_dict() for span in sorted(spans, key=lambda span: span.start_time)]
+
+    def traces(self, limit: int = 50, session_id: Optional[str] = None) -> list[dict[str, Any]]:
+        """Summaries of the most recent traces, newest first. A trace's root
+        span ends last, so a trace still in progress shows its first span."""
+        with self._lock:
+            spans = list(self._spans)
+
+        by_trace: OrderedDict[str, list[Span]] = OrderedDict()
+        for span in spans:
+            by_trace.setdefault(span.trace_id, []).append(span)
+
+        summaries = []
+        for trace_id, trace_spans in reversed(by_trace.items()):
+            root = next((span for span in trace_spans if span.parent_id is None), None)
+            first = root or min(trace_spans, key=lambda span: span.start_time)
+            if session_id and first.attributes.get("session_id") != session_id:
+                continue
+            summaries.append({
+                "trace_id": trace_id,
+                "name": first.name,
+                "session_id": first.attributes.get("session_id"),
+                "start_time": first.start_time,
+                "duration_ms": root.duration_ms if root else None,
+                "status": "error" if any(span.status == "error" for span in trace_spans) else "ok",
+                "span_count": len(trace_spans),
+            })
+            if len(summaries) >= limit:
+                break
+        return summaries
+
+
+class Tracer:
+    def __init__(self, exporters: list, enabled: bool = True):
+        self.exporters = exporters
+        self.enabled = enabled
+
+    def start_span(self, name: str, parent: Any = _INHERIT, **attributes: Any) -> Span:
+        """A span that is not made current; end it with ``end_span``. For
+        stages delimited by callbacks rather than a block."""
+        if parent is _INHERIT:
+            parent = _current_span.get()
+        inherited = {}
+        if parent:
+            inherited = {key: parent.attributes[key] for key in INHERITED_ATTRIBUTES if key in parent.attributes}
+        return Span(
+            trace_id=parent.trace_id if parent else uuid.uuid4().hex,
+            span_id=uuid.uuid4().hex[:16],
+            parent_id=parent.span_id if parent else None,
+            name=name,
+            attributes={**inherited, **{key: value for key, value in attributes.items() if value is not None}}
+        )
+
+    def end_span(self, span: Span, error: Optional[BaseException] = None) -> None:
+        span.end_time = time.time()
+        span.duration_ms = (time.perf_counter() - span._start_counter) * 1000
+        if error is not None:
+            span.status = "error"
+            span.error = f"{type(error).__name__}: {error}"
+        if not self.enabled:
+            return
+        for exporter in self.exporters:
+            try:
+                exporter.export(span)
+            except Exception as e:
+                logger.warning(f"Could not export span {span.name}: {e}")
+
+    @contextlib.contextmanager
+    def span(self, name: str, parent: Any = _INHERIT, **attributes: Any) -> Iterator[Span]:
+        """Time the block as a span nested in the current one, or in
+        ``parent`` when the block runs on another thread."""
+        span = self.start_span(name, parent, **attributes)
+        token = _current_span.set(span)
+        error = None
+        try:
+            yield span
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            _current_span.reset(token)
+            self.end_span(span, error)
+
+    def traced(self, name: Optional[str] = None, **attributes: Any) -> Callable:
+        """Decorator that runs each call of a function in a span. The wrapper
+        keeps the function's signature, so agent tools can be wrapped."""
+        def decorator(func: Callable) -> Callable:
+            span_name = name or func.__name__
+
+            @functools.wraps(func)
+            def wrapper(*args: Any, **kwargs: Any) -> Any:
+                with self.span(span_name, **attributes):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+
+span_buffer = RingBufferExporter(settings.TRACE_BUFFER_SPANS)
+# Stage latency metrics come from spans, so they are exported even with tracing off.
+tracer = Tracer([SpanMetricsExporter()])
+if settings.TRACING:
+    tracer.exporters += [
+        JsonlSpanExporter(
+            str(Path(__file__).parent.parent / settings.TRACE_LOG_PATH),
+            max_bytes=settings.TRACE_LOG_MAX_BYTES,
+            backups=settings.TRACE_LOG_BACKUPS
+        ),
+        span_buffer
+    ]
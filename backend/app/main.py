@@ -1,12 +1,15 @@
 """API Entry point where the app and routers are set up"""
 
+import time
+
 import uvicorn
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from starlette.middleware.cors import CORSMiddleware
 
 from api.router import api_router
 from core.config import settings
 from core.env_validation import validate_environment_or_exit
+from core.metrics import HTTP_REQUEST_SECONDS, HTTP_REQUESTS_IN_PROGRESS
 
 validate_environment_or_exit()
 
@@ -25,6 +28,23 @@ if settings.BACKEND_CORS_ORIGINS:
         allow_headers=["*"],
     )
 
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    started = time.perf_counter()
+    status = 500
+    with HTTP_REQUESTS_IN_PROGRESS.track_inprogress():
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            # The route template, so /render-jobs/{job_id} is one series.
+            route = request.scope.get("route")
+            HTTP_REQUEST_SECONDS.labels(
+                method=request.method, route=getattr(route, "path", "unmatched"), status=status
+            ).observe(time.perf_counter() - started)
+
 app.include_router(api_router, prefix=settings.API_PREFIX)
 
 if __name__ == "__main__":
@@ -1,4 +1,6 @@
-from dataclasses import dataclass, asdict
+import hashlib
+import json
+from dataclasses import dataclass, asdict, field
 from datetime import datetime
 from typing import Any, Literal, Optional
 
@@ -6,6 +8,36 @@ from typing import Any, Literal, Optional
 EditType = Literal["voiceover", "text_overlay", "trim", "filter"]
 EditStatus = Literal["pending", "applied", "reverted", "overwritten", "superseded"]
 
+# Params filled in by the pipeline itself (e.g. the TTS file for a voiceover's
+# text) that must not change an edit's identity.
+DERIVED_PARAM_KEYS = {"audio_path"}
+
+MAX_RENDER_CACHE_ENTRIES = 50
+
+# Which edit types change each stream; the pipeline renders the two layers
+# separately so an audio-only change never re-encodes video.
+LAYER_EDIT_TYPES = {
+    "video": ("text_overlay", "filter", "trim"),
+    "audio": ("voiceover", "trim"),
+}
+
+
+def hash_source(video_url: str, video_id: Optional[str] = None, profile: str = "full") -> str:
+    identity = f"source:{video_url}:{video_id}"
+    if profile != "full":
+        identity += f":profile:{profile}"
+    return hashlib.sha256(identity.encode()).hexdigest()
+
+
+def hash_layer_root(source_hash: str, layer: str) -> str:
+    return hashlib.sha256(f"{source_hash}:layer:{layer}".encode()).hexdigest()
+
+
+def hash_edit_prefix(parent_hash: str, edit_type: str, params: dict[str, Any]) -> str:
+    identity = {k: v for k, v in params.items() if k not in DERIVED_PARAM_KEYS}
+    payload = json.dumps({"type": edit_type, "params": identity}, sort_keys=True, default=str)
+    return hashlib.sha256(f"{parent_hash}:{payload}".encode()).hexdigest()
+
 
 @dataclass
 class Edit:
@@ -15,6 +47,7 @@ class Edit:
     timestamp: str
     status: EditStatus
     result_video_url: Optional[str] = None
+    prefix_hash: Optional[str] = None
     
     def to_dict(self) -> dict[str, Any]:
         return asdict(self)
@@ -31,6 +64,7 @@ class EditQueue:
     edits: list[Edit]
     current_video_url: str
     video_id: Optional[str] = None
+    render_cache: dict[str, str] = field(default_factory=dict)
     
     def add_edit(self, edit: Edit) -> None:
         self.edits.append(edit)
@@ -57,6 +91,100 @@ class EditQueue:
     def get_applied_edits(self) -> list[Edit]:
         return [e for e in self.edits if e.status == "applied"]
     
+    def compute_prefix_hashes(self, profile: str = "full") -> list[str]:
+        """Hash (source, render profile, ordered applied edit params) for every
+        applied edit.
+
+        Each hash identifies the video produced by applying the queue up to and
+        including that edit, so it is stored on the edit and used as the key
+        into ``render_cache``.
+        """
+        hashes = []
+        current_hash = hash_source(self.original_video_url, self.video_id, profile)
+        for edit in self.get_applied_edits():
+            current_hash = hash_edit_prefix(current_hash, edit.type, edit.params)
+            edit.prefix_hash = current_hash
+            hashes.append(current_hash)
+        return hashes
+    
+    def get_layer_edits(self, layer: str) -> list[Edit]:
+        return [e for e in self.get_applied_edits() if e.type in LAYER_EDIT_TYPES[layer]]
+    
+    def compute_layer_hashes(self, layer: str, profile: str = "full") -> list[str]:
+        """Prefix hashes of one stream layer; index 0 is the untouched source
+        layer and index i the layer after its first i edits."""
+        # Render profiles only change the video stream, so audio layers are shared.
+        if layer == "audio":
+            profile = "full"
+        current_hash = hash_layer_root(hash_source(self.original_video_url, self.video_id, profile), layer)
+        hashes = [current_hash]
+        for edit in self.get_layer_edits(layer):
+            current_hash = hash_edit_prefix(current_hash, edit.type, edit.params)
+            hashes.append(current_hash)
+        return hashes
+    
+    def prefix_queue(self, edit_id: str) -> Optional["EditQueue"]:
+        """Recipe for the video as of an applied edit: a copy of this queue
+        holding the applied edits up to and including it. Its final prefix
+        hash is that edit's prefix hash."""
+        applied_edits = self.get_applied_edits()
+        index = next((i for i, edit in enumerate(applied_edits) if edit.id == edit_id), None)
+        if index is None:
+            return None
+        return EditQueue(
+            session_id=self.session_id,
+            original_video_url=self.original_video_url,
+            edits=[Edit.from_dict(edit.to_dict()) for edit in applied_edits[:index + 1]],
+            current_video_url=self.original_video_url,
+            video_id=self.video_id,
+            render_cache=dict(self.render_cache)
+        )
+    
+    def cache_render(self, prefix_hash: str, video_url: str) -> None:
+        self.render_cache.pop(prefix_hash, None)
+        self.render_cache[prefix_hash] = video_url
+        while len(self.render_cache) > MAX_RENDER_CACHE_ENTRIES:
+            self.render_cache.pop(next(iter(self.render_cache)))
+    
+    def merge_derived_params(self, other: "EditQueue") -> None:
+        """Copy params produced while rendering another copy of this queue
+        (e.g. generated voiceover audio) onto the matching, unchanged edits."""
+        other_edits = {edit.id: edit for edit in other.edits}
+        for edit in self.edits:
+            source = other_edits.get(edit.id)
+            if not source or source.type != edit.type:
+                continue
+            identity = {k: v for k, v in edit.params.items() if k not in DERIVED_PARAM_KEYS}
+            source_identity = {k: v for k, v in source.params.items() if k not in DERIVED_PARAM_KEYS}
+            if identity != source_identity:
+                continue
+            for key in DERIVED_PARAM_KEYS:
+                if key in source.params:
+                    edit.params[key] = source.params[key]
+    
+    def merge_render(self, rendered: "EditQueue", profile: str = "full") -> bool:
+        """Merge a finished render of another copy of this queue.
+
+        This queue may have gained edits while the render ran, so only the
+        render cache and derived params are merged unconditionally; the current
+        video moves only if this queue still describes what was rendered.
+        Returns whether it did.
+        """
+        rendered_hashes = rendered.compute_prefix_hashes(profile)
+        stored_hashes = self.compute_prefix_hashes(profile)
+        
+        self.merge_derived_params(rendered)
+        for prefix_hash, video_url in rendered.render_cache.items():
+            self.cache_render(prefix_hash, video_url)
+        
+        if rendered_hashes != stored_hashes:
+            return False
+        
+        self.current_video_url = rendered.current_video_url
+        for edit in self.get_applied_edits():
+            edit.result_video_url = self.render_cache.get(edit.prefix_hash)
+        return True
+    
     def find_edit_by_type(self, edit_type: EditType) -> Optional[Edit]:
         for edit in reversed(self.edits):
             if edit.type == edit_type and edit.status == "applied":
@@ -69,7 +197,8 @@ class EditQueue:
             "original_video_url": self.original_video_url,
             "edits": [e.to_dict() for e in self.edits],
             "current_video_url": self.current_video_url,
-            "video_id": self.video_id
+            "video_id": self.video_id,
+            "render_cache": self.render_cache
         }
     
     @classmethod
@@ -80,5 +209,6 @@ class EditQueue:
             original_video_url=data["original_video_url"],
             edits=edits,
             current_video_url=data["current_video_url"],
-            video_id=data.get("video_id")
+            video_id=data.get("video_id"),
+            render_cache=data.get("render_cache", {})
         )
@@ -1,24 +1,29 @@
 import asyncio
+import contextvars
 import json
 import logging
 import os
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Optional
 from urllib.parse import unquote
 
 from dotenv import load_dotenv
 from google import genai
-from google.adk.agents import LlmAgent
+from google.adk.agents import LlmAgent, RunConfig
 from google.adk.agents.callback_context import CallbackContext
 from google.adk.artifacts import InMemoryArtifactService
 from google.adk.models import LlmRequest, LlmResponse
 from google.adk.runners import Runner
 from google.adk.sessions import InMemorySessionService
+from google.adk.utils.context_utils import Aclosing
 from google.cloud import storage
 from google.genai import types
 from services.bigquery.bigquery_service import bigquery_service
 from services.config_service import config_service
+from services.render_store import render_store
+from core.tracing import Span, tracer
 
 from multi_tool_agent.add_text import add_text_to_video_with_ffmpeg
 from multi_tool_agent.generate_speech_tool import (
@@ -224,6 +229,24 @@ async def call_agent_async(query):
 CURRENT_FEATURE_ID = None
 
 
+def _run_agent_turn(user_id: str, session_id: str, new_message: types.Content) -> list:
+    """Events of one agent turn. The caller may be on an event loop thread, so
+    the turn gets a loop of its own on a worker thread, running in a copy of
+    the caller's context so its model, tool and render spans nest under the
+    caller's span."""
+    async def collect_events():
+        async with Aclosing(
+            AGENT_RUNNER.run_async(
+                user_id=user_id, session_id=session_id, new_message=new_message, run_config=RunConfig()
+            )
+        ) as events:
+            return [event async for event in events]
+
+    context = contextvars.copy_context()
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="agent-turn") as pool:
+        return pool.submit(context.run, asyncio.run, collect_events()).result()
+
+
 def call_agent(query, feature_id=None, user_id=None, session_id=None):
     """"""
     global CURRENT_FEATURE_ID
@@ -296,9 +319,7 @@ USER QUERY: {query}
 
     content = types.Content(role="user", parts=parts)
     print("Running agent...")
-    events = AGENT_RUNNER.run(
-        user_id=agent_user_id, session_id=agent_session_id, new_message=content
-    )
+    events = _run_agent_turn(agent_user_id, agent_session_id, content)
     print("Processing agent responses...")
     
     media_assets = {}
@@ -339,13 +360,21 @@ USER QUERY: {query}
             
             print(f"DEBUG agent.py: has_audio={has_audio}, has_new_video={has_new_video}")
             
-            if has_audio and has_new_video:
-                media_assets['video_url'] = session.state['edited_video_url']
+            render_job_id = session.state.get('render_job_id')
+            
+            if render_job_id:
+                media_assets['render_job_id'] = render_job_id
+                session.state['render_job_id'] = None
+                print(f"DEBUG agent.py: Render in progress - sending render_job_id: {render_job_id}")
+                if has_audio:
+                    session.state['audio_urls'] = []
+            elif has_audio and has_new_video:
+                media_assets['video_url'] = render_store.materialize_url(session.state['edited_video_url'])
                 print(f"DEBUG agent.py: Both audio and video present - sending video_url: {media_assets['video_url']}")
                 session.state['audio_urls'] = []
                 print(f"DEBUG agent.py: Cleared audio_urls from session state (keeping edited_video_url for edit queue)")
             elif has_new_video:
-                media_assets['video_url'] = session.state['edited_video_url']
+                media_assets['video_url'] = render_store.materialize_url(session.state['edited_video_url'])
                 print(f"DEBUG agent.py: Setting video_url in media_assets: {media_assets['video_url']}")
                 print(f"DEBUG agent.py: Keeping edited_video_url in session state for edit queue")
             elif has_audio:
@@ -372,6 +401,35 @@ USER QUERY: {query}
     return last_response
 
 
+# Model calls in flight, by invocation; an invocation calls the model one at a time.
+_llm_spans: dict[str, Span] = {}
+
+
+def _start_llm_span(
+    callback_context: CallbackContext, llm_request: LlmRequest
+) -> Optional[LlmResponse]:
+    _llm_spans[callback_context.invocation_id] = tracer.start_span("llm", model=llm_request.model)
+    return None
+
+
+def _end_llm_span(
+    callback_context: CallbackContext, llm_response: LlmResponse
+) -> Optional[LlmResponse]:
+    span = _llm_spans.pop(callback_context.invocation_id, None)
+    if span:
+        usage = llm_response.usage_metadata
+        if usage:
+            span.set(
+                prompt_tokens=usage.prompt_token_count,
+                response_tokens=usage.candidates_token_count
+            )
+        if llm_response.error_code:
+            span.status = "error"
+            span.error = f"{llm_response.error_code}: {llm_response.error_message}"
+        tracer.end_span(span)
+    return None
+
+
 async def init_agent(
     callback_context: CallbackContext, llm_request: LlmRequest
 ) -> Optional[LlmResponse]:
@@ -425,7 +483,8 @@ async def init_agent(
                 with tempfile.NamedTemporaryFile(
                     delete=False, suffix=".mp4"
                 ) as tmp_file:
-                    blob.download_to_filename(tmp_file.name)
+                    with tracer.span("download", url=video_url):
+                        blob.download_to_filename(tmp_file.name)
 
                     callback_context.state["video_url"] = video_url
                     callback_context.state["temp:video"] = tmp_file.name
@@ -506,6 +565,10 @@ def generate_dynamic_instruction(feature_config: Optional[dict] = None) -> str:
        - The function will AUTOMATICALLY mark old text overlays as "overwritten"
        - DO NOT call `remove_edit()` before adding new text - this causes history loss
     
+    7. RENDERING:
+       - Edit tools return status "rendering" and a job_id instead of a video_url
+       - Tell the user their video is rendering; do not call the tool again to wait for it
+    
     CRITICAL: Always determine if the user wants to UPDATE an existing edit or ADD a new one before calling tools.
     """
     
@@ -539,8 +602,8 @@ def generate_dynamic_instruction(feature_config: Optional[dict] = None) -> str:
     2. Extract the Video URL from the FEATURE CONTEXT section above (it's listed as "- Video URL: ...")
     3. CRITICAL: Call ONLY `add_voiceover_edit(text=voice_message, start_ms=start_at_milliseconds)` - the video_url is automatically retrieved from the agent's context
     4. DO NOT call `add_text_overlay_edit` - text overlays are already in the video, only the voiceover is missing
-    5. The tool will return a new video_url - you MUST include this in your response media
-    6. DO NOT just say you've added it - actually call the tool and return the new video
+    5. The tool returns status "rendering" with a job_id - tell the user the updated video is rendering and will appear shortly
+    6. DO NOT just say you've added it - actually call the tool so the new video gets rendered
     
     WORKFLOW FOR USER EDITS:
     When a user requests changes to audio:
@@ -721,8 +784,9 @@ def create_agent():
         name=name,
         description=description,
         instruction=instruction,
-        tools=tools,
-        before_model_callback=init_agent,
+        tools=[tracer.traced(f"tool.{tool.__name__}")(tool) for tool in tools],
+        before_model_callback=[init_agent, _start_llm_span],
+        after_model_callback=_end_llm_span,
     )
 
     return agent
@@ -3,16 +3,80 @@ import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 import logging
+import threading
 import uuid
 from datetime import datetime
 from typing import Dict, Any, Optional
 
+from core.config import settings
+from core.tracing import current_span
 from models.edit_models import Edit, EditQueue
+from services.render_job_service import RenderJob, render_job_service
+from services.render_queue_service import render_queue_service
+from services.render_profiles import PROXY_PROFILE
 from services.video_pipeline_service import video_pipeline_service
-from multi_tool_agent.session_data import get_edit_queue, save_edit_queue, initialize_edit_queue
+from multi_tool_agent import session_data
+from multi_tool_agent.session_data import (
+    capture_session_info,
+    get_edit_queue,
+    save_edit_queue,
+    initialize_edit_queue
+)
 
 logger = logging.getLogger(__name__)
 
+_record_lock = threading.Lock()
+
+
+def _record_render(edit_queue: EditQueue, session_info) -> None:
+    """Merge a finished render into the stored queue, which may have gained
+    edits while the job ran."""
+    with _record_lock:
+        stored_queue = get_edit_queue(session_info) or edit_queue
+        stored_queue.merge_render(edit_queue, PROXY_PROFILE.name)
+        save_edit_queue(stored_queue, session_info)
+
+
+def _tag_span(edit: Edit) -> None:
+    """Tag the tool's span, and the render it submits, with the edit it works on."""
+    span = current_span()
+    if span:
+        span.set(edit_id=edit.id, edit_type=edit.type)
+
+
+def _submit_render(tool_context, edit_queue: EditQueue) -> RenderJob:
+    """Save the queue and render it in the background; the agent turn returns
+    straight away and the client polls the job for the video."""
+    save_edit_queue(edit_queue)
+    session_info = capture_session_info()
+    user_id, _, _, is_frontend = session_info
+    
+    # Bursts of edits coalesce per session: this job supersedes any render of
+    # an older queue state that is still debouncing or running.
+    prefix_hashes = edit_queue.compute_prefix_hashes(PROXY_PROFILE.name)
+    state_key = prefix_hashes[-1] if prefix_hashes else None
+    
+    # Render workers can only write back to sessions stored in the database.
+    if settings.RENDER_BACKEND == "queue" and is_frontend:
+        job = render_queue_service.enqueue(
+            edit_queue,
+            PROXY_PROFILE,
+            app_name=session_data.APP_NAME,
+            user_id=user_id,
+            state_key=state_key
+        )
+    else:
+        job = render_job_service.submit(
+            lambda: video_pipeline_service.apply_edit_queue(edit_queue, profile=PROXY_PROFILE),
+            session_id=edit_queue.session_id,
+            on_success=lambda video_url: _record_render(edit_queue, session_info),
+            state_key=state_key
+        )
+    
+    tool_context.state["render_job_id"] = job.id
+    logger.info(f"Set render_job_id in tool_context.state: {job.id}")
+    return job
+
 
 def add_voiceover_edit(tool_context, text: str, start_ms: int, original_video_url: Optional[str] = None) -> Dict[str, Any]:
     """
@@ -25,7 +89,7 @@ def add_voiceover_edit(tool_context, text: str, start_ms: int, original_video_ur
         original_video_url: URL of the original video (optional, will use from state if not provided)
     
     Returns:
-        Dictionary with status, message, and video_url
+        Dictionary with status, message, and the render job_id
     """
     try:
         if not original_video_url:
@@ -55,18 +119,14 @@ def add_voiceover_edit(tool_context, text: str, start_ms: int, original_video_ur
         )
         
         edit_queue.add_edit(edit)
+        _tag_span(edit)
         
-        result_video_url = video_pipeline_service.apply_edit_queue(edit_queue)
-        
-        save_edit_queue(edit_queue)
-        
-        tool_context.state["edited_video_url"] = result_video_url
-        logger.info(f"Set edited_video_url in tool_context.state: {result_video_url}")
+        job = _submit_render(tool_context, edit_queue)
         
         return {
-            "status": "success",
-            "message": f"Added voiceover at {start_ms}ms",
-            "video_url": result_video_url,
+            "status": "rendering",
+            "message": f"Added voiceover at {start_ms}ms; the updated video is rendering",
+            "job_id": job.id,
             "edit_id": edit.id
         }
     except Exception as e:
@@ -87,7 +147,7 @@ def update_voiceover_timing(tool_context, edit_id: str, new_start_ms: int) -> Di
         new_start_ms: New start time in milliseconds
     
     Returns:
-        Dictionary with status, message, and video_url
+        Dictionary with status, message, and the render job_id
     """
     try:
         edit_queue = get_edit_queue()
@@ -103,18 +163,14 @@ def update_voiceover_timing(tool_context, edit_id: str, new_start_ms: int) -> Di
                 "status": "error",
                 "message": f"Edit {edit_id} not found"
             }
+        _tag_span(edit_queue.get_edit(edit_id))
         
-        result_video_url = video_pipeline_service.apply_edit_queue(edit_queue)
-        
-        save_edit_queue(edit_queue)
-        
-        tool_context.state["edited_video_url"] = result_video_url
-        logger.info(f"Set edited_video_url in tool_context.state: {result_video_url}")
+        job = _submit_render(tool_context, edit_queue)
         
         return {
-            "status": "success",
-            "message": f"Updated voiceover timing to {new_start_ms}ms",
-            "video_url": result_video_url
+            "status": "rendering",
+            "message": f"Updated voiceover timing to {new_start_ms}ms; the updated video is rendering",
+            "job_id": job.id
         }
     except Exception as e:
         logger.error(f"Error updating voiceover timing: {e}")
@@ -148,7 +204,7 @@ def add_text_overlay_edit(
         position: Text position (default "center")
     
     Returns:
-        Dictionary with status, message, and video_url
+        Dictionary with status, message, and the render job_id
     """
     try:
         if not original_video_url:
@@ -187,24 +243,20 @@ def add_text_overlay_edit(
         )
         
         edit_queue.add_edit(edit)
+        _tag_span(edit)
         
         logger.info(f"DEBUG: Edit queue before save has {len(edit_queue.edits)} total edits")
         for e in edit_queue.edits:
             logger.info(f"  Edit {e.id}: type={e.type}, status={e.status}")
         
-        result_video_url = video_pipeline_service.apply_edit_queue(edit_queue)
-        
-        save_edit_queue(edit_queue)
+        job = _submit_render(tool_context, edit_queue)
         
         logger.info(f"DEBUG: Edit queue after save has {len(edit_queue.edits)} total edits")
         
-        tool_context.state["edited_video_url"] = result_video_url
-        logger.info(f"Set edited_video_url in tool_context.state: {result_video_url}")
-        
         return {
-            "status": "success",
-            "message": f"Added text overlay '{text}' from {start_ms}ms to {end_ms}ms",
-            "video_url": result_video_url,
+            "status": "rendering",
+            "message": f"Added text overlay '{text}' from {start_ms}ms to {end_ms}ms; the updated video is rendering",
+            "job_id": job.id,
             "edit_id": edit.id
         }
     except Exception as e:
@@ -224,7 +276,7 @@ def remove_edit(tool_context, edit_id: str) -> Dict[str, Any]:
         edit_id: ID of the edit to remove
     
     Returns:
-        Dictionary with status, message, and video_url (only if video changed)
+        Dictionary with status, message, and job_id (only if video changed)
     """
     try:
         edit_queue = get_edit_queue()
@@ -241,6 +293,7 @@ def remove_edit(tool_context, edit_id: str) -> Dict[str, Any]:
                 "message": f"Edit {edit_id} not found"
             }
         
+        _tag_span(edit_to_remove)
         was_applied = edit_to_remove.status == "applied"
         
         success = edit_queue.remove_edit(edit_id)
@@ -251,21 +304,12 @@ def remove_edit(tool_context, edit_id: str) -> Dict[str, Any]:
             }
         
         if was_applied:
-            edit_queue.current_video_url = edit_queue.original_video_url
-            for edit in edit_queue.edits:
-                edit.result_video_url = None
-            
-            result_video_url = video_pipeline_service.apply_edit_queue(edit_queue)
-            
-            save_edit_queue(edit_queue)
-            
-            tool_context.state["edited_video_url"] = result_video_url
-            logger.info(f"Set edited_video_url in tool_context.state: {result_video_url}")
+            job = _submit_render(tool_context, edit_queue)
             
             return {
-                "status": "success",
-                "message": "Edit removed and video regenerated",
-                "video_url": result_video_url
+                "status": "rendering",
+                "message": "Edit removed; the updated video is rendering",
+                "job_id": job.id
             }
         else:
             save_edit_queue(edit_queue)
@@ -356,7 +400,7 @@ def reactivate_edit(tool_context, edit_id: str) -> Dict[str, Any]:
         edit_id: ID of the edit to reactivate
     
     Returns:
-        Dictionary with status, message, and video_url
+        Dictionary with status, message, and the render job_id
     """
     try:
         edit_queue = get_edit_queue()
@@ -381,22 +425,14 @@ def reactivate_edit(tool_context, edit_id: str) -> Dict[str, Any]:
         
         edit.status = "applied"
         edit.timestamp = datetime.now().isoformat()
+        _tag_span(edit)
         
-        edit_queue.current_video_url = edit_queue.original_video_url
-        for e in edit_queue.edits:
-            e.result_video_url = None
-        
-        result_video_url = video_pipeline_service.apply_edit_queue(edit_queue)
-        
-        save_edit_queue(edit_queue)
-        
-        tool_context.state["edited_video_url"] = result_video_url
-        logger.info(f"Set edited_video_url in tool_context.state: {result_video_url}")
+        job = _submit_render(tool_context, edit_queue)
         
         return {
-            "status": "success",
-            "message": f"Edit reactivated successfully",
-            "video_url": result_video_url
+            "status": "rendering",
+            "message": f"Edit reactivated; the updated video is rendering",
+            "job_id": job.id
         }
     except Exception as e:
         logger.error(f"Error reactivating edit: {e}")
@@ -415,7 +451,7 @@ def deactivate_edit(tool_context, edit_id: str) -> Dict[str, Any]:
         edit_id: ID of the edit to deactivate
     
     Returns:
-        Dictionary with status, message, and video_url
+        Dictionary with status, message, and the render job_id
     """
     try:
         edit_queue = get_edit_queue()
@@ -440,22 +476,14 @@ def deactivate_edit(tool_context, edit_id: str) -> Dict[str, Any]:
         
         edit.status = "reverted"
         edit.timestamp = datetime.now().isoformat()
+        _tag_span(edit)
         
-        edit_queue.current_video_url = edit_queue.original_video_url
-        for e in edit_queue.edits:
-            e.result_video_url = None
-        
-        result_video_url = video_pipeline_service.apply_edit_queue(edit_queue)
-        
-        save_edit_queue(edit_queue)
-        
-        tool_context.state["edited_video_url"] = result_video_url
-        logger.info(f"Set edited_video_url in tool_context.state: {result_video_url}")
+        job = _submit_render(tool_context, edit_queue)
         
         return {
-            "status": "success",
-            "message": f"Edit deactivated successfully",
-            "video_url": result_video_url
+            "status": "rendering",
+            "message": f"Edit deactivated; the updated video is rendering",
+            "job_id": job.id
         }
     except Exception as e:
         logger.error(f"Error deactivating edit: {e}")
@@ -43,6 +43,12 @@ def _get_active_session_info():
     return USER_ID, SESSION_ID, session_service, False
 
 
+def capture_session_info():
+    """Snapshot the active session so background work can write back to it
+    after the frontend has moved on to another session."""
+    return _get_active_session_info()
+
+
 def set_session_data(key: str, data: Dict[str, Any]) -> Dict[str, str]:
     session = session_service.get_session_sync(
         app_name=APP_NAME, 
@@ -93,9 +99,9 @@ def clear_session_state() -> Dict[str, str]:
     return {"status": "error", "message": "Session not found"}
 
 
-def get_edit_queue() -> Optional[EditQueue]:
-    """Get the edit queue for the current session."""
-    user_id, session_id, service, is_frontend = _get_active_session_info()
+def get_edit_queue(session_info=None) -> Optional[EditQueue]:
+    """Get the edit queue for the current (or a captured) session."""
+    user_id, session_id, service, is_frontend = session_info or _get_active_session_info()
     
     if is_frontend:
         session = service.get_session(
@@ -117,9 +123,9 @@ def get_edit_queue() -> Optional[EditQueue]:
     return None
 
 
-def save_edit_queue(edit_queue: EditQueue) -> None:
-    """Save the edit queue to the session state."""
-    user_id, session_id, service, is_frontend = _get_active_session_info()
+def save_edit_queue(edit_queue: EditQueue, session_info=None) -> None:
+    """Save the edit queue to the current (or a captured) session's state."""
+    user_id, session_id, service, is_frontend = session_info or _get_active_session_info()
     
     queue_dict = edit_queue.to_dict()
     print(f"DEBUG session_data.py: Saving edit queue with {len(queue_dict.get('edits', []))} edits")
@@ -0,0 +1,141 @@
+"""Standalone render worker.
+
+Claims edit-queue renders from the ``render_jobs`` table in sessions.db and
+runs them with VideoPipelineService outside the API process. Run one per core
+you want to spend on rendering:
+
+    python render_worker.py --worker-id render-1
+"""
+
+import argparse
+import logging
+import os
+import socket
+import threading
+from typing import Optional
+
+from core.config import settings
+from core.env_validation import validate_environment_or_exit
+from core.tracing import tracer
+from models.edit_models import EditQueue
+from services.database_session_service import database_session_service
+from services.ffmpeg_runner import CancelToken, ffmpeg_runner
+from services.hls_preview_service import hls_preview_service
+from services.render_queue_service import ClaimedRender, render_queue_service
+from services.video_pipeline_service import video_pipeline_service
+
+logger = logging.getLogger(__name__)
+
+
+class RenderWorker:
+    def __init__(
+        self,
+        worker_id: Optional[str] = None,
+        queue=None,
+        poll_interval: float = 1.0,
+        lease_seconds: Optional[float] = None,
+        heartbeat_seconds: Optional[float] = None
+    ):
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.queue = queue or render_queue_service
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds or settings.RENDER_LEASE_SECONDS
+        self.heartbeat_seconds = heartbeat_seconds or settings.RENDER_HEARTBEAT_SECONDS
+        self._stop = threading.Event()
+
+    def run_forever(self) -> None:
+        logger.info(f"Render worker {self.worker_id} started")
+        while not self._stop.is_set():
+            if not self.run_once():
+                self._stop.wait(self.poll_interval)
+        logger.info(f"Render worker {self.worker_id} stopped")
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def run_once(self) -> bool:
+        """Claim and render one job; False when the queue had nothing runnable."""
+        claimed = self.queue.claim(self.worker_id, self.lease_seconds)
+        if not claimed:
+            return False
+
+        job = claimed.job
+        logger.info(f"Worker {self.worker_id} rendering job {job.id} (attempt {job.attempts})")
+
+        cancel_token = CancelToken()
+        finished = threading.Event()
+        heartbeat = threading.Thread(
+            target=self._heartbeat, args=(claimed, cancel_token, finished), daemon=True
+        )
+        heartbeat.start()
+        try:
+            with ffmpeg_runner.reporting_to(job.record_progress), ffmpeg_runner.cancellable(cancel_token), \
+                    hls_preview_service.reporting_to(job.record_preview), \
+                    tracer.span("render.job", job_id=job.id, session_id=job.session_id, worker_id=self.worker_id):
+                video_url = video_pipeline_service.apply_edit_queue(claimed.edit_queue, profile=claimed.profile)
+            self._record_render(claimed)
+            self.queue.complete(job.id, self.worker_id, video_url)
+            logger.info(f"Render job {job.id} finished: {video_url}")
+        except Exception as e:
+            if cancel_token.cancelled:
+                logger.info(f"Render job {job.id} stopped: superseded or reclaimed by another worker")
+            else:
+                logger.error(f"Render job {job.id} failed: {e}")
+                self.queue.fail(job.id, self.worker_id, str(e))
+        finally:
+            finished.set()
+            heartbeat.join()
+        return True
+
+    def _heartbeat(self, claimed: ClaimedRender, cancel_token: CancelToken, finished: threading.Event) -> None:
+        while not finished.wait(self.heartbeat_seconds):
+            try:
+                owned = self.queue.heartbeat(claimed.job, self.worker_id, self.lease_seconds)
+            except Exception as e:
+                # The lease still has time left; try again on the next beat.
+                logger.warning(f"Heartbeat for render job {claimed.job.id} failed: {e}")
+                continue
+            if not owned:
+                cancel_token.cancel()
+                return
+
+    def _record_render(self, claimed: ClaimedRender) -> None:
+        """Merge the render into the session's stored queue, in one transaction
+        so edits the API saves meanwhile are not lost."""
+        if not claimed.app_name or not claimed.user_id:
+            return
+        session = database_session_service.get_session(
+            app_name=claimed.app_name,
+            user_id=claimed.user_id,
+            session_id=claimed.job.session_id
+        )
+        if not session:
+            logger.warning(f"Session {claimed.job.session_id} is gone, not recording render {claimed.job.id}")
+            return
+
+        def merge(stored_queue_data):
+            stored_queue = EditQueue.from_dict(stored_queue_data) if stored_queue_data else claimed.edit_queue
+            stored_queue.merge_render(claimed.edit_queue, claimed.profile.name)
+            return stored_queue.to_dict()
+
+        database_session_service.update_state(session["pk"], "edit_queue", merge)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Render edit queues claimed from the render_jobs table")
+    parser.add_argument("--worker-id", help="Unique name of this worker (default: host-pid)")
+    parser.add_argument("--poll-interval", type=float, default=1.0, help="Seconds to wait when the queue is empty")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    validate_environment_or_exit()
+
+    worker = RenderWorker(worker_id=args.worker_id, poll_interval=args.poll_interval)
+    try:
+        worker.run_forever()
+    except KeyboardInterrupt:
+        worker.stop()
+
+
+if __name__ == "__main__":
+    main()
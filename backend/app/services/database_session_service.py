@@ -4,11 +4,17 @@ import os
 import sqlite3
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Optional
+from typing import Any, Callable, Optional
+
+from core.metrics import DB_QUERY_SECONDS
 
 logger = logging.getLogger(__name__)
 
 
+def _timed(func: Callable) -> Callable:
+    return DB_QUERY_SECONDS.labels(operation=func.__name__).time()(func)
+
+
 class DatabaseSessionService:
     def __init__(self, db_path: Optional[str] = None):
         if db_path is None:
@@ -65,6 +71,7 @@ class DatabaseSessionService:
             conn.commit()
             logger.info(f"Database initialized at {self.db_path}")
     
+    @_timed
     def create_session(
         self, 
         app_name: str, 
@@ -91,6 +98,7 @@ class DatabaseSessionService:
             logger.info(f"Session created: {app_name}/{user_id}/{session_id}")
             return session_pk
     
+    @_timed
     def get_session(
         self, 
         app_name: str, 
@@ -137,6 +145,7 @@ class DatabaseSessionService:
             
             return session
     
+    @_timed
     def list_sessions(
         self,
         user_id: str,
@@ -182,6 +191,7 @@ class DatabaseSessionService:
             
             return sessions
     
+    @_timed
     def set_state(
         self, 
         session_pk: int, 
@@ -205,6 +215,48 @@ class DatabaseSessionService:
             
             conn.commit()
     
+    @_timed
+    def update_state(
+        self,
+        session_pk: int,
+        key: str,
+        update: Callable[[Optional[Any]], Any]
+    ) -> Any:
+        """Read-modify-write one state value inside a single write transaction,
+        so concurrent writers in other processes cannot interleave."""
+        with sqlite3.connect(self.db_path, timeout=30) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT value FROM session_state
+                WHERE session_pk = ? AND key = ?
+            """, (session_pk, key))
+            
+            row = cursor.fetchone()
+            current = None
+            if row:
+                try:
+                    current = json.loads(row[0])
+                except json.JSONDecodeError:
+                    current = row[0]
+            
+            value = update(current)
+            now = datetime.utcnow().isoformat()
+            value_json = json.dumps(value) if not isinstance(value, str) else value
+            
+            cursor.execute("""
+                INSERT OR REPLACE INTO session_state (session_pk, key, value, updated_at)
+                VALUES (?, ?, ?, ?)
+            """, (session_pk, key, value_json, now))
+            
+            cursor.execute("""
+                UPDATE sessions SET updated_at = ? WHERE id = ?
+            """, (now, session_pk))
+            
+            conn.commit()
+            return value
+    
+    @_timed
     def get_state(
         self, 
         session_pk: int, 
@@ -226,6 +278,7 @@ class DatabaseSessionService:
             except json.JSONDecodeError:
                 return row[0]
     
+    @_timed
     def clear_state(self, session_pk: int):
         with sqlite3.connect(self.db_path) as conn:
             cursor = conn.cursor()
@@ -235,6 +288,7 @@ class DatabaseSessionService:
             conn.commit()
             logger.info(f"Cleared state for session_pk={session_pk}")
     
+    @_timed
     def create_version(
         self,
         session_pk: int,
@@ -268,6 +322,7 @@ class DatabaseSessionService:
             logger.info(f"Created version {next_version} for session_pk={session_pk}")
             return version_id
     
+    @_timed
     def get_versions(self, session_pk: int) -> list[dict[str, Any]]:
         with sqlite3.connect(self.db_path) as conn:
             cursor = conn.cursor()
@@ -289,6 +344,7 @@ class DatabaseSessionService:
             
             return versions
     
+    @_timed
     def delete_session(self, app_name: str, user_id: str, session_id: str):
         with sqlite3.connect(self.db_path) as conn:
             cursor = conn.cursor()
@@ -299,6 +355,7 @@ class DatabaseSessionService:
             conn.commit()
             logger.info(f"Deleted session: {app_name}/{user_id}/{session_id}")
     
+    @_timed
     def delete_all_sessions(self, user_id: str) -> int:
         with sqlite3.connect(self.db_path) as conn:
             cursor = conn.cursor()
@@ -0,0 +1,292 @@
+import contextlib
+import contextvars
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from typing import BinaryIO, Callable, Iterator, Optional
+
+from core.metrics import FFMPEG_PROCESSES
+from core.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_LOG_INTERVAL_SECONDS = 5.0
+
+OUTPUT_COPY_CHUNK_BYTES = 1024 * 1024
+
+ProgressCallback = Callable[["FfmpegProgress"], None]
+
+# Set by whoever owns the current thread of work (e.g. a render job) so every
+# ffmpeg run inside it reports progress without threading a callback through
+# each service call.
+_progress_listener: contextvars.ContextVar[Optional[ProgressCallback]] = contextvars.ContextVar(
+    "ffmpeg_progress_listener", default=None
+)
+
+
+class RenderCancelled(Exception):
+    pass
+
+
+class CancelToken:
+    """Cancels a unit of render work, killing the ffmpeg process it is running."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cancelled = False
+        self._processes: set[subprocess.Popen] = set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled
+
+    def cancel(self) -> None:
+        with self._lock:
+            self._cancelled = True
+            processes = list(self._processes)
+        for process in processes:
+            logger.info(f"Killing superseded ffmpeg process {process.pid}")
+            process.kill()
+
+    def attach(self, process: subprocess.Popen) -> None:
+        with self._lock:
+            self._processes.add(process)
+            cancelled = self._cancelled
+        if cancelled:
+            process.kill()
+
+    def detach(self, process: subprocess.Popen) -> None:
+        with self._lock:
+            self._processes.discard(process)
+
+
+_cancel_token: contextvars.ContextVar[Optional[CancelToken]] = contextvars.ContextVar(
+    "ffmpeg_cancel_token", default=None
+)
+
+
+@dataclass
+class FfmpegProgress:
+    out_time_seconds: float = 0.0
+    frame: Optional[int] = None
+    fps: Optional[float] = None
+    speed: Optional[float] = None
+    duration_seconds: Optional[float] = None
+    elapsed_seconds: float = 0.0
+    done: bool = False
+
+    @property
+    def percent(self) -> Optional[float]:
+        if not self.duration_seconds:
+            return None
+        if self.done:
+            return 100.0
+        return round(min(100.0, 100.0 * self.out_time_seconds / self.duration_seconds), 1)
+
+    @property
+    def eta_seconds(self) -> Optional[float]:
+        if not self.duration_seconds:
+            return None
+        if self.done:
+            return 0.0
+        if not self.speed:
+            return None
+        remaining = max(0.0, self.duration_seconds - self.out_time_seconds)
+        return round(remaining / self.speed, 1)
+
+
+def _parse_float(value: str) -> Optional[float]:
+    try:
+        return float(value.rstrip("x"))
+    except ValueError:
+        return None
+
+
+def _parse_timestamp(value: str) -> Optional[float]:
+    # out_time is HH:MM:SS.micro in every ffmpeg version, unlike out_time_us,
+    # and may be negative or N/A before the first frame.
+    try:
+        sign = -1 if value.startswith("-") else 1
+        hours, minutes, seconds = value.lstrip("-").split(":")
+        return sign * (int(hours) * 3600 + int(minutes) * 60 + float(seconds))
+    except ValueError:
+        return None
+
+
+def redact_command(command: list[str]) -> list[str]:
+    """``command`` with the query strings of URL arguments dropped, so signed
+    URLs never reach logs or error messages."""
+    return [arg.split("?", 1)[0] if "://" in arg else arg for arg in command]
+
+
+def update_progress(progress: FfmpegProgress, key: str, value: str) -> bool:
+    """Apply one ``key=value`` line of ``-progress`` output; returns True when
+    the line closes a progress block."""
+    if key == "out_time":
+        seconds = _parse_timestamp(value)
+        if seconds is not None:
+            progress.out_time_seconds = max(0.0, seconds)
+    elif key == "frame":
+        frame = _parse_float(value)
+        progress.frame = int(frame) if frame is not None else None
+    elif key == "fps":
+        progress.fps = _parse_float(value)
+    elif key == "speed":
+        progress.speed = _parse_float(value)
+    elif key == "progress":
+        progress.done = value == "end"
+        return True
+    return False
+
+
+class FfmpegRunner:
+    """Runs ffmpeg with ``-progress pipe:1`` and reports out_time, fps and
+    speed as the render runs, instead of staying silent until ffmpeg exits.
+
+    A command whose output is ``pipe:1`` can stream its output into
+    ``output_stream`` as it is encoded; progress then moves to a pipe of its own.
+    """
+
+    def run(
+        self,
+        command: list[str],
+        duration_seconds: Optional[float] = None,
+        on_progress: Optional[ProgressCallback] = None,
+        output_stream: Optional[BinaryIO] = None
+    ) -> FfmpegProgress:
+        with tracer.span("ffmpeg", output=redact_command(command)[-1], media_seconds=duration_seconds) as span, \
+                FFMPEG_PROCESSES.track_inprogress():
+            progress = self._run(command, duration_seconds, on_progress, output_stream)
+            span.set(speed=progress.speed)
+            return progress
+
+    def _run(
+        self,
+        command: list[str],
+        duration_seconds: Optional[float],
+        on_progress: Optional[ProgressCallback],
+        output_stream: Optional[BinaryIO]
+    ) -> FfmpegProgress:
+        cancel_token = _cancel_token.get()
+        if cancel_token and cancel_token.cancelled:
+            raise RenderCancelled("Render was cancelled")
+        
+        listeners = [callback for callback in (on_progress, _progress_listener.get()) if callback]
+        progress = FfmpegProgress(duration_seconds=duration_seconds)
+        copy_errors: list[Exception] = []
+        copier = None
+
+        with tempfile.TemporaryFile() as stderr_file:
+            if output_stream is None:
+                progress_command = [command[0], "-progress", "pipe:1", "-nostats", *command[1:]]
+                process = subprocess.Popen(progress_command, stdout=subprocess.PIPE, stderr=stderr_file, text=True)
+                progress_lines = process.stdout
+            else:
+                progress_read_fd, progress_write_fd = os.pipe()
+                progress_command = [command[0], "-progress", f"pipe:{progress_write_fd}", "-nostats", *command[1:]]
+                try:
+                    process = subprocess.Popen(
+                        progress_command, stdout=subprocess.PIPE, stderr=stderr_file, pass_fds=(progress_write_fd,)
+                    )
+                except BaseException:
+                    os.close(progress_read_fd)
+                    raise
+                finally:
+                    os.close(progress_write_fd)
+                progress_lines = os.fdopen(progress_read_fd, "r")
+                copier = threading.Thread(
+                    target=self._copy_output, args=(process, output_stream, copy_errors), daemon=True
+                )
+                copier.start()
+            started = time.monotonic()
+            last_logged_at = 0.0
+            if cancel_token:
+                cancel_token.attach(process)
+            try:
+                for line in progress_lines:
+                    key, _, value = line.strip().partition("=")
+                    if not update_progress(progress, key, value):
+                        continue
+                    progress.elapsed_seconds = time.monotonic() - started
+                    for callback in listeners:
+                        callback(progress)
+                    if progress.elapsed_seconds - last_logged_at >= PROGRESS_LOG_INTERVAL_SECONDS:
+                        last_logged_at = progress.elapsed_seconds
+                        logger.info(
+                            f"ffmpeg progress: {progress.percent}% at {progress.speed}x, "
+                            f"{progress.fps} fps, ETA {progress.eta_seconds}s"
+                        )
+                returncode = process.wait()
+                if copier:
+                    copier.join()
+            except BaseException:
+                process.kill()
+                process.wait()
+                raise
+            finally:
+                progress_lines.close()
+                process.stdout.close()
+                if cancel_token:
+                    cancel_token.detach(process)
+
+            if returncode != 0:
+                if cancel_token and cancel_token.cancelled:
+                    raise RenderCancelled("Render was cancelled")
+                if copy_errors:
+                    raise copy_errors[0]
+                stderr_file.seek(0)
+                raise subprocess.CalledProcessError(
+                    returncode, redact_command(command), stderr=stderr_file.read().decode(errors="replace")
+                )
+            if copy_errors:
+                raise copy_errors[0]
+
+        progress.elapsed_seconds = time.monotonic() - started
+        if not progress.done:
+            progress.done = True
+            for callback in listeners:
+                callback(progress)
+        logger.info(
+            f"ffmpeg finished {progress.out_time_seconds:.1f}s of media in "
+            f"{progress.elapsed_seconds:.1f}s (speed {progress.speed}x)"
+        )
+        return progress
+
+    @staticmethod
+    def _copy_output(process: subprocess.Popen, output_stream: BinaryIO, errors: list[Exception]) -> None:
+        try:
+            shutil.copyfileobj(process.stdout, output_stream, OUTPUT_COPY_CHUNK_BYTES)
+        except Exception as e:
+            # ffmpeg would block on a full pipe; stop it and report the sink's error.
+            errors.append(e)
+            process.kill()
+
+    @contextlib.contextmanager
+    def reporting_to(self, callback: ProgressCallback) -> Iterator[None]:
+        """Send progress of every ffmpeg run in the current context to ``callback``."""
+        token = _progress_listener.set(callback)
+        try:
+            yield
+        finally:
+            _progress_listener.reset(token)
+
+    @contextlib.contextmanager
+    def cancellable(self, cancel_token: CancelToken) -> Iterator[None]:
+        """Tie every ffmpeg run in the current context to ``cancel_token``."""
+        token = _cancel_token.set(cancel_token)
+        try:
+            yield
+        finally:
+            _cancel_token.reset(token)
+
+    def is_cancelled(self) -> bool:
+        cancel_token = _cancel_token.get()
+        return bool(cancel_token and cancel_token.cancelled)
+
+
+ffmpeg_runner = FfmpegRunner()
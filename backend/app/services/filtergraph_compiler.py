@@ -0,0 +1,270 @@
+import logging
+import os
+import sys
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from models.edit_models import LAYER_EDIT_TYPES, Edit
+from services.lut_builder import LutBuilder, lut_builder
+from services.render_profiles import FULL_PROFILE, RenderProfile
+from services.text_rasterizer import TextRasterizer, text_rasterizer
+
+logger = logging.getLogger(__name__)
+
+VOLUME_ORIGINAL = 0.3
+VOLUME_OVERLAY = 1.0
+
+TEXT_MARGIN = 30
+TEXT_BOX_BORDER = 20
+TEXT_LINE_SPACING = 10
+
+
+def overlay_y_position(position: str, margin: int = TEXT_MARGIN, border: int = TEXT_BOX_BORDER) -> str:
+    # The margin is measured to the text, and the box extends border pixels past it.
+    return {
+        "top": f"{margin - border}",
+        "center": "(H-h)/2",
+        "bottom": f"H-h-{margin - border}"
+    }.get(position, "(H-h)/2")
+
+
+def build_overlay_filter(
+    start_seconds: float,
+    end_seconds: float,
+    position: str = "center",
+    scale: float = 1.0
+) -> str:
+    y = overlay_y_position(position, round(TEXT_MARGIN * scale), round(TEXT_BOX_BORDER * scale))
+    return f"overlay=x=(W-w)/2:y={y}:enable='between(t,{start_seconds:g},{end_seconds:g})'"
+
+
+@dataclass
+class CompiledGraph:
+    """A whole edit queue lowered to a single ffmpeg invocation.
+
+    Input 0 is always the source video; rasterized text overlays follow, then
+    voiceover audio files, each in queue order. A ``None`` output label means
+    that stream is copied from the source untouched. ``layer`` restricts the
+    output to the "video" or "audio" stream only. ``video_span`` is the time
+    range outside which the video nodes leave frames untouched, when there is
+    one; ``profile`` sets the output resolution and encoder settings.
+    """
+    image_inputs: list[str] = field(default_factory=list)
+    audio_inputs: list[str] = field(default_factory=list)
+    # (filter, extra input label) pairs applied to the source video in order.
+    video_nodes: list[tuple[str, Optional[str]]] = field(default_factory=list)
+    filters: list[str] = field(default_factory=list)
+    video_label: Optional[str] = None
+    audio_label: Optional[str] = None
+    layer: Optional[str] = None
+    video_span: Optional[tuple[float, float]] = None
+    profile: RenderProfile = FULL_PROFILE
+
+    def video_graph(self, source_label: str = "[0:v]", output_label: str = "[vout]") -> str:
+        """The video nodes as one filtergraph from ``source_label`` to ``output_label``."""
+        parts = []
+        label = source_label
+        for index, (node, extra_input) in enumerate(self.video_nodes, start=1):
+            next_label = output_label if index == len(self.video_nodes) else f"[v{index}]"
+            parts.append(f"{label}{extra_input or ''}{node}{next_label}")
+            label = next_label
+        return ";".join(parts)
+
+    @property
+    def filter_complex(self) -> str:
+        graphs = [self.video_graph()] if self.video_nodes else []
+        return ";".join(graphs + self.filters)
+
+    def build_command(self, input_video_path: str, output_video_path: str) -> list[str]:
+        command = ["ffmpeg", "-y", "-i", input_video_path]
+        for input_path in self.image_inputs + self.audio_inputs:
+            command += ["-i", input_path]
+
+        if self.video_nodes or self.filters:
+            command += ["-filter_complex", self.filter_complex]
+
+        if self.layer != "audio":
+            command += ["-map", self.video_label or "0:v"]
+            command += self.profile.video_encoder_args() if self.video_label else ["-c:v", "copy"]
+        else:
+            command.append("-vn")
+
+        if self.layer != "video":
+            command += ["-map", self.audio_label or "0:a?"]
+            command += ["-c:a", "aac", "-b:a", "128k"] if self.audio_label else ["-c:a", "copy"]
+        else:
+            command.append("-an")
+
+        command.append(output_video_path)
+        return command
+
+
+class FiltergraphCompiler:
+    """Turns the applied edits of an EditQueue into one ``-filter_complex`` graph.
+
+    Every text overlay becomes an ``overlay`` of its pre-rasterized PNG on a
+    single video chain, each run of consecutive filter edits becomes one
+    ``lut3d`` lookup, every voiceover becomes an ``adelay`` branch mixed
+    into the audio chain, and a trim cuts both chains at its place in the
+    queue, so a rebuild costs one decode and one encode regardless of queue
+    length.
+    """
+
+    def __init__(self, rasterizer: Optional[TextRasterizer] = None, luts: Optional[LutBuilder] = None):
+        self.rasterizer = rasterizer or text_rasterizer
+        self.luts = luts or lut_builder
+
+    def compile(
+        self,
+        edits: list[Edit],
+        video_width: int,
+        box_color: str,
+        wrap_text: Callable[[str, int, int], list[str]],
+        layer: Optional[str] = None,
+        profile: RenderProfile = FULL_PROFILE,
+        video_height: int = 0
+    ) -> CompiledGraph:
+        graph = CompiledGraph(layer=layer, profile=profile)
+        video_spans = []
+        audio_edits = []
+        trimmed = False
+        pending_filters = []
+        lut_count = 0
+        
+        # Downscale first so every overlay is composited at output resolution.
+        scale = profile.scale_factor(video_height) if layer != "audio" else 1.0
+        if scale < 1.0:
+            graph.video_nodes.append((f"scale=-2:{profile.max_height}", None))
+
+        for edit in edits:
+            if layer == "audio" and edit.type not in LAYER_EDIT_TYPES["audio"]:
+                continue
+            if layer == "video" and edit.type not in LAYER_EDIT_TYPES["video"]:
+                continue
+
+            # Overlays and trims between two grades split them; voiceovers do not.
+            if edit.type in ("text_overlay", "trim") and pending_filters:
+                graph.video_nodes.append(self._compile_filters(pending_filters))
+                pending_filters, lut_count = [], lut_count + 1
+
+            if edit.type == "filter":
+                pending_filters.append(edit)
+            elif edit.type == "text_overlay":
+                graph.video_nodes.append(self._compile_text_overlay(edit, graph, video_width, box_color, wrap_text, scale))
+                video_spans.append((edit.params.get("start_ms", 0) / 1000.0, edit.params.get("end_ms", 3000) / 1000.0))
+            elif edit.type == "voiceover":
+                audio_edits.append(edit)
+            elif edit.type == "trim":
+                # Later edits are timed on the trimmed video, as edit by edit.
+                trimmed = True
+                if layer != "audio":
+                    graph.video_nodes.append((f"{self._trim_filter('trim', edit)},setpts=PTS-STARTPTS", None))
+                if layer != "video":
+                    audio_edits.append(edit)
+            else:
+                raise ValueError(f"Unknown edit type: {edit.type}")
+
+        if pending_filters:
+            graph.video_nodes.append(self._compile_filters(pending_filters))
+            lut_count += 1
+
+        if graph.video_nodes:
+            graph.video_label = "[vout]"
+            # A color grade touches every frame, so there is no span to re-encode alone.
+            if video_spans and scale == 1.0 and not lut_count and not trimmed:
+                graph.video_span = (min(s for s, _ in video_spans), max(e for _, e in video_spans))
+
+        if audio_edits:
+            self._compile_audio(audio_edits, graph)
+
+        voiceover_count = sum(edit.type == "voiceover" for edit in audio_edits)
+        logger.info(
+            f"Compiled {len(edits)} edits into one filtergraph "
+            f"({len(video_spans)} text overlays, {lut_count} LUTs, {voiceover_count} voiceover branches"
+            f"{', trimmed' if trimmed else ''})"
+        )
+        return graph
+
+    def _compile_text_overlay(
+        self,
+        edit: Edit,
+        graph: CompiledGraph,
+        video_width: int,
+        box_color: str,
+        wrap_text: Callable[[str, int, int], list[str]],
+        scale: float = 1.0
+    ) -> tuple[str, str]:
+        text = edit.params.get("text", "")
+        start_ms = edit.params.get("start_ms", 0)
+        end_ms = edit.params.get("end_ms", 3000)
+        fontsize = edit.params.get("fontsize", 70)
+
+        # Wrapping is done in source pixels so line breaks match across profiles.
+        wrap_width = int(video_width * 0.8)
+        lines = wrap_text(text, wrap_width, fontsize)
+        png_path = self.rasterizer.rasterize(
+            lines,
+            fontsize=round(fontsize * scale),
+            color=edit.params.get("color", "white"),
+            box_color=box_color,
+            width=wrap_width,
+            border=round(TEXT_BOX_BORDER * scale),
+            line_spacing=round(TEXT_LINE_SPACING * scale)
+        )
+        graph.image_inputs.append(png_path)
+
+        overlay_filter = build_overlay_filter(
+            start_seconds=start_ms / 1000.0,
+            end_seconds=end_ms / 1000.0,
+            position=edit.params.get("position", "center"),
+            scale=scale
+        )
+        return overlay_filter, f"[{len(graph.image_inputs)}:v]"
+
+    def _compile_filters(self, edits: list[Edit]) -> tuple[str, None]:
+        lut_path = self.luts.build([edit.params for edit in edits])
+        return f"lut3d=file='{lut_path}':interp=tetrahedral", None
+
+    @staticmethod
+    def _trim_filter(name: str, edit: Edit) -> str:
+        start_ms = edit.params.get("start_ms", 0)
+        end_ms = edit.params.get("end_ms")
+        bounds = f"start={start_ms / 1000.0:g}"
+        if end_ms is not None:
+            bounds += f":end={end_ms / 1000.0:g}"
+        return f"{name}={bounds}"
+
+    def _compile_audio(self, audio_edits: list[Edit], graph: CompiledGraph) -> None:
+        # Each voiceover ducks everything mixed before it, exactly like applying
+        # the edits one ffmpeg run at a time, so a render is identical whether it
+        # starts from the source or from a cached prefix.
+        mixed_label = "[0:a]"
+        first_input = 1 + len(graph.image_inputs)
+
+        for edit in audio_edits:
+            if edit.type == "trim":
+                trim_label = f"[atrim{len(graph.filters)}]"
+                graph.filters.append(f"{mixed_label}{self._trim_filter('atrim', edit)},asetpts=PTS-STARTPTS{trim_label}")
+                mixed_label = trim_label
+                continue
+
+            index = len(graph.audio_inputs) + 1
+            audio_path = edit.params.get("audio_path")
+            if not audio_path:
+                raise ValueError(f"Voiceover edit {edit.id} has no audio_path")
+
+            graph.audio_inputs.append(audio_path)
+            delay_ms = int(edit.params.get("start_ms", 0))
+            graph.filters.append(f"{mixed_label}volume={VOLUME_ORIGINAL}[base{index}]")
+            graph.filters.append(
+                f"[{first_input + index - 1}:a]adelay={delay_ms}|{delay_ms},volume={VOLUME_OVERLAY}[vo{index}]"
+            )
+            graph.filters.append(f"[base{index}][vo{index}]amix=inputs=2:duration=longest[mix{index}]")
+            mixed_label = f"[mix{index}]"
+
+        graph.audio_label = mixed_label
+
+
+filtergraph_compiler = FiltergraphCompiler()
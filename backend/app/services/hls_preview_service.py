@@ -0,0 +1,207 @@
+import contextlib
+import contextvars
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from typing import Callable, Iterator, Optional
+
+from core.config import settings
+from services.render_store import render_store
+
+logger = logging.getLogger(__name__)
+
+HLS_SUFFIX = ".hls"
+PLAYLIST_NAME = "index.m3u8"
+PUBLISHED_PLAYLIST_NAME = "published.m3u8"
+PLAYLIST_CONTENT_TYPE = "application/vnd.apple.mpegurl"
+SEGMENT_CONTENT_TYPE = "video/mp2t"
+# Players re-fetch an event playlist as it grows, so it must not be cached.
+PLAYLIST_CACHE_CONTROL = "no-cache, max-age=0"
+POLL_SECONDS = 0.5
+
+PreviewCallback = Callable[[str], None]
+
+_preview_listener: contextvars.ContextVar[Optional[PreviewCallback]] = contextvars.ContextVar(
+    "hls_preview_listener", default=None
+)
+_active_preview: contextvars.ContextVar[Optional["HlsPreview"]] = contextvars.ContextVar(
+    "active_hls_preview", default=None
+)
+
+
+class HlsPreview:
+    """HLS copy of one encode, written by ffmpeg next to its MP4 output and
+    uploaded segment by segment while the encode runs.
+
+    The playlist is an EVENT playlist: it only grows, and ffmpeg closes it
+    with ``#EXT-X-ENDLIST`` when the encode finishes, so a player can start
+    from the first segment and keep going until the end.
+    """
+
+    def __init__(self, key: str, audio_source: Optional[str] = None, on_ready: Optional[PreviewCallback] = None):
+        self.key = key
+        self.audio_source = audio_source
+        self.on_ready = on_ready
+        self.url = render_store.sidecar_url(key, f"{HLS_SUFFIX}/{PLAYLIST_NAME}")
+        self.directory = tempfile.mkdtemp(prefix="hls_preview_")
+        self.playlist_path = os.path.join(self.directory, PLAYLIST_NAME)
+        self.used = False
+        self._uploaded_segments: set[str] = set()
+        self._published_playlist: Optional[str] = None
+        self._stop = threading.Event()
+        self._watcher = threading.Thread(target=self._watch, name=f"hls-{key[:8]}", daemon=True)
+
+    def tee_command(self, command: list[str]) -> list[str]:
+        """``command`` with its MP4 output also written as HLS in the same
+        encode, through ffmpeg's tee muxer.
+
+        A video-only encode (``-an``) gets the preview's audio source mapped
+        into the HLS copy only, so the preview plays with sound while the MP4
+        stays a video layer.
+        """
+        self.used = True
+        output_path = command[-1]
+        body = command[:-1]
+        mp4_options = "f=mp4:movflags=+faststart"
+        audio_args = []
+
+        if "-an" in body:
+            body.remove("-an")
+            mp4_options = f"select=v:{mp4_options}"
+            if self.audio_source:
+                last_input = max(index for index, arg in enumerate(body) if arg == "-i")
+                input_count = body.count("-i")
+                body[last_input + 2:last_input + 2] = ["-i", self.audio_source]
+                audio_args = ["-map", f"{input_count}:a?", "-c:a", "copy"]
+            else:
+                audio_args = ["-map", "0:a?", "-c:a", "aac", "-b:a", "128k"]
+
+        if "libx264" in body:
+            # Segments can only start on keyframes.
+            body += ["-force_key_frames", f"expr:gte(t,n_forced*{settings.HLS_SEGMENT_SECONDS})"]
+
+        hls_options = ":".join([
+            "f=hls",
+            f"hls_time={settings.HLS_SEGMENT_SECONDS}",
+            "hls_playlist_type=event",
+            "hls_flags=independent_segments+temp_file",
+            f"hls_segment_filename={os.path.join(self.directory, 'segment_%05d.ts')}"
+        ])
+        return body + audio_args + [
+            "-flags", "+global_header",
+            "-f", "tee",
+            f"[{mp4_options}]{output_path}|[{hls_options}]{self.playlist_path}"
+        ]
+
+    def start(self) -> None:
+        self._watcher.start()
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._watcher.is_alive():
+            self._watcher.join()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _watch(self) -> None:
+        while not self._stop.wait(POLL_SECONDS):
+            self._publish()
+        # Pick up the last segments and the closing #EXT-X-ENDLIST.
+        self._publish()
+
+    def _publish(self) -> None:
+        """Upload the segments the current playlist lists, then the playlist
+        itself, so the published playlist never names a missing segment."""
+        try:
+            with open(self.playlist_path) as f:
+                playlist = f.read()
+        except FileNotFoundError:
+            return
+        if playlist == self._published_playlist:
+            return
+
+        try:
+            for line in playlist.splitlines():
+                segment = line.strip()
+                if not segment or segment.startswith("#") or segment in self._uploaded_segments:
+                    continue
+                render_store.put_sidecar(
+                    self.key, f"{HLS_SUFFIX}/{segment}", os.path.join(self.directory, segment), SEGMENT_CONTENT_TYPE
+                )
+                self._uploaded_segments.add(segment)
+
+            # ffmpeg may rewrite the playlist while it uploads; publish what was read.
+            published_path = os.path.join(self.directory, PUBLISHED_PLAYLIST_NAME)
+            with open(published_path, "w") as f:
+                f.write(playlist)
+            render_store.put_sidecar(
+                self.key,
+                f"{HLS_SUFFIX}/{PLAYLIST_NAME}",
+                published_path,
+                PLAYLIST_CONTENT_TYPE,
+                cache_control=PLAYLIST_CACHE_CONTROL
+            )
+        except Exception as e:
+            # Retried on the next poll; the preview just lags behind.
+            logger.warning(f"Could not publish HLS preview of render {self.key}: {e}")
+            return
+
+        first = self._published_playlist is None
+        self._published_playlist = playlist
+        if first:
+            logger.info(f"HLS preview of render {self.key} is live at {self.url}")
+            if self.on_ready:
+                self.on_ready(self.url)
+
+
+class HlsPreviewService:
+    """Lets whoever runs a render (a render job) ask for an HLS preview of
+    it, and the pipeline pick the encode that produces the final video to
+    carry it. Both travel in context variables, like ffmpeg progress, so
+    the edit methods between them need no extra arguments.
+    """
+
+    @contextlib.contextmanager
+    def reporting_to(self, callback: PreviewCallback) -> Iterator[None]:
+        """Publish an HLS preview of renders in the current context and pass
+        its playlist URL to ``callback`` once the first segment is up."""
+        token = _preview_listener.set(callback)
+        try:
+            yield
+        finally:
+            _preview_listener.reset(token)
+
+    @contextlib.contextmanager
+    def previewing(self, key: str, audio_source: Optional[str] = None) -> Iterator[Optional[HlsPreview]]:
+        """Attach a preview to the next encode in this block, if anyone is
+        listening for one."""
+        listener = _preview_listener.get()
+        if not settings.HLS_PREVIEW or not listener:
+            yield None
+            return
+
+        preview = HlsPreview(key, audio_source, on_ready=listener)
+        token = _active_preview.set(preview)
+        preview.start()
+        try:
+            yield preview
+        finally:
+            _active_preview.reset(token)
+            preview.close()
+
+    def claim(self) -> Optional[HlsPreview]:
+        """The preview the next full encode should write, once per preview.
+
+        Spliced renders (segment-scoped overlays and stream-copy trims) never
+        claim it: they re-encode a few GOPs and stream-copy the rest, so they
+        finish in about the time a first segment would take to publish, and
+        their job simply reports no preview_url.
+        """
+        preview = _active_preview.get()
+        if preview is None or preview.used:
+            return None
+        return preview
+
+
+hls_preview_service = HlsPreviewService()
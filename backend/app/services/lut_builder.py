@@ -0,0 +1,128 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Optional
+
+import numpy as np
+from PIL import ImageColor
+
+from core.config import settings
+from core.metrics import record_cache_lookup
+
+logger = logging.getLogger(__name__)
+
+LUT_SIZE = 33
+
+# Rec. 709 luma weights, as ffmpeg's eq and hue filters use.
+LUMA_WEIGHTS = np.array([0.2126, 0.7152, 0.0722])
+
+NEUTRAL_GRADE = {
+    "brightness": 0.0,
+    "contrast": 1.0,
+    "saturation": 1.0,
+    "gamma": 1.0,
+    "temperature": 0.0,
+    "tint": None,
+    "tint_strength": 0.0
+}
+
+LOOKS = {
+    "warm": {"temperature": 0.12, "saturation": 1.1},
+    "cool": {"temperature": -0.12},
+    "vivid": {"contrast": 1.15, "saturation": 1.35},
+    "muted": {"contrast": 0.9, "saturation": 0.7},
+    "mono": {"saturation": 0.0, "contrast": 1.1},
+    "vintage": {"contrast": 0.85, "saturation": 0.75, "temperature": 0.08, "gamma": 1.1, "brightness": 0.03},
+    "cinematic": {"contrast": 1.2, "saturation": 0.9, "temperature": -0.05, "gamma": 0.95}
+}
+
+
+def resolve_grade(params: dict[str, Any]) -> dict[str, Any]:
+    """The full set of grading parameters of a filter edit: the neutral grade,
+    overridden by its ``look`` preset, overridden by its explicit params."""
+    look = params.get("look")
+    if look and look not in LOOKS:
+        raise ValueError(f"Unknown look: {look} (expected one of {', '.join(sorted(LOOKS))})")
+
+    grade = dict(NEUTRAL_GRADE)
+    grade.update(LOOKS.get(look, {}))
+    grade.update({key: value for key, value in params.items() if key in NEUTRAL_GRADE and value is not None})
+    for key, value in grade.items():
+        if key != "tint":
+            grade[key] = float(value)
+    if grade["tint"] and not grade["tint_strength"]:
+        grade["tint_strength"] = 0.2
+    return grade
+
+
+def apply_grade(rgb: np.ndarray, grade: dict[str, Any]) -> np.ndarray:
+    """Apply one filter edit's grade to an (..., 3) array of RGB values in [0, 1]."""
+    rgb = rgb + grade["brightness"]
+    rgb = (rgb - 0.5) * grade["contrast"] + 0.5
+
+    luma = (rgb @ LUMA_WEIGHTS)[..., None]
+    rgb = luma + (rgb - luma) * grade["saturation"]
+
+    temperature = grade["temperature"]
+    rgb = rgb * np.array([1.0 + temperature, 1.0, 1.0 - temperature])
+
+    if grade["tint"] and grade["tint_strength"]:
+        tint = np.array(ImageColor.getrgb(grade["tint"])[:3]) / 255.0
+        # Tint toward the color at each pixel's own brightness.
+        tinted = (rgb @ LUMA_WEIGHTS)[..., None] * tint / max(float(tint @ LUMA_WEIGHTS), 1e-6)
+        rgb = rgb + (tinted - rgb) * grade["tint_strength"]
+
+    rgb = np.clip(rgb, 0.0, 1.0)
+    if grade["gamma"] != 1.0:
+        rgb = rgb ** (1.0 / grade["gamma"])
+    return rgb
+
+
+class LutBuilder:
+    """Compiles stacked color-grading filter edits into one 3D LUT ``.cube``
+    file, so the whole stack costs a single ``lut3d`` lookup per pixel.
+
+    LUTs are cached on disk by the hash of their resolved grades, so the same
+    stack is built once across rebuilds and sessions.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, size: int = LUT_SIZE):
+        self.cache_dir = Path(__file__).parent.parent / (cache_dir or settings.LUT_CACHE_DIR)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.size = size
+
+    def cache_key(self, grades: list[dict[str, Any]]) -> str:
+        identity = {"grades": grades, "size": self.size}
+        return hashlib.sha256(json.dumps(identity, sort_keys=True).encode()).hexdigest()
+
+    def build(self, filter_params: list[dict[str, Any]]) -> str:
+        """Path of the ``.cube`` LUT applying each params' grade in order."""
+        grades = [resolve_grade(params) for params in filter_params]
+        key = self.cache_key(grades)
+        cube_path = self.cache_dir / f"{key}.cube"
+        cached = cube_path.exists()
+        record_cache_lookup("lut", hit=cached)
+        if cached:
+            return str(cube_path)
+
+        # .cube tables list red fastest, then green, then blue.
+        steps = np.linspace(0.0, 1.0, self.size)
+        blue, green, red = np.meshgrid(steps, steps, steps, indexing="ij")
+        rgb = np.stack([red, green, blue], axis=-1).reshape(-1, 3)
+        for grade in grades:
+            rgb = apply_grade(rgb, grade)
+
+        with tempfile.NamedTemporaryFile(
+            "w", dir=self.cache_dir, suffix=".cube.part", delete=False
+        ) as part_file:
+            part_file.write(f"TITLE \"{key[:16]}\"\nLUT_3D_SIZE {self.size}\n")
+            np.savetxt(part_file, rgb, fmt="%.6f")
+        os.replace(part_file.name, cube_path)
+        logger.info(f"Built {self.size}^3 LUT for {len(grades)} filter edits at {cube_path}")
+        return str(cube_path)
+
+
+lut_builder = LutBuilder()
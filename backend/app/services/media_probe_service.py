@@ -0,0 +1,232 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import subprocess
+import threading
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from fractions import Fraction
+from pathlib import Path
+from typing import Any, Optional
+
+from core.metrics import record_cache_lookup
+from core.tracing import tracer
+from services.render_store import render_store
+
+logger = logging.getLogger(__name__)
+
+MAX_MEMORY_PROBES = 256
+
+PROBE_ENTRIES = ":".join([
+    "format=duration",
+    "stream=index,codec_type,codec_name,width,height,pix_fmt,time_base,avg_frame_rate,r_frame_rate,"
+    "sample_rate,channels,channel_layout",
+    "packet=stream_index,pts_time,flags"
+])
+
+
+@dataclass
+class MediaProbe:
+    duration: Optional[float] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+    fps: Optional[float] = None
+    video_codec: Optional[str] = None
+    pix_fmt: Optional[str] = None
+    time_base: Optional[str] = None
+    audio_codec: Optional[str] = None
+    audio_channels: Optional[int] = None
+    audio_channel_layout: Optional[str] = None
+    audio_sample_rate: Optional[int] = None
+    keyframe_times: list[float] = field(default_factory=list)
+
+    @property
+    def has_video(self) -> bool:
+        return self.video_codec is not None
+
+    @property
+    def has_audio(self) -> bool:
+        return self.audio_codec is not None
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "MediaProbe":
+        return cls(**data)
+
+
+def _to_float(value: Any) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _frame_rate(value: Optional[str]) -> Optional[float]:
+    try:
+        rate = Fraction(value)
+    except (TypeError, ValueError, ZeroDivisionError):
+        return None
+    return float(rate) if rate > 0 else None
+
+
+def parse_probe(data: dict[str, Any]) -> MediaProbe:
+    """MediaProbe from ffprobe's JSON output for PROBE_ENTRIES."""
+    streams = data.get("streams", [])
+    video = next((s for s in streams if s.get("codec_type") == "video"), None)
+    audio = next((s for s in streams if s.get("codec_type") == "audio"), None)
+    probe = MediaProbe(duration=_to_float(data.get("format", {}).get("duration")))
+
+    if video:
+        probe.width = video.get("width")
+        probe.height = video.get("height")
+        probe.fps = _frame_rate(video.get("avg_frame_rate")) or _frame_rate(video.get("r_frame_rate"))
+        probe.video_codec = video.get("codec_name")
+        probe.pix_fmt = video.get("pix_fmt")
+        probe.time_base = video.get("time_base")
+        # Packet flags are read without decoding, so the index is cheap even on long videos.
+        probe.keyframe_times = sorted(
+            float(packet["pts_time"])
+            for packet in data.get("packets", [])
+            if packet.get("stream_index") == video.get("index")
+            and "K" in packet.get("flags", "")
+            and _to_float(packet.get("pts_time")) is not None
+        )
+
+    if audio:
+        probe.audio_codec = audio.get("codec_name")
+        probe.audio_channels = audio.get("channels")
+        probe.audio_channel_layout = audio.get("channel_layout")
+        sample_rate = _to_float(audio.get("sample_rate"))
+        probe.audio_sample_rate = int(sample_rate) if sample_rate else None
+
+    return probe
+
+
+class MediaProbeService:
+    """Probes each media object once with a single JSON ffprobe and caches
+    the result in the ``media_probes`` table of sessions.db.
+
+    Probes are keyed by what identifies the media's bytes: the GCS object
+    generation for downloaded sources, the render key for files in the render
+    store, and a content hash for anything else.
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        if db_path is None:
+            db_path = os.getenv("DATABASE_PATH", "data/sessions.db")
+
+        self.db_path = Path(__file__).parent.parent / db_path
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._probes: OrderedDict[str, MediaProbe] = OrderedDict()
+        # Path -> (size, mtime_ns, media key), so a file is hashed at most once.
+        self._path_keys: dict[str, tuple[int, int, str]] = {}
+        self._init_database()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def _init_database(self):
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS media_probes (
+                    media_key TEXT PRIMARY KEY,
+                    probe TEXT NOT NULL,
+                    created_at TEXT NOT NULL
+                )
+            """)
+            conn.commit()
+
+    def remember_source(self, path: str, media_key: str) -> None:
+        """Key ``path`` (or a streamed source URL) by an identity known without
+        reading it, such as the generation of the GCS object it comes from."""
+        if "://" in path:
+            with self._lock:
+                self._path_keys[path] = (0, 0, media_key)
+            return
+        stat = os.stat(path)
+        with self._lock:
+            self._path_keys[os.path.realpath(path)] = (stat.st_size, stat.st_mtime_ns, media_key)
+
+    def media_key(self, path: str) -> str:
+        if "://" in path:
+            with self._lock:
+                known = self._path_keys.get(path)
+            return known[2] if known else f"url:{path.split('?', 1)[0]}"
+
+        real_path = os.path.realpath(path)
+        stat = os.stat(real_path)
+        with self._lock:
+            known = self._path_keys.get(real_path)
+        if known and known[:2] == (stat.st_size, stat.st_mtime_ns):
+            return known[2]
+
+        if render_store.owns(real_path):
+            media_key = f"render:{Path(real_path).stem}"
+        else:
+            digest = hashlib.sha256()
+            with open(real_path, "rb") as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    digest.update(chunk)
+            media_key = f"sha256:{digest.hexdigest()}"
+
+        with self._lock:
+            self._path_keys[real_path] = (stat.st_size, stat.st_mtime_ns, media_key)
+        return media_key
+
+    def probe(self, path: str) -> MediaProbe:
+        media_key = self.media_key(path)
+        with self._lock:
+            probe = self._probes.get(media_key)
+            if probe:
+                self._probes.move_to_end(media_key)
+                record_cache_lookup("media_probe", hit=True)
+                return probe
+
+        with self._connect() as conn:
+            row = conn.execute("SELECT probe FROM media_probes WHERE media_key = ?", (media_key,)).fetchone()
+        record_cache_lookup("media_probe", hit=row is not None)
+        if row:
+            probe = MediaProbe.from_dict(json.loads(row[0]))
+        else:
+            probe = self._run_ffprobe(path)
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO media_probes (media_key, probe, created_at) VALUES (?, ?, ?)",
+                    (media_key, json.dumps(probe.to_dict()), datetime.now().isoformat())
+                )
+                conn.commit()
+
+        with self._lock:
+            self._probes[media_key] = probe
+            while len(self._probes) > MAX_MEMORY_PROBES:
+                self._probes.popitem(last=False)
+        return probe
+
+    def _run_ffprobe(self, path: str) -> MediaProbe:
+        probe_command = [
+            "ffprobe",
+            "-v", "error",
+            "-show_entries", PROBE_ENTRIES,
+            "-of", "json",
+            path
+        ]
+
+        with tracer.span("probe", media=path.split('?', 1)[0]):
+            probe_result = subprocess.run(probe_command, capture_output=True, text=True, check=True)
+        probe = parse_probe(json.loads(probe_result.stdout))
+        logger.info(
+            f"Probed {path.split('?', 1)[0]}: {probe.width}x{probe.height} {probe.video_codec} @ {probe.fps} fps, "
+            f"{probe.duration}s, audio {probe.audio_channel_layout or 'none'}, "
+            f"{len(probe.keyframe_times)} keyframes"
+        )
+        return probe
+
+
+media_probe_service = MediaProbeService()
@@ -0,0 +1,228 @@
+import logging
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Any, Callable, Optional
+
+from core.config import settings
+from core.tracing import Span, current_span, tracer
+from services.ffmpeg_runner import CancelToken, FfmpegProgress, ffmpeg_runner
+from services.hls_preview_service import hls_preview_service
+
+logger = logging.getLogger(__name__)
+
+MAX_FINISHED_JOBS = 500
+
+
+@dataclass
+class RenderJob:
+    id: str
+    session_id: Optional[str]
+    created_at: str
+    status: str = "queued"  # queued, rendering, succeeded, failed, superseded
+    video_url: Optional[str] = None
+    # HLS playlist of the render, playable while it is still encoding.
+    preview_url: Optional[str] = None
+    error: Optional[str] = None
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+    # Of the ffmpeg pass currently running; a render may run several.
+    progress_percent: Optional[float] = None
+    eta_seconds: Optional[float] = None
+    fps: Optional[float] = None
+    speed: Optional[float] = None
+    # Identifies the queue state being rendered; jobs for the same state coalesce.
+    state_key: Optional[str] = None
+    superseded_by: Optional[str] = None
+    # Set for jobs run by standalone render workers.
+    worker_id: Optional[str] = None
+    attempts: int = 0
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("succeeded", "failed", "superseded")
+
+    def record_progress(self, progress: FfmpegProgress) -> None:
+        self.fps = progress.fps
+        self.speed = progress.speed
+        if progress.percent is not None:
+            self.progress_percent = progress.percent
+            self.eta_seconds = progress.eta_seconds
+
+    def record_preview(self, preview_url: str) -> None:
+        self.preview_url = preview_url
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+class RenderJobService:
+    """Runs edit-queue renders on a worker pool so agent turns return as soon
+    as the edit is recorded; clients poll the job for the video URL.
+
+    Jobs for the same session are coalesced: each waits out a short debounce,
+    and a newer job supersedes the older one, killing its ffmpeg process if it
+    is already running, so only a session's latest queue state is rendered to
+    completion.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, debounce_seconds: Optional[float] = None):
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or settings.RENDER_WORKERS,
+            thread_name_prefix="render"
+        )
+        self.debounce_seconds = settings.RENDER_DEBOUNCE_SECONDS if debounce_seconds is None else debounce_seconds
+        self._lock = threading.Lock()
+        self._jobs: dict[str, RenderJob] = {}
+        self._cancel_tokens: dict[str, CancelToken] = {}
+        self._latest_by_session: dict[str, RenderJob] = {}
+
+    def submit(
+        self,
+        render: Callable[[], str],
+        session_id: Optional[str] = None,
+        on_success: Optional[Callable[[str], None]] = None,
+        state_key: Optional[str] = None
+    ) -> RenderJob:
+        job = RenderJob(
+            id=str(uuid.uuid4()),
+            session_id=session_id,
+            created_at=datetime.now().isoformat(),
+            state_key=state_key
+        )
+        with self._lock:
+            previous = self._latest_by_session.get(session_id) if session_id else None
+            if previous and not previous.done:
+                if state_key and previous.state_key == state_key:
+                    logger.info(f"Render job {previous.id} already covers this queue state of session {session_id}")
+                    return previous
+                self._supersede(previous, job)
+
+            self._jobs[job.id] = job
+            self._cancel_tokens[job.id] = CancelToken()
+            if session_id:
+                self._latest_by_session[session_id] = job
+            self._prune()
+
+        # The render runs on another thread, so its spans join the submitter's trace explicitly.
+        parent_span = current_span()
+        if session_id and self.debounce_seconds > 0:
+            timer = threading.Timer(self.debounce_seconds, self._start, (job, render, on_success, parent_span))
+            timer.daemon = True
+            timer.start()
+        else:
+            self._start(job, render, on_success, parent_span)
+        logger.info(f"Queued render job {job.id} for session {session_id}")
+        return job
+
+    def _supersede(self, previous: RenderJob, job: RenderJob) -> None:
+        logger.info(f"Render job {previous.id} ({previous.status}) superseded by {job.id}")
+        previous.status = "superseded"
+        previous.superseded_by = job.id
+        previous.finished_at = datetime.now().isoformat()
+        cancel_token = self._cancel_tokens.get(previous.id)
+        if cancel_token:
+            cancel_token.cancel()
+
+    def _start(
+        self,
+        job: RenderJob,
+        render: Callable[[], str],
+        on_success: Optional[Callable[[str], None]],
+        parent_span: Optional[Span] = None
+    ) -> None:
+        # Jobs superseded during the debounce never reach a worker.
+        if job.done:
+            self._release(job)
+            return
+        try:
+            self._executor.submit(self._run, job, render, on_success, parent_span)
+        except RuntimeError as e:
+            logger.error(f"Could not start render job {job.id}: {e}")
+            with self._lock:
+                job.error = str(e)
+                job.status = "failed"
+                job.finished_at = datetime.now().isoformat()
+            self._release(job)
+
+    def _run(
+        self,
+        job: RenderJob,
+        render: Callable[[], str],
+        on_success: Optional[Callable[[str], None]],
+        parent_span: Optional[Span] = None
+    ) -> None:
+        with self._lock:
+            cancel_token = self._cancel_tokens.get(job.id)
+            if job.done or not cancel_token:
+                cancel_token = None
+            else:
+                job.status = "rendering"
+                job.started_at = datetime.now().isoformat()
+        if not cancel_token:
+            self._release(job)
+            return
+
+        try:
+            with ffmpeg_runner.reporting_to(job.record_progress), ffmpeg_runner.cancellable(cancel_token), \
+                    hls_preview_service.reporting_to(job.record_preview), \
+                    tracer.span("render.job", parent=parent_span, job_id=job.id, session_id=job.session_id):
+                video_url = render()
+            # A render that completed despite being superseded still fills the
+            # render cache; the recorder only moves the current video when the
+            # stored queue matches what was rendered.
+            if on_success:
+                on_success(video_url)
+            with self._lock:
+                superseded = job.status == "superseded"
+                if not superseded:
+                    job.video_url = video_url
+                    job.progress_percent = 100.0
+                    job.eta_seconds = 0.0
+                    job.status = "succeeded"
+            if not superseded:
+                logger.info(f"Render job {job.id} finished: {video_url}")
+        except Exception as e:
+            with self._lock:
+                superseded = job.status == "superseded"
+                if not superseded:
+                    job.error = str(e)
+                    job.status = "failed"
+            if superseded:
+                logger.info(f"Render job {job.id} stopped, superseded by {job.superseded_by}")
+            else:
+                logger.error(f"Render job {job.id} failed: {e}")
+        finally:
+            with self._lock:
+                if not job.finished_at:
+                    job.finished_at = datetime.now().isoformat()
+            self._release(job)
+
+    def _release(self, job: RenderJob) -> None:
+        with self._lock:
+            self._cancel_tokens.pop(job.id, None)
+            if job.session_id and self._latest_by_session.get(job.session_id) is job:
+                del self._latest_by_session[job.session_id]
+
+    def get(self, job_id: str) -> Optional[RenderJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def depth(self) -> dict[str, int]:
+        """Number of queued and rendering jobs in this process."""
+        with self._lock:
+            statuses = [job.status for job in self._jobs.values()]
+        return {status: statuses.count(status) for status in ("queued", "rendering")}
+
+    def _prune(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if job.done]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[job_id]
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
+
+
+render_job_service = RenderJobService()
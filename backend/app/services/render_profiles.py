@@ -0,0 +1,35 @@
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass(frozen=True)
+class RenderProfile:
+    """Output settings for a render.
+
+    Overlay geometry in edit params is authored against the source resolution,
+    so a downscaling profile also scales font sizes and margins to match.
+    """
+    name: str
+    max_height: Optional[int] = None
+    preset: str = "medium"
+    crf: int = 23
+
+    @property
+    def rescales(self) -> bool:
+        return self.max_height is not None
+
+    def scale_factor(self, source_height: int) -> float:
+        if not self.max_height or not source_height or source_height <= self.max_height:
+            return 1.0
+        return self.max_height / source_height
+
+    def video_encoder_args(self) -> list[str]:
+        return ["-c:v", "libx264", "-preset", self.preset, "-crf", str(self.crf)]
+
+
+FULL_PROFILE = RenderProfile(name="full")
+
+# Interactive previews only ever play in the chat's video player.
+PROXY_PROFILE = RenderProfile(name="proxy", max_height=480, preset="ultrafast", crf=28)
+
+PROFILES = {profile.name: profile for profile in (FULL_PROFILE, PROXY_PROFILE)}
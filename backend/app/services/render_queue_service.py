@@ -0,0 +1,250 @@
+import json
+import logging
+import os
+import sqlite3
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from core.config import settings
+from models.edit_models import EditQueue
+from services.render_job_service import RenderJob
+from services.render_profiles import PROFILES, RenderProfile
+
+logger = logging.getLogger(__name__)
+
+PENDING_STATUSES = ("queued", "rendering")
+
+JOB_COLUMNS = (
+    "id", "session_id", "created_at", "status", "video_url", "preview_url", "error", "started_at", "finished_at",
+    "progress_percent", "eta_seconds", "fps", "speed", "state_key", "superseded_by", "worker_id", "attempts"
+)
+
+
+@dataclass
+class ClaimedRender:
+    job: RenderJob
+    edit_queue: EditQueue
+    profile: RenderProfile
+    app_name: Optional[str]
+    user_id: Optional[str]
+
+
+class RenderQueueService:
+    """Durable render queue in the ``render_jobs`` table of sessions.db.
+
+    Standalone render workers claim jobs under a lease and keep it alive with
+    heartbeats; a job whose worker dies is claimed again once its lease
+    expires, up to ``RENDER_MAX_ATTEMPTS`` times. Enqueueing coalesces per
+    session the same way the in-process RenderJobService does.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, debounce_seconds: Optional[float] = None):
+        if db_path is None:
+            db_path = os.getenv("DATABASE_PATH", "data/sessions.db")
+
+        self.db_path = Path(__file__).parent.parent / db_path
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.debounce_seconds = settings.RENDER_DEBOUNCE_SECONDS if debounce_seconds is None else debounce_seconds
+        self._init_database()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _init_database(self):
+        with self._connect() as conn:
+            # WAL lets the API keep reading sessions while workers write.
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS render_jobs (
+                    id TEXT PRIMARY KEY,
+                    app_name TEXT,
+                    user_id TEXT,
+                    session_id TEXT,
+                    state_key TEXT,
+                    profile TEXT NOT NULL,
+                    edit_queue TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    max_attempts INTEGER NOT NULL,
+                    worker_id TEXT,
+                    available_at REAL NOT NULL,
+                    lease_expires_at REAL,
+                    video_url TEXT,
+                    preview_url TEXT,
+                    error TEXT,
+                    superseded_by TEXT,
+                    progress_percent REAL,
+                    eta_seconds REAL,
+                    fps REAL,
+                    speed REAL,
+                    created_at TEXT NOT NULL,
+                    started_at TEXT,
+                    finished_at TEXT
+                )
+            """)
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(render_jobs)")}
+            if "preview_url" not in columns:
+                conn.execute("ALTER TABLE render_jobs ADD COLUMN preview_url TEXT")
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_render_jobs_claim
+                ON render_jobs (status, available_at)
+            """)
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_render_jobs_session
+                ON render_jobs (session_id, status)
+            """)
+            conn.commit()
+            logger.info(f"Render queue initialized at {self.db_path}")
+
+    def _to_job(self, row: sqlite3.Row) -> RenderJob:
+        return RenderJob(**{column: row[column] for column in JOB_COLUMNS})
+
+    def enqueue(
+        self,
+        edit_queue: EditQueue,
+        profile: RenderProfile,
+        app_name: Optional[str] = None,
+        user_id: Optional[str] = None,
+        state_key: Optional[str] = None
+    ) -> RenderJob:
+        session_id = edit_queue.session_id
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            pending = conn.execute(f"""
+                SELECT * FROM render_jobs
+                WHERE session_id = ? AND status IN ({",".join("?" * len(PENDING_STATUSES))})
+                ORDER BY created_at DESC
+            """, (session_id, *PENDING_STATUSES)).fetchall()
+
+            if pending and state_key and pending[0]["state_key"] == state_key:
+                logger.info(f"Render job {pending[0]['id']} already covers this queue state of session {session_id}")
+                return self._to_job(pending[0])
+
+            job_id = str(uuid.uuid4())
+            now = datetime.now().isoformat()
+            # A running job notices on its next heartbeat and kills its ffmpeg.
+            for row in pending:
+                logger.info(f"Render job {row['id']} ({row['status']}) superseded by {job_id}")
+            conn.execute(f"""
+                UPDATE render_jobs SET status = 'superseded', superseded_by = ?, finished_at = ?
+                WHERE session_id = ? AND status IN ({",".join("?" * len(PENDING_STATUSES))})
+            """, (job_id, now, session_id, *PENDING_STATUSES))
+
+            conn.execute("""
+                INSERT INTO render_jobs
+                (id, app_name, user_id, session_id, state_key, profile, edit_queue, status,
+                 max_attempts, available_at, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, 'queued', ?, ?, ?)
+            """, (
+                job_id, app_name, user_id, session_id, state_key, profile.name,
+                json.dumps(edit_queue.to_dict()), settings.RENDER_MAX_ATTEMPTS,
+                time.time() + self.debounce_seconds, now
+            ))
+            conn.commit()
+
+            logger.info(f"Queued render job {job_id} for session {session_id}")
+            return self._to_job(conn.execute("SELECT * FROM render_jobs WHERE id = ?", (job_id,)).fetchone())
+
+    def claim(self, worker_id: str, lease_seconds: Optional[float] = None) -> Optional[ClaimedRender]:
+        """Take the oldest runnable job: a queued one past its debounce, or a
+        rendering one whose worker stopped heartbeating."""
+        lease_seconds = lease_seconds or settings.RENDER_LEASE_SECONDS
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("""
+                UPDATE render_jobs
+                SET status = 'failed', error = 'Render worker stopped responding', finished_at = ?
+                WHERE status = 'rendering' AND lease_expires_at < ? AND attempts >= max_attempts
+            """, (datetime.now().isoformat(), now))
+
+            row = conn.execute("""
+                SELECT * FROM render_jobs
+                WHERE (status = 'queued' AND available_at <= ?)
+                   OR (status = 'rendering' AND lease_expires_at < ?)
+                ORDER BY available_at
+                LIMIT 1
+            """, (now, now)).fetchone()
+            if not row:
+                conn.commit()
+                return None
+
+            if row["status"] == "rendering":
+                logger.warning(f"Reclaiming render job {row['id']} from unresponsive worker {row['worker_id']}")
+            conn.execute("""
+                UPDATE render_jobs
+                SET status = 'rendering', worker_id = ?, attempts = attempts + 1,
+                    lease_expires_at = ?, started_at = ?, error = NULL
+                WHERE id = ?
+            """, (worker_id, now + lease_seconds, datetime.now().isoformat(), row["id"]))
+            conn.commit()
+
+            row = conn.execute("SELECT * FROM render_jobs WHERE id = ?", (row["id"],)).fetchone()
+            return ClaimedRender(
+                job=self._to_job(row),
+                edit_queue=EditQueue.from_dict(json.loads(row["edit_queue"])),
+                profile=PROFILES[row["profile"]],
+                app_name=row["app_name"],
+                user_id=row["user_id"]
+            )
+
+    def heartbeat(self, job: RenderJob, worker_id: str, lease_seconds: Optional[float] = None) -> bool:
+        """Extend the lease and publish progress; False means the worker no
+        longer owns the job (superseded or reclaimed) and must stop."""
+        lease_seconds = lease_seconds or settings.RENDER_LEASE_SECONDS
+        with self._connect() as conn:
+            cursor = conn.execute("""
+                UPDATE render_jobs
+                SET lease_expires_at = ?, progress_percent = ?, eta_seconds = ?, fps = ?, speed = ?, preview_url = ?
+                WHERE id = ? AND worker_id = ? AND status = 'rendering'
+            """, (
+                time.time() + lease_seconds, job.progress_percent, job.eta_seconds, job.fps, job.speed,
+                job.preview_url, job.id, worker_id
+            ))
+            conn.commit()
+            return cursor.rowcount == 1
+
+    def complete(self, job_id: str, worker_id: str, video_url: str) -> bool:
+        with self._connect() as conn:
+            cursor = conn.execute("""
+                UPDATE render_jobs
+                SET status = 'succeeded', video_url = ?, progress_percent = 100.0, eta_seconds = 0.0,
+                    lease_expires_at = NULL, finished_at = ?
+                WHERE id = ? AND worker_id = ? AND status = 'rendering'
+            """, (video_url, datetime.now().isoformat(), job_id, worker_id))
+            conn.commit()
+            return cursor.rowcount == 1
+
+    def fail(self, job_id: str, worker_id: str, error: str) -> bool:
+        with self._connect() as conn:
+            cursor = conn.execute("""
+                UPDATE render_jobs
+                SET status = 'failed', error = ?, lease_expires_at = NULL, finished_at = ?
+                WHERE id = ? AND worker_id = ? AND status = 'rendering'
+            """, (error, datetime.now().isoformat(), job_id, worker_id))
+            conn.commit()
+            return cursor.rowcount == 1
+
+    def get(self, job_id: str) -> Optional[RenderJob]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM render_jobs WHERE id = ?", (job_id,)).fetchone()
+            return self._to_job(row) if row else None
+
+    def depth(self) -> dict[str, int]:
+        """Number of queued and rendering jobs, across all workers."""
+        with self._connect() as conn:
+            rows = conn.execute(f"""
+                SELECT status, COUNT(*) FROM render_jobs
+                WHERE status IN ({",".join("?" * len(PENDING_STATUSES))})
+                GROUP BY status
+            """, PENDING_STATUSES).fetchall()
+        return {status: 0 for status in PENDING_STATUSES} | {row[0]: row[1] for row in rows}
+
+
+render_queue_service = RenderQueueService()
@@ -0,0 +1,427 @@
+import contextlib
+import contextvars
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, BinaryIO, Iterator, Optional
+
+from core.config import settings
+from core.metrics import record_cache_lookup
+from core.tracing import tracer
+from google.cloud import storage
+
+logger = logging.getLogger(__name__)
+
+RENDER_PREFIX = "renders"
+MAX_REMEMBERED_MISSES = 10000
+
+
+class RenderStore:
+    """Content-addressed store for rendered videos.
+
+    Renders are keyed by a hash of their input media and normalized edit
+    params, so identical edits on the same source are rendered and uploaded
+    once no matter which session asks for them. A local-disk tier with a byte
+    budget and LRU eviction sits in front of the scratch bucket.
+
+    Renders put with ``upload=False`` (pipeline intermediates) live only in
+    the local tier until ``materialize`` is called for them. With upload
+    workers, uploaded renders are served from the local tier right away and
+    copied to the bucket in the background; they are not evicted before the
+    copy finishes.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[str] = None,
+        max_bytes: Optional[int] = None,
+        bucket_name: Optional[str] = None,
+        storage_client: Optional[storage.Client] = None,
+        upload_workers: Optional[int] = None,
+        miss_ttl_seconds: Optional[float] = None
+    ):
+        self.cache_dir = Path(__file__).parent.parent / (cache_dir or settings.RENDER_CACHE_DIR)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes if max_bytes is not None else settings.RENDER_CACHE_MAX_BYTES
+        self.bucket_name = bucket_name or settings.GCS_BUCKET_NAME
+        self.storage_client = storage_client or storage.Client()
+        upload_workers = upload_workers if upload_workers is not None else settings.RENDER_UPLOAD_WORKERS
+        self.miss_ttl_seconds = miss_ttl_seconds if miss_ttl_seconds is not None else settings.RENDER_MISS_TTL_SECONDS
+        self._upload_pool = (
+            ThreadPoolExecutor(max_workers=upload_workers, thread_name_prefix="render-upload")
+            if upload_workers > 0 else None
+        )
+
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, int] = OrderedDict()
+        self._total_bytes = 0
+        self._unmaterialized: set[str] = set()
+        self._uploads: dict[str, Future] = {}
+        # Key -> monotonic time until which the bucket is known not to have it.
+        self._remote_misses: dict[str, float] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._load_index()
+
+    def _load_index(self) -> None:
+        files = sorted(self.cache_dir.glob("*.mp4"), key=lambda p: p.stat().st_mtime)
+        for path in files:
+            size = path.stat().st_size
+            self._entries[path.stem] = size
+            self._total_bytes += size
+            # Upload state is not persisted, so materialize re-checks the bucket.
+            self._unmaterialized.add(path.stem)
+        logger.info(f"Render store loaded {len(self._entries)} local renders ({self._total_bytes} bytes)")
+
+    @staticmethod
+    def make_key(media_key: str, operation: str, params: dict[str, Any]) -> str:
+        payload = json.dumps(
+            {"media": media_key, "operation": operation, "params": params},
+            sort_keys=True,
+            default=str
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def media_key(self, media: str) -> str:
+        """Identity of an input: the render key for our own renders, a content
+        hash for local files, and the URL itself for source media."""
+        render_key = self.key_from_url(media)
+        if render_key:
+            return render_key
+        if os.path.exists(media):
+            digest = hashlib.sha256()
+            with open(media, "rb") as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    digest.update(chunk)
+            return digest.hexdigest()
+        return media
+
+    def url_for_key(self, key: str) -> str:
+        return f"https://storage.googleapis.com/{self.bucket_name}/{RENDER_PREFIX}/{key}.mp4"
+
+    def sidecar_url(self, key: str, suffix: str) -> str:
+        """URL of a file derived from a render, such as its thumbnail sprite.
+        Sidecars sit next to the render, under its URL with ``.mp4`` replaced
+        by ``suffix``."""
+        return f"https://storage.googleapis.com/{self.bucket_name}/{RENDER_PREFIX}/{key}{suffix}"
+
+    def put_sidecar(
+        self,
+        key: str,
+        suffix: str,
+        local_path: str,
+        content_type: str,
+        cache_control: Optional[str] = None
+    ) -> str:
+        blob = self.storage_client.bucket(self.bucket_name).blob(f"{RENDER_PREFIX}/{key}{suffix}")
+        if cache_control:
+            blob.cache_control = cache_control
+        with tracer.span("upload", key=key, suffix=suffix, bytes=os.path.getsize(local_path)):
+            blob.upload_from_filename(local_path, content_type=content_type)
+        return self.sidecar_url(key, suffix)
+
+    def has_sidecar(self, key: str, suffix: str) -> bool:
+        return self.storage_client.bucket(self.bucket_name).blob(f"{RENDER_PREFIX}/{key}{suffix}").exists()
+
+    def key_from_url(self, url: str) -> Optional[str]:
+        prefix = f"{self.bucket_name}/{RENDER_PREFIX}/"
+        for scheme in ("https://storage.googleapis.com/", "gs://"):
+            if url.startswith(scheme + prefix) and url.endswith(".mp4"):
+                return url[len(scheme + prefix):-len(".mp4")]
+        return None
+
+    def _local_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.mp4"
+
+    def owns(self, path: str) -> bool:
+        return Path(path).parent.resolve() == self.cache_dir.resolve()
+
+    def get_local(self, key: str) -> Optional[str]:
+        with self._lock:
+            if key not in self._entries:
+                return None
+            local_path = self._local_path(key)
+            if not local_path.exists():
+                self._total_bytes -= self._entries.pop(key)
+                self._unmaterialized.discard(key)
+                return None
+            self._entries.move_to_end(key)
+        os.utime(local_path)
+        return str(local_path)
+
+    def local_path_for_url(self, url: str) -> Optional[str]:
+        key = self.key_from_url(url)
+        return self.get_local(key) if key else None
+
+    def lookup(self, key: str) -> Optional[str]:
+        if self.get_local(key):
+            self._record_lookup(key, "local hit")
+            return self.url_for_key(key)
+
+        exists = self._exists_remote(key)
+        self._record_lookup(key, "remote hit" if exists else "miss")
+        return self.url_for_key(key) if exists else None
+
+    def lookup_deepest(self, keys: list[str]) -> tuple[int, Optional[str]]:
+        """Deepest stored render of a chain of prefix keys, as its 1-based
+        depth and URL, or ``(0, None)``. The bucket is asked about every key
+        not in the local tier at once, rather than one round trip per depth."""
+        for depth in range(len(keys), 0, -1):
+            if self.get_local(keys[depth - 1]):
+                local_depth = depth
+                break
+        else:
+            local_depth = 0
+
+        deeper_keys = keys[local_depth:]
+        if len(deeper_keys) > 1:
+            with ThreadPoolExecutor(max_workers=min(len(deeper_keys), 8)) as pool:
+                exists = list(pool.map(self._exists_remote, deeper_keys))
+        else:
+            exists = [self._exists_remote(key) for key in deeper_keys]
+
+        for index in range(len(deeper_keys) - 1, -1, -1):
+            if exists[index]:
+                self._record_lookup(deeper_keys[index], "remote hit")
+                return local_depth + index + 1, self.url_for_key(deeper_keys[index])
+        if local_depth:
+            self._record_lookup(keys[local_depth - 1], "local hit")
+            return local_depth, self.url_for_key(keys[local_depth - 1])
+        if keys:
+            self._record_lookup(keys[-1], "miss")
+        return 0, None
+
+    def _record_lookup(self, key: str, result: str) -> None:
+        hit = result != "miss"
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        record_cache_lookup("render", hit=hit)
+        logger.info(f"Render store {result}: {key}")
+
+    def _exists_remote(self, key: str) -> bool:
+        with self._lock:
+            known_missing = self._remote_misses.get(key, 0.0) > time.monotonic()
+        if known_missing:
+            return False
+
+        try:
+            blob = self.storage_client.bucket(self.bucket_name).blob(f"{RENDER_PREFIX}/{key}.mp4")
+            exists = blob.exists()
+        except Exception as e:
+            # Not remembered as a miss: the bucket may well have it.
+            logger.warning(f"Render store remote lookup failed for {key}: {e}")
+            return False
+
+        if not exists and self.miss_ttl_seconds > 0:
+            now = time.monotonic()
+            with self._lock:
+                if len(self._remote_misses) >= MAX_REMEMBERED_MISSES:
+                    self._remote_misses = {key: until for key, until in self._remote_misses.items() if until > now}
+                self._remote_misses[key] = now + self.miss_ttl_seconds
+        return exists
+
+    def put(self, key: str, local_path: str, upload: bool = True) -> str:
+        """Move a finished render into the local tier and, unless it is an
+        intermediate, upload it under its key."""
+        cached_path = self._local_path(key)
+        shutil.move(local_path, cached_path)
+        size = cached_path.stat().st_size
+
+        background = upload and self._upload_pool is not None
+        if background:
+            # Tracked before registering, so the render cannot be evicted mid-upload.
+            with self._lock:
+                # In the render's context, so the upload's span joins its trace.
+                self._uploads[key] = self._upload_pool.submit(
+                    contextvars.copy_context().run, self._upload_in_background, key, cached_path
+                )
+        elif upload:
+            self._upload(key, cached_path)
+
+        self._register(key, size, materialized=upload and not background)
+
+        video_url = self.url_for_key(key)
+        logger.info(f"Render stored: {video_url} (uploaded={upload})")
+        return video_url
+
+    def _register(self, key: str, size: int, materialized: bool) -> None:
+        with self._lock:
+            self._remote_misses.pop(key, None)
+            if key in self._entries:
+                self._total_bytes -= self._entries.pop(key)
+            self._entries[key] = size
+            self._total_bytes += size
+            if materialized:
+                self._unmaterialized.discard(key)
+            else:
+                self._unmaterialized.add(key)
+            evicted = self._evict()
+
+        for path in evicted:
+            try:
+                path.unlink()
+            except OSError as e:
+                logger.warning(f"Could not delete evicted render {path}: {e}")
+
+    def fetch_local(self, key: str) -> Optional[str]:
+        """Local path of a render, pulling it into the local tier from the
+        bucket if needed; None if it exists in neither."""
+        local_path = self.get_local(key)
+        if local_path:
+            return local_path
+
+        blob = self.storage_client.bucket(self.bucket_name).blob(f"{RENDER_PREFIX}/{key}.mp4")
+        if not blob.exists():
+            return None
+
+        cached_path = self._local_path(key)
+        # A unique partial file per fetch: parallel Range requests for the
+        # same render each download in full, and the last rename wins.
+        with tempfile.NamedTemporaryFile(dir=cached_path.parent, suffix=".mp4.part", delete=False) as part_file:
+            pass
+        try:
+            with tracer.span("download", key=key):
+                blob.download_to_filename(part_file.name)
+            os.replace(part_file.name, cached_path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.unlink(part_file.name)
+            raise
+        self._register(key, cached_path.stat().st_size, materialized=True)
+        logger.info(f"Fetched render {key} into local tier")
+        return str(cached_path)
+
+    def fetch_local_url(self, url: str) -> Optional[str]:
+        key = self.key_from_url(url)
+        return self.fetch_local(key) if key else None
+
+    def _upload(self, key: str, cached_path: Path) -> None:
+        blob = self.storage_client.bucket(self.bucket_name).blob(f"{RENDER_PREFIX}/{key}.mp4")
+        with tracer.span("upload", key=key, bytes=cached_path.stat().st_size):
+            blob.upload_from_filename(str(cached_path))
+
+    def _upload_in_background(self, key: str, cached_path: Path) -> None:
+        try:
+            self._upload(key, cached_path)
+            uploaded = True
+        except Exception as e:
+            # The render stays pending, so materialize uploads it when it is needed.
+            logger.warning(f"Background upload of render {key} failed: {e}")
+            uploaded = False
+
+        with self._lock:
+            self._uploads.pop(key, None)
+            if uploaded:
+                self._unmaterialized.discard(key)
+        if uploaded:
+            logger.info(f"Render {key} uploaded in the background")
+
+    @contextlib.contextmanager
+    def open_upload(self, key: str) -> Iterator[BinaryIO]:
+        """Writable stream into a resumable upload of the render ``key``,
+        bypassing the local tier. The render appears under its key only if
+        the block completes, since closing the upload commits whatever was
+        written."""
+        bucket = self.storage_client.bucket(self.bucket_name)
+        partial_blob = bucket.blob(f"{RENDER_PREFIX}/partial/{key}-{uuid.uuid4().hex}.mp4")
+        writer = partial_blob.open(
+            "wb", chunk_size=settings.STREAM_UPLOAD_CHUNK_BYTES, content_type="video/mp4"
+        )
+        try:
+            yield writer
+            writer.close()
+        except BaseException:
+            try:
+                writer.close()
+                partial_blob.delete()
+            except Exception as e:
+                logger.warning(f"Could not discard partial upload of render {key}: {e}")
+            raise
+
+        bucket.copy_blob(partial_blob, bucket, f"{RENDER_PREFIX}/{key}.mp4")
+        partial_blob.delete()
+        with self._lock:
+            self._remote_misses.pop(key, None)
+        logger.info(f"Render streamed to {self.url_for_key(key)}")
+
+    def materialize(self, key: str) -> Optional[str]:
+        """Make sure a render is in the bucket and return its URL, or None if
+        it was a local-only intermediate that has since been evicted."""
+        with self._lock:
+            upload_future = self._uploads.get(key)
+        if upload_future:
+            upload_future.result()
+
+        with self._lock:
+            pending = key in self._unmaterialized
+        if not pending:
+            return self.url_for_key(key) if key in self._entries or self.lookup(key) else None
+
+        local_path = self.get_local(key)
+        if not local_path:
+            return None
+
+        blob = self.storage_client.bucket(self.bucket_name).blob(f"{RENDER_PREFIX}/{key}.mp4")
+        if not blob.exists():
+            logger.info(f"Materializing render {key}")
+            self._upload(key, Path(local_path))
+
+        with self._lock:
+            self._unmaterialized.discard(key)
+        return self.url_for_key(key)
+
+    def materialize_url(self, url: str) -> str:
+        key = self.key_from_url(url)
+        if not key:
+            return url
+        materialized_url = self.materialize(key)
+        if not materialized_url:
+            raise FileNotFoundError(f"Render {key} is no longer available")
+        return materialized_url
+
+    def _evict(self) -> list[Path]:
+        evicted = []
+        for key in list(self._entries):
+            if self._total_bytes <= self.max_bytes or len(self._entries) <= 1:
+                break
+            upload_future = self._uploads.get(key)
+            if upload_future and not upload_future.done():
+                continue
+            size = self._entries.pop(key)
+            self._total_bytes -= size
+            self._unmaterialized.discard(key)
+            self.evictions += 1
+            evicted.append(self._local_path(key))
+            logger.info(f"Evicted render {key} from local tier ({size} bytes)")
+        return evicted
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "local_entries": len(self._entries),
+                "local_bytes": self._total_bytes,
+                "pending_uploads": sum(1 for upload in self._uploads.values() if not upload.done()),
+                "max_bytes": self.max_bytes
+            }
+
+
+render_store = RenderStore()
@@ -0,0 +1,207 @@
+import logging
+import math
+import os
+import struct
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FONT_FILE = os.path.normpath(os.path.join(os.path.dirname(__file__), "../config/arial.ttf"))
+
+LAYOUT_CACHE_SIZE = 4096
+
+# (platform, encoding) of the Unicode BMP cmap subtables, in order of preference.
+UNICODE_CMAPS = ((3, 1), (0, 3), (0, 4), (0, 1), (0, 0))
+
+
+class GlyphAdvanceTable:
+    """Advance widths of a TrueType font, indexed by BMP code point.
+
+    Read once from the font's ``cmap``, ``hmtx`` and ``hhea`` tables into a
+    numpy array, so a whole string is measured with one vectorized lookup.
+    Like Pillow's basic layout, each advance is rounded to whole pixels at the
+    requested size and kerning is not applied.
+    """
+
+    def __init__(self, font_file: str):
+        with open(font_file, "rb") as f:
+            data = f.read()
+        tables = self._read_table_directory(data)
+
+        head = tables["head"]
+        self.units_per_em = struct.unpack_from(">H", data, head + 18)[0]
+        hhea = tables["hhea"]
+        self.ascender, self.descender = struct.unpack_from(">hh", data, hhea + 4)
+        number_of_h_metrics = struct.unpack_from(">H", data, hhea + 34)[0]
+        num_glyphs = struct.unpack_from(">H", data, tables["maxp"] + 4)[0]
+
+        # hmtx holds (advance, lsb) pairs; glyphs past the last pair share its advance.
+        metrics = np.frombuffer(data, dtype=">u2", count=2 * number_of_h_metrics, offset=tables["hmtx"])
+        glyph_advances = np.full(max(num_glyphs, number_of_h_metrics), metrics[-2], dtype=np.int32)
+        glyph_advances[:number_of_h_metrics] = metrics[0::2]
+
+        glyph_ids = self._read_cmap(data, tables["cmap"])
+        # Code point 0x10000 stands in for everything outside the BMP and gets .notdef.
+        glyph_ids = np.append(glyph_ids, 0)
+        self.advances = glyph_advances[np.minimum(glyph_ids, len(glyph_advances) - 1)]
+        self._pixel_advances: dict[int, np.ndarray] = {}
+
+    @staticmethod
+    def _read_table_directory(data: bytes) -> dict[str, int]:
+        num_tables = struct.unpack_from(">H", data, 4)[0]
+        tables = {}
+        for index in range(num_tables):
+            tag, _, offset, _ = struct.unpack_from(">4sIII", data, 12 + 16 * index)
+            tables[tag.decode("latin-1")] = offset
+        missing = {"head", "hhea", "hmtx", "maxp", "cmap"} - tables.keys()
+        if missing:
+            raise ValueError(f"Font is missing required tables: {', '.join(sorted(missing))}")
+        return tables
+
+    @staticmethod
+    def _read_cmap(data: bytes, cmap: int) -> np.ndarray:
+        """Glyph id of every BMP code point, from the format 4 Unicode subtable."""
+        num_subtables = struct.unpack_from(">H", data, cmap + 2)[0]
+        subtables = {}
+        for index in range(num_subtables):
+            platform, encoding, offset = struct.unpack_from(">HHI", data, cmap + 4 + 8 * index)
+            if struct.unpack_from(">H", data, cmap + offset)[0] == 4:
+                subtables[(platform, encoding)] = cmap + offset
+        subtable = next((subtables[key] for key in UNICODE_CMAPS if key in subtables), None)
+        if subtable is None:
+            raise ValueError("Font has no format 4 Unicode cmap")
+
+        seg_count = struct.unpack_from(">H", data, subtable + 6)[0] // 2
+        end_codes = np.frombuffer(data, dtype=">u2", count=seg_count, offset=subtable + 14).astype(np.int64)
+        start_offset = subtable + 16 + 2 * seg_count
+        start_codes = np.frombuffer(data, dtype=">u2", count=seg_count, offset=start_offset).astype(np.int64)
+        id_deltas = np.frombuffer(data, dtype=">u2", count=seg_count, offset=start_offset + 2 * seg_count).astype(np.int64)
+        range_offset_start = start_offset + 4 * seg_count
+        id_range_offsets = np.frombuffer(data, dtype=">u2", count=seg_count, offset=range_offset_start).astype(np.int64)
+
+        glyph_ids = np.zeros(0x10000, dtype=np.int64)
+        for segment in range(seg_count):
+            start, end = start_codes[segment], end_codes[segment]
+            if start > end or start == 0xFFFF:
+                continue
+            codes = np.arange(start, end + 1)
+            if id_range_offsets[segment] == 0:
+                glyph_ids[codes] = (codes + id_deltas[segment]) & 0xFFFF
+                continue
+            # idRangeOffset is relative to its own slot in the idRangeOffset array.
+            addresses = range_offset_start + 2 * segment + id_range_offsets[segment] + 2 * (codes - start)
+            mapped = np.frombuffer(data, dtype=">u2", count=len(codes), offset=int(addresses[0])).astype(np.int64)
+            glyph_ids[codes] = np.where(mapped != 0, (mapped + id_deltas[segment]) & 0xFFFF, 0)
+        return glyph_ids
+
+    def pixel_advances(self, fontsize: int) -> np.ndarray:
+        if fontsize not in self._pixel_advances:
+            scaled = np.floor(self.advances * fontsize / self.units_per_em + 0.5)
+            self._pixel_advances[fontsize] = scaled.astype(np.int64)
+        return self._pixel_advances[fontsize]
+
+    def advances_for(self, text: str, fontsize: int) -> np.ndarray:
+        """Advance width of each character of ``text``, in pixels."""
+        code_points = np.frombuffer(text.encode("utf-32-le"), dtype="<u4")
+        return self.pixel_advances(fontsize)[np.minimum(code_points, 0x10000)]
+
+
+@dataclass(frozen=True)
+class TextLayout:
+    lines: tuple[str, ...]
+    line_widths: tuple[int, ...]
+    fontsize: int
+    line_height: int
+
+    @property
+    def width(self) -> int:
+        return max(self.line_widths, default=0)
+
+    def height(self, line_spacing: int = 0) -> int:
+        return len(self.lines) * self.line_height + max(0, len(self.lines) - 1) * line_spacing
+
+    def box_size(self, border: int, line_spacing: int) -> tuple[int, int]:
+        """Size of the super's background box, with ``border`` padding around the text."""
+        return max(1, self.width + 2 * border), max(1, self.height(line_spacing) + 2 * border)
+
+
+class TextLayoutEngine:
+    """Wraps and measures supers with the font's real glyph advances.
+
+    Layouts are memoized per (text, fontsize, max_width), so rebuilding a
+    queue does not lay out its supers again.
+    """
+
+    def __init__(self, font_file: str = FONT_FILE, cache_size: int = LAYOUT_CACHE_SIZE):
+        self.font_file = font_file
+        self._table: Optional[GlyphAdvanceTable] = None
+        self._table_lock = threading.Lock()
+        self.layout = lru_cache(maxsize=cache_size)(self._layout)
+
+    @property
+    def table(self) -> GlyphAdvanceTable:
+        with self._table_lock:
+            if self._table is None:
+                self._table = GlyphAdvanceTable(self.font_file)
+                logger.info(f"Loaded glyph advances of {os.path.basename(self.font_file)}")
+            return self._table
+
+    def line_height(self, fontsize: int) -> int:
+        # FreeType rounds the scaled ascender and descender outwards, as Pillow reports them.
+        scale = fontsize / self.table.units_per_em
+        return math.ceil(self.table.ascender * scale) + math.ceil(-self.table.descender * scale)
+
+    def measure(self, text: str, fontsize: int) -> int:
+        return int(self.table.advances_for(text, fontsize).sum())
+
+    def measure_lines(self, lines: list[str], fontsize: int) -> TextLayout:
+        """Layout of text that is already broken into ``lines``."""
+        return TextLayout(
+            lines=tuple(lines),
+            line_widths=tuple(self.measure(line, fontsize) for line in lines),
+            fontsize=fontsize,
+            line_height=self.line_height(fontsize)
+        )
+
+    def _layout(self, text: str, fontsize: int, max_width: int) -> TextLayout:
+        words = text.split()
+        if not words:
+            return self.measure_lines([], fontsize)
+
+        # Measure every word in one pass over the joined text.
+        advances = self.table.advances_for(" ".join(words), fontsize)
+        cumulative = np.concatenate(([0], np.cumsum(advances)))
+        lengths = np.fromiter((len(word) for word in words), dtype=np.int64, count=len(words))
+        starts = np.cumsum(lengths + 1) - lengths - 1
+        word_widths = (cumulative[starts + lengths] - cumulative[starts]).tolist()
+        space_width = int(self.table.advances_for(" ", fontsize)[0])
+
+        lines, line_widths = [], []
+        current, current_width = [], 0
+        for word, word_width in zip(words, word_widths):
+            candidate_width = current_width + space_width + word_width if current else word_width
+            if candidate_width <= max_width or not current:
+                # A word wider than the whole line gets a line to itself.
+                current.append(word)
+                current_width = candidate_width
+            else:
+                lines.append(" ".join(current))
+                line_widths.append(current_width)
+                current, current_width = [word], word_width
+        lines.append(" ".join(current))
+        line_widths.append(current_width)
+
+        return TextLayout(
+            lines=tuple(lines),
+            line_widths=tuple(line_widths),
+            fontsize=fontsize,
+            line_height=self.line_height(fontsize)
+        )
+
+
+text_layout_engine = TextLayoutEngine()
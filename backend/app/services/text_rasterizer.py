@@ -0,0 +1,115 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+from PIL import Image, ImageColor, ImageDraw, ImageFont
+
+from core.config import settings
+from core.metrics import record_cache_lookup
+from services.text_layout import FONT_FILE, TextLayoutEngine, text_layout_engine
+
+logger = logging.getLogger(__name__)
+
+
+def parse_color(color: str) -> tuple[int, int, int, int]:
+    """ffmpeg-style color (``white``, ``#RRGGBB``, ``0xRRGGBBAA``, ``red@0.5``) as RGBA."""
+    color, _, alpha = color.partition("@")
+    if color.lower().startswith("0x"):
+        color = "#" + color[2:]
+    rgba = ImageColor.getcolor(color, "RGBA")
+    if alpha:
+        rgba = rgba[:3] + (round(float(alpha) * 255),)
+    return rgba
+
+
+class TextRasterizer:
+    """Renders a super (wrapped text on its brand-colored box) to a transparent
+    PNG once, so the video is composited with ``overlay`` instead of laying
+    text out on every frame with ``drawtext``.
+
+    PNGs are cached on disk by everything that affects their pixels, so the
+    same super is reused across rebuilds and sessions.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[str] = None,
+        font_file: str = FONT_FILE,
+        layout_engine: Optional[TextLayoutEngine] = None
+    ):
+        self.cache_dir = Path(__file__).parent.parent / (cache_dir or settings.TEXT_OVERLAY_CACHE_DIR)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.font_file = font_file
+        if layout_engine is None:
+            layout_engine = text_layout_engine if font_file == FONT_FILE else TextLayoutEngine(font_file)
+        self.layout_engine = layout_engine
+        self._fonts: dict[int, ImageFont.FreeTypeFont] = {}
+
+    def _font(self, fontsize: int) -> ImageFont.FreeTypeFont:
+        if fontsize not in self._fonts:
+            self._fonts[fontsize] = ImageFont.truetype(self.font_file, fontsize)
+        return self._fonts[fontsize]
+
+    def cache_key(
+        self,
+        lines: list[str],
+        fontsize: int,
+        color: str,
+        box_color: str,
+        width: int,
+        border: int,
+        line_spacing: int
+    ) -> str:
+        identity = {
+            "lines": lines,
+            "font": os.path.basename(self.font_file),
+            "fontsize": fontsize,
+            "color": color,
+            "box_color": box_color,
+            "width": width,
+            "border": border,
+            "line_spacing": line_spacing
+        }
+        return hashlib.sha256(json.dumps(identity, sort_keys=True).encode()).hexdigest()
+
+    def rasterize(
+        self,
+        lines: list[str],
+        fontsize: int,
+        color: str,
+        box_color: str,
+        width: int,
+        border: int = 20,
+        line_spacing: int = 10
+    ) -> str:
+        """Path of the PNG for ``lines``; ``width`` is the wrap width the lines
+        were broken at."""
+        key = self.cache_key(lines, fontsize, color, box_color, width, border, line_spacing)
+        png_path = self.cache_dir / f"{key}.png"
+        cached = png_path.exists()
+        record_cache_lookup("text_overlay", hit=cached)
+        if cached:
+            return str(png_path)
+
+        font = self._font(fontsize)
+        layout = self.layout_engine.measure_lines(lines, fontsize)
+
+        # Lines are left-aligned inside a box centred on the frame, as drawtext did.
+        image = Image.new("RGBA", layout.box_size(border, line_spacing), parse_color(box_color))
+        draw = ImageDraw.Draw(image)
+        fill = parse_color(color)
+        for index, line in enumerate(lines):
+            draw.text((border, border + index * (layout.line_height + line_spacing)), line, font=font, fill=fill)
+
+        with tempfile.NamedTemporaryFile(dir=self.cache_dir, suffix=".png.part", delete=False) as part_file:
+            image.save(part_file, format="PNG")
+        os.replace(part_file.name, png_path)
+        logger.info(f"Rasterized {len(lines)}-line super to {png_path} ({image.width}x{image.height})")
+        return str(png_path)
+
+
+text_rasterizer = TextRasterizer()
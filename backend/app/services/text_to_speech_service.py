@@ -4,6 +4,7 @@ import os
 import tempfile
 
 from core.config import settings
+from core.tracing import tracer
 from google.cloud import storage, texttospeech
 
 os.environ["GRPC_DNS_RESOLVER"] = "native"
@@ -21,6 +22,7 @@ class TextToSpeechService:
             "language_code": "en-US",
         }
     
+    @tracer.traced("tts")
     def generate_speech(
         self,
         text: str,
@@ -58,8 +60,9 @@ class TextToSpeechService:
             blob_path = f"audio/{file_name}"
             blob = bucket.blob(blob_path)
             
-            blob.upload_from_filename(local_path)
-            blob.reload()
+            with tracer.span("upload", blob=blob_path):
+                blob.upload_from_filename(local_path)
+                blob.reload()
             
             audio_url = f"https://storage.googleapis.com/{self.scratch_bucket}/{blob_path}"
             logger.info(f"Audio uploaded to GCS: {audio_url}")
@@ -0,0 +1,234 @@
+import logging
+import math
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Optional
+
+from core.config import settings
+from core.tracing import current_span, tracer
+from services.ffmpeg_runner import RenderCancelled, ffmpeg_runner
+from services.media_probe_service import media_probe_service
+from services.render_store import render_store
+
+logger = logging.getLogger(__name__)
+
+SPRITE_SUFFIX = ".sprite.jpg"
+VTT_SUFFIX = ".vtt"
+MAX_REMEMBERED_SPRITES = 10000
+
+
+@dataclass(frozen=True)
+class SpriteLayout:
+    count: int
+    columns: int
+    thumb_width: int
+    thumb_height: int
+    duration: float
+
+    @property
+    def rows(self) -> int:
+        return math.ceil(self.count / self.columns)
+
+    def tile_position(self, index: int) -> tuple[int, int]:
+        return (index % self.columns) * self.thumb_width, (index // self.columns) * self.thumb_height
+
+    def cue_span(self, index: int) -> tuple[float, float]:
+        return index * self.duration / self.count, (index + 1) * self.duration / self.count
+
+
+def sprite_layout(
+    duration: float,
+    width: int,
+    height: int,
+    fps: Optional[float],
+    count: int,
+    thumb_width: int
+) -> SpriteLayout:
+    """Grid of ``count`` evenly spaced thumbnails, fewer if the video has
+    fewer frames than that."""
+    if fps:
+        count = min(count, max(1, math.floor(duration * fps)))
+    # Even dimensions keep the JPEG encoder's chroma subsampling exact.
+    thumb_height = max(2, round(thumb_width * height / width / 2) * 2)
+    return SpriteLayout(
+        count=count,
+        columns=math.ceil(math.sqrt(count)),
+        thumb_width=thumb_width,
+        thumb_height=thumb_height,
+        duration=duration
+    )
+
+
+def _vtt_timestamp(seconds: float) -> str:
+    milliseconds = round(seconds * 1000)
+    hours, milliseconds = divmod(milliseconds, 3_600_000)
+    minutes, milliseconds = divmod(milliseconds, 60_000)
+    seconds, milliseconds = divmod(milliseconds, 1000)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}.{milliseconds:03d}"
+
+
+def build_webvtt(layout: SpriteLayout, sprite_name: str) -> str:
+    """WebVTT index mapping each thumbnail's span of the video to its tile,
+    as scrubbing players read it (``sprite.jpg#xywh=x,y,w,h``)."""
+    cues = ["WEBVTT", ""]
+    for index in range(layout.count):
+        start, end = layout.cue_span(index)
+        x, y = layout.tile_position(index)
+        cues.append(f"{_vtt_timestamp(start)} --> {_vtt_timestamp(end)}")
+        cues.append(f"{sprite_name}#xywh={x},{y},{layout.thumb_width},{layout.thumb_height}")
+        cues.append("")
+    return "\n".join(cues)
+
+
+class ThumbnailSpriteService:
+    """Uploads a thumbnail sprite sheet and its WebVTT index next to a render
+    in the render store, so the frontend can scrub an edit's result without
+    fetching any video.
+
+    All thumbnails come out of a single decode of the render: ffmpeg's fps
+    filter samples it evenly and the tile filter packs the samples into one
+    image. Renders ``submit`` their sprite to a background pool, so it never
+    delays the render itself; ``urls`` reports it once it is stored.
+    """
+
+    def __init__(
+        self,
+        count: Optional[int] = None,
+        thumb_width: Optional[int] = None,
+        workers: Optional[int] = None
+    ):
+        self.count = count if count is not None else settings.SPRITE_THUMBNAIL_COUNT
+        self.thumb_width = thumb_width or settings.SPRITE_THUMBNAIL_WIDTH
+        workers = workers if workers is not None else settings.SPRITE_WORKERS
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sprites") if workers > 0 else None
+        self._lock = threading.Lock()
+        self._pending: dict[str, Future] = {}
+        # Keys whose sprite and index are known to be in the bucket.
+        self._stored: OrderedDict[str, None] = OrderedDict()
+
+    def urls(self, key: str) -> Optional[dict[str, str]]:
+        """Sprite and WebVTT URLs of render ``key`` if both are stored; None
+        while they are being generated or if there are none."""
+        if self.count <= 0:
+            return None
+        with self._lock:
+            if key in self._pending:
+                return None
+            stored = key in self._stored
+        # The index is uploaded after the sprite, so it marks a complete pair.
+        if not stored and not render_store.has_sidecar(key, VTT_SUFFIX):
+            return None
+        self._remember(key)
+        return self._urls(key)
+
+    @staticmethod
+    def _urls(key: str) -> dict[str, str]:
+        return {
+            "sprite_url": render_store.sidecar_url(key, SPRITE_SUFFIX),
+            "vtt_url": render_store.sidecar_url(key, VTT_SUFFIX)
+        }
+
+    def _remember(self, key: str) -> None:
+        with self._lock:
+            self._stored[key] = None
+            self._stored.move_to_end(key)
+            while len(self._stored) > MAX_REMEMBERED_SPRITES:
+                self._stored.popitem(last=False)
+
+    def submit(self, key: str) -> None:
+        """Generate the sprite of render ``key`` in the background, once per
+        key; synchronously without sprite workers."""
+        if self.count <= 0:
+            return
+        if self._pool is None:
+            self.generate(key)
+            return
+        with self._lock:
+            if key in self._pending or key in self._stored:
+                return
+            # Not in the render's context: its cancel token and progress
+            # reporting must not reach a render that has already returned.
+            self._pending[key] = self._pool.submit(self._generate_in_background, key, current_span())
+
+    def _generate_in_background(self, key: str, parent_span) -> None:
+        try:
+            with tracer.span("thumbnails", parent=parent_span, key=key):
+                self.generate(key)
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+
+    def build_command(self, video_path: str, layout: SpriteLayout, sprite_path: str) -> list[str]:
+        video_filter = ",".join([
+            f"fps={layout.count / layout.duration:.6f}",
+            f"scale={layout.thumb_width}:{layout.thumb_height}",
+            f"tile={layout.columns}x{layout.rows}"
+        ])
+        return [
+            "ffmpeg", "-y",
+            "-i", video_path,
+            "-an", "-sn",
+            "-vf", video_filter,
+            "-frames:v", "1",
+            "-q:v", "4",
+            sprite_path
+        ]
+
+    def generate(self, key: str, video_path: Optional[str] = None) -> Optional[dict[str, str]]:
+        """Sprite and WebVTT URLs of render ``key``, read from ``video_path``
+        or the render store. Thumbnails are a convenience, so failures are
+        logged and None is returned."""
+        if self.count <= 0:
+            return None
+
+        sprite_path = vtt_path = None
+        try:
+            with self._lock:
+                stored = key in self._stored
+            if stored or render_store.has_sidecar(key, VTT_SUFFIX):
+                self._remember(key)
+                return self._urls(key)
+
+            video_path = video_path or render_store.fetch_local(key)
+            if not video_path:
+                logger.warning(f"Render {key} is not available for thumbnails")
+                return None
+
+            probe = media_probe_service.probe(video_path)
+            if not probe.has_video or not probe.duration:
+                return None
+            layout = sprite_layout(
+                probe.duration, probe.width, probe.height, probe.fps, self.count, self.thumb_width
+            )
+
+            sprite_fd, sprite_path = tempfile.mkstemp(suffix=SPRITE_SUFFIX)
+            os.close(sprite_fd)
+            ffmpeg_runner.run(self.build_command(video_path, layout, sprite_path), duration_seconds=probe.duration)
+
+            with tempfile.NamedTemporaryFile("w", suffix=VTT_SUFFIX, delete=False) as vtt_file:
+                vtt_file.write(build_webvtt(layout, f"{key}{SPRITE_SUFFIX}"))
+                vtt_path = vtt_file.name
+
+            urls = {
+                "sprite_url": render_store.put_sidecar(key, SPRITE_SUFFIX, sprite_path, "image/jpeg"),
+                "vtt_url": render_store.put_sidecar(key, VTT_SUFFIX, vtt_path, "text/vtt")
+            }
+            self._remember(key)
+            logger.info(f"Thumbnail sprite of {layout.count} frames stored for render {key}")
+            return urls
+        except RenderCancelled:
+            raise
+        except Exception as e:
+            logger.warning(f"Could not generate thumbnails for render {key}: {e}")
+            return None
+        finally:
+            for path in (sprite_path, vtt_path):
+                if path and os.path.exists(path):
+                    os.unlink(path)
+
+
+thumbnail_sprite_service = ThumbnailSpriteService()
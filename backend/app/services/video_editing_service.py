@@ -1,24 +1,82 @@
-import datetime
 import json
 import logging
 import os
+import shutil
 import subprocess
 import tempfile
+from datetime import datetime, timedelta
 from typing import Optional
 from urllib.parse import unquote
 
 from core.config import settings
+from core.tracing import tracer
+import google.auth.credentials
+import google.auth.transport.requests
 from google.cloud import storage
+from models.edit_models import Edit
+from services.ffmpeg_runner import ffmpeg_runner, redact_command
+from services.filtergraph_compiler import CompiledGraph, filtergraph_compiler
+from services.hls_preview_service import hls_preview_service
+from services.media_probe_service import media_probe_service
+from services.render_profiles import FULL_PROFILE, RenderProfile
+from services.render_store import render_store
+from services.text_layout import text_layout_engine
+from services.thumbnail_sprite_service import thumbnail_sprite_service
 
 logger = logging.getLogger(__name__)
 
+# Codecs whose stream-copied segments can be concatenated with a libx264 re-encode.
+SPLICEABLE_CODECS = {"h264"}
+
+# Shorter than any frame; pieces of a cut this short are empty.
+MIN_PIECE_SECONDS = 0.001
+
+# Fragmented MP4 needs no seek back to write the moov, so it can be piped.
+STREAM_OUTPUT_ARGS = ["-movflags", "frag_keyframe+empty_moov+default_base_moof", "-f", "mp4", "pipe:1"]
+
+# Stored renders put the moov atom first, so players can start them from the
+# first byte range instead of seeking to the end of the file.
+FASTSTART_ARGS = ["-movflags", "+faststart"]
+
+
+def gop_aligned_span(
+    keyframe_times: list[float],
+    start_seconds: float,
+    end_seconds: float
+) -> tuple[float, Optional[float]]:
+    """Smallest keyframe-bounded span covering [start, end]; an end of None
+    means the span runs to the end of the video."""
+    span_start = max((t for t in keyframe_times if t <= start_seconds), default=0.0)
+    span_end = min((t for t in keyframe_times if t >= end_seconds and t > span_start), default=None)
+    return span_start, span_end
+
+
+def keyframe_aligned_cut(
+    keyframe_times: list[float],
+    start_seconds: float,
+    end_seconds: float
+) -> Optional[tuple[float, float]]:
+    """Largest keyframe-bounded span inside [start, end], which can be stream
+    copied; None when no whole GOP fits between the cut points."""
+    copy_start = min((t for t in keyframe_times if t >= start_seconds), default=None)
+    copy_end = max((t for t in keyframe_times if t <= end_seconds), default=None)
+    if copy_start is None or copy_end is None or copy_end <= copy_start:
+        return None
+    return copy_start, copy_end
+
 
 class VideoEditingService:
-    def __init__(self):
+    def __init__(self, segment_scoped: bool = True):
         self.storage_client = storage.Client()
         self.scratch_bucket = settings.GCS_BUCKET_NAME
+        self.render_store = render_store
+        self.media_probe = media_probe_service
+        self.thumbnails = thumbnail_sprite_service
+        self.hls_previews = hls_preview_service
+        self.segment_scoped = segment_scoped
     
-    def _download_video_from_gcs(self, video_url: str) -> str:
+    @staticmethod
+    def _parse_gcs_url(video_url: str) -> tuple[str, str]:
         if video_url.startswith("gs://"):
             bucket_name = video_url.split("/")[2]
             blob_path = unquote("/".join(video_url.split("/")[3:]))
@@ -26,68 +84,325 @@ class VideoEditingService:
             parts = video_url.split("/")
             bucket_name = parts[3]
             blob_path = unquote("/".join(parts[4:]))
+        return bucket_name, blob_path
+    
+    def open_source_video(self, video_url: str) -> str:
+        """What ffmpeg should read ``video_url`` from: a local file, or in
+        streaming mode a signed URL it reads with byte-range requests while it
+        encodes, so nothing is staged in /tmp first."""
+        if settings.STREAM_IO and not self.render_store.local_path_for_url(video_url):
+            try:
+                return self._signed_source_url(video_url)
+            except Exception as e:
+                logger.warning(f"Could not stream {video_url}, downloading it instead: {e}")
+        return self._download_video_from_gcs(video_url)
+    
+    def release_source_video(self, path: str) -> None:
+        """Delete what ``open_source_video`` staged locally, if anything."""
+        self._cleanup_temp_files(path)
+    
+    def _signed_source_url(self, video_url: str) -> str:
+        bucket_name, blob_path = self._parse_gcs_url(video_url)
+        blob = self.storage_client.bucket(bucket_name).blob(blob_path)
+        blob.reload()
         
-        bucket = self.storage_client.bucket(bucket_name)
-        blob = bucket.blob(blob_path)
+        signing_args = {}
+        credentials = self.storage_client._credentials
+        if not isinstance(credentials, google.auth.credentials.Signing):
+            # Metadata-server credentials cannot sign locally; sign through IAM.
+            credentials.refresh(google.auth.transport.requests.Request())
+            signing_args = {"service_account_email": credentials.service_account_email, "access_token": credentials.token}
         
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".mp4") as tmp_file:
-            blob.download_to_filename(tmp_file.name)
-            return tmp_file.name
+        signed_url = blob.generate_signed_url(
+            version="v4",
+            expiration=timedelta(seconds=settings.STREAM_URL_EXPIRY_SECONDS),
+            method="GET",
+            **signing_args
+        )
+        self.media_probe.remember_source(signed_url, f"gs://{bucket_name}/{blob_path}#{blob.generation}")
+        logger.info(f"Streaming {video_url} (generation {blob.generation})")
+        return signed_url
     
-    def _upload_video_to_gcs(self, local_path: str, filename: str) -> str:
-        bucket = self.storage_client.bucket(self.scratch_bucket)
-        blob_path = f"videos/{filename}"
+    def _download_video_from_gcs(self, video_url: str) -> str:
+        cached_path = self.render_store.local_path_for_url(video_url)
+        if cached_path:
+            logger.info(f"Using locally cached render for {video_url}")
+            return cached_path
+        
+        bucket_name, blob_path = self._parse_gcs_url(video_url)
+        bucket = self.storage_client.bucket(bucket_name)
         blob = bucket.blob(blob_path)
         
-        blob.upload_from_filename(local_path)
-        blob.reload()
+        with tempfile.NamedTemporaryFile(delete=False, suffix=".mp4") as tmp_file:
+            with tracer.span("download", url=f"gs://{bucket_name}/{blob_path}"):
+                blob.download_to_filename(tmp_file.name)
         
-        video_url = f"https://storage.googleapis.com/{self.scratch_bucket}/{blob_path}"
-        logger.info(f"Video uploaded to GCS: {video_url}")
-        return video_url
+        # The download reports the object generation, which spares hashing the file to probe it.
+        if blob.generation:
+            self.media_probe.remember_source(tmp_file.name, f"gs://{bucket_name}/{blob_path}#{blob.generation}")
+        return tmp_file.name
+    
+    @staticmethod
+    def _source_exists(path: str) -> bool:
+        return "://" in path or os.path.exists(path)
+    
+    def _cleanup_temp_files(self, *paths: str) -> None:
+        for path in paths:
+            if "://" in path or self.render_store.owns(path):
+                continue
+            try:
+                os.unlink(path)
+            except Exception as cleanup_error:
+                logger.warning(f"Could not delete temp file {path}: {cleanup_error}")
+    
+    def _cached_result(self, cache_key: str, message: str, upload: bool = True) -> Optional[dict[str, str]]:
+        cached_url = self.render_store.lookup(cache_key)
+        if cached_url and upload:
+            cached_url = self.render_store.materialize(cache_key)
+        if not cached_url:
+            return None
+        return {
+            "status": "success",
+            "message": message,
+            "video_url": cached_url
+        }
     
     def _get_video_dimensions(self, video_path: str) -> tuple[int, int]:
-        probe_command = [
-            "ffprobe",
-            "-v", "error",
-            "-select_streams", "v:0",
-            "-show_entries", "stream=width,height",
-            "-of", "csv=p=0",
-            video_path
-        ]
+        probe = self.media_probe.probe(video_path)
+        if not probe.has_video:
+            raise ValueError(f"No video stream in {video_path}")
+        logger.info(f"Video dimensions: {probe.width}x{probe.height}")
+        return probe.width, probe.height
+    
+    def _get_duration(self, video_path: str) -> Optional[float]:
+        # Only used for progress reporting, so a failed probe must not fail the render.
+        try:
+            return self.media_probe.probe(video_path).duration
+        except (OSError, subprocess.CalledProcessError, ValueError) as e:
+            logger.warning(f"Could not probe duration of {video_path}: {e}")
+            return None
+    
+    def _run_ffmpeg(self, command: list[str], duration_seconds: Optional[float] = None) -> None:
+        ffmpeg_runner.run(command, duration_seconds=duration_seconds)
+    
+    def _render_to_store(
+        self,
+        command: list[str],
+        cache_key: str,
+        upload: bool = True,
+        duration_seconds: Optional[float] = None
+    ) -> str:
+        """Run an ffmpeg command ending in a local output path and store the
+        render under ``cache_key``. In streaming mode an uploaded render is
+        piped as fragmented MP4 into a resumable upload as it is encoded;
+        otherwise a pending HLS preview is written alongside the MP4."""
+        if settings.STREAM_IO and upload:
+            with self.render_store.open_upload(cache_key) as upload_stream:
+                ffmpeg_runner.run(
+                    command[:-1] + STREAM_OUTPUT_ARGS, duration_seconds=duration_seconds, output_stream=upload_stream
+                )
+            self.thumbnails.submit(cache_key)
+            return self.render_store.url_for_key(cache_key)
         
-        probe_result = subprocess.run(probe_command, capture_output=True, text=True, check=True)
-        video_width, video_height = map(int, probe_result.stdout.strip().split(','))
-        logger.info(f"Video dimensions: {video_width}x{video_height}")
-        return video_width, video_height
+        output_path = command[-1]
+        preview = self.hls_previews.claim()
+        if preview:
+            command = preview.tee_command(command)
+        elif "-movflags" not in command:
+            command = command[:-1] + FASTSTART_ARGS + [output_path]
+        self._run_ffmpeg(command, duration_seconds)
+        return self._store_render(cache_key, output_path, upload)
     
-    def _wrap_text(self, text: str, max_width: int, fontsize: int) -> list[str]:
-        avg_char_width = fontsize * 0.55
-        max_chars_per_line = int(max_width / avg_char_width)
+    def _store_render(self, cache_key: str, output_path: str, upload: bool = True) -> str:
+        """Put a finished render in the render store; uploaded renders also
+        get a thumbnail sprite for scrubbing, generated in the background."""
+        video_url = self.render_store.put(cache_key, output_path, upload=upload)
+        if upload:
+            self.thumbnails.submit(cache_key)
+        return video_url
+    
+    def _render_segment_scoped(
+        self,
+        input_video_path: str,
+        graph: CompiledGraph,
+        start_seconds: float,
+        end_seconds: float,
+        output_video_path: str,
+        include_audio: bool = True
+    ) -> bool:
+        """Apply a graph's time-bounded video nodes by re-encoding only the GOP-aligned
+        span around [start, end] and stream-copying the GOPs before and after it.
+        
+        Returns False without writing anything when the span covers the whole
+        video or the source codec cannot be spliced, so the caller should fall
+        back to a full encode. A splice does not claim the HLS preview.
+        """
+        probe = self.media_probe.probe(input_video_path)
+        if probe.video_codec not in SPLICEABLE_CODECS:
+            return False
+        
+        span_start, span_end = gop_aligned_span(probe.keyframe_times, start_seconds, end_seconds)
+        if span_start == 0 and span_end is None:
+            return False
         
-        words = text.split()
-        lines = []
-        current_line = []
+        logger.info(
+            f"Re-encoding {span_start:g}s-{span_end if span_end is not None else 'end'} "
+            f"for an overlay at {start_seconds:g}s-{end_seconds:g}s, stream-copying the rest"
+        )
         
-        for word in words:
-            test_line = current_line + [word]
-            test_text = ' '.join(test_line)
+        work_dir = tempfile.mkdtemp()
+        try:
+            # MPEG-TS parts carry SPS/PPS in-band, so the re-encoded span can be
+            # concatenated with the copied GOPs despite differing encoder settings.
+            # The split lands on the first keyframe at or after each time.
+            split_times = [t - 0.0005 for t in (span_start, span_end) if t]
+            self._run_ffmpeg([
+                "ffmpeg", "-y",
+                "-i", input_video_path,
+                "-map", "0:v:0",
+                "-c", "copy",
+                "-f", "segment",
+                "-segment_format", "mpegts",
+                "-segment_times", ",".join(f"{t:.6f}" for t in split_times),
+                "-reset_timestamps", "1",
+                os.path.join(work_dir, "part%03d.ts")
+            ])
+            
+            parts = sorted(
+                os.path.join(work_dir, name) for name in os.listdir(work_dir) if name.startswith("part")
+            )
+            span_index = 1 if span_start > 0 else 0
+            if span_index >= len(parts):
+                return False
+            
+            # Shift timestamps back to source time so the filter's enable
+            # expressions line up, then rebase the encoded span to zero.
+            encoded_span_path = os.path.join(work_dir, "span.ts")
+            encode_command = ["ffmpeg", "-y", "-i", parts[span_index]]
+            for image_path in graph.image_inputs:
+                encode_command += ["-i", image_path]
+            encode_command += [
+                "-filter_complex",
+                f"[0:v]setpts=PTS+{span_start}/TB[vsrc];"
+                f"{graph.video_graph('[vsrc]', '[vspan]')};"
+                f"[vspan]setpts=PTS-STARTPTS[vout]",
+                "-map", "[vout]",
+                "-c:v", "libx264",
+                "-an"
+            ]
+            if probe.pix_fmt:
+                encode_command += ["-pix_fmt", probe.pix_fmt]
+            encode_command.append(encoded_span_path)
+            encoded_until = span_end or probe.duration
+            self._run_ffmpeg(encode_command, encoded_until - span_start if encoded_until else None)
+            parts[span_index] = encoded_span_path
+            
+            concat_list_path = os.path.join(work_dir, "parts.txt")
+            with open(concat_list_path, "w") as concat_list:
+                concat_list.writelines(f"file '{part}'\n" for part in parts)
             
-            if len(test_text) <= max_chars_per_line:
-                current_line.append(word)
+            concat_command = ["ffmpeg", "-y", "-f", "concat", "-safe", "0", "-i", concat_list_path]
+            if include_audio:
+                concat_command += ["-i", input_video_path, "-map", "0:v", "-map", "1:a?"]
             else:
-                if current_line:
-                    lines.append(' '.join(current_line))
-                    current_line = [word]
-                else:
-                    lines.append(word)
-                    current_line = []
+                concat_command += ["-map", "0:v"]
+            concat_command += ["-c", "copy"] + FASTSTART_ARGS + [output_video_path]
+            self._run_ffmpeg(concat_command)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+        
+        return True
+    
+    def _trim_stream_copy(
+        self,
+        input_video_path: str,
+        start_seconds: float,
+        end_seconds: float,
+        output_video_path: str
+    ) -> bool:
+        """Trim to [start, end] by re-encoding only the partial GOPs at the two
+        cut points and stream-copying every whole GOP between them.
+        
+        Returns False without writing anything when the source codec cannot be
+        spliced or no whole GOP lies inside the range, so the caller should
+        fall back to a full encode. A splice does not claim the HLS preview.
+        """
+        probe = self.media_probe.probe(input_video_path)
+        if probe.video_codec not in SPLICEABLE_CODECS:
+            return False
+        
+        cut = keyframe_aligned_cut(probe.keyframe_times, start_seconds, end_seconds)
+        if cut is None:
+            return False
+        copy_start, copy_end = cut
         
-        if current_line:
-            lines.append(' '.join(current_line))
+        logger.info(
+            f"Trimming to {start_seconds:g}s-{end_seconds:g}s: stream-copying {copy_start:g}s-{copy_end:g}s, "
+            f"re-encoding the partial GOPs at the cut points"
+        )
         
-        logger.info(f"Wrapped text into {len(lines)} lines, max width: {max_width}px")
-        return lines
+        work_dir = tempfile.mkdtemp()
+        try:
+            # Each piece is an MPEG-TS part (SPS/PPS in-band, as in the
+            # segment-scoped render) so the concat demuxer can splice them.
+            parts = []
+            pieces = [
+                (start_seconds, copy_start, False),
+                (copy_start, copy_end, True),
+                (copy_end, end_seconds, False),
+            ]
+            for index, (piece_start, piece_end, copy) in enumerate(pieces):
+                if piece_end - piece_start < MIN_PIECE_SECONDS:
+                    continue
+                # Seeking a hair past a keyframe still lands on it, and never on
+                # the one before when pts_time was rounded down.
+                seek_to = piece_start + MIN_PIECE_SECONDS if copy else piece_start
+                part_path = os.path.join(work_dir, f"part{index}.ts")
+                piece_command = [
+                    "ffmpeg", "-y",
+                    "-ss", f"{seek_to:.6f}",
+                    "-i", input_video_path,
+                    "-t", f"{piece_end - seek_to:.6f}",
+                    "-map", "0:v:0"
+                ]
+                if copy:
+                    piece_command += ["-c", "copy"]
+                else:
+                    piece_command += ["-c:v", "libx264"]
+                    if probe.pix_fmt:
+                        piece_command += ["-pix_fmt", probe.pix_fmt]
+                piece_command += ["-an", "-f", "mpegts", part_path]
+                self._run_ffmpeg(piece_command, piece_end - piece_start)
+                parts.append(part_path)
+            
+            concat_list_path = os.path.join(work_dir, "parts.txt")
+            with open(concat_list_path, "w") as concat_list:
+                concat_list.writelines(f"file '{part}'\n" for part in parts)
+            
+            # Audio is cut sample-accurately and re-encoded, which is cheap.
+            self._run_ffmpeg([
+                "ffmpeg", "-y",
+                "-f", "concat", "-safe", "0", "-i", concat_list_path,
+                "-ss", f"{start_seconds:.6f}",
+                "-t", f"{end_seconds - start_seconds:.6f}",
+                "-i", input_video_path,
+                "-map", "0:v",
+                "-map", "1:a?",
+                "-c:v", "copy",
+                "-c:a", "aac",
+                "-b:a", "128k",
+                *FASTSTART_ARGS,
+                output_video_path
+            ], end_seconds - start_seconds)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+        
+        return True
+    
+    def _wrap_text(self, text: str, max_width: int, fontsize: int) -> list[str]:
+        layout = text_layout_engine.layout(text, fontsize, max_width)
+        logger.info(f"Wrapped text into {len(layout.lines)} lines, max width: {max_width}px ({layout.width}px used)")
+        return list(layout.lines)
     
     def _get_brand_color(self, video_id: str) -> str:
         config_path = os.path.join(os.path.dirname(__file__), "../config/config.json")
@@ -102,21 +417,52 @@ class VideoEditingService:
         
         return primary_brand_color
     
+    def _get_text_bg_color(self, video_id: Optional[str]) -> str:
+        if video_id:
+            brand_color = self._get_brand_color(video_id)
+        else:
+            brand_color = "#1e1e1e"
+        brand_color_hex = brand_color.lstrip("#")
+        alpha_hex = format(int(0.8 * 255), '02X')
+        return f"0x{brand_color_hex}{alpha_hex}"
+    
     def add_text_overlay(
         self,
         video_url: str,
         text: str,
-        start_time: int,
-        duration: int,
+        start_time: float,
+        duration: float,
         fontsize: int = 70,
         color: str = "white",
         position: str = "center",
-        video_id: Optional[str] = None
+        video_id: Optional[str] = None,
+        cache_key: Optional[str] = None,
+        upload: bool = True
     ) -> dict[str, str]:
         try:
-            input_video_path = self._download_video_from_gcs(video_url)
+            text_bg_color = self._get_text_bg_color(video_id)
+            if cache_key is None:
+                cache_key = self.render_store.make_key(
+                    self.render_store.media_key(video_url),
+                    "text_overlay",
+                    {
+                        "text": text,
+                        "start_ms": round(start_time * 1000),
+                        "end_ms": round((start_time + duration) * 1000),
+                        "fontsize": fontsize,
+                        "color": color,
+                        "position": position,
+                        "box_color": text_bg_color
+                    }
+                )
+            
+            cached = self._cached_result(cache_key, "Text successfully added to video! The edited video is ready.", upload)
+            if cached:
+                return cached
+            
+            input_video_path = self.open_source_video(video_url)
             
-            if not os.path.exists(input_video_path):
+            if not self._source_exists(input_video_path):
                 logger.error(f"Input video file not found: {input_video_path}")
                 return {
                     "status": "error",
@@ -124,57 +470,41 @@ class VideoEditingService:
                 }
             
             video_width, video_height = self._get_video_dimensions(input_video_path)
-            max_text_width = int(video_width * 0.8)
             
-            lines = self._wrap_text(text, max_text_width, fontsize)
-            
-            with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.txt') as text_file:
-                text_file.write('\n'.join(lines))
-                text_file_path = text_file.name
-            
-            logger.info(f"Created text file: {text_file_path}")
-            
-            if video_id:
-                brand_color = self._get_brand_color(video_id)
-            else:
-                brand_color = "#1e1e1e"
-            brand_color_hex = brand_color.lstrip("#")
-            alpha_hex = format(int(0.8 * 255), '02X')
-            text_bg_color = f"0x{brand_color_hex}{alpha_hex}"
-            
-            x = "(w-text_w)/2"
-            y_position = {
-                "top": "30",
-                "center": "(h-text_h)/2",
-                "bottom": "h-text_h-30"
-            }.get(position, "(h-text_h)/2")
+            # The super is rasterized once (and cached) and composited with overlay.
+            text_edit = Edit(
+                id="text_overlay",
+                type="text_overlay",
+                params={
+                    "text": text,
+                    "start_ms": start_time * 1000,
+                    "end_ms": (start_time + duration) * 1000,
+                    "fontsize": fontsize,
+                    "color": color,
+                    "position": position
+                },
+                timestamp=datetime.now().isoformat(),
+                status="applied"
+            )
+            graph = filtergraph_compiler.compile([text_edit], video_width, text_bg_color, self._wrap_text)
             
             output_video_path = tempfile.mktemp(suffix=".mp4")
             
-            ffmpeg_command = [
-                "ffmpeg",
-                "-y",
-                "-i", input_video_path,
-                "-vf",
-                f"drawtext=fontfile=/System/Library/Fonts/Supplemental/Arial.ttf:textfile={text_file_path}:fontcolor={color}:fontsize={fontsize}:x={x}:y={y_position}:box=1:boxcolor={text_bg_color}:boxborderw=20:line_spacing=10:enable='between(t,{start_time},{start_time + duration})'",
-                "-c:a", "copy",
-                output_video_path,
-            ]
-            
-            logger.info(f"FFmpeg command: {' '.join(ffmpeg_command)}")
-            subprocess.run(ffmpeg_command, check=True, capture_output=True)
+            if self.segment_scoped and self._render_segment_scoped(
+                input_video_path, graph, start_time, start_time + duration, output_video_path
+            ):
+                video_gcs_url = self._store_render(cache_key, output_video_path, upload)
+            else:
+                ffmpeg_command = graph.build_command(input_video_path, output_video_path)
+                
+                logger.info(f"FFmpeg command: {' '.join(redact_command(ffmpeg_command))}")
+                video_gcs_url = self._render_to_store(
+                    ffmpeg_command, cache_key, upload, self._get_duration(input_video_path)
+                )
             
             logger.info("Text successfully overlaid on video")
             
-            file_name = f"video_{datetime.datetime.now().timestamp()}.mp4"
-            video_gcs_url = self._upload_video_to_gcs(output_video_path, file_name)
-            
-            try:
-                os.unlink(text_file_path)
-                os.unlink(input_video_path)
-                os.unlink(output_video_path)
-            except Exception as cleanup_error:
-                logger.warning(f"Could not delete temp files: {cleanup_error}")
+            self._cleanup_temp_files(input_video_path)
             
             return {
                 "status": "success",
@@ -205,13 +535,13 @@ class VideoEditingService:
         self,
         video_url: str,
         audio_path: str,
-        start_offset: int = 0,
+        start_offset: float = 0,
         volume_overlay: float = 1.0,
-        volume_original: float = 0.3
+        volume_original: float = 0.3,
+        cache_key: Optional[str] = None,
+        upload: bool = True
     ) -> dict[str, str]:
         try:
-            input_video_path = self._download_video_from_gcs(video_url)
-            
             if not os.path.exists(audio_path):
                 logger.error(f"Audio file not found: {audio_path}")
                 return {
@@ -219,7 +549,26 @@ class VideoEditingService:
                     "message": f"Audio file not found at {audio_path}"
                 }
             
+            if cache_key is None:
+                cache_key = self.render_store.make_key(
+                    self.render_store.media_key(video_url),
+                    "audio_overlay",
+                    {
+                        "audio": self.render_store.media_key(audio_path),
+                        "start_ms": round(start_offset * 1000),
+                        "volume_overlay": volume_overlay,
+                        "volume_original": volume_original
+                    }
+                )
+            
+            cached = self._cached_result(cache_key, "The audio was successfully added to the video!", upload)
+            if cached:
+                return cached
+            
+            input_video_path = self.open_source_video(video_url)
+            
             output_video_path = tempfile.mktemp(suffix=".mp4")
+            delay_ms = int(start_offset * 1000)
             
             command = [
                 "ffmpeg",
@@ -227,7 +576,7 @@ class VideoEditingService:
                 "-i", audio_path,
                 "-filter_complex",
                 f"[0:a]volume={volume_original}[a0];"
-                f"[1:a]adelay={start_offset * 1000}|{start_offset * 1000},"
+                f"[1:a]adelay={delay_ms}|{delay_ms},"
                 f"volume={volume_overlay}[a1];"
                 f"[a0][a1]amix=inputs=2:duration=longest[aout]",
                 "-map", "0:v",
@@ -239,17 +588,10 @@ class VideoEditingService:
                 output_video_path,
             ]
             
-            subprocess.run(command, check=True, capture_output=True)
+            video_gcs_url = self._render_to_store(command, cache_key, upload, self._get_duration(input_video_path))
             logger.info("Successfully added audio to video")
             
-            file_name = f"video_{datetime.datetime.now().timestamp()}.mp4"
-            video_gcs_url = self._upload_video_to_gcs(output_video_path, file_name)
-            
-            try:
-                os.unlink(input_video_path)
-                os.unlink(output_video_path)
-            except Exception as cleanup_error:
-                logger.warning(f"Could not delete temp files: {cleanup_error}")
+            self._cleanup_temp_files(input_video_path)
             
             return {
                 "status": "success",
@@ -276,5 +618,246 @@ class VideoEditingService:
                 "message": f"Error: {str(e)}"
             }
 
+    def trim_video(
+        self,
+        video_url: str,
+        start_time: float,
+        end_time: Optional[float] = None,
+        cache_key: Optional[str] = None,
+        upload: bool = True
+    ) -> dict[str, str]:
+        input_video_path = None
+        try:
+            if cache_key is None:
+                cache_key = self.render_store.make_key(
+                    self.render_store.media_key(video_url),
+                    "trim",
+                    {
+                        "start_ms": round(start_time * 1000),
+                        "end_ms": round(end_time * 1000) if end_time is not None else None
+                    }
+                )
+            
+            cached = self._cached_result(cache_key, "The video was successfully trimmed!", upload)
+            if cached:
+                return cached
+            
+            input_video_path = self.open_source_video(video_url)
+            
+            duration = self._get_duration(input_video_path)
+            if end_time is None or (duration and end_time > duration):
+                end_time = duration
+            if end_time is None or end_time - start_time < MIN_PIECE_SECONDS:
+                return {
+                    "status": "error",
+                    "message": f"Nothing to keep between {start_time:g}s and {end_time}s"
+                }
+            
+            output_video_path = tempfile.mktemp(suffix=".mp4")
+            
+            if self.segment_scoped and self._trim_stream_copy(input_video_path, start_time, end_time, output_video_path):
+                video_gcs_url = self._store_render(cache_key, output_video_path, upload)
+            else:
+                ffmpeg_command = [
+                    "ffmpeg", "-y",
+                    "-ss", f"{start_time:.6f}",
+                    "-i", input_video_path,
+                    "-t", f"{end_time - start_time:.6f}",
+                    "-map", "0:v:0",
+                    "-map", "0:a?",
+                    "-c:v", "libx264",
+                    "-c:a", "aac",
+                    "-b:a", "128k",
+                    output_video_path
+                ]
+                logger.info(f"FFmpeg command: {' '.join(redact_command(ffmpeg_command))}")
+                video_gcs_url = self._render_to_store(ffmpeg_command, cache_key, upload, end_time - start_time)
+            
+            logger.info(f"Trimmed video to {start_time:g}s-{end_time:g}s")
+            
+            return {
+                "status": "success",
+                "message": "The video was successfully trimmed!",
+                "video_url": video_gcs_url
+            }
+            
+        except subprocess.CalledProcessError as e:
+            logger.error(f"Error trimming video: {e}")
+            return {
+                "status": "error",
+                "message": f"There was an error trimming the video: {e}"
+            }
+        except FileNotFoundError:
+            logger.error("FFmpeg command not found. Please ensure FFmpeg is installed.")
+            return {
+                "status": "error",
+                "message": "FFmpeg not found. Please ensure FFmpeg is installed."
+            }
+        except Exception as e:
+            logger.error(f"Error in trim_video: {e}")
+            return {
+                "status": "error",
+                "message": f"Error: {str(e)}"
+            }
+        finally:
+            if input_video_path:
+                self._cleanup_temp_files(input_video_path)
+
+    def render_edit_graph(
+        self,
+        video_url: str,
+        edits: list[Edit],
+        video_id: Optional[str] = None,
+        cache_key: Optional[str] = None,
+        upload: bool = True,
+        layer: Optional[str] = None,
+        profile: RenderProfile = FULL_PROFILE
+    ) -> dict[str, str]:
+        try:
+            if cache_key is None:
+                cache_key = self.render_store.make_key(
+                    self.render_store.media_key(video_url),
+                    "edit_graph",
+                    {
+                        "video_id": video_id,
+                        "layer": layer,
+                        "profile": profile.name,
+                        "edits": [{"type": e.type, "params": e.params} for e in edits]
+                    }
+                )
+            
+            cached = self._cached_result(cache_key, "All edits were rendered in a single pass.", upload)
+            if cached:
+                return cached
+            
+            input_video_path = self.open_source_video(video_url)
+            
+            if not self._source_exists(input_video_path):
+                logger.error(f"Input video file not found: {input_video_path}")
+                return {
+                    "status": "error",
+                    "message": f"Input video file not found at {input_video_path}"
+                }
+            
+            # Audio layer inputs carry no video stream to probe.
+            video_width, video_height = self._get_video_dimensions(input_video_path) if layer != "audio" else (0, 0)
+            graph = filtergraph_compiler.compile(
+                edits,
+                video_width=video_width,
+                box_color=self._get_text_bg_color(video_id),
+                wrap_text=self._wrap_text,
+                layer=layer,
+                profile=profile,
+                video_height=video_height
+            )
+            
+            output_video_path = tempfile.mktemp(suffix=".mp4")
+            
+            # A video layer made only of time-bounded overlays can be spliced.
+            if layer == "video" and graph.video_span and self.segment_scoped and self._render_segment_scoped(
+                input_video_path, graph, *graph.video_span, output_video_path, include_audio=False
+            ):
+                video_gcs_url = self._store_render(cache_key, output_video_path, upload)
+            else:
+                ffmpeg_command = graph.build_command(input_video_path, output_video_path)
+                
+                logger.info(f"FFmpeg command: {' '.join(redact_command(ffmpeg_command))}")
+                video_gcs_url = self._render_to_store(
+                    ffmpeg_command, cache_key, upload, self._get_duration(input_video_path)
+                )
+            
+            logger.info(f"Rendered {len(edits)} edits in a single pass (layer={layer or 'all'}, profile={profile.name})")
+            
+            self._cleanup_temp_files(input_video_path)
+            
+            return {
+                "status": "success",
+                "message": "All edits were rendered in a single pass.",
+                "video_url": video_gcs_url
+            }
+            
+        except subprocess.CalledProcessError as e:
+            logger.error(f"Error during FFmpeg execution: {e}")
+            return {
+                "status": "error",
+                "message": f"Error rendering edits: {str(e)}"
+            }
+        except FileNotFoundError:
+            logger.error("FFmpeg not found. Please ensure FFmpeg is installed.")
+            return {
+                "status": "error",
+                "message": "Error: FFmpeg not found. Please ensure FFmpeg is installed."
+            }
+        except Exception as e:
+            logger.error(f"Error in render_edit_graph: {e}")
+            return {
+                "status": "error",
+                "message": f"Error: {str(e)}"
+            }
+
+    
+    def mux_layers(
+        self,
+        video_layer_url: str,
+        audio_layer_url: str,
+        cache_key: str,
+        upload: bool = True
+    ) -> dict[str, str]:
+        """Combine a video layer and an audio layer with stream copy only."""
+        input_paths = []
+        try:
+            cached = self._cached_result(cache_key, "All edits were rendered.", upload)
+            if cached:
+                return cached
+            
+            video_path = self.open_source_video(video_layer_url)
+            input_paths.append(video_path)
+            if audio_layer_url == video_layer_url:
+                audio_path = video_path
+            else:
+                audio_path = self.open_source_video(audio_layer_url)
+                input_paths.append(audio_path)
+            
+            output_video_path = tempfile.mktemp(suffix=".mp4")
+            ffmpeg_command = [
+                "ffmpeg", "-y",
+                "-i", video_path,
+                "-i", audio_path,
+                "-map", "0:v",
+                "-map", "1:a?",
+                "-c", "copy",
+                output_video_path
+            ]
+            
+            logger.info(f"FFmpeg command: {' '.join(redact_command(ffmpeg_command))}")
+            video_gcs_url = self._render_to_store(ffmpeg_command, cache_key, upload, self._get_duration(video_path))
+            
+            return {
+                "status": "success",
+                "message": "All edits were rendered.",
+                "video_url": video_gcs_url
+            }
+            
+        except subprocess.CalledProcessError as e:
+            logger.error(f"Error during FFmpeg execution: {e}")
+            return {
+                "status": "error",
+                "message": f"Error muxing layers: {str(e)}"
+            }
+        except FileNotFoundError:
+            logger.error("FFmpeg not found. Please ensure FFmpeg is installed.")
+            return {
+                "status": "error",
+                "message": "Error: FFmpeg not found. Please ensure FFmpeg is installed."
+            }
+        except Exception as e:
+            logger.error(f"Error in mux_layers: {e}")
+            return {
+                "status": "error",
+                "message": f"Error: {str(e)}"
+            }
+        finally:
+            self._cleanup_temp_files(*input_paths)
+
 
 video_editing_service = VideoEditingService()
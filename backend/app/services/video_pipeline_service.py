@@ -1,3 +1,4 @@
+import contextlib
 import logging
 import sys
 import os
@@ -5,7 +6,14 @@ from typing import Optional
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
+from core.tracing import current_span, tracer
 from models.edit_models import Edit, EditQueue
+from services.ffmpeg_runner import RenderCancelled, ffmpeg_runner
+from services.hls_preview_service import hls_preview_service
+from services.render_profiles import FULL_PROFILE, RenderProfile
+from services.render_store import render_store
+from services.thumbnail_sprite_service import thumbnail_sprite_service
+from services.waveform_service import waveform_service
 from services.video_editing_service import video_editing_service
 from services.text_to_speech_service import text_to_speech_service
 
@@ -13,70 +21,340 @@ logger = logging.getLogger(__name__)
 
 
 class VideoPipelineService:
+    def __init__(self, single_pass: bool = True):
+        self.single_pass = single_pass
     
-    def apply_edit_queue(self, edit_queue: EditQueue) -> str:
+    @tracer.traced("render.edit_queue")
+    def apply_edit_queue(
+        self,
+        edit_queue: EditQueue,
+        single_pass: Optional[bool] = None,
+        profile: RenderProfile = FULL_PROFILE
+    ) -> str:
+        if single_pass is None:
+            single_pass = self.single_pass
+        
         applied_edits = edit_queue.get_applied_edits()
+        current_span().set(session_id=edit_queue.session_id, profile=profile.name, edits=len(applied_edits))
+        prefix_hashes = edit_queue.compute_prefix_hashes(profile.name)
         
-        has_overwritten_edits = any(e.status == "overwritten" for e in edit_queue.edits)
-        needs_rebuild = any(e.result_video_url is None for e in applied_edits)
+        if not applied_edits:
+            logger.info("No applied edits, returning original video")
+            edit_queue.current_video_url = edit_queue.original_video_url
+            return edit_queue.current_video_url
         
-        if has_overwritten_edits or needs_rebuild:
-            logger.info(f"Full rebuild required (overwritten={has_overwritten_edits}, needs_rebuild={needs_rebuild})")
-            
-            for edit in edit_queue.edits:
-                edit.result_video_url = None
-            
-            current_video_url = edit_queue.original_video_url
-            
-            logger.info(f"Rebuilding video from original with {len(applied_edits)} applied edits")
-            for edit in applied_edits:
+        if single_pass and not profile.rescales and any(edit.type == "trim" for edit in applied_edits):
+            # The filtergraph would re-encode the whole trimmed video; edit by
+            # edit, a trim only re-encodes the GOPs at its cut points. A
+            # downscaling profile re-encodes every frame either way, so its
+            # renders stay on the layered path.
+            logger.info("Queue has trims, rendering edit by edit")
+            single_pass = False
+        
+        # The key the job's state and later lookups at this profile use.
+        final_hash = prefix_hashes[-1]
+        cached_video_url = self._lookup_prefix(edit_queue, final_hash)
+        
+        if cached_video_url:
+            logger.info(f"No changes needed, full edit prefix is cached")
+            current_video_url = cached_video_url
+        else:
+            current_video_url = None
+            if single_pass:
                 try:
-                    current_video_url = self.apply_single_edit(current_video_url, edit, edit_queue.video_id)
-                    edit.result_video_url = current_video_url
-                    logger.info(f"Applied edit {edit.id} ({edit.type})")
+                    current_video_url = self._render_layers(edit_queue, final_hash, profile)
                 except Exception as e:
-                    logger.error(f"Error applying edit {edit.id}: {e}")
-                    raise
+                    # A superseded render must stop, not retry edit by edit.
+                    if ffmpeg_runner.is_cancelled():
+                        raise RenderCancelled(f"Render of session {edit_queue.session_id} was superseded") from e
+                    logger.warning(f"Layered render failed, falling back to per-edit rendering: {e}")
             
-            edit_queue.current_video_url = current_video_url
+            if current_video_url is None:
+                # Per-edit rendering always works at full quality.
+                if profile.rescales:
+                    logger.warning(
+                        f"Rendering session {edit_queue.session_id} edit by edit at full quality; "
+                        f"the {profile.name} profile does not apply to per-edit renders"
+                    )
+                prefix_hashes = edit_queue.compute_prefix_hashes()
+                cached_depth, cached_video_url = self._find_cached_prefix(edit_queue, prefix_hashes)
+                start_video_url = cached_video_url or edit_queue.original_video_url
+                remaining_edits = applied_edits[cached_depth:]
+                
+                logger.info(
+                    f"Rebuilding {len(remaining_edits)} of {len(applied_edits)} applied edits "
+                    f"(reusing cached prefix of {cached_depth})"
+                )
+                current_video_url = self._apply_edits_per_edit(
+                    start_video_url, remaining_edits, edit_queue.video_id
+                )
+        
+        # The URL leaves the process (job status, versions, the agent's media),
+        # so wait for a background upload rather than hand out a missing object.
+        current_video_url = render_store.materialize_url(current_video_url)
+        edit_queue.cache_render(prefix_hashes[-1], current_video_url)
+        if final_hash != prefix_hashes[-1]:
+            # A full-quality fallback also answers later renders at the
+            # requested profile, so they don't fall back again.
+            edit_queue.cache_render(final_hash, current_video_url)
+        for edit in applied_edits:
+            edit.result_video_url = edit_queue.render_cache.get(edit.prefix_hash)
+        
+        edit_queue.current_video_url = current_video_url
+        return current_video_url
+    
+    def render_full_quality(self, edit_queue: EditQueue) -> str:
+        """Full-resolution render of the queue, used for exports and version
+        snapshots; the chat loop works on proxies."""
+        return self.apply_edit_queue(edit_queue, profile=FULL_PROFILE)
+    
+    def _find_cached_prefix(self, edit_queue: EditQueue, prefix_hashes: list[str]) -> tuple[int, Optional[str]]:
+        """Deepest applied-edit prefix that is already rendered, either recorded on
+        the queue or present in the render store (possibly as a local-only
+        intermediate), together with its URL."""
+        recorded_depth = 0
+        for depth in range(len(prefix_hashes), 0, -1):
+            if prefix_hashes[depth - 1] in edit_queue.render_cache:
+                recorded_depth = depth
+                break
+        
+        stored_depth, stored_video_url = render_store.lookup_deepest(prefix_hashes[recorded_depth:])
+        if stored_video_url:
+            return recorded_depth + stored_depth, stored_video_url
+        if recorded_depth:
+            return recorded_depth, edit_queue.render_cache[prefix_hashes[recorded_depth - 1]]
+        return 0, None
+    
+    def _lookup_prefix(self, edit_queue: EditQueue, prefix_hash: str) -> Optional[str]:
+        if prefix_hash in edit_queue.render_cache:
+            return edit_queue.render_cache[prefix_hash]
+        return render_store.lookup(prefix_hash)
+    
+    def _render_layers(self, edit_queue: EditQueue, final_hash: str, profile: RenderProfile = FULL_PROFILE) -> str:
+        """Render the video layer (overlays, trims, filters) and the audio layer
+        (original audio plus voiceovers) as separate cached artifacts and mux
+        them with stream copy, so an audio-only change costs an AAC encode and
+        a remux."""
+        # The audio layer is cheap and goes first, so an HLS preview of the
+        # video layer encode can carry the final audio.
+        audio_layer_url = self._render_layer(edit_queue, "audio", profile)
+        audio_source = None
+        if audio_layer_url != edit_queue.original_video_url:
+            audio_source = render_store.local_path_for_url(audio_layer_url)
+        with hls_preview_service.previewing(final_hash, audio_source):
+            video_layer_url = self._render_layer(edit_queue, "video", profile)
+        
+        if video_layer_url == audio_layer_url == edit_queue.original_video_url:
+            return edit_queue.original_video_url
+        
+        result = video_editing_service.mux_layers(video_layer_url, audio_layer_url, cache_key=final_hash)
+        if result["status"] != "success":
+            raise Exception(f"Failed to mux layers: {result.get('message')}")
+        
+        return result["video_url"]
+    
+    def _render_layer(self, edit_queue: EditQueue, layer: str, profile: RenderProfile = FULL_PROFILE) -> str:
+        layer_edits = edit_queue.get_layer_edits(layer)
+        rescaled = layer == "video" and profile.rescales
+        if not layer_edits and not rescaled:
+            return edit_queue.original_video_url
+        
+        layer_hashes = edit_queue.compute_layer_hashes(layer, profile.name)
+        
+        if rescaled:
+            # Overlay geometry is authored in source pixels, so a downscaled
+            # layer is always drawn from the source in one pass rather than
+            # stacked on a downscaled intermediate.
+            layer_url = render_store.lookup(layer_hashes[-1])
+            if layer_url:
+                logger.info(f"{layer} layer is cached ({profile.name})")
+                return layer_url
+            return self.apply_edits_single_pass(
+                edit_queue.original_video_url,
+                layer_edits,
+                edit_queue.video_id,
+                cache_key=layer_hashes[-1],
+                upload=False,
+                layer=layer,
+                profile=profile
+            )
+        
+        # The bare video layer is the source itself and is never stored; the
+        # bare audio layer is the source's audio track, extracted once.
+        cached_depth, layer_url = render_store.lookup_deepest(layer_hashes[1:])
+        if layer_url is None and layer == "audio":
+            layer_url = render_store.lookup(layer_hashes[0])
+        
+        if cached_depth == len(layer_edits):
+            logger.info(f"{layer} layer is cached")
+            return layer_url
+        
+        if layer_url is None:
+            if layer == "audio":
+                layer_url = self.apply_edits_single_pass(
+                    edit_queue.original_video_url, [], cache_key=layer_hashes[0], upload=False, layer="audio"
+                )
+            else:
+                layer_url = edit_queue.original_video_url
+        
+        logger.info(
+            f"Rebuilding {len(layer_edits) - cached_depth} of {len(layer_edits)} {layer} layer edits "
+            f"(reusing cached prefix of {cached_depth})"
+        )
+        return self.apply_edits_single_pass(
+            layer_url,
+            layer_edits[cached_depth:],
+            edit_queue.video_id,
+            cache_key=layer_hashes[-1],
+            upload=False,
+            layer=layer
+        )
+    
+    def get_edit_result_url(
+        self,
+        edit_queue: EditQueue,
+        edit_id: str,
+        profile: RenderProfile = FULL_PROFILE
+    ) -> Optional[str]:
+        """Public URL of the video as of an applied edit.
+
+        Intermediates are only recipes (the edit's prefix hash and the params
+        of the edits before it) until something asks for one: the first ask
+        uploads it from the local render tier or, if it was never rendered or
+        has been evicted, renders the prefix of the queue it names.
+        """
+        edit_queue.compute_prefix_hashes(profile.name)
+        edit = edit_queue.get_edit(edit_id)
+        if not edit or edit.status != "applied":
+            return None
+        
+        if edit.prefix_hash in edit_queue.render_cache:
+            return edit_queue.render_cache[edit.prefix_hash]
+        
+        video_url = render_store.materialize(edit.prefix_hash)
+        if video_url:
+            thumbnail_sprite_service.submit(edit.prefix_hash)
         else:
-            logger.info(f"No changes needed, returning current video")
-            current_video_url = edit_queue.current_video_url
+            logger.info(f"Rendering result of edit {edit_id} on demand ({profile.name})")
+            prefix_queue = edit_queue.prefix_queue(edit_id)
+            video_url = self.apply_edit_queue(prefix_queue, profile=profile)
+            edit_queue.merge_derived_params(prefix_queue)
+        
+        edit_queue.cache_render(edit.prefix_hash, video_url)
+        edit.result_video_url = video_url
+        return video_url
+    
+    @tracer.traced("render.single_pass")
+    def apply_edits_single_pass(
+        self,
+        video_url: str,
+        edits: list[Edit],
+        video_id: Optional[str] = None,
+        cache_key: Optional[str] = None,
+        upload: bool = True,
+        layer: Optional[str] = None,
+        profile: RenderProfile = FULL_PROFILE
+    ) -> str:
+        current_span().set(layer=layer, edits=len(edits))
+        logger.info(f"Rendering {len(edits)} applied edits in a single pass")
+        for edit in edits:
+            if edit.type == "voiceover":
+                self._ensure_voiceover_audio(edit)
+        
+        result = video_editing_service.render_edit_graph(
+            video_url=video_url,
+            edits=edits,
+            video_id=video_id,
+            cache_key=cache_key,
+            upload=upload,
+            layer=layer,
+            profile=profile
+        )
+        
+        if result["status"] != "success":
+            raise Exception(f"Failed to render edit queue: {result.get('message')}")
+        
+        return result["video_url"]
+    
+    def _apply_edits_per_edit(self, video_url: str, edits: list[Edit], video_id: Optional[str] = None) -> str:
+        # Intermediates stay in the local render tier and are passed between
+        # stages on disk; only the final output is uploaded.
+        current_video_url = video_url
+        
+        for index, edit in enumerate(edits):
+            is_last = index == len(edits) - 1
+            try:
+                # Only the last edit's encode shows the final video, so only it is previewed.
+                with hls_preview_service.previewing(edit.prefix_hash) if is_last else contextlib.nullcontext():
+                    current_video_url = self.apply_single_edit(
+                        current_video_url,
+                        edit,
+                        video_id,
+                        cache_key=edit.prefix_hash,
+                        upload=is_last
+                    )
+                logger.info(f"Applied edit {edit.id} ({edit.type})")
+            except Exception as e:
+                logger.error(f"Error applying edit {edit.id}: {e}")
+                raise
         
         return current_video_url
     
-    def apply_single_edit(self, video_url: str, edit: Edit, video_id: Optional[str] = None) -> str:
+    @tracer.traced("edit.apply")
+    def apply_single_edit(
+        self,
+        video_url: str,
+        edit: Edit,
+        video_id: Optional[str] = None,
+        cache_key: Optional[str] = None,
+        upload: bool = True
+    ) -> str:
+        current_span().set(edit_id=edit.id, edit_type=edit.type)
         if edit.type == "voiceover":
-            return self._apply_voiceover(video_url, edit)
+            return self._apply_voiceover(video_url, edit, cache_key, upload)
         elif edit.type == "text_overlay":
-            return self._apply_text_overlay(video_url, edit, video_id)
+            return self._apply_text_overlay(video_url, edit, video_id, cache_key, upload)
         elif edit.type == "trim":
-            return self._apply_trim(video_url, edit)
+            return self._apply_trim(video_url, edit, cache_key, upload)
         elif edit.type == "filter":
-            return self._apply_filter(video_url, edit)
+            return self._apply_filter(video_url, edit, video_id, cache_key, upload)
         else:
             raise ValueError(f"Unknown edit type: {edit.type}")
     
-    def _apply_voiceover(self, video_url: str, edit: Edit) -> str:
-        text = edit.params.get("text", "")
-        start_ms = edit.params.get("start_ms", 0)
+    def _ensure_voiceover_audio(self, edit: Edit) -> str:
         audio_path = edit.params.get("audio_path")
         
-        if not audio_path:
+        if not audio_path or not os.path.exists(audio_path):
             logger.info(f"Generating speech for voiceover edit {edit.id}")
-            tts_result = text_to_speech_service.generate_speech(text)
+            with tracer.span("voiceover.speech", edit_id=edit.id, edit_type=edit.type):
+                tts_result = text_to_speech_service.generate_speech(edit.params.get("text", ""))
             if tts_result["status"] != "success":
                 raise Exception(f"Failed to generate speech: {tts_result.get('message')}")
             audio_path = tts_result["local_path"]
             edit.params["audio_path"] = audio_path
+            # Decode the clip's waveform now so it can be placed without a re-render.
+            waveform_service.precompute(audio_path)
+        
+        return audio_path
+    
+    def _apply_voiceover(
+        self,
+        video_url: str,
+        edit: Edit,
+        cache_key: Optional[str] = None,
+        upload: bool = True
+    ) -> str:
+        start_ms = edit.params.get("start_ms", 0)
+        audio_path = self._ensure_voiceover_audio(edit)
         
-        start_seconds = start_ms / 1000.0
         result = video_editing_service.add_audio_overlay(
             video_url=video_url,
             audio_path=audio_path,
-            start_offset=int(start_seconds),
+            start_offset=start_ms / 1000.0,
             volume_overlay=1.0,
-            volume_original=0.3
+            volume_original=0.3,
+            cache_key=cache_key,
+            upload=upload
         )
         
         if result["status"] != "success":
@@ -84,7 +362,14 @@ class VideoPipelineService:
         
         return result["video_url"]
     
-    def _apply_text_overlay(self, video_url: str, edit: Edit, video_id: Optional[str] = None) -> str:
+    def _apply_text_overlay(
+        self,
+        video_url: str,
+        edit: Edit,
+        video_id: Optional[str] = None,
+        cache_key: Optional[str] = None,
+        upload: bool = True
+    ) -> str:
         text = edit.params.get("text", "")
         start_ms = edit.params.get("start_ms", 0)
         end_ms = edit.params.get("end_ms", 3000)
@@ -98,12 +383,14 @@ class VideoPipelineService:
         result = video_editing_service.add_text_overlay(
             video_url=video_url,
             text=text,
-            start_time=int(start_seconds),
-            duration=int(duration_seconds),
+            start_time=start_seconds,
+            duration=duration_seconds,
             fontsize=fontsize,
             color=color,
             position=position,
-            video_id=video_id
+            video_id=video_id,
+            cache_key=cache_key,
+            upload=upload
         )
         
         if result["status"] != "success":
@@ -111,13 +398,50 @@ class VideoPipelineService:
         
         return result["video_url"]
     
-    def _apply_trim(self, video_url: str, edit: Edit) -> str:
-        logger.warning("Trim edit not yet implemented")
-        return video_url
+    def _apply_trim(
+        self,
+        video_url: str,
+        edit: Edit,
+        cache_key: Optional[str] = None,
+        upload: bool = True
+    ) -> str:
+        start_ms = edit.params.get("start_ms", 0)
+        end_ms = edit.params.get("end_ms")
+        
+        result = video_editing_service.trim_video(
+            video_url=video_url,
+            start_time=start_ms / 1000.0,
+            end_time=end_ms / 1000.0 if end_ms is not None else None,
+            cache_key=cache_key,
+            upload=upload
+        )
+        
+        if result["status"] != "success":
+            raise Exception(f"Failed to trim video: {result.get('message')}")
+        
+        return result["video_url"]
     
-    def _apply_filter(self, video_url: str, edit: Edit) -> str:
-        logger.warning("Filter edit not yet implemented")
-        return video_url
+    def _apply_filter(
+        self,
+        video_url: str,
+        edit: Edit,
+        video_id: Optional[str] = None,
+        cache_key: Optional[str] = None,
+        upload: bool = True
+    ) -> str:
+        # A lone filter edit is a one-node graph: a single lut3d pass.
+        result = video_editing_service.render_edit_graph(
+            video_url=video_url,
+            edits=[edit],
+            video_id=video_id,
+            cache_key=cache_key,
+            upload=upload
+        )
+        
+        if result["status"] != "success":
+            raise Exception(f"Failed to apply filter: {result.get('message')}")
+        
+        return result["video_url"]
 
 
 video_pipeline_service = VideoPipelineService()
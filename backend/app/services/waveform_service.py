@@ -0,0 +1,185 @@
+import hashlib
+import logging
+import os
+import struct
+import tempfile
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from core.config import settings
+from core.metrics import record_cache_lookup
+from services.ffmpeg_runner import RenderCancelled, ffmpeg_runner
+from services.media_probe_service import media_probe_service
+from services.video_editing_service import video_editing_service
+
+logger = logging.getLogger(__name__)
+
+# Mono at 8 kHz is plenty to draw; the finest level is one peak per 8 ms.
+WAVEFORM_SAMPLE_RATE = 8000
+PEAK_LEVELS = (64, 256, 1024, 4096)
+
+PEAKS_MAGIC = b"PEAK"
+PEAKS_VERSION = 1
+HEADER = struct.Struct("<4sHHI")
+LEVEL_HEADER = struct.Struct("<II")
+
+
+@dataclass
+class WaveformPeaks:
+    """Min/max peaks of an audio track at several resolutions.
+
+    Each level maps a number of samples per peak to an (n, 2) int8 array of
+    (min, max) pairs, with full scale at +-127.
+    """
+    sample_rate: int
+    levels: dict[int, np.ndarray]
+
+    def to_bytes(self, samples_per_peak: Optional[int] = None) -> bytes:
+        """Binary form: a header, one (samples_per_peak, count) entry per
+        level, then each level's interleaved min/max bytes. With
+        ``samples_per_peak`` only that level is included."""
+        levels = self.levels if samples_per_peak is None else {samples_per_peak: self.levels[samples_per_peak]}
+        parts = [HEADER.pack(PEAKS_MAGIC, PEAKS_VERSION, len(levels), self.sample_rate)]
+        parts.extend(LEVEL_HEADER.pack(size, len(peaks)) for size, peaks in levels.items())
+        parts.extend(peaks.tobytes() for peaks in levels.values())
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "WaveformPeaks":
+        magic, version, level_count, sample_rate = HEADER.unpack_from(data)
+        if magic != PEAKS_MAGIC or version != PEAKS_VERSION:
+            raise ValueError("Not a waveform peaks file")
+        offset = HEADER.size
+        level_sizes = []
+        for _ in range(level_count):
+            level_sizes.append(LEVEL_HEADER.unpack_from(data, offset))
+            offset += LEVEL_HEADER.size
+        levels = {}
+        for samples_per_peak, count in level_sizes:
+            levels[samples_per_peak] = np.frombuffer(data, dtype=np.int8, count=2 * count, offset=offset).reshape(-1, 2)
+            offset += 2 * count
+        return cls(sample_rate=sample_rate, levels=levels)
+
+
+def reduce_peaks(peaks: np.ndarray, factor: int) -> np.ndarray:
+    """Coarser level of (min, max) peaks, ``factor`` peaks per new peak."""
+    count = -(-len(peaks) // factor)
+    padded = np.concatenate([peaks, np.repeat(peaks[-1:], count * factor - len(peaks), axis=0)])
+    grouped = padded.reshape(count, factor, 2)
+    return np.stack([grouped[:, :, 0].min(axis=1), grouped[:, :, 1].max(axis=1)], axis=1)
+
+
+class PeakAccumulator:
+    """Writable sink for ffmpeg's raw ``f32le`` output that keeps only the
+    finest level of peaks, so the decoded track is never held in memory."""
+
+    def __init__(self, samples_per_peak: int = PEAK_LEVELS[0]):
+        self.samples_per_peak = samples_per_peak
+        self._pending = b""
+        self._blocks: list[np.ndarray] = []
+
+    def write(self, data: bytes) -> int:
+        buffered = self._pending + data
+        usable = len(buffered) - len(buffered) % (4 * self.samples_per_peak)
+        if usable:
+            samples = np.frombuffer(buffered, dtype="<f4", count=usable // 4).reshape(-1, self.samples_per_peak)
+            self._blocks.append(np.stack([samples.min(axis=1), samples.max(axis=1)], axis=1))
+        self._pending = buffered[usable:]
+        return len(data)
+
+    def finish(self) -> np.ndarray:
+        tail = self._pending[:len(self._pending) - len(self._pending) % 4]
+        if tail:
+            samples = np.frombuffer(tail, dtype="<f4")
+            self._blocks.append(np.array([[samples.min(), samples.max()]]))
+        self._pending = b""
+        if not self._blocks:
+            return np.zeros((0, 2), dtype=np.float32)
+        return np.concatenate(self._blocks)
+
+
+class WaveformService:
+    """Decodes each source's audio track and each voiceover clip once into
+    multi-resolution waveform peaks, cached on disk by media hash, so
+    voiceovers can be placed against a drawn waveform instead of by
+    re-rendering."""
+
+    def __init__(self, cache_dir: Optional[str] = None):
+        self.cache_dir = Path(__file__).parent.parent / (cache_dir or settings.WAVEFORM_CACHE_DIR)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._key_locks: dict[str, threading.Lock] = {}
+
+    def cache_path(self, media_key: str) -> Path:
+        return self.cache_dir / f"{hashlib.sha256(media_key.encode()).hexdigest()}.peaks"
+
+    def _key_lock(self, media_key: str) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(media_key, threading.Lock())
+
+    def peaks(self, media: str) -> WaveformPeaks:
+        """Peaks of a local audio or video file, or of a source or render URL."""
+        media_key = media_probe_service.media_key(media)
+        cache_path = self.cache_path(media_key)
+        # Concurrent requests for the same media decode it once.
+        with self._key_lock(media_key):
+            cached = cache_path.exists()
+            record_cache_lookup("waveform", hit=cached)
+            if cached:
+                return WaveformPeaks.from_bytes(cache_path.read_bytes())
+
+            if "://" in media:
+                local_media = video_editing_service.open_source_video(media)
+                try:
+                    peaks = self.compute(local_media)
+                finally:
+                    video_editing_service.release_source_video(local_media)
+            else:
+                peaks = self.compute(media)
+
+            with tempfile.NamedTemporaryFile(dir=self.cache_dir, suffix=".part", delete=False) as part_file:
+                part_file.write(peaks.to_bytes())
+            os.replace(part_file.name, cache_path)
+            logger.info(f"Cached waveform of {media_key.split('?', 1)[0]} at {cache_path}")
+            return peaks
+
+    def compute(self, media_path: str) -> WaveformPeaks:
+        probe = media_probe_service.probe(media_path)
+        if not probe.has_audio:
+            silent = np.zeros((0, 2), dtype=np.int8)
+            return WaveformPeaks(sample_rate=WAVEFORM_SAMPLE_RATE, levels={size: silent for size in PEAK_LEVELS})
+
+        accumulator = PeakAccumulator()
+        command = [
+            "ffmpeg",
+            "-i", media_path,
+            "-vn", "-sn",
+            "-ac", "1",
+            "-ar", str(WAVEFORM_SAMPLE_RATE),
+            "-f", "f32le",
+            "pipe:1"
+        ]
+        ffmpeg_runner.run(command, duration_seconds=probe.duration, output_stream=accumulator)
+
+        finest = np.clip(np.rint(accumulator.finish() * 127), -127, 127).astype(np.int8)
+        levels = {PEAK_LEVELS[0]: finest}
+        for coarser, finer in zip(PEAK_LEVELS[1:], PEAK_LEVELS):
+            peaks = levels[finer]
+            levels[coarser] = reduce_peaks(peaks, coarser // finer) if len(peaks) else peaks
+        return WaveformPeaks(sample_rate=WAVEFORM_SAMPLE_RATE, levels=levels)
+
+    def precompute(self, media: str) -> None:
+        """Warm the cache for media a user is about to place; never raises."""
+        try:
+            self.peaks(media)
+        except RenderCancelled:
+            raise
+        except Exception as e:
+            logger.warning(f"Could not compute waveform of {media.split('?', 1)[0]}: {e}")
+
+
+waveform_service = WaveformService()
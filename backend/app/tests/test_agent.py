@@ -42,6 +42,13 @@ def mock_session_service():
     return mock_service
 
 
+def agent_events(*events):
+    async def run_async(**kwargs):
+        for event in events:
+            yield event
+    return run_async
+
+
 @pytest.fixture
 def mock_agent_runner(mock_session_service):
     with patch("multi_tool_agent.agent.AGENT_RUNNER") as mock_runner:
@@ -171,12 +178,12 @@ class TestCallAgent:
         mock_event.content = MagicMock()
         mock_event.content.parts = [MagicMock(text="Test response")]
 
-        mock_agent_runner.run.return_value = [mock_event]
+        mock_agent_runner.run_async.side_effect = agent_events(mock_event)
 
         result = call_agent("Test query")
 
         assert result == "Test response"
-        mock_agent_runner.run.assert_called_once()
+        mock_agent_runner.run_async.assert_called_once()
 
     @patch("multi_tool_agent.agent.get_session_data")
     def test_call_agent_with_video_url(
@@ -196,7 +203,7 @@ class TestCallAgent:
         mock_event.content = MagicMock()
         mock_event.content.parts = [MagicMock(text="Test response")]
 
-        mock_agent_runner.run.return_value = [mock_event]
+        mock_agent_runner.run_async.side_effect = agent_events(mock_event)
 
         result = call_agent("Test query")
 
@@ -223,7 +230,7 @@ class TestCallAgent:
         mock_event.content = MagicMock()
         mock_event.content.parts = [MagicMock(text="Test response")]
 
-        mock_agent_runner.run.return_value = [mock_event]
+        mock_agent_runner.run_async.side_effect = agent_events(mock_event)
 
         result = call_agent("Test query")
 
@@ -254,7 +261,7 @@ class TestCallAgent:
         mock_event.content = MagicMock()
         mock_event.content.parts = [MagicMock(text="Test response")]
 
-        mock_agent_runner.run.return_value = [mock_event]
+        mock_agent_runner.run_async.side_effect = agent_events(mock_event)
 
         result = call_agent("Test query", feature_id="feature_1")
 
@@ -279,7 +286,7 @@ class TestCallAgent:
         mock_event.content = MagicMock()
         mock_event.content.parts = [MagicMock(text="Test response")]
 
-        mock_agent_runner.run.return_value = [mock_event]
+        mock_agent_runner.run_async.side_effect = agent_events(mock_event)
 
         result = call_agent("Test query")
 
@@ -287,6 +294,29 @@ class TestCallAgent:
         assert "video_url" in result_obj["media"]
         assert "audio_urls" not in result_obj["media"]
 
+    @patch("multi_tool_agent.agent.get_session_data")
+    def test_call_agent_runs_turn_in_callers_context(
+        self, mock_get_session, mock_agent_runner, mock_session_service
+    ):
+        from core.tracing import current_span, tracer
+        from multi_tool_agent.agent import call_agent
+
+        mock_get_session.return_value = {}
+        seen_spans = []
+
+        async def run_async(**kwargs):
+            seen_spans.append(current_span())
+            assert kwargs["run_config"] is not None
+            return
+            yield
+
+        mock_agent_runner.run_async.side_effect = run_async
+
+        with tracer.span("agent.turn") as turn:
+            call_agent("Test query")
+
+        assert seen_spans == [turn]
+
 
 @pytest.mark.asyncio
 class TestInitAgent:
@@ -0,0 +1,94 @@
+import pytest
+from google.api_core.exceptions import NotFound
+from benchmarks.compare import compare_results, format_report
+from benchmarks.media import source_command
+from benchmarks.runner import BenchmarkCase, _median_result
+from benchmarks.scenarios import SCENARIOS
+from benchmarks.stand_ins import FilesystemStorageClient
+from models.edit_models import EditQueue
+
+
+def make_suite(**cases):
+    return {"cases": [{"case": case, **metrics} for case, metrics in cases.items()]}
+
+
+class TestBenchmarks:
+    @pytest.mark.parametrize("scenario", sorted(SCENARIOS))
+    def test_scenarios_build_valid_queues(self, scenario):
+        edits = SCENARIOS[scenario](5, 60)
+        queue = EditQueue(
+            session_id="bench",
+            original_video_url="gs://benchmark-sources/source.mp4",
+            edits=edits,
+            current_video_url="gs://benchmark-sources/source.mp4"
+        )
+        
+        assert len(edits) == 5
+        assert len(set(queue.compute_prefix_hashes())) == 5
+        for edit in edits:
+            assert edit.params.get("end_ms", 60000) <= 60000
+    
+    def test_source_command_uses_lavfi_test_sources(self):
+        command = source_command("4k", 300, "/tmp/out.mp4")
+        
+        assert "testsrc2=size=3840x2160:rate=30:duration=300" in command
+        assert "sine=frequency=440:sample_rate=48000:duration=300" in command
+        assert command[-1] == "/tmp/out.mp4"
+    
+    def test_storage_stand_in_counts_transfers(self, tmp_path):
+        client = FilesystemStorageClient(str(tmp_path / "storage"))
+        local_file = tmp_path / "render.mp4"
+        local_file.write_bytes(b"x" * 100)
+        blob = client.bucket("scratch").blob("renders/abc.mp4")
+        
+        assert not blob.exists()
+        blob.upload_from_filename(str(local_file))
+        client.bucket("scratch").blob("renders/abc.mp4").download_to_filename(str(tmp_path / "copy.mp4"))
+        
+        assert (tmp_path / "copy.mp4").read_bytes() == b"x" * 100
+        assert client.transfers.bytes_uploaded == 100
+        assert client.transfers.bytes_downloaded == 100
+        with pytest.raises(NotFound):
+            client.bucket("scratch").blob("missing.mp4").reload()
+    
+    def test_compare_flags_regressions_past_threshold(self):
+        baseline = make_suite(a={"wall_seconds": 10.0, "bytes_transferred": 1000})
+        current = make_suite(a={"wall_seconds": 12.0, "bytes_transferred": 1000})
+        
+        changes, unmatched = compare_results(baseline, current)
+        
+        regressions = [change.metric for change in changes if change.regression]
+        assert regressions == ["wall_seconds"]
+        assert unmatched == []
+        assert "REGRESSION" in format_report(changes, unmatched)
+    
+    def test_compare_ignores_timer_noise_and_improvements(self):
+        baseline = make_suite(a={"wall_seconds": 0.1, "cpu_seconds": 10.0})
+        current = make_suite(a={"wall_seconds": 0.14, "cpu_seconds": 5.0})
+        
+        changes, _ = compare_results(baseline, current)
+        
+        assert not any(change.regression for change in changes)
+    
+    def test_compare_reports_unmatched_cases(self):
+        baseline = make_suite(a={"wall_seconds": 1.0}, b={"wall_seconds": 1.0})
+        current = make_suite(a={"error": "boom"}, c={"wall_seconds": 1.0})
+        
+        changes, unmatched = compare_results(baseline, current)
+        
+        assert changes == []
+        assert unmatched == ["a", "b", "c"]
+    
+    def test_median_of_repeats(self):
+        case = BenchmarkCase("mixed", 4, "720p", 15)
+        metrics = {"peak_rss_bytes": 1, "peak_ffmpeg_rss_bytes": 1, "bytes_uploaded": 1, "bytes_downloaded": 1, "bytes_transferred": 2}
+        runs = [
+            {"case": case.id, "wall_seconds": wall, "cpu_seconds": wall, **metrics}
+            for wall in (3.0, 1.0, 2.0)
+        ] + [{"case": case.id, "error": "boom"}]
+        
+        result = _median_result(runs)
+        
+        assert case.id == "mixed-4x-720p-15s-full"
+        assert result["wall_seconds"] == 2.0
+        assert result["repeats"] == 3
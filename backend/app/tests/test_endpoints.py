@@ -2,6 +2,8 @@ import pytest
 from fastapi.testclient import TestClient
 from unittest.mock import patch, Mock
 from main import app
+from core.config import settings
+from core.metrics import CONTENT_TYPE
 
 
 client = TestClient(app)
@@ -48,6 +50,45 @@ class TestEndpoints:
         assert response.status_code == 500
         assert "ERROR" in response.text
     
+    @patch('api.endpoints.ai_editor_agent_routes.agent.call_agent')
+    def test_call_ai_editor_agent_returns_trace(self, mock_call_agent):
+        mock_call_agent.return_value = '{"text": "Response", "media": null}'
+        
+        response = client.post("/api/call_ai_editor_agent", json={
+            "query": "Add text overlay",
+            "feature_id": "feature-123",
+            "user_id": "user1",
+            "session_id": "trace-sess"
+        })
+        
+        trace_id = response.headers["x-trace-id"]
+        trace = client.get(f"/api/traces/{trace_id}").json()
+        assert trace["spans"][0]["name"] == "agent.turn"
+        assert trace["spans"][0]["attributes"]["session_id"] == "trace-sess"
+        
+        traces = client.get("/api/traces", params={"session_id": "trace-sess"}).json()["traces"]
+        assert traces[0]["trace_id"] == trace_id
+    
+    @patch('api.endpoints.ai_editor_agent_routes.render_queue_service.depth')
+    @patch('api.endpoints.ai_editor_agent_routes.render_job_service.depth')
+    def test_get_metrics(self, mock_job_depth, mock_queue_depth):
+        mock_job_depth.return_value = {"queued": 2, "rendering": 1}
+        mock_queue_depth.return_value = {"queued": 5, "rendering": 3}
+        client.get("/api/test")
+        
+        response = client.get("/api/metrics")
+        
+        assert response.status_code == 200
+        assert response.headers["content-type"] == CONTENT_TYPE
+        lines = response.text.splitlines()
+        assert 'editor_render_queue_depth{queue="api",status="queued"} 2.0' in lines
+        assert 'editor_render_queue_depth{queue="workers",status="rendering"} 3.0' in lines
+        assert any(line.startswith('editor_http_request_duration_seconds_count{method="GET",route="/test",status="200"}') for line in lines)
+        assert "# TYPE editor_ffmpeg_processes gauge" in lines
+    
+    def test_get_trace_not_found(self):
+        assert client.get("/api/traces/unknown").status_code == 404
+    
     @patch('api.endpoints.ai_editor_agent_routes.cleanup_all')
     @patch('api.endpoints.ai_editor_agent_routes.agent')
     def test_cleanup_session_success(self, mock_agent, mock_cleanup):
@@ -149,3 +190,169 @@ class TestEndpoints:
         data = response.json()
         assert "public_url" in data
         assert "Video exported" in data["message"]
+    
+    @patch('api.endpoints.ai_editor_agent_routes.render_store.fetch_local_url')
+    @patch('api.endpoints.ai_editor_agent_routes.video_pipeline_service.render_full_quality')
+    @patch('api.endpoints.ai_editor_agent_routes.database_session_service')
+    @patch('api.endpoints.ai_editor_agent_routes.get_video_export_service')
+    def test_export_video_renders_session_at_full_quality(self, mock_get_export, mock_db, mock_render, mock_fetch):
+        mock_db.get_session.return_value = {"pk": 7}
+        mock_db.get_state.return_value = {
+            "session_id": "sess1",
+            "original_video_url": "gs://bucket/original.mp4",
+            "current_video_url": "gs://bucket/proxy.mp4",
+            "edits": [{"id": "1", "type": "text_overlay", "params": {"text": "Hi"}, "timestamp": "t", "status": "applied"}]
+        }
+        mock_render.return_value = "https://storage.googleapis.com/scratch/renders/full.mp4"
+        mock_fetch.return_value = "/cache/full.mp4"
+        mock_export_service = Mock()
+        mock_export_service.export_video.return_value = "https://storage.googleapis.com/exported.mp4"
+        mock_get_export.return_value = mock_export_service
+        
+        response = client.post(
+            "/api/export?video_path=gs://bucket/proxy.mp4&user_id=user1&feature_id=feat1&video_id=vid1&session_id=sess1"
+        )
+        
+        assert response.status_code == 200
+        mock_render.assert_called_once()
+        assert mock_export_service.export_video.call_args.kwargs["video_path"] == "/cache/full.mp4"
+        mock_db.set_state.assert_called_once()
+    
+    @patch('api.endpoints.ai_editor_agent_routes.render_job_service.get')
+    def test_get_render_job(self, mock_get):
+        job = Mock()
+        job.to_dict.return_value = {"id": "job1", "status": "rendering", "video_url": None}
+        mock_get.return_value = job
+        
+        response = client.get("/api/render-jobs/job1")
+        
+        assert response.status_code == 200
+        assert response.json()["status"] == "rendering"
+    
+    @patch('api.endpoints.ai_editor_agent_routes.thumbnail_sprite_service.urls')
+    @patch('api.endpoints.ai_editor_agent_routes.render_job_service.get')
+    def test_get_render_job_reports_thumbnails(self, mock_get, mock_urls):
+        key = "a" * 64
+        job = Mock(status="succeeded", video_url=f"https://storage.googleapis.com/{settings.GCS_BUCKET_NAME}/renders/{key}.mp4")
+        job.to_dict.return_value = {"id": "job1", "status": "succeeded", "video_url": job.video_url}
+        mock_get.return_value = job
+        mock_urls.return_value = {"sprite_url": "https://b/sprite.jpg", "vtt_url": "https://b/index.vtt"}
+        
+        response = client.get("/api/render-jobs/job1")
+        
+        assert response.json()["vtt_url"] == "https://b/index.vtt"
+        mock_urls.assert_called_once_with(key)
+    
+    @patch('api.endpoints.ai_editor_agent_routes.render_queue_service.get')
+    @patch('api.endpoints.ai_editor_agent_routes.render_job_service.get')
+    def test_get_render_job_from_worker_queue(self, mock_get, mock_queue_get):
+        mock_get.return_value = None
+        job = Mock()
+        job.to_dict.return_value = {"id": "job2", "status": "queued", "worker_id": None}
+        mock_queue_get.return_value = job
+        
+        response = client.get("/api/render-jobs/job2")
+        
+        assert response.status_code == 200
+        assert response.json()["id"] == "job2"
+        mock_queue_get.assert_called_once_with("job2")
+    
+    @patch('api.endpoints.ai_editor_agent_routes.render_queue_service.get')
+    @patch('api.endpoints.ai_editor_agent_routes.render_job_service.get')
+    def test_get_render_job_not_found(self, mock_get, mock_queue_get):
+        mock_get.return_value = None
+        mock_queue_get.return_value = None
+        
+        response = client.get("/api/render-jobs/missing")
+        
+        assert response.status_code == 404
+    
+    @patch('api.endpoints.ai_editor_agent_routes.render_store.stats')
+    def test_get_render_store_stats(self, mock_stats):
+        mock_stats.return_value = {"hits": 3, "misses": 1, "evictions": 0, "hit_ratio": 0.75}
+        
+        response = client.get("/api/render-store/stats")
+        
+        assert response.status_code == 200
+        assert response.json()["hit_ratio"] == 0.75
+    
+    @patch('api.endpoints.ai_editor_agent_routes.video_pipeline_service.get_edit_result_url')
+    @patch('api.endpoints.ai_editor_agent_routes.database_session_service')
+    def test_get_edit_result_renders_proxy_on_demand(self, mock_db, mock_result):
+        mock_db.get_state.return_value = {
+            "session_id": "sess1",
+            "original_video_url": "gs://bucket/original.mp4",
+            "current_video_url": "gs://bucket/proxy.mp4",
+            "edits": [{"id": "1", "type": "text_overlay", "params": {"text": "Hi"}, "timestamp": "t", "status": "applied"}]
+        }
+        mock_result.return_value = "https://storage.googleapis.com/scratch/renders/first.mp4"
+        
+        response = client.get("/api/sessions/edit-result?session_pk=7&edit_id=1")
+        
+        assert response.status_code == 200
+        assert response.json()["video_url"] == "https://storage.googleapis.com/scratch/renders/first.mp4"
+        assert mock_result.call_args[0][2].name == "proxy"
+        saved_queue = mock_db.set_state.call_args[0][2]
+        assert "https://storage.googleapis.com/scratch/renders/first.mp4" in saved_queue["render_cache"].values()
+    
+    @patch('api.endpoints.ai_editor_agent_routes.database_session_service')
+    def test_get_edit_result_rejects_unknown_profile(self, mock_db):
+        response = client.get("/api/sessions/edit-result?session_pk=7&edit_id=1&profile=huge")
+        
+        assert response.status_code == 400
+        mock_db.get_state.assert_not_called()
+    
+    @patch('api.endpoints.ai_editor_agent_routes.waveform_service.peaks')
+    @patch('api.endpoints.ai_editor_agent_routes.os.path.exists', return_value=True)
+    @patch('api.endpoints.ai_editor_agent_routes.database_session_service')
+    def test_get_waveform_of_voiceover_clip(self, mock_db, mock_exists, mock_peaks):
+        mock_db.get_state.return_value = {
+            "session_id": "sess1",
+            "original_video_url": "gs://bucket/original.mp4",
+            "current_video_url": "gs://bucket/original.mp4",
+            "edits": [{"id": "1", "type": "voiceover", "params": {"text": "Hi", "audio_path": "/tmp/hi.mp3"}, "timestamp": "t", "status": "applied"}]
+        }
+        mock_peaks.return_value.to_bytes.return_value = b"PEAK..."
+        
+        response = client.get("/api/waveform?session_pk=7&edit_id=1&samples_per_peak=256")
+        
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/octet-stream"
+        assert response.content == b"PEAK..."
+        mock_peaks.assert_called_once_with("/tmp/hi.mp3")
+        mock_peaks.return_value.to_bytes.assert_called_once_with(256)
+    
+    @patch('api.endpoints.ai_editor_agent_routes.waveform_service.peaks')
+    def test_get_waveform_validates_request(self, mock_peaks):
+        assert client.get("/api/waveform").status_code == 400
+        assert client.get("/api/waveform?media_url=gs://bucket/a.mp4&samples_per_peak=100").status_code == 400
+        mock_peaks.assert_not_called()
+    
+    @patch('api.endpoints.ai_editor_agent_routes.render_store.fetch_local')
+    def test_get_render_media_supports_ranges(self, mock_fetch, tmp_path):
+        key = "a" * 64
+        render_path = tmp_path / f"{key}.mp4"
+        render_path.write_bytes(b"0123456789")
+        mock_fetch.return_value = str(render_path)
+        
+        response = client.get(f"/api/media/renders/{key}.mp4", headers={"Range": "bytes=2-5"})
+        
+        assert response.status_code == 206
+        assert response.content == b"2345"
+        assert response.headers["content-range"] == "bytes 2-5/10"
+        assert response.headers["etag"] == f'"{key}"'
+        mock_fetch.assert_called_once_with(key)
+    
+    @patch('api.endpoints.ai_editor_agent_routes.render_store.fetch_local')
+    def test_get_render_media_not_modified(self, mock_fetch):
+        key = "a" * 64
+        
+        response = client.get(f"/api/media/renders/{key}.mp4", headers={"If-None-Match": f'W/"x", "{key}"'})
+        
+        assert response.status_code == 304
+        mock_fetch.assert_not_called()
+    
+    @patch('api.endpoints.ai_editor_agent_routes.render_store.fetch_local', return_value=None)
+    def test_get_render_media_not_found(self, mock_fetch):
+        assert client.get(f"/api/media/renders/{'a' * 64}.mp4").status_code == 404
+        assert client.get("/api/media/renders/not-a-key.mp4").status_code == 400
@@ -0,0 +1,146 @@
+import io
+import subprocess
+import pytest
+from unittest.mock import Mock, patch
+from services.ffmpeg_runner import (
+    CancelToken, FfmpegProgress, FfmpegRunner, RenderCancelled, redact_command, update_progress
+)
+
+
+PROGRESS_OUTPUT = """frame=120
+fps=60.00
+out_time_us=4000000
+out_time=00:00:04.000000
+speed=2.00x
+progress=continue
+frame=300
+fps=60.00
+out_time=00:00:10.000000
+speed=2.00x
+progress=end
+"""
+
+
+def fake_process(stdout=PROGRESS_OUTPUT, returncode=0):
+    process = Mock()
+    process.stdout = io.StringIO(stdout)
+    process.wait.return_value = returncode
+    return process
+
+
+class TestFfmpegRunner:
+    @pytest.fixture
+    def runner(self):
+        return FfmpegRunner()
+    
+    def test_update_progress_parses_block(self):
+        progress = FfmpegProgress(duration_seconds=20.0)
+        
+        for line in PROGRESS_OUTPUT.splitlines()[:6]:
+            key, _, value = line.partition("=")
+            closed = update_progress(progress, key, value)
+        
+        assert closed
+        assert progress.out_time_seconds == 4.0
+        assert progress.fps == 60.0
+        assert progress.speed == 2.0
+        assert progress.percent == 20.0
+        assert progress.eta_seconds == 8.0
+    
+    def test_progress_without_duration_has_no_percent(self):
+        progress = FfmpegProgress(out_time_seconds=4.0, speed=2.0)
+        
+        assert progress.percent is None
+        assert progress.eta_seconds is None
+    
+    def test_unparseable_values_are_ignored(self):
+        progress = FfmpegProgress(duration_seconds=20.0)
+        
+        update_progress(progress, "out_time", "N/A")
+        update_progress(progress, "speed", "N/A")
+        
+        assert progress.out_time_seconds == 0.0
+        assert progress.speed is None
+        assert progress.eta_seconds is None
+    
+    @patch('services.ffmpeg_runner.subprocess.Popen')
+    def test_run_reports_each_progress_block(self, mock_popen, runner):
+        mock_popen.return_value = fake_process()
+        snapshots = []
+        
+        result = runner.run(
+            ["ffmpeg", "-y", "-i", "in.mp4", "out.mp4"],
+            duration_seconds=20.0,
+            on_progress=lambda progress: snapshots.append((progress.percent, progress.eta_seconds))
+        )
+        
+        command = mock_popen.call_args.args[0]
+        assert command[:4] == ["ffmpeg", "-progress", "pipe:1", "-nostats"]
+        assert command[4:] == ["-y", "-i", "in.mp4", "out.mp4"]
+        assert snapshots == [(20.0, 8.0), (100.0, 0.0)]
+        assert result.done
+    
+    @patch('services.ffmpeg_runner.subprocess.Popen')
+    def test_reporting_to_receives_progress(self, mock_popen, runner):
+        mock_popen.return_value = fake_process()
+        snapshots = []
+        
+        with runner.reporting_to(lambda progress: snapshots.append(progress.percent)):
+            runner.run(["ffmpeg", "-i", "in.mp4", "out.mp4"], duration_seconds=20.0)
+        mock_popen.return_value = fake_process()
+        runner.run(["ffmpeg", "-i", "in.mp4", "out.mp4"], duration_seconds=20.0)
+        
+        assert snapshots == [20.0, 100.0]
+    
+    @patch('services.ffmpeg_runner.subprocess.Popen')
+    def test_run_raises_on_failure(self, mock_popen, runner):
+        mock_popen.return_value = fake_process(stdout="", returncode=1)
+        
+        with pytest.raises(subprocess.CalledProcessError) as error:
+            runner.run(["ffmpeg", "-i", "missing.mp4", "out.mp4"])
+        
+        assert error.value.cmd == ["ffmpeg", "-i", "missing.mp4", "out.mp4"]
+    
+    def test_redact_command_drops_signed_url_queries(self):
+        command = ["ffmpeg", "-i", "https://storage.googleapis.com/b/in.mp4?X-Goog-Signature=abc", "out.mp4"]
+        
+        assert redact_command(command) == ["ffmpeg", "-i", "https://storage.googleapis.com/b/in.mp4", "out.mp4"]
+    
+    @patch('services.ffmpeg_runner.subprocess.Popen')
+    def test_failure_does_not_leak_signed_url(self, mock_popen, runner):
+        mock_popen.return_value = fake_process(stdout="", returncode=1)
+        
+        with pytest.raises(subprocess.CalledProcessError) as error:
+            runner.run(["ffmpeg", "-i", "https://storage.googleapis.com/b/in.mp4?X-Goog-Signature=abc", "out.mp4"])
+        
+        assert "X-Goog-Signature" not in " ".join(error.value.cmd)
+    
+    @patch('services.ffmpeg_runner.subprocess.Popen')
+    def test_cancelled_token_stops_before_starting(self, mock_popen, runner):
+        cancel_token = CancelToken()
+        cancel_token.cancel()
+        
+        with runner.cancellable(cancel_token), pytest.raises(RenderCancelled):
+            runner.run(["ffmpeg", "-i", "in.mp4", "out.mp4"])
+        
+        mock_popen.assert_not_called()
+    
+    def test_cancel_kills_attached_process(self):
+        cancel_token = CancelToken()
+        process = Mock()
+        cancel_token.attach(process)
+        
+        cancel_token.cancel()
+        
+        process.kill.assert_called_once()
+        assert cancel_token.cancelled
+    
+    @patch('services.ffmpeg_runner.subprocess.Popen')
+    def test_killed_process_raises_cancelled(self, mock_popen, runner):
+        cancel_token = CancelToken()
+        process = fake_process(stdout="", returncode=-9)
+        process.wait.side_effect = lambda: cancel_token.cancel() or -9
+        mock_popen.return_value = process
+        
+        with runner.cancellable(cancel_token), pytest.raises(RenderCancelled):
+            runner.run(["ffmpeg", "-i", "in.mp4", "out.mp4"])
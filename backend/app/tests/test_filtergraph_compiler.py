@@ -0,0 +1,237 @@
+import pytest
+from unittest.mock import patch
+from models.edit_models import Edit
+from services.filtergraph_compiler import FiltergraphCompiler
+from services.lut_builder import LutBuilder
+from services.render_profiles import PROXY_PROFILE
+from services.text_rasterizer import TextRasterizer
+
+
+def make_edit(edit_id, edit_type, **params):
+    return Edit(id=edit_id, type=edit_type, params=params, timestamp="2025-01-01T00:00:00", status="applied")
+
+
+class TestFiltergraphCompiler:
+    @pytest.fixture
+    def compiler(self, tmp_path):
+        return FiltergraphCompiler(
+            rasterizer=TextRasterizer(cache_dir=str(tmp_path)),
+            luts=LutBuilder(cache_dir=str(tmp_path), size=5)
+        )
+    
+    def wrap_text(self, text, max_width, fontsize):
+        return [text]
+    
+    def test_compile_empty_queue_copies_streams(self, compiler):
+        graph = compiler.compile([], 1920, "0x1e1e1eCC", self.wrap_text)
+        
+        command = graph.build_command("/tmp/in.mp4", "/tmp/out.mp4")
+        
+        assert "-filter_complex" not in command
+        assert command[command.index("-c:v") + 1] == "copy"
+        assert command[command.index("-c:a") + 1] == "copy"
+    
+    def test_compile_text_overlays_into_one_chain(self, compiler):
+        edits = [
+            make_edit("1", "text_overlay", text="First", start_ms=0, end_ms=1500),
+            make_edit("2", "text_overlay", text="Second", start_ms=2000, end_ms=4000, position="top"),
+        ]
+        
+        graph = compiler.compile(edits, 1920, "0x1e1e1eCC", self.wrap_text)
+        command = graph.build_command("/tmp/in.mp4", "/tmp/out.mp4")
+        
+        assert len(graph.image_inputs) == 2
+        assert all(path.endswith(".png") for path in graph.image_inputs)
+        assert graph.filter_complex.startswith("[0:v][1:v]overlay=x=(W-w)/2:y=(H-h)/2:")
+        assert "[v1][2:v]overlay=x=(W-w)/2:y=10:" in graph.filter_complex
+        assert "between(t,0,1.5)" in graph.filter_complex
+        assert "between(t,2,4)" in graph.filter_complex
+        assert "drawtext" not in graph.filter_complex
+        assert command[command.index("-i", 3) + 1] == graph.image_inputs[0]
+        assert graph.video_label == "[vout]"
+        assert graph.audio_label is None
+    
+    def test_compile_reuses_rasterized_super(self, compiler):
+        edits = [
+            make_edit("1", "text_overlay", text="Same", start_ms=0, end_ms=1000),
+            make_edit("2", "text_overlay", text="Same", start_ms=2000, end_ms=3000),
+        ]
+        
+        with patch.object(compiler.rasterizer, '_font', wraps=compiler.rasterizer._font) as mock_font:
+            graph = compiler.compile(edits, 1920, "0x1e1e1eCC", self.wrap_text)
+        
+        assert graph.image_inputs[0] == graph.image_inputs[1]
+        mock_font.assert_called_once_with(70)
+    
+    def test_compile_voiceover_inputs_follow_overlay_images(self, compiler):
+        edits = [
+            make_edit("1", "text_overlay", text="One", start_ms=0, end_ms=1000),
+            make_edit("2", "voiceover", text="Hi", start_ms=500, audio_path="/tmp/a.mp3"),
+        ]
+        
+        graph = compiler.compile(edits, 1920, "0x1e1e1eCC", self.wrap_text)
+        command = graph.build_command("/tmp/in.mp4", "/tmp/out.mp4")
+        
+        assert "[2:a]adelay=500|500" in graph.filter_complex
+        assert command.count("-i") == 3
+        assert command[command.index("/tmp/a.mp3") - 1] == "-i"
+        assert command.index("/tmp/a.mp3") > command.index(graph.image_inputs[0])
+    
+    def test_compile_voiceovers_into_one_amix(self, compiler):
+        edits = [
+            make_edit("1", "voiceover", text="Hi", start_ms=500, audio_path="/tmp/a.mp3"),
+            make_edit("2", "voiceover", text="Bye", start_ms=2500, audio_path="/tmp/b.mp3"),
+        ]
+        
+        graph = compiler.compile(edits, 1920, "0x1e1e1eCC", self.wrap_text)
+        command = graph.build_command("/tmp/in.mp4", "/tmp/out.mp4")
+        
+        assert graph.audio_inputs == ["/tmp/a.mp3", "/tmp/b.mp3"]
+        assert "[1:a]adelay=500|500" in graph.filter_complex
+        assert "[2:a]adelay=2500|2500" in graph.filter_complex
+        assert "[mix1]volume=0.3[base2]" in graph.filter_complex
+        assert graph.audio_label == "[mix2]"
+        assert command[command.index("-c:v") + 1] == "copy"
+    
+    def test_compile_video_layer_drops_audio(self, compiler):
+        edits = [
+            make_edit("1", "text_overlay", text="One", start_ms=0, end_ms=1000),
+            make_edit("2", "voiceover", text="Hi", start_ms=500, audio_path="/tmp/a.mp3"),
+        ]
+        
+        graph = compiler.compile(edits, 1920, "0x1e1e1eCC", self.wrap_text, layer="video")
+        command = graph.build_command("/tmp/in.mp4", "/tmp/out.mp4")
+        
+        assert graph.audio_inputs == []
+        assert "-an" in command
+        assert "-c:a" not in command
+        assert command[command.index("-map") + 1] == "[vout]"
+    
+    def test_compile_audio_layer_drops_video(self, compiler):
+        edits = [
+            make_edit("1", "text_overlay", text="One", start_ms=0, end_ms=1000),
+            make_edit("2", "voiceover", text="Hi", start_ms=500, audio_path="/tmp/a.mp3"),
+        ]
+        
+        graph = compiler.compile(edits, 0, "0x1e1e1eCC", self.wrap_text, layer="audio")
+        command = graph.build_command("/tmp/in.mp4", "/tmp/out.mp4")
+        
+        assert graph.video_label is None
+        assert graph.image_inputs == []
+        assert "-vn" in command
+        assert "-c:v" not in command
+        assert command[command.index("-map") + 1] == "[mix1]"
+    
+    def test_compile_proxy_profile_scales_geometry(self, compiler):
+        edits = [make_edit("1", "text_overlay", text="One", start_ms=0, end_ms=1000, fontsize=72, position="top")]
+        
+        with patch.object(compiler.rasterizer, 'rasterize', return_value="/tmp/super.png") as mock_rasterize:
+            graph = compiler.compile(
+                edits, 1920, "0x1e1e1eCC", self.wrap_text, layer="video", profile=PROXY_PROFILE, video_height=1080
+            )
+        command = graph.build_command("/tmp/in.mp4", "/tmp/out.mp4")
+        
+        assert graph.filter_complex.startswith("[0:v]scale=-2:480[v1];[v1][1:v]overlay=")
+        assert mock_rasterize.call_args.kwargs["fontsize"] == 32
+        assert mock_rasterize.call_args.kwargs["border"] == 9
+        assert mock_rasterize.call_args.kwargs["width"] == 1536
+        assert ":y=4:" in graph.filter_complex
+        assert graph.video_span is None
+        assert command[command.index("-preset") + 1] == "ultrafast"
+    
+    def test_compile_proxy_profile_without_edits_still_downscales(self, compiler):
+        graph = compiler.compile([], 1920, "0x1e1e1eCC", self.wrap_text, layer="video", profile=PROXY_PROFILE, video_height=1080)
+        
+        assert graph.video_label == "[vout]"
+        assert graph.filter_complex == "[0:v]scale=-2:480[vout]"
+    
+    def test_compile_stacked_filters_into_one_lut(self, compiler):
+        edits = [
+            make_edit("1", "filter", look="warm"),
+            make_edit("2", "voiceover", text="Hi", start_ms=0, audio_path="/tmp/a.mp3"),
+            make_edit("3", "filter", brightness=0.1, contrast=1.2),
+        ]
+        
+        with patch.object(compiler.luts, 'build', wraps=compiler.luts.build) as mock_build:
+            graph = compiler.compile(edits, 1920, "0x1e1e1eCC", self.wrap_text, layer="video")
+        
+        mock_build.assert_called_once_with([{"look": "warm"}, {"brightness": 0.1, "contrast": 1.2}])
+        assert graph.filter_complex.count("lut3d=") == 1
+        assert graph.filter_complex.startswith("[0:v]lut3d=file='")
+        assert graph.filter_complex.endswith(".cube':interp=tetrahedral[vout]")
+    
+    def test_compile_overlay_between_filters_splits_lut(self, compiler):
+        edits = [
+            make_edit("1", "filter", look="mono"),
+            make_edit("2", "text_overlay", text="One", start_ms=0, end_ms=1000),
+            make_edit("3", "filter", saturation=1.5),
+        ]
+        
+        graph = compiler.compile(edits, 1920, "0x1e1e1eCC", self.wrap_text)
+        
+        nodes = [node for node, _ in graph.video_nodes]
+        assert nodes[0].startswith("lut3d=")
+        assert nodes[1].startswith("overlay=")
+        assert nodes[2].startswith("lut3d=")
+        assert nodes[0] != nodes[2]
+    
+    def test_compile_filter_disables_segment_span(self, compiler):
+        edits = [
+            make_edit("1", "text_overlay", text="One", start_ms=0, end_ms=1000),
+            make_edit("2", "filter", look="vivid"),
+        ]
+        
+        graph = compiler.compile(edits, 1920, "0x1e1e1eCC", self.wrap_text, layer="video")
+        
+        assert graph.video_span is None
+    
+    def test_compile_trim_cuts_both_chains(self, compiler):
+        edits = [
+            make_edit("1", "filter", look="warm"),
+            make_edit("2", "trim", start_ms=1000, end_ms=4000),
+            make_edit("3", "text_overlay", text="One", start_ms=0, end_ms=1000),
+        ]
+        
+        graph = compiler.compile(edits, 1920, "0x1e1e1eCC", self.wrap_text)
+        
+        nodes = [node for node, _ in graph.video_nodes]
+        assert nodes[0].startswith("lut3d=")
+        assert nodes[1] == "trim=start=1:end=4,setpts=PTS-STARTPTS"
+        assert nodes[2].startswith("overlay=")
+        assert graph.filters == ["[0:a]atrim=start=1:end=4,asetpts=PTS-STARTPTS[atrim0]"]
+        assert graph.audio_label == "[atrim0]"
+        assert graph.video_span is None
+    
+    def test_compile_trim_keeps_voiceover_order(self, compiler):
+        edits = [
+            make_edit("1", "voiceover", text="Hi", start_ms=500, audio_path="/tmp/a.mp3"),
+            make_edit("2", "trim", start_ms=1000),
+            make_edit("3", "voiceover", text="Bye", start_ms=0, audio_path="/tmp/b.mp3"),
+        ]
+        
+        graph = compiler.compile(edits, 0, "0x1e1e1eCC", self.wrap_text, layer="audio")
+        
+        assert graph.audio_inputs == ["/tmp/a.mp3", "/tmp/b.mp3"]
+        assert "[mix1]atrim=start=1,asetpts=PTS-STARTPTS[atrim3]" in graph.filters
+        assert graph.filters[4].startswith("[atrim3]volume=")
+        assert graph.audio_label == "[mix2]"
+    
+    def test_compile_audio_layer_skips_video_trim(self, compiler):
+        edits = [make_edit("1", "trim", start_ms=0, end_ms=2000)]
+        
+        graph = compiler.compile(edits, 0, "0x1e1e1eCC", self.wrap_text, layer="audio")
+        
+        assert graph.video_nodes == []
+        assert graph.audio_label == "[atrim0]"
+    
+    def test_compile_voiceover_without_audio_raises(self, compiler):
+        edits = [make_edit("1", "voiceover", text="Hi", start_ms=0)]
+        
+        with pytest.raises(ValueError):
+            compiler.compile(edits, 1920, "0x1e1e1eCC", self.wrap_text)
+    
+    def test_compile_unknown_edit_type_raises(self, compiler):
+        edits = [make_edit("1", "sparkles")]
+        
+        with pytest.raises(ValueError):
+            compiler.compile(edits, 1920, "0x1e1e1eCC", self.wrap_text)
@@ -0,0 +1,114 @@
+import os
+import pytest
+from unittest.mock import patch
+from services.hls_preview_service import HlsPreview, hls_preview_service
+
+
+PLAYLIST = """#EXTM3U
+#EXT-X-VERSION:6
+#EXT-X-TARGETDURATION:2
+#EXT-X-PLAYLIST-TYPE:EVENT
+#EXTINF:2.000000,
+segment_00000.ts
+#EXTINF:2.000000,
+segment_00001.ts
+"""
+
+
+class TestHlsPreviewService:
+    @pytest.fixture
+    def mock_render_store(self):
+        with patch('services.hls_preview_service.render_store') as mock_store:
+            mock_store.sidecar_url.side_effect = lambda key, suffix: f"https://b/renders/{key}{suffix}"
+            yield mock_store
+    
+    @pytest.fixture
+    def preview(self, mock_render_store):
+        preview = HlsPreview("abc", audio_source="/cache/audio.mp4")
+        yield preview
+        preview.close()
+    
+    def write_playlist(self, preview, playlist=PLAYLIST):
+        for line in playlist.splitlines():
+            if line.endswith(".ts"):
+                with open(os.path.join(preview.directory, line), "wb") as f:
+                    f.write(b"ts")
+        with open(preview.playlist_path, "w") as f:
+            f.write(playlist)
+    
+    def test_video_layer_preview_carries_audio_layer(self, preview):
+        command = ["ffmpeg", "-y", "-i", "src.mp4", "-i", "text.png", "-filter_complex", "[0:v][1:v]overlay[v]",
+                   "-map", "[v]", "-c:v", "libx264", "-an", "out.mp4"]
+        
+        tee_command = preview.tee_command(command)
+        
+        assert tee_command[:8] == ["ffmpeg", "-y", "-i", "src.mp4", "-i", "text.png", "-i", "/cache/audio.mp4"]
+        assert "-an" not in tee_command
+        assert tee_command[tee_command.index("-force_key_frames") + 1] == "expr:gte(t,n_forced*2)"
+        assert ["-map", "2:a?", "-c:a", "copy"] == tee_command[tee_command.index("2:a?") - 1:tee_command.index("2:a?") + 3]
+        assert tee_command[-1].startswith("[select=v:f=mp4:movflags=+faststart]out.mp4|[f=hls:hls_time=2:hls_playlist_type=event")
+        assert tee_command[-1].endswith(f"]{preview.playlist_path}")
+        assert preview.used
+    
+    def test_preview_of_full_encode_keeps_its_streams(self, mock_render_store):
+        preview = HlsPreview("abc")
+        command = ["ffmpeg", "-y", "-i", "src.mp4", "-i", "vo.mp3", "-map", "0:v", "-c:v", "copy",
+                   "-map", "[a]", "-c:a", "aac", "out.mp4"]
+        
+        tee_command = preview.tee_command(command)
+        preview.close()
+        
+        assert tee_command[:-5] == command[:-1]
+        assert tee_command[-1].startswith("[f=mp4:movflags=+faststart]out.mp4|")
+    
+    def test_publish_uploads_segments_before_playlist(self, preview, mock_render_store):
+        ready = []
+        preview.on_ready = ready.append
+        self.write_playlist(preview)
+        
+        preview._publish()
+        preview._publish()
+        
+        suffixes = [call.args[1] for call in mock_render_store.put_sidecar.call_args_list]
+        assert suffixes == [".hls/segment_00000.ts", ".hls/segment_00001.ts", ".hls/index.m3u8"]
+        assert mock_render_store.put_sidecar.call_args.kwargs["cache_control"].startswith("no-cache")
+        assert ready == ["https://b/renders/abc.hls/index.m3u8"]
+    
+    def test_grown_playlist_uploads_only_new_segments(self, preview, mock_render_store):
+        self.write_playlist(preview)
+        preview._publish()
+        mock_render_store.put_sidecar.reset_mock()
+        
+        self.write_playlist(preview, PLAYLIST + "#EXTINF:1.000000,\nsegment_00002.ts\n#EXT-X-ENDLIST\n")
+        preview._publish()
+        
+        suffixes = [call.args[1] for call in mock_render_store.put_sidecar.call_args_list]
+        assert suffixes == [".hls/segment_00002.ts", ".hls/index.m3u8"]
+    
+    def test_failed_upload_is_retried_on_next_poll(self, preview, mock_render_store):
+        ready = []
+        preview.on_ready = ready.append
+        self.write_playlist(preview)
+        mock_render_store.put_sidecar.side_effect = [OSError("network"), None, None, None]
+        
+        preview._publish()
+        assert ready == []
+        
+        preview._publish()
+        assert ready == ["https://b/renders/abc.hls/index.m3u8"]
+    
+    def test_no_preview_without_listener(self, mock_render_store):
+        with hls_preview_service.previewing("abc") as preview:
+            assert preview is None
+            assert hls_preview_service.claim() is None
+    
+    def test_preview_is_claimed_once_and_cleaned_up(self, mock_render_store):
+        with hls_preview_service.reporting_to(lambda url: None):
+            with hls_preview_service.previewing("abc") as preview:
+                claimed = hls_preview_service.claim()
+                claimed.tee_command(["ffmpeg", "-i", "in.mp4", "out.mp4"])
+                assert claimed is preview
+                assert hls_preview_service.claim() is None
+        
+        assert not os.path.exists(preview.directory)
+        assert hls_preview_service.claim() is None
@@ -0,0 +1,68 @@
+import os
+import numpy as np
+import pytest
+from services.lut_builder import LutBuilder, apply_grade, resolve_grade
+
+
+def read_cube(path):
+    with open(path) as f:
+        lines = f.read().splitlines()
+    size = int(next(line for line in lines if line.startswith("LUT_3D_SIZE")).split()[1])
+    table = np.array([[float(v) for v in line.split()] for line in lines if line[:1].isdigit()])
+    return size, table
+
+
+class TestLutBuilder:
+    @pytest.fixture
+    def builder(self, tmp_path):
+        return LutBuilder(cache_dir=str(tmp_path), size=9)
+    
+    def test_resolve_grade_applies_look_then_params(self):
+        grade = resolve_grade({"look": "mono", "contrast": 1.5})
+        
+        assert grade["saturation"] == 0.0
+        assert grade["contrast"] == 1.5
+        assert grade["brightness"] == 0.0
+    
+    def test_resolve_grade_rejects_unknown_look(self):
+        with pytest.raises(ValueError):
+            resolve_grade({"look": "sparkly"})
+    
+    def test_neutral_grade_is_identity(self):
+        rgb = np.random.default_rng(0).random((100, 3))
+        
+        np.testing.assert_allclose(apply_grade(rgb, resolve_grade({})), rgb)
+    
+    def test_mono_grade_removes_color(self):
+        graded = apply_grade(np.array([[1.0, 0.0, 0.0]]), resolve_grade({"saturation": 0}))
+        
+        assert graded[0, 0] == pytest.approx(graded[0, 1])
+        assert graded[0, 1] == pytest.approx(graded[0, 2])
+    
+    def test_cube_lists_red_fastest(self, builder):
+        size, table = read_cube(builder.build([{}]))
+        
+        assert size == 9
+        assert len(table) == 9 ** 3
+        np.testing.assert_allclose(table[1], [0.125, 0.0, 0.0])
+        np.testing.assert_allclose(table[9], [0.0, 0.125, 0.0])
+        np.testing.assert_allclose(table[81], [0.0, 0.0, 0.125])
+    
+    def test_stacked_grades_fold_into_one_table(self, builder):
+        _, folded = read_cube(builder.build([{"brightness": 0.1}, {"contrast": 2.0}]))
+        _, identity = read_cube(builder.build([{}]))
+        
+        expected = apply_grade(apply_grade(identity, resolve_grade({"brightness": 0.1})), resolve_grade({"contrast": 2.0}))
+        np.testing.assert_allclose(folded, expected, atol=1e-6)
+    
+    def test_lut_is_cached_by_resolved_grades(self, builder):
+        first = builder.build([{"look": "warm"}])
+        modified = os.path.getmtime(first)
+        
+        same = builder.build([{"temperature": 0.12, "saturation": 1.1}])
+        reordered = builder.build([{"brightness": 0.1}, {"contrast": 2.0}])
+        other_order = builder.build([{"contrast": 2.0}, {"brightness": 0.1}])
+        
+        assert same == first
+        assert os.path.getmtime(same) == modified
+        assert reordered != other_order
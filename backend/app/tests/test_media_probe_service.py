@@ -0,0 +1,129 @@
+import json
+import pytest
+from unittest.mock import Mock, patch
+from services.media_probe_service import MediaProbe, MediaProbeService, parse_probe
+
+FFPROBE_OUTPUT = {
+    "packets": [
+        {"stream_index": 0, "pts_time": "2.000000", "flags": "K__"},
+        {"stream_index": 0, "pts_time": "0.000000", "flags": "K__"},
+        {"stream_index": 0, "pts_time": "0.040000", "flags": "___"},
+        {"stream_index": 1, "pts_time": "0.000000", "flags": "K__"},
+        {"stream_index": 0, "pts_time": "N/A", "flags": "K__"}
+    ],
+    "streams": [
+        {
+            "index": 0, "codec_name": "h264", "codec_type": "video", "width": 1920, "height": 1080,
+            "pix_fmt": "yuv420p", "time_base": "1/15360", "avg_frame_rate": "30000/1001", "r_frame_rate": "30/1"
+        },
+        {
+            "index": 1, "codec_name": "aac", "codec_type": "audio", "sample_rate": "48000",
+            "channels": 2, "channel_layout": "stereo", "avg_frame_rate": "0/0"
+        }
+    ],
+    "format": {"duration": "12.480000"}
+}
+
+
+class TestParseProbe:
+    def test_parse_video_and_audio(self):
+        probe = parse_probe(FFPROBE_OUTPUT)
+        
+        assert (probe.width, probe.height) == (1920, 1080)
+        assert probe.duration == 12.48
+        assert probe.fps == pytest.approx(29.97, abs=0.01)
+        assert probe.video_codec == "h264"
+        assert probe.pix_fmt == "yuv420p"
+        assert probe.audio_channel_layout == "stereo"
+        assert probe.audio_channels == 2
+        assert probe.audio_sample_rate == 48000
+        assert probe.keyframe_times == [0.0, 2.0]
+    
+    def test_parse_audio_only(self):
+        probe = parse_probe({"streams": [FFPROBE_OUTPUT["streams"][1]], "format": {"duration": "N/A"}})
+        
+        assert not probe.has_video
+        assert probe.has_audio
+        assert probe.duration is None
+        assert probe.keyframe_times == []
+
+
+class TestMediaProbeService:
+    @pytest.fixture
+    def service(self, tmp_path):
+        return MediaProbeService(db_path=str(tmp_path / "sessions.db"))
+    
+    @pytest.fixture
+    def media_path(self, tmp_path):
+        path = tmp_path / "input.mp4"
+        path.write_bytes(b"not really a video")
+        return str(path)
+    
+    @pytest.fixture
+    def mock_ffprobe(self):
+        with patch('services.media_probe_service.subprocess.run') as mock_run:
+            mock_run.return_value = Mock(stdout=json.dumps(FFPROBE_OUTPUT))
+            yield mock_run
+    
+    def test_probe_runs_one_ffprobe(self, service, media_path, mock_ffprobe):
+        probe = service.probe(media_path)
+        again = service.probe(media_path)
+        
+        assert again is probe
+        assert probe.keyframe_times == [0.0, 2.0]
+        mock_ffprobe.assert_called_once()
+        assert mock_ffprobe.call_args.args[0][-1] == media_path
+    
+    def test_probe_is_persisted(self, service, media_path, mock_ffprobe, tmp_path):
+        probe = service.probe(media_path)
+        
+        reopened = MediaProbeService(db_path=str(tmp_path / "sessions.db"))
+        
+        assert reopened.probe(media_path) == probe
+        mock_ffprobe.assert_called_once()
+    
+    def test_probe_is_keyed_by_content(self, service, media_path, mock_ffprobe, tmp_path):
+        copy_path = tmp_path / "copy.mp4"
+        copy_path.write_bytes(b"not really a video")
+        
+        service.probe(media_path)
+        service.probe(str(copy_path))
+        
+        assert service.media_key(str(copy_path)) == service.media_key(media_path)
+        mock_ffprobe.assert_called_once()
+    
+    def test_rewritten_file_is_probed_again(self, service, media_path, mock_ffprobe):
+        service.probe(media_path)
+        
+        with open(media_path, "wb") as f:
+            f.write(b"a different video entirely")
+        service.probe(media_path)
+        
+        assert mock_ffprobe.call_count == 2
+    
+    def test_remembered_source_skips_hashing(self, service, media_path):
+        service.remember_source(media_path, "gs://bucket/source.mp4#17")
+        
+        with patch('services.media_probe_service.hashlib.sha256') as mock_sha256:
+            assert service.media_key(media_path) == "gs://bucket/source.mp4#17"
+        mock_sha256.assert_not_called()
+    
+    def test_streamed_url_is_keyed_without_its_signature(self, service):
+        signed_url = "https://storage.googleapis.com/bucket/source.mp4?X-Goog-Signature=abc"
+        
+        assert service.media_key(signed_url) == "url:https://storage.googleapis.com/bucket/source.mp4"
+        service.remember_source(signed_url, "gs://bucket/source.mp4#17")
+        assert service.media_key(signed_url) == "gs://bucket/source.mp4#17"
+    
+    def test_probe_failure_is_not_cached(self, service, media_path, mock_ffprobe):
+        mock_ffprobe.side_effect = ValueError("bad output")
+        with pytest.raises(ValueError):
+            service.probe(media_path)
+        
+        mock_ffprobe.side_effect = None
+        assert service.probe(media_path) == parse_probe(FFPROBE_OUTPUT)
+    
+    def test_probe_round_trips_through_dict(self):
+        probe = parse_probe(FFPROBE_OUTPUT)
+        
+        assert MediaProbe.from_dict(json.loads(json.dumps(probe.to_dict()))) == probe
@@ -0,0 +1,81 @@
+import pytest
+from core.metrics import (
+    DB_QUERY_SECONDS,
+    FFMPEG_PROCESSES,
+    RENDER_BUCKETS,
+    SpanMetricsExporter,
+    expose,
+    record_cache_lookup,
+    registry,
+    update_cache_hit_ratios,
+)
+from core.tracing import Tracer
+
+
+def sample(name, **labels):
+    return registry.get_sample_value(name, labels) or 0.0
+
+
+class TestMetrics:
+    def test_exposition_has_only_app_metrics(self):
+        record_cache_lookup("test_exposition", hit=True)
+
+        lines = expose().decode().splitlines()
+
+        assert "# TYPE editor_cache_lookups_total counter" in lines
+        assert 'editor_cache_lookups_total{cache="test_exposition",result="hit"} 1.0' in lines
+        assert not any(line.startswith("python_gc") or line.startswith("process_") for line in lines)
+
+    def test_db_timer_decorates(self):
+        before = sample("editor_db_query_duration_seconds_count", operation="test_get_state")
+
+        @DB_QUERY_SECONDS.labels(operation="test_get_state").time()
+        def get_state(session_pk):
+            return {"pk": session_pk}
+
+        assert get_state(1) == {"pk": 1}
+        assert get_state.__name__ == "get_state"
+        assert sample("editor_db_query_duration_seconds_count", operation="test_get_state") == before + 1
+
+    def test_ffmpeg_gauge_tracks_in_progress(self):
+        before = sample("editor_ffmpeg_processes")
+
+        with FFMPEG_PROCESSES.track_inprogress():
+            assert sample("editor_ffmpeg_processes") == before + 1
+        with pytest.raises(RuntimeError):
+            with FFMPEG_PROCESSES.track_inprogress():
+                raise RuntimeError("ffmpeg failed")
+
+        assert sample("editor_ffmpeg_processes") == before
+
+
+class TestSpanMetrics:
+    def test_stage_and_render_spans_are_observed(self):
+        tracer = Tracer([SpanMetricsExporter()])
+        tts_before = sample("editor_stage_duration_seconds_count", stage="tts", status="ok")
+        failed_before = sample("editor_render_duration_seconds_count", status="error")
+
+        with tracer.span("tts"):
+            pass
+        with pytest.raises(RuntimeError):
+            with tracer.span("render.job", job_id="job-1"):
+                raise RuntimeError("render failed")
+        with tracer.span("edit.apply"):
+            pass
+
+        assert sample("editor_stage_duration_seconds_count", stage="tts", status="ok") == tts_before + 1
+        assert sample("editor_render_duration_seconds_count", status="error") == failed_before + 1
+        assert registry.get_sample_value(
+            "editor_stage_duration_seconds_count", {"stage": "edit.apply", "status": "ok"}
+        ) is None
+        assert registry.get_sample_value(
+            "editor_render_duration_seconds_bucket", {"status": "error", "le": str(RENDER_BUCKETS[-1])}
+        ) is not None
+
+    def test_cache_hit_ratio(self):
+        for hit in (True, True, True, False):
+            record_cache_lookup("test_cache", hit=hit)
+
+        update_cache_hit_ratios()
+
+        assert sample("editor_cache_hit_ratio", cache="test_cache") == 0.75
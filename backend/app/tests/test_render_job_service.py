@@ -0,0 +1,123 @@
+import threading
+import time
+import pytest
+from services.ffmpeg_runner import FfmpegProgress, RenderCancelled, ffmpeg_runner
+from services.render_job_service import RenderJob, RenderJobService
+
+
+def wait_until(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+class TestRenderJobService:
+    @pytest.fixture
+    def service(self):
+        service = RenderJobService(max_workers=1, debounce_seconds=0)
+        yield service
+        service.shutdown()
+    
+    def test_submit_returns_immediately_and_succeeds(self, service):
+        recorded = []
+        
+        job = service.submit(lambda: "https://storage.googleapis.com/b/out.mp4", session_id="s1", on_success=recorded.append)
+        service.shutdown()
+        
+        assert service.get(job.id) is job
+        assert job.status == "succeeded"
+        assert job.video_url == "https://storage.googleapis.com/b/out.mp4"
+        assert job.finished_at is not None
+        assert recorded == ["https://storage.googleapis.com/b/out.mp4"]
+    
+    def test_failed_render_records_error(self, service):
+        def render():
+            raise RuntimeError("ffmpeg exploded")
+        
+        job = service.submit(render)
+        service.shutdown()
+        
+        assert job.status == "failed"
+        assert job.error == "ffmpeg exploded"
+        assert job.video_url is None
+    
+    def test_get_unknown_job(self, service):
+        assert service.get("missing") is None
+
+    
+    def test_job_records_ffmpeg_progress(self):
+        job = RenderJob(id="j1", session_id="s1", created_at="2024-01-01T00:00:00")
+        
+        job.record_progress(FfmpegProgress(out_time_seconds=5.0, speed=2.0, fps=48.0, duration_seconds=10.0))
+        
+        assert job.progress_percent == 50.0
+        assert job.eta_seconds == 2.5
+        assert job.to_dict()["speed"] == 2.0
+    
+    def test_succeeded_job_is_complete(self, service):
+        job = service.submit(lambda: "https://storage.googleapis.com/b/out.mp4")
+        service.shutdown()
+        
+        assert job.progress_percent == 100.0
+        assert job.eta_seconds == 0.0
+    
+    def test_depth_counts_pending_jobs(self):
+        service = RenderJobService(max_workers=1, debounce_seconds=0)
+        release = threading.Event()
+        
+        running = service.submit(lambda: release.wait(2) and "first.mp4", session_id="s1")
+        service.submit(lambda: "second.mp4", session_id="s2")
+        assert wait_until(lambda: running.status == "rendering")
+        assert service.depth() == {"queued": 1, "rendering": 1}
+        
+        release.set()
+        service.shutdown()
+        assert service.depth() == {"queued": 0, "rendering": 0}
+    
+    def test_newer_job_supersedes_debouncing_job(self):
+        service = RenderJobService(max_workers=1, debounce_seconds=0.1)
+        rendered = []
+        
+        first = service.submit(lambda: rendered.append("first") or "first.mp4", session_id="s1", state_key="a")
+        second = service.submit(lambda: rendered.append("second") or "second.mp4", session_id="s1", state_key="b")
+        
+        assert wait_until(lambda: second.done)
+        service.shutdown()
+        
+        assert first.status == "superseded"
+        assert first.superseded_by == second.id
+        assert second.status == "succeeded"
+        assert rendered == ["second"]
+    
+    def test_same_queue_state_reuses_pending_job(self):
+        service = RenderJobService(max_workers=1, debounce_seconds=0.1)
+        
+        first = service.submit(lambda: "out.mp4", session_id="s1", state_key="a")
+        again = service.submit(lambda: "out.mp4", session_id="s1", state_key="a")
+        
+        assert again is first
+        assert wait_until(lambda: first.done)
+        service.shutdown()
+        assert first.status == "succeeded"
+    
+    def test_newer_job_cancels_running_render(self):
+        service = RenderJobService(max_workers=2, debounce_seconds=0)
+        started = threading.Event()
+        
+        def slow_render():
+            started.set()
+            wait_until(ffmpeg_runner.is_cancelled)
+            raise RenderCancelled("Render was cancelled")
+        
+        first = service.submit(slow_render, session_id="s1", state_key="a")
+        assert started.wait(2)
+        second = service.submit(lambda: "second.mp4", session_id="s1", state_key="b")
+        service.shutdown()
+        
+        assert first.status == "superseded"
+        assert first.error is None
+        assert second.status == "succeeded"
+        assert second.video_url == "second.mp4"
@@ -0,0 +1,131 @@
+import sqlite3
+import time
+import pytest
+from models.edit_models import Edit, EditQueue
+from services.render_job_service import RenderJob
+from services.render_profiles import PROXY_PROFILE
+from services.render_queue_service import RenderQueueService
+
+
+def make_queue(session_id="s1", text="Hello"):
+    return EditQueue(
+        session_id=session_id,
+        original_video_url="gs://bucket/source.mp4",
+        edits=[Edit(id="1", type="text_overlay", params={"text": text}, timestamp="t", status="applied")],
+        current_video_url="gs://bucket/source.mp4"
+    )
+
+
+class TestRenderQueueService:
+    @pytest.fixture
+    def queue(self, tmp_path):
+        return RenderQueueService(db_path=str(tmp_path / "sessions.db"), debounce_seconds=0)
+    
+    def test_enqueue_and_claim(self, queue):
+        job = queue.enqueue(make_queue(), PROXY_PROFILE, app_name="app", user_id="u1", state_key="a")
+        
+        claimed = queue.claim("worker-1", lease_seconds=30)
+        
+        assert claimed.job.id == job.id
+        assert claimed.job.status == "rendering"
+        assert claimed.job.worker_id == "worker-1"
+        assert claimed.job.attempts == 1
+        assert claimed.edit_queue.edits[0].params == {"text": "Hello"}
+        assert claimed.profile is PROXY_PROFILE
+        assert (claimed.app_name, claimed.user_id) == ("app", "u1")
+        assert queue.claim("worker-2") is None
+    
+    def test_depth_counts_pending_jobs(self, queue):
+        assert queue.depth() == {"queued": 0, "rendering": 0}
+        
+        queue.enqueue(make_queue(session_id="s1"), PROXY_PROFILE)
+        queue.enqueue(make_queue(session_id="s2"), PROXY_PROFILE)
+        claimed = queue.claim("worker-1")
+        assert queue.depth() == {"queued": 1, "rendering": 1}
+        
+        queue.complete(claimed.job.id, "worker-1", "gs://bucket/out.mp4")
+        assert queue.depth() == {"queued": 1, "rendering": 0}
+    
+    def test_debounced_job_is_not_claimable_yet(self, tmp_path):
+        queue = RenderQueueService(db_path=str(tmp_path / "sessions.db"), debounce_seconds=60)
+        queue.enqueue(make_queue(), PROXY_PROFILE)
+        
+        assert queue.claim("worker-1") is None
+    
+    def test_newer_job_supersedes_pending_job(self, queue):
+        first = queue.enqueue(make_queue(text="Old"), PROXY_PROFILE, state_key="a")
+        claimed = queue.claim("worker-1")
+        second = queue.enqueue(make_queue(text="New"), PROXY_PROFILE, state_key="b")
+        
+        superseded = queue.get(first.id)
+        assert superseded.status == "superseded"
+        assert superseded.superseded_by == second.id
+        assert not queue.heartbeat(claimed.job, "worker-1")
+        assert not queue.complete(first.id, "worker-1", "gs://bucket/old.mp4")
+        assert queue.claim("worker-2").job.id == second.id
+    
+    def test_same_queue_state_reuses_pending_job(self, queue):
+        first = queue.enqueue(make_queue(), PROXY_PROFILE, state_key="a")
+        again = queue.enqueue(make_queue(), PROXY_PROFILE, state_key="a")
+        
+        assert again.id == first.id
+        assert again.status == "queued"
+    
+    def test_heartbeat_publishes_progress_and_completion(self, queue):
+        queue.enqueue(make_queue(), PROXY_PROFILE)
+        claimed = queue.claim("worker-1")
+        claimed.job.progress_percent = 40.0
+        claimed.job.eta_seconds = 3.0
+        claimed.job.preview_url = "https://storage.googleapis.com/bucket/renders/k.hls/index.m3u8"
+        
+        assert queue.heartbeat(claimed.job, "worker-1")
+        assert queue.get(claimed.job.id).progress_percent == 40.0
+        assert queue.get(claimed.job.id).preview_url == claimed.job.preview_url
+        
+        assert queue.complete(claimed.job.id, "worker-1", "gs://bucket/out.mp4")
+        job = queue.get(claimed.job.id)
+        assert isinstance(job, RenderJob)
+        assert job.status == "succeeded"
+        assert job.video_url == "gs://bucket/out.mp4"
+        assert job.done
+    
+    def test_expired_lease_is_reclaimed(self, queue):
+        queue.enqueue(make_queue(), PROXY_PROFILE)
+        lost = queue.claim("worker-1", lease_seconds=0.01)
+        time.sleep(0.02)
+        
+        reclaimed = queue.claim("worker-2")
+        
+        assert reclaimed.job.id == lost.job.id
+        assert reclaimed.job.attempts == 2
+        assert not queue.heartbeat(lost.job, "worker-1")
+        assert queue.heartbeat(reclaimed.job, "worker-2")
+    
+    def test_job_fails_after_max_attempts(self, queue, monkeypatch):
+        monkeypatch.setattr("services.render_queue_service.settings.RENDER_MAX_ATTEMPTS", 1)
+        job = queue.enqueue(make_queue(), PROXY_PROFILE)
+        queue.claim("worker-1", lease_seconds=0.01)
+        time.sleep(0.02)
+        
+        assert queue.claim("worker-2") is None
+        failed = queue.get(job.id)
+        assert failed.status == "failed"
+        assert "stopped responding" in failed.error
+    
+    def test_fail_records_error(self, queue):
+        queue.enqueue(make_queue(), PROXY_PROFILE)
+        claimed = queue.claim("worker-1")
+        
+        assert queue.fail(claimed.job.id, "worker-1", "ffmpeg exploded")
+        assert queue.get(claimed.job.id).error == "ffmpeg exploded"
+    
+    def test_older_database_gains_preview_column(self, tmp_path):
+        db_path = tmp_path / "sessions.db"
+        RenderQueueService(db_path=str(db_path), debounce_seconds=0)
+        with sqlite3.connect(db_path) as conn:
+            conn.execute("ALTER TABLE render_jobs DROP COLUMN preview_url")
+        
+        queue = RenderQueueService(db_path=str(db_path), debounce_seconds=0)
+        job = queue.enqueue(make_queue(), PROXY_PROFILE)
+        
+        assert queue.get(job.id).preview_url is None
@@ -0,0 +1,265 @@
+import io
+import threading
+import pytest
+from unittest.mock import Mock
+from services.render_store import RenderStore
+
+
+class TestRenderStore:
+    @pytest.fixture
+    def store(self, tmp_path):
+        storage_client = Mock()
+        storage_client.bucket.return_value.blob.return_value.exists.return_value = False
+        return RenderStore(
+            cache_dir=str(tmp_path / "cache"),
+            max_bytes=250,
+            bucket_name="scratch",
+            storage_client=storage_client,
+            upload_workers=0
+        )
+    
+    @pytest.fixture
+    def background_store(self, tmp_path):
+        storage_client = Mock()
+        storage_client.bucket.return_value.blob.return_value.exists.return_value = False
+        return RenderStore(
+            cache_dir=str(tmp_path / "cache"),
+            max_bytes=250,
+            bucket_name="scratch",
+            storage_client=storage_client,
+            upload_workers=1
+        )
+    
+    def write_render(self, tmp_path, name, size):
+        path = tmp_path / name
+        path.write_bytes(b"x" * size)
+        return str(path)
+    
+    def test_make_key_is_stable_and_param_sensitive(self):
+        first = RenderStore.make_key("gs://b/a.mp4", "text_overlay", {"text": "Hi", "fontsize": 70})
+        same = RenderStore.make_key("gs://b/a.mp4", "text_overlay", {"fontsize": 70, "text": "Hi"})
+        other = RenderStore.make_key("gs://b/a.mp4", "text_overlay", {"text": "Hello", "fontsize": 70})
+        
+        assert first == same
+        assert first != other
+    
+    def test_put_then_lookup_is_local_hit(self, store, tmp_path):
+        url = store.put("abc", self.write_render(tmp_path, "out.mp4", 100))
+        
+        assert url == "https://storage.googleapis.com/scratch/renders/abc.mp4"
+        assert store.lookup("abc") == url
+        assert store.stats()["hits"] == 1
+        store.storage_client.bucket.return_value.blob.return_value.upload_from_filename.assert_called_once()
+    
+    def test_lookup_miss_checks_remote(self, store):
+        assert store.lookup("missing") is None
+        assert store.stats()["misses"] == 1
+        store.storage_client.bucket.return_value.blob.assert_called_with("renders/missing.mp4")
+    
+    def test_lookup_remote_hit(self, store):
+        store.storage_client.bucket.return_value.blob.return_value.exists.return_value = True
+        
+        assert store.lookup("remote") == "https://storage.googleapis.com/scratch/renders/remote.mp4"
+        assert store.stats()["hits"] == 1
+    
+    def test_remote_miss_is_remembered_until_stored(self, store, tmp_path):
+        blob = store.storage_client.bucket.return_value.blob.return_value
+        
+        assert store.lookup("missing") is None
+        assert store.lookup("missing") is None
+        assert blob.exists.call_count == 1
+        
+        store.put("missing", self.write_render(tmp_path, "out.mp4", 10))
+        store._entries.clear()
+        blob.exists.return_value = True
+        assert store.lookup("missing") == "https://storage.googleapis.com/scratch/renders/missing.mp4"
+        assert blob.exists.call_count == 2
+    
+    def test_remote_miss_expires(self, tmp_path):
+        storage_client = Mock()
+        blob = storage_client.bucket.return_value.blob.return_value
+        blob.exists.return_value = False
+        store = RenderStore(
+            cache_dir=str(tmp_path / "cache"), bucket_name="scratch", storage_client=storage_client,
+            upload_workers=0, miss_ttl_seconds=0
+        )
+        
+        store.lookup("missing")
+        store.lookup("missing")
+        
+        assert blob.exists.call_count == 2
+    
+    def test_lookup_deepest_prefers_deepest_render(self, store, tmp_path):
+        store.put("p1", self.write_render(tmp_path, "p1.mp4", 10), upload=False)
+        blobs = {}
+        def blob_for(name):
+            return blobs.setdefault(name, Mock(exists=Mock(return_value=name == "renders/p3.mp4")))
+        store.storage_client.bucket.return_value.blob.side_effect = blob_for
+        
+        assert store.lookup_deepest(["p1", "p2", "p3", "p4"]) == (3, "https://storage.googleapis.com/scratch/renders/p3.mp4")
+        # Prefixes at or above the deepest local render are not asked about.
+        assert "renders/p1.mp4" not in blobs
+        assert store.stats()["hits"] == 1
+    
+    def test_lookup_deepest_falls_back_to_local_prefix(self, store, tmp_path):
+        store.put("p1", self.write_render(tmp_path, "p1.mp4", 10), upload=False)
+        
+        assert store.lookup_deepest(["p1", "p2", "p3"]) == (1, "https://storage.googleapis.com/scratch/renders/p1.mp4")
+        assert store.lookup_deepest(["q1", "q2"]) == (0, None)
+        assert store.stats()["misses"] == 1
+    
+    def test_lru_eviction_respects_byte_budget(self, store, tmp_path):
+        store.put("a", self.write_render(tmp_path, "a.mp4", 100))
+        store.put("b", self.write_render(tmp_path, "b.mp4", 100))
+        store.get_local("a")
+        store.put("c", self.write_render(tmp_path, "c.mp4", 100))
+        
+        assert store.get_local("b") is None
+        assert store.get_local("a") is not None
+        assert store.get_local("c") is not None
+        assert store.stats()["evictions"] == 1
+        assert store.stats()["local_bytes"] == 200
+    
+    def test_local_path_for_url(self, store, tmp_path):
+        url = store.put("abc", self.write_render(tmp_path, "out.mp4", 10))
+        
+        assert store.local_path_for_url(url) == str(store.cache_dir / "abc.mp4")
+        assert store.local_path_for_url("gs://other/videos/x.mp4") is None
+        assert store.media_key(url) == "abc"
+    
+    def test_intermediate_is_uploaded_only_when_materialized(self, store, tmp_path):
+        blob = store.storage_client.bucket.return_value.blob.return_value
+        store.put("mid", self.write_render(tmp_path, "mid.mp4", 10), upload=False)
+        
+        blob.upload_from_filename.assert_not_called()
+        assert store.lookup("mid") == "https://storage.googleapis.com/scratch/renders/mid.mp4"
+        
+        assert store.materialize("mid") == "https://storage.googleapis.com/scratch/renders/mid.mp4"
+        blob.upload_from_filename.assert_called_once()
+        
+        store.materialize("mid")
+        blob.upload_from_filename.assert_called_once()
+    
+    def test_fetch_local_downloads_remote_render(self, store):
+        blob = store.storage_client.bucket.return_value.blob.return_value
+        blob.exists.return_value = True
+        blob.download_to_filename.side_effect = lambda path: open(path, "wb").write(b"x" * 10)
+        
+        local_path = store.fetch_local_url("https://storage.googleapis.com/scratch/renders/remote.mp4")
+        
+        assert local_path == str(store.cache_dir / "remote.mp4")
+        assert store.get_local("remote") == local_path
+        assert store.stats()["local_bytes"] == 10
+    
+    def test_concurrent_fetches_download_to_separate_files(self, store):
+        blob = store.storage_client.bucket.return_value.blob.return_value
+        blob.exists.return_value = True
+        both_downloading = threading.Barrier(2, timeout=5)
+        partial_paths = []
+        
+        def download(path):
+            partial_paths.append(path)
+            with open(path, "wb") as f:
+                f.write(b"x" * 5)
+                both_downloading.wait()
+                f.write(b"x" * 5)
+        blob.download_to_filename.side_effect = download
+        
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(store.fetch_local("remote"))) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert len(set(partial_paths)) == 2
+        assert results == [str(store.cache_dir / "remote.mp4")] * 2
+        assert (store.cache_dir / "remote.mp4").read_bytes() == b"x" * 10
+        assert not list(store.cache_dir.glob("*.part"))
+        assert store.stats()["local_bytes"] == 10
+    
+    def test_failed_fetch_removes_partial_file(self, store):
+        blob = store.storage_client.bucket.return_value.blob.return_value
+        blob.exists.return_value = True
+        blob.download_to_filename.side_effect = OSError("connection reset")
+        
+        with pytest.raises(OSError):
+            store.fetch_local("remote")
+        
+        assert list(store.cache_dir.iterdir()) == []
+    
+    def test_fetch_local_missing_everywhere(self, store):
+        assert store.fetch_local("missing") is None
+    
+    def test_open_upload_publishes_render_on_success(self, store):
+        bucket = store.storage_client.bucket.return_value
+        partial_blob = bucket.blob.return_value
+        partial_blob.open.return_value = io.BytesIO()
+        
+        with store.open_upload("abc") as stream:
+            stream.write(b"fragment")
+        
+        assert bucket.blob.call_args[0][0].startswith("renders/partial/abc-")
+        bucket.copy_blob.assert_called_once_with(partial_blob, bucket, "renders/abc.mp4")
+        partial_blob.delete.assert_called_once()
+    
+    def test_open_upload_discards_partial_on_failure(self, store):
+        bucket = store.storage_client.bucket.return_value
+        partial_blob = bucket.blob.return_value
+        partial_blob.open.return_value = io.BytesIO()
+        
+        with pytest.raises(RuntimeError):
+            with store.open_upload("abc"):
+                raise RuntimeError("ffmpeg failed")
+        
+        bucket.copy_blob.assert_not_called()
+        partial_blob.delete.assert_called_once()
+    
+    def test_sidecar_is_stored_next_to_render(self, store, tmp_path):
+        sprite_path = self.write_render(tmp_path, "sprite.jpg", 10)
+        
+        url = store.put_sidecar("abc", ".sprite.jpg", sprite_path, "image/jpeg")
+        
+        assert url == "https://storage.googleapis.com/scratch/renders/abc.sprite.jpg"
+        store.storage_client.bucket.return_value.blob.assert_called_with("renders/abc.sprite.jpg")
+        store.storage_client.bucket.return_value.blob.return_value.upload_from_filename.assert_called_once_with(
+            sprite_path, content_type="image/jpeg"
+        )
+    
+    def test_background_upload_serves_render_locally_first(self, background_store, tmp_path):
+        blob = background_store.storage_client.bucket.return_value.blob.return_value
+        uploading = threading.Event()
+        release = threading.Event()
+        blob.upload_from_filename.side_effect = lambda *args, **kwargs: (uploading.set(), release.wait(5))
+        
+        url = background_store.put("abc", self.write_render(tmp_path, "out.mp4", 100))
+        uploading.wait(5)
+        
+        assert background_store.get_local("abc")
+        assert background_store.stats()["pending_uploads"] == 1
+        release.set()
+        assert background_store.materialize("abc") == url
+        assert background_store.stats()["pending_uploads"] == 0
+        blob.upload_from_filename.assert_called_once()
+    
+    def test_render_is_not_evicted_while_uploading(self, background_store, tmp_path):
+        blob = background_store.storage_client.bucket.return_value.blob.return_value
+        release = threading.Event()
+        blob.upload_from_filename.side_effect = lambda *args, **kwargs: release.wait(5)
+        
+        background_store.put("a", self.write_render(tmp_path, "a.mp4", 100))
+        background_store.put("b", self.write_render(tmp_path, "b.mp4", 100), upload=False)
+        background_store.put("c", self.write_render(tmp_path, "c.mp4", 100), upload=False)
+        
+        assert background_store.get_local("a")
+        assert background_store.get_local("b") is None
+        release.set()
+    
+    def test_failed_background_upload_is_retried_by_materialize(self, background_store, tmp_path):
+        blob = background_store.storage_client.bucket.return_value.blob.return_value
+        blob.upload_from_filename.side_effect = [OSError("network"), None]
+        
+        url = background_store.put("abc", self.write_render(tmp_path, "out.mp4", 100))
+        
+        assert background_store.materialize("abc") == url
+        assert blob.upload_from_filename.call_count == 2
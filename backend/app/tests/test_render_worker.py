@@ -0,0 +1,82 @@
+import time
+import pytest
+from unittest.mock import patch
+from models.edit_models import Edit, EditQueue
+from render_worker import RenderWorker
+from services.ffmpeg_runner import RenderCancelled, ffmpeg_runner
+from services.render_profiles import PROXY_PROFILE
+from services.render_queue_service import RenderQueueService
+
+
+def make_queue(text="Hello"):
+    return EditQueue(
+        session_id="s1",
+        original_video_url="gs://bucket/source.mp4",
+        edits=[Edit(id="1", type="text_overlay", params={"text": text}, timestamp="t", status="applied")],
+        current_video_url="gs://bucket/source.mp4"
+    )
+
+
+class TestRenderWorker:
+    @pytest.fixture
+    def queue(self, tmp_path):
+        return RenderQueueService(db_path=str(tmp_path / "sessions.db"), debounce_seconds=0)
+    
+    @pytest.fixture
+    def worker(self, queue):
+        return RenderWorker(worker_id="worker-1", queue=queue, heartbeat_seconds=0.01)
+    
+    def test_run_once_with_empty_queue(self, worker):
+        assert worker.run_once() is False
+    
+    @patch('render_worker.database_session_service')
+    @patch('render_worker.video_pipeline_service.apply_edit_queue')
+    def test_renders_job_and_records_it_in_the_session(self, mock_apply, mock_db, worker, queue):
+        def render(edit_queue, profile):
+            edit_queue.current_video_url = "gs://bucket/renders/out.mp4"
+            return edit_queue.current_video_url
+        mock_apply.side_effect = render
+        mock_db.get_session.return_value = {"pk": 7}
+        job = queue.enqueue(make_queue(), PROXY_PROFILE, app_name="app", user_id="u1")
+        
+        assert worker.run_once() is True
+        
+        finished = queue.get(job.id)
+        assert finished.status == "succeeded"
+        assert finished.video_url == "gs://bucket/renders/out.mp4"
+        assert mock_apply.call_args.kwargs["profile"] is PROXY_PROFILE
+        
+        session_pk, key, merge = mock_db.update_state.call_args.args
+        assert (session_pk, key) == (7, "edit_queue")
+        stored = merge(make_queue().to_dict())
+        assert stored["current_video_url"] == "gs://bucket/renders/out.mp4"
+        newer = merge(make_queue(text="Changed").to_dict())
+        assert newer["current_video_url"] == "gs://bucket/source.mp4"
+    
+    @patch('render_worker.video_pipeline_service.apply_edit_queue')
+    def test_failed_render_is_recorded(self, mock_apply, worker, queue):
+        mock_apply.side_effect = Exception("ffmpeg exploded")
+        job = queue.enqueue(make_queue(), PROXY_PROFILE)
+        
+        worker.run_once()
+        
+        failed = queue.get(job.id)
+        assert failed.status == "failed"
+        assert failed.error == "ffmpeg exploded"
+    
+    @patch('render_worker.video_pipeline_service.apply_edit_queue')
+    def test_superseded_job_is_cancelled_through_heartbeat(self, mock_apply, worker, queue):
+        def render(edit_queue, profile):
+            queue.enqueue(make_queue(text="Newer"), PROXY_PROFILE)
+            deadline = time.monotonic() + 2
+            while not ffmpeg_runner.is_cancelled() and time.monotonic() < deadline:
+                time.sleep(0.01)
+            raise RenderCancelled("Render was cancelled")
+        mock_apply.side_effect = render
+        job = queue.enqueue(make_queue(), PROXY_PROFILE)
+        
+        worker.run_once()
+        
+        superseded = queue.get(job.id)
+        assert superseded.status == "superseded"
+        assert superseded.error is None
@@ -0,0 +1,66 @@
+import pytest
+from PIL import ImageFont
+from services.text_layout import FONT_FILE, TextLayoutEngine
+
+
+class TestTextLayoutEngine:
+    @pytest.fixture
+    def engine(self):
+        return TextLayoutEngine()
+    
+    @pytest.mark.parametrize("fontsize", [20, 32, 50, 70, 113])
+    def test_measure_matches_rendered_width(self, engine, fontsize):
+        font = ImageFont.truetype(FONT_FILE, fontsize)
+        
+        for text in ["Hello world", "WWW iiii 1234", "Big summer sale on everything", "Café ÄÖÜ €"]:
+            assert engine.measure(text, fontsize) == font.getlength(text)
+    
+    def test_line_height_matches_font_metrics(self, engine):
+        ascent, descent = ImageFont.truetype(FONT_FILE, 70).getmetrics()
+        
+        assert engine.line_height(70) == ascent + descent
+    
+    def test_layout_breaks_at_exact_width(self, engine):
+        fits = engine.measure("Big summer", 70)
+        
+        assert engine.layout("Big summer sale", 70, fits).lines == ("Big summer", "sale")
+        assert engine.layout("Big summer sale", 70, fits - 1).lines == ("Big", "summer", "sale")
+    
+    def test_layout_lines_fit_max_width(self, engine):
+        text = "This is a very long text that should be wrapped into multiple lines"
+        
+        layout = engine.layout(text, 50, 300)
+        
+        assert len(layout.lines) > 1
+        assert " ".join(layout.lines) == text
+        assert all(width <= 300 for width in layout.line_widths)
+        assert layout.line_widths == tuple(engine.measure(line, 50) for line in layout.lines)
+    
+    def test_layout_gives_overlong_word_its_own_line(self, engine):
+        layout = engine.layout("a Supercalifragilistic b", 70, 200)
+        
+        assert layout.lines == ("a", "Supercalifragilistic", "b")
+        assert layout.width > 200
+    
+    def test_layout_box_size(self, engine):
+        layout = engine.layout("One two", 40, 1000)
+        
+        assert layout.box_size(border=20, line_spacing=10) == (layout.width + 40, engine.line_height(40) + 40)
+    
+    def test_layout_of_blank_text_is_empty(self, engine):
+        layout = engine.layout("   ", 40, 1000)
+        
+        assert layout.lines == ()
+        assert layout.box_size(border=0, line_spacing=10) == (1, 1)
+    
+    def test_characters_outside_the_font_use_notdef_width(self, engine):
+        notdef = int(engine.table.pixel_advances(40)[-1])
+        
+        assert engine.measure("\U0001F600", 40) == notdef
+    
+    def test_layout_is_memoized(self, engine):
+        first = engine.layout("Same super", 70, 1536)
+        second = engine.layout("Same super", 70, 1536)
+        
+        assert second is first
+        assert engine.layout.cache_info().hits == 1
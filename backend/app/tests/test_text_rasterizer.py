@@ -0,0 +1,46 @@
+import os
+import pytest
+from PIL import Image
+from services.text_rasterizer import TextRasterizer, parse_color
+
+
+class TestTextRasterizer:
+    @pytest.fixture
+    def rasterizer(self, tmp_path):
+        return TextRasterizer(cache_dir=str(tmp_path))
+    
+    def test_parse_color(self):
+        assert parse_color("white") == (255, 255, 255, 255)
+        assert parse_color("0x1e1e1eCC") == (30, 30, 30, 204)
+        assert parse_color("#FF0000") == (255, 0, 0, 255)
+        assert parse_color("black@0.5") == (0, 0, 0, 128)
+    
+    def test_rasterize_draws_box_around_wrapped_lines(self, rasterizer):
+        path = rasterizer.rasterize(["Hello", "World"], fontsize=40, color="white", box_color="0x1e1e1eCC", width=800)
+        
+        with Image.open(path) as image:
+            ascent, descent = rasterizer._font(40).getmetrics()
+            layout = rasterizer.layout_engine.measure_lines(["Hello", "World"], 40)
+            assert image.mode == "RGBA"
+            assert image.height == 2 * (ascent + descent) + 10 + 2 * 20
+            assert image.size == layout.box_size(border=20, line_spacing=10)
+            assert image.getpixel((0, 0)) == (30, 30, 30, 204)
+            assert (255, 255, 255, 255) in [color for _, color in image.getcolors(maxcolors=1 << 16)]
+    
+    def test_rasterize_is_cached_by_appearance(self, rasterizer):
+        first = rasterizer.rasterize(["Sale"], fontsize=40, color="white", box_color="0x1e1e1eCC", width=800)
+        modified = os.path.getmtime(first)
+        
+        again = rasterizer.rasterize(["Sale"], fontsize=40, color="white", box_color="0x1e1e1eCC", width=800)
+        other_box = rasterizer.rasterize(["Sale"], fontsize=40, color="white", box_color="0xFF0000CC", width=800)
+        
+        assert again == first
+        assert os.path.getmtime(again) == modified
+        assert other_box != first
+    
+    def test_cache_survives_new_instances(self, rasterizer, tmp_path):
+        first = rasterizer.rasterize(["Sale"], fontsize=40, color="white", box_color="0x1e1e1eCC", width=800)
+        
+        assert TextRasterizer(cache_dir=str(tmp_path)).rasterize(
+            ["Sale"], fontsize=40, color="white", box_color="0x1e1e1eCC", width=800
+        ) == first
@@ -0,0 +1,111 @@
+import threading
+import pytest
+from unittest.mock import patch
+from services.media_probe_service import MediaProbe
+from services.thumbnail_sprite_service import ThumbnailSpriteService, build_webvtt, sprite_layout
+
+
+class TestThumbnailSpriteService:
+    @pytest.fixture
+    def service(self):
+        return ThumbnailSpriteService(count=20, thumb_width=160)
+    
+    @pytest.fixture
+    def mock_render_store(self):
+        with patch('services.thumbnail_sprite_service.render_store') as mock_store:
+            mock_store.put_sidecar.side_effect = lambda key, suffix, path, content_type: f"https://b/renders/{key}{suffix}"
+            mock_store.sidecar_url.side_effect = lambda key, suffix: f"https://b/renders/{key}{suffix}"
+            mock_store.has_sidecar.return_value = False
+            yield mock_store
+    
+    @pytest.fixture
+    def mock_probe(self):
+        with patch('services.thumbnail_sprite_service.media_probe_service.probe') as mock_probe:
+            mock_probe.return_value = MediaProbe(duration=8.0, width=1920, height=1080, fps=25.0, video_codec="h264")
+            yield mock_probe
+    
+    def test_sprite_layout_is_a_square_ish_grid(self):
+        layout = sprite_layout(8.0, 1920, 1080, 25.0, 20, 160)
+        
+        assert (layout.columns, layout.rows) == (5, 4)
+        assert (layout.thumb_width, layout.thumb_height) == (160, 90)
+        assert layout.tile_position(7) == (320, 90)
+    
+    def test_sprite_layout_never_exceeds_frame_count(self):
+        layout = sprite_layout(0.2, 1920, 1080, 25.0, 20, 160)
+        
+        assert layout.count == 5
+    
+    def test_webvtt_maps_each_span_to_its_tile(self):
+        layout = sprite_layout(8.0, 1920, 1080, 25.0, 20, 160)
+        
+        vtt = build_webvtt(layout, "abc.sprite.jpg")
+        
+        assert vtt.startswith("WEBVTT\n\n00:00:00.000 --> 00:00:00.400\nabc.sprite.jpg#xywh=0,0,160,90\n")
+        assert "00:00:07.600 --> 00:00:08.000\nabc.sprite.jpg#xywh=640,270,160,90" in vtt
+        assert vtt.count("#xywh=") == 20
+    
+    def test_build_command_decodes_once_into_one_tiled_image(self, service):
+        layout = sprite_layout(8.0, 1920, 1080, 25.0, 20, 160)
+        
+        command = service.build_command("/cache/abc.mp4", layout, "/tmp/sprite.jpg")
+        
+        assert command.count("-i") == 1
+        assert command[command.index("-vf") + 1] == "fps=2.500000,scale=160:90,tile=5x4"
+        assert command[-3:] == ["-q:v", "4", "/tmp/sprite.jpg"]
+    
+    @patch('services.thumbnail_sprite_service.ffmpeg_runner.run')
+    def test_generate_uploads_sprite_and_index(self, mock_ffmpeg, service, mock_render_store, mock_probe):
+        urls = service.generate("abc", "/cache/abc.mp4")
+        
+        assert urls == {"sprite_url": "https://b/renders/abc.sprite.jpg", "vtt_url": "https://b/renders/abc.vtt"}
+        mock_ffmpeg.assert_called_once()
+        assert [call.args[1] for call in mock_render_store.put_sidecar.call_args_list] == [".sprite.jpg", ".vtt"]
+    
+    @patch('services.thumbnail_sprite_service.ffmpeg_runner.run', side_effect=OSError("ffmpeg missing"))
+    def test_generate_failure_does_not_raise(self, mock_ffmpeg, service, mock_render_store, mock_probe):
+        assert service.generate("abc", "/cache/abc.mp4") is None
+        mock_render_store.put_sidecar.assert_not_called()
+    
+    def test_generate_disabled(self, mock_render_store):
+        assert ThumbnailSpriteService(count=0).generate("abc", "/cache/abc.mp4") is None
+        mock_render_store.fetch_local.assert_not_called()
+    
+    @patch('services.thumbnail_sprite_service.ffmpeg_runner.run')
+    def test_generate_skips_stored_sprite(self, mock_ffmpeg, service, mock_render_store, mock_probe):
+        mock_render_store.has_sidecar.return_value = True
+        
+        urls = service.generate("abc", "/cache/abc.mp4")
+        
+        assert urls == {"sprite_url": "https://b/renders/abc.sprite.jpg", "vtt_url": "https://b/renders/abc.vtt"}
+        mock_ffmpeg.assert_not_called()
+        mock_render_store.has_sidecar.assert_called_once_with("abc", ".vtt")
+    
+    @patch('services.thumbnail_sprite_service.ffmpeg_runner.run')
+    def test_submit_generates_in_background_once(self, mock_ffmpeg, mock_render_store, mock_probe):
+        service = ThumbnailSpriteService(count=20, thumb_width=160, workers=1)
+        mock_render_store.fetch_local.return_value = "/cache/abc.mp4"
+        started = threading.Event()
+        release = threading.Event()
+        
+        def run(command, duration_seconds=None):
+            started.set()
+            release.wait(5)
+        mock_ffmpeg.side_effect = run
+        
+        service.submit("abc")
+        assert started.wait(5)
+        service.submit("abc")
+        assert service.urls("abc") is None
+        release.set()
+        service._pool.shutdown(wait=True)
+        
+        assert mock_ffmpeg.call_count == 1
+        assert service.urls("abc") == {"sprite_url": "https://b/renders/abc.sprite.jpg", "vtt_url": "https://b/renders/abc.vtt"}
+    
+    def test_urls_of_unknown_render_check_bucket(self, service, mock_render_store):
+        assert service.urls("abc") is None
+        
+        mock_render_store.has_sidecar.return_value = True
+        
+        assert service.urls("abc")["vtt_url"] == "https://b/renders/abc.vtt"
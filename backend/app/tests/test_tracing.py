@@ -0,0 +1,150 @@
+import inspect
+import json
+import threading
+import pytest
+from core.tracing import JsonlSpanExporter, RingBufferExporter, Tracer, current_span
+
+
+class TestTracer:
+    @pytest.fixture
+    def buffer(self):
+        return RingBufferExporter(max_spans=100)
+
+    @pytest.fixture
+    def tracer(self, buffer):
+        return Tracer([buffer])
+
+    def test_spans_nest_and_inherit_tags(self, tracer, buffer):
+        with tracer.span("render.job", job_id="job-1", session_id="sess1") as root:
+            with tracer.span("edit.apply", edit_id="e1", edit_type="trim") as edit:
+                with tracer.span("ffmpeg", media_seconds=12.0) as ffmpeg:
+                    assert current_span() is ffmpeg
+            assert current_span() is root
+        assert current_span() is None
+
+        spans = buffer.trace(root.trace_id)
+        assert [span["name"] for span in spans] == ["render.job", "edit.apply", "ffmpeg"]
+        assert edit.parent_id == root.span_id
+        assert ffmpeg.parent_id == edit.span_id
+        assert ffmpeg.attributes == {
+            "job_id": "job-1", "session_id": "sess1", "edit_id": "e1", "edit_type": "trim", "media_seconds": 12.0
+        }
+        assert all(span["duration_ms"] >= 0 for span in spans)
+
+    def test_span_records_error_and_reraises(self, tracer, buffer):
+        with pytest.raises(ValueError):
+            with tracer.span("probe") as span:
+                raise ValueError("bad media")
+
+        assert span.status == "error"
+        assert span.error == "ValueError: bad media"
+        assert buffer.traces()[0]["status"] == "error"
+
+    def test_explicit_parent_joins_trace_across_threads(self, tracer, buffer):
+        with tracer.span("agent.turn", session_id="sess1") as turn:
+            parent = current_span()
+
+        def render():
+            with tracer.span("render.job", parent=parent, job_id="job-1"):
+                pass
+        worker = threading.Thread(target=render)
+        worker.start()
+        worker.join()
+
+        spans = buffer.trace(turn.trace_id)
+        assert spans[1]["parent_id"] == turn.span_id
+        assert spans[1]["attributes"] == {"session_id": "sess1", "job_id": "job-1"}
+
+    def test_traced_keeps_signature(self, tracer, buffer):
+        def add_text_overlay_edit(tool_context, text: str, start_ms: int) -> dict:
+            return {"text": text}
+
+        wrapped = tracer.traced("tool.add_text_overlay_edit")(add_text_overlay_edit)
+
+        assert wrapped.__name__ == "add_text_overlay_edit"
+        assert inspect.signature(wrapped) == inspect.signature(add_text_overlay_edit)
+        assert wrapped(None, "Hi", 0) == {"text": "Hi"}
+        assert buffer.traces()[0]["name"] == "tool.add_text_overlay_edit"
+
+    def test_disabled_tracer_exports_nothing(self, buffer):
+        tracer = Tracer([buffer], enabled=False)
+
+        with tracer.span("render.job"):
+            pass
+
+        assert buffer.traces() == []
+
+
+class TestExporters:
+    def test_ring_buffer_summarizes_recent_traces(self):
+        buffer = RingBufferExporter(max_spans=100)
+        tracer = Tracer([buffer])
+        for session_id in ["sess1", "sess2", "sess1"]:
+            with tracer.span("agent.turn", session_id=session_id):
+                with tracer.span("llm"):
+                    pass
+
+        summaries = buffer.traces()
+        assert len(summaries) == 3
+        assert summaries[0]["span_count"] == 2
+        assert summaries[0]["name"] == "agent.turn"
+        assert len(buffer.traces(session_id="sess1")) == 2
+        assert len(buffer.traces(limit=1)) == 1
+
+    def test_ring_buffer_drops_oldest_spans(self):
+        buffer = RingBufferExporter(max_spans=2)
+        tracer = Tracer([buffer])
+        with tracer.span("first") as first:
+            pass
+        with tracer.span("second"):
+            pass
+        with tracer.span("third"):
+            pass
+
+        assert buffer.trace(first.trace_id) == []
+        assert [summary["name"] for summary in buffer.traces()] == ["third", "second"]
+
+    def test_jsonl_exporter_appends_spans(self, tmp_path):
+        path = tmp_path / "logs" / "traces.jsonl"
+        tracer = Tracer([JsonlSpanExporter(str(path))])
+
+        with tracer.span("upload", key="abc"):
+            pass
+        with tracer.span("download", key="abc"):
+            pass
+
+        lines = [json.loads(line) for line in path.read_text().splitlines()]
+        assert [line["name"] for line in lines] == ["upload", "download"]
+        assert lines[0]["attributes"] == {"key": "abc"}
+        assert "_start_counter" not in lines[0]
+
+    def test_jsonl_exporter_rolls_over_at_max_bytes(self, tmp_path):
+        path = tmp_path / "traces.jsonl"
+        exporter = JsonlSpanExporter(str(path), max_bytes=400, backups=2)
+        tracer = Tracer([exporter])
+
+        for index in range(12):
+            with tracer.span("upload", index=index):
+                pass
+        exporter.close()
+
+        files = [path, tmp_path / "traces.jsonl.1", tmp_path / "traces.jsonl.2"]
+        assert all(file.exists() for file in files)
+        assert not (tmp_path / "traces.jsonl.3").exists()
+        assert all(file.stat().st_size <= 400 for file in files)
+        newest = [json.loads(line)["attributes"]["index"] for line in path.read_text().splitlines()]
+        assert newest[-1] == 11
+        older = [json.loads(line)["attributes"]["index"] for line in files[1].read_text().splitlines()]
+        assert older[-1] == newest[0] - 1
+
+    def test_failing_exporter_does_not_break_span(self):
+        class BrokenExporter:
+            def export(self, span):
+                raise OSError("disk full")
+        buffer = RingBufferExporter(max_spans=10)
+        tracer = Tracer([BrokenExporter(), buffer])
+
+        with tracer.span("upload"):
+            pass
+
+        assert len(buffer.traces()) == 1
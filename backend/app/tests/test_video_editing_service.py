@@ -1,13 +1,24 @@
 import pytest
+import subprocess
 from unittest.mock import Mock, patch, MagicMock
-from services.video_editing_service import VideoEditingService
+from services.media_probe_service import MediaProbe
+from services.video_editing_service import VideoEditingService, gop_aligned_span, keyframe_aligned_cut
 
 
 class TestVideoEditingService:
     @pytest.fixture
     def service(self):
         with patch('services.video_editing_service.storage.Client'):
-            return VideoEditingService()
+            service = VideoEditingService()
+        service.render_store = Mock()
+        service.render_store.lookup.return_value = None
+        service.render_store.local_path_for_url.return_value = None
+        service.render_store.owns.return_value = False
+        service.render_store.materialize.side_effect = lambda key: f"https://storage.googleapis.com/bucket/renders/{key}.mp4"
+        service.render_store.put.return_value = "https://storage.googleapis.com/bucket/renders/key.mp4"
+        service.media_probe = Mock()
+        service.thumbnails = Mock()
+        return service
     
     def test_init(self, service):
         assert service.storage_client is not None
@@ -22,6 +33,7 @@ class TestVideoEditingService:
         
         mock_bucket = Mock()
         mock_blob = Mock()
+        mock_blob.generation = 1712345
         mock_bucket.blob.return_value = mock_blob
         service.storage_client.bucket.return_value = mock_bucket
         
@@ -30,6 +42,9 @@ class TestVideoEditingService:
         assert result == "/tmp/test_video.mp4"
         service.storage_client.bucket.assert_called_with("test-bucket")
         mock_blob.download_to_filename.assert_called_once()
+        service.media_probe.remember_source.assert_called_once_with(
+            "/tmp/test_video.mp4", "gs://test-bucket/videos/test.mp4#1712345"
+        )
     
     @patch('services.video_editing_service.tempfile.NamedTemporaryFile')
     def test_download_video_from_gcs_https_url(self, mock_tempfile, service):
@@ -48,17 +63,20 @@ class TestVideoEditingService:
         assert result == "/tmp/test_video.mp4"
         mock_blob.download_to_filename.assert_called_once()
     
-    @patch('services.video_editing_service.subprocess.run')
-    def test_get_video_dimensions(self, mock_subprocess, service):
-        mock_result = Mock()
-        mock_result.stdout = "1920,1080\n"
-        mock_subprocess.return_value = mock_result
+    def test_get_video_dimensions(self, service):
+        service.media_probe.probe.return_value = MediaProbe(width=1920, height=1080, video_codec="h264")
         
         width, height = service._get_video_dimensions("/tmp/test.mp4")
         
         assert width == 1920
         assert height == 1080
-        mock_subprocess.assert_called_once()
+        service.media_probe.probe.assert_called_once_with("/tmp/test.mp4")
+    
+    def test_get_video_dimensions_without_video_stream(self, service):
+        service.media_probe.probe.return_value = MediaProbe(audio_codec="aac")
+        
+        with pytest.raises(ValueError):
+            service._get_video_dimensions("/tmp/audio_only.mp4")
     
     def test_wrap_text_single_line(self, service):
         result = service._wrap_text("Hello", 1000, 70)
@@ -93,20 +111,18 @@ class TestVideoEditingService:
             assert result == "#1e1e1e"
     
     @patch('services.video_editing_service.os.unlink')
-    @patch('services.video_editing_service.subprocess.run')
+    @patch('services.video_editing_service.ffmpeg_runner.run')
     @patch('services.video_editing_service.tempfile.mktemp')
-    @patch('services.video_editing_service.tempfile.NamedTemporaryFile')
-    def test_add_text_overlay_success(self, mock_tempfile, mock_mktemp, mock_subprocess, mock_unlink, service):
-        mock_temp = MagicMock()
-        mock_temp.name = "/tmp/test.txt"
-        mock_temp.__enter__.return_value = mock_temp
-        mock_tempfile.return_value = mock_temp
+    @patch('services.video_editing_service.filtergraph_compiler.rasterizer.rasterize')
+    def test_add_text_overlay_success(self, mock_rasterize, mock_mktemp, mock_ffmpeg, mock_unlink, service):
+        mock_rasterize.return_value = "/tmp/super.png"
         mock_mktemp.return_value = "/tmp/output.mp4"
         
         with patch.object(service, '_download_video_from_gcs', return_value="/tmp/input.mp4"), \
              patch.object(service, '_get_video_dimensions', return_value=(1920, 1080)), \
              patch.object(service, '_get_brand_color', return_value="#1e1e1e"), \
-             patch.object(service, '_upload_video_to_gcs', return_value="https://storage.googleapis.com/bucket/output.mp4"), \
+             patch.object(service, '_render_segment_scoped', return_value=False), \
+             patch.object(service, '_get_duration', return_value=10.0), \
              patch('services.video_editing_service.os.path.exists', return_value=True):
             
             result = service.add_text_overlay(
@@ -118,7 +134,146 @@ class TestVideoEditingService:
             
             assert result["status"] == "success"
             assert "video_url" in result
-            mock_subprocess.assert_called_once()
+            mock_ffmpeg.assert_called_once()
+            assert mock_ffmpeg.call_args.kwargs["duration_seconds"] == 10.0
+            command = mock_ffmpeg.call_args.args[0]
+            assert "/tmp/super.png" in command
+            assert "overlay=" in command[command.index("-filter_complex") + 1]
+            assert mock_rasterize.call_args.kwargs["box_color"] == "0x1e1e1eCC"
+    
+    @patch('services.video_editing_service.os.unlink')
+    @patch('services.video_editing_service.subprocess.run')
+    @patch('services.video_editing_service.tempfile.mktemp')
+    @patch('services.video_editing_service.filtergraph_compiler.rasterizer.rasterize')
+    def test_add_text_overlay_segment_scoped(self, mock_rasterize, mock_mktemp, mock_subprocess, mock_unlink, service):
+        mock_rasterize.return_value = "/tmp/super.png"
+        mock_mktemp.return_value = "/tmp/output.mp4"
+        
+        with patch.object(service, '_download_video_from_gcs', return_value="/tmp/input.mp4"), \
+             patch.object(service, '_get_video_dimensions', return_value=(1920, 1080)), \
+             patch.object(service, '_get_brand_color', return_value="#1e1e1e"), \
+             patch.object(service, '_render_segment_scoped', return_value=True) as mock_segment, \
+             patch('services.video_editing_service.os.path.exists', return_value=True):
+            
+            result = service.add_text_overlay(
+                "gs://bucket/input.mp4",
+                "Test Text",
+                start_time=30,
+                duration=2
+            )
+            
+            assert result["status"] == "success"
+            args = mock_segment.call_args.args
+            assert args[0] == "/tmp/input.mp4"
+            assert args[1].image_inputs == ["/tmp/super.png"]
+            assert "between(t,30,32)" in args[1].video_graph("[vsrc]")
+            assert args[2:4] == (30, 32)
+            mock_subprocess.assert_not_called()
+    
+    def test_get_duration_tolerates_probe_failure(self, service):
+        service.media_probe.probe.side_effect = subprocess.CalledProcessError(1, "ffprobe")
+        assert service._get_duration("/tmp/input.mp4") is None
+        
+        service.media_probe.probe.side_effect = None
+        service.media_probe.probe.return_value = MediaProbe(duration=12.48)
+        assert service._get_duration("/tmp/input.mp4") == 12.48
+    
+    def test_gop_aligned_span(self):
+        keyframes = [0.0, 2.0, 4.0, 6.0, 8.0]
+        
+        assert gop_aligned_span(keyframes, 4.5, 5.5) == (4.0, 6.0)
+        assert gop_aligned_span(keyframes, 4.0, 6.0) == (4.0, 6.0)
+        assert gop_aligned_span(keyframes, 0.5, 1.0) == (0.0, 2.0)
+        assert gop_aligned_span(keyframes, 7.0, 9.0) == (6.0, None)
+    
+    @patch('services.video_editing_service.subprocess.run')
+    def test_render_segment_scoped_skips_unspliceable_codec(self, mock_subprocess, service):
+        service.media_probe.probe.return_value = MediaProbe(video_codec="prores", keyframe_times=[0.0, 2.0])
+        assert service._render_segment_scoped("/tmp/in.mp4", "null", 1, 2, "/tmp/out.mp4") is False
+        mock_subprocess.assert_not_called()
+    
+    @patch('services.video_editing_service.subprocess.run')
+    def test_render_segment_scoped_skips_whole_video_span(self, mock_subprocess, service):
+        service.media_probe.probe.return_value = MediaProbe(video_codec="h264", keyframe_times=[0.0])
+        assert service._render_segment_scoped("/tmp/in.mp4", "null", 1, 2, "/tmp/out.mp4") is False
+        mock_subprocess.assert_not_called()
+    
+    def test_keyframe_aligned_cut(self):
+        keyframes = [0.0, 2.0, 4.0, 6.0, 8.0]
+        
+        assert keyframe_aligned_cut(keyframes, 1.5, 7.0) == (2.0, 6.0)
+        assert keyframe_aligned_cut(keyframes, 2.0, 6.0) == (2.0, 6.0)
+        assert keyframe_aligned_cut(keyframes, 4.5, 5.5) is None
+        assert keyframe_aligned_cut(keyframes, 2.5, 5.5) is None
+    
+    @patch('services.video_editing_service.ffmpeg_runner.run')
+    @patch('services.video_editing_service.tempfile.mktemp', return_value="/tmp/trimmed.mp4")
+    def test_trim_video_copies_whole_gops(self, mock_mktemp, mock_ffmpeg, service):
+        service.media_probe.probe.return_value = MediaProbe(
+            duration=60.0, video_codec="h264", pix_fmt="yuv420p", keyframe_times=[0.0, 2.0, 4.0, 50.0, 52.0]
+        )
+        
+        with patch.object(service, '_download_video_from_gcs', return_value="/tmp/input.mp4"), \
+             patch('services.video_editing_service.os.unlink'):
+            result = service.trim_video("gs://bucket/input.mp4", start_time=1.5, end_time=51.0)
+        
+        assert result["status"] == "success"
+        commands = [c.args[0] for c in mock_ffmpeg.call_args_list]
+        head, middle, tail, concat = commands
+        assert head[head.index("-ss") + 1] == "1.500000"
+        assert head[head.index("-t") + 1] == "0.500000"
+        assert "libx264" in head
+        assert middle[middle.index("-c") + 1] == "copy"
+        assert middle[middle.index("-ss") + 1] == "2.001000"
+        assert middle[middle.index("-t") + 1] == "47.999000"
+        assert tail[tail.index("-ss") + 1] == "50.000000"
+        assert tail[tail.index("-t") + 1] == "1.000000"
+        assert concat[concat.index("-f") + 1] == "concat"
+        assert concat[concat.index("-c:v") + 1] == "copy"
+        assert concat[-1] == "/tmp/trimmed.mp4"
+        service.render_store.put.assert_called_once()
+    
+    @patch('services.video_editing_service.ffmpeg_runner.run')
+    @patch('services.video_editing_service.tempfile.mktemp', return_value="/tmp/trimmed.mp4")
+    def test_trim_video_on_keyframes_copies_only(self, mock_mktemp, mock_ffmpeg, service):
+        service.media_probe.probe.return_value = MediaProbe(
+            duration=60.0, video_codec="h264", keyframe_times=[0.0, 2.0, 4.0, 6.0]
+        )
+        
+        with patch.object(service, '_download_video_from_gcs', return_value="/tmp/input.mp4"), \
+             patch('services.video_editing_service.os.unlink'):
+            service.trim_video("gs://bucket/input.mp4", start_time=2.0, end_time=6.0)
+        
+        commands = [c.args[0] for c in mock_ffmpeg.call_args_list]
+        assert len(commands) == 2
+        assert all("libx264" not in command for command in commands)
+    
+    @patch('services.video_editing_service.ffmpeg_runner.run')
+    @patch('services.video_editing_service.tempfile.mktemp', return_value="/tmp/trimmed.mp4")
+    def test_trim_video_reencodes_unspliceable_source(self, mock_mktemp, mock_ffmpeg, service):
+        service.media_probe.probe.return_value = MediaProbe(
+            duration=10.0, video_codec="prores", keyframe_times=[0.0, 2.0, 4.0, 6.0]
+        )
+        
+        with patch.object(service, '_download_video_from_gcs', return_value="/tmp/input.mp4"), \
+             patch('services.video_editing_service.os.unlink'):
+            result = service.trim_video("gs://bucket/input.mp4", start_time=1.0)
+        
+        assert result["status"] == "success"
+        mock_ffmpeg.assert_called_once()
+        command = mock_ffmpeg.call_args.args[0]
+        assert command[command.index("-t") + 1] == "9.000000"
+        assert command[command.index("-c:v") + 1] == "libx264"
+    
+    def test_trim_video_rejects_empty_range(self, service):
+        service.media_probe.probe.return_value = MediaProbe(duration=10.0, video_codec="h264")
+        
+        with patch.object(service, '_download_video_from_gcs', return_value="/tmp/input.mp4"), \
+             patch('services.video_editing_service.os.unlink'):
+            result = service.trim_video("gs://bucket/input.mp4", start_time=12.0)
+        
+        assert result["status"] == "error"
+        service.render_store.put.assert_not_called()
     
     @patch('services.video_editing_service.os.path.exists', return_value=False)
     def test_add_text_overlay_file_not_found(self, mock_exists, service):
@@ -134,13 +289,13 @@ class TestVideoEditingService:
             assert "not found" in result["message"]
     
     @patch('services.video_editing_service.os.unlink')
-    @patch('services.video_editing_service.subprocess.run')
+    @patch('services.video_editing_service.ffmpeg_runner.run')
     @patch('services.video_editing_service.tempfile.mktemp')
-    def test_add_audio_overlay_success(self, mock_mktemp, mock_subprocess, mock_unlink, service):
+    def test_add_audio_overlay_success(self, mock_mktemp, mock_ffmpeg, mock_unlink, service):
         mock_mktemp.return_value = "/tmp/output.mp4"
         
         with patch.object(service, '_download_video_from_gcs', return_value="/tmp/input.mp4"), \
-             patch.object(service, '_upload_video_to_gcs', return_value="https://storage.googleapis.com/bucket/output.mp4"), \
+             patch.object(service, '_get_duration', return_value=10.0), \
              patch('services.video_editing_service.os.path.exists', return_value=True):
             
             result = service.add_audio_overlay(
@@ -150,7 +305,55 @@ class TestVideoEditingService:
             
             assert result["status"] == "success"
             assert "video_url" in result
-            mock_subprocess.assert_called_once()
+            mock_ffmpeg.assert_called_once()
+            assert mock_ffmpeg.call_args[0][0][-3:] == ["-movflags", "+faststart", "/tmp/output.mp4"]
+    
+    @patch('services.video_editing_service.settings')
+    @patch('services.video_editing_service.ffmpeg_runner.run')
+    def test_add_audio_overlay_streams_source_and_output(self, mock_ffmpeg, mock_settings, service):
+        mock_settings.STREAM_IO = True
+        signed_url = "https://storage.googleapis.com/bucket/input.mp4?X-Goog-Signature=abc"
+        upload_stream = Mock()
+        service.render_store.open_upload.return_value.__enter__ = Mock(return_value=upload_stream)
+        service.render_store.open_upload.return_value.__exit__ = Mock(return_value=False)
+        service.render_store.url_for_key.return_value = "https://storage.googleapis.com/bucket/renders/key.mp4"
+        
+        with patch.object(service, '_signed_source_url', return_value=signed_url), \
+             patch.object(service, '_download_video_from_gcs') as mock_download, \
+             patch.object(service, '_get_duration', return_value=10.0), \
+             patch('services.video_editing_service.os.path.exists', return_value=True):
+            result = service.add_audio_overlay("gs://bucket/input.mp4", "/tmp/audio.mp3")
+        
+        assert result["status"] == "success"
+        assert result["video_url"] == "https://storage.googleapis.com/bucket/renders/key.mp4"
+        mock_download.assert_not_called()
+        command = mock_ffmpeg.call_args[0][0]
+        assert signed_url in command
+        assert command[-3:] == ["-f", "mp4", "pipe:1"]
+        assert mock_ffmpeg.call_args.kwargs["output_stream"] is upload_stream
+        service.render_store.put.assert_not_called()
+    
+    @patch('services.video_editing_service.os.unlink')
+    @patch('services.video_editing_service.ffmpeg_runner.run')
+    @patch('services.video_editing_service.tempfile.mktemp')
+    def test_only_uploaded_renders_get_thumbnails(self, mock_mktemp, mock_ffmpeg, mock_unlink, service):
+        mock_mktemp.return_value = "/tmp/output.mp4"
+        
+        with patch.object(service, '_download_video_from_gcs', return_value="/tmp/input.mp4"), \
+             patch.object(service, '_get_duration', return_value=10.0), \
+             patch('services.video_editing_service.os.path.exists', return_value=True):
+            service.add_audio_overlay("gs://bucket/input.mp4", "/tmp/audio.mp3", cache_key="final")
+            service.add_audio_overlay("gs://bucket/input.mp4", "/tmp/audio.mp3", cache_key="step", upload=False)
+        
+        service.thumbnails.submit.assert_called_once_with("final")
+    
+    @patch('services.video_editing_service.settings')
+    def test_open_source_video_falls_back_to_download(self, mock_settings, service):
+        mock_settings.STREAM_IO = True
+        
+        with patch.object(service, '_signed_source_url', side_effect=RuntimeError("no signer")), \
+             patch.object(service, '_download_video_from_gcs', return_value="/tmp/input.mp4"):
+            assert service.open_source_video("gs://bucket/input.mp4") == "/tmp/input.mp4"
     
     @patch('services.video_editing_service.os.path.exists', return_value=False)
     def test_add_audio_overlay_audio_not_found(self, mock_exists, service):
@@ -162,3 +365,29 @@ class TestVideoEditingService:
             
             assert result["status"] == "error"
             assert "Audio file not found" in result["message"]
+    
+    @patch('services.video_editing_service.subprocess.run')
+    def test_add_text_overlay_render_store_hit(self, mock_subprocess, service):
+        service.render_store.lookup.return_value = "https://storage.googleapis.com/bucket/renders/abc.mp4"
+        
+        with patch.object(service, '_get_brand_color', return_value="#1e1e1e"):
+            result = service.add_text_overlay(
+                "gs://bucket/input.mp4",
+                "Test Text",
+                start_time=0,
+                duration=5,
+                cache_key="abc"
+            )
+        
+        assert result["status"] == "success"
+        assert result["video_url"] == "https://storage.googleapis.com/bucket/renders/abc.mp4"
+        service.render_store.lookup.assert_called_once_with("abc")
+        mock_subprocess.assert_not_called()
+    
+    def test_download_video_uses_local_render(self, service):
+        service.render_store.local_path_for_url.return_value = "/cache/abc.mp4"
+        
+        result = service._download_video_from_gcs("https://storage.googleapis.com/bucket/renders/abc.mp4")
+        
+        assert result == "/cache/abc.mp4"
+        service.storage_client.bucket.assert_not_called()
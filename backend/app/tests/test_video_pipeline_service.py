@@ -0,0 +1,390 @@
+import pytest
+from unittest.mock import patch
+from models.edit_models import Edit, EditQueue
+from services.render_profiles import PROXY_PROFILE
+from services.video_pipeline_service import VideoPipelineService
+
+
+def make_queue(*edits):
+    return EditQueue(
+        session_id="session-1",
+        original_video_url="gs://bucket/original.mp4",
+        edits=list(edits),
+        current_video_url="gs://bucket/original.mp4"
+    )
+
+
+def make_edit(edit_id, edit_type, status="applied", **params):
+    return Edit(id=edit_id, type=edit_type, params=params, timestamp="2025-01-01T00:00:00", status=status)
+
+
+class TestVideoPipelineService:
+    @pytest.fixture(autouse=True)
+    def mock_render_store(self):
+        with patch('services.video_pipeline_service.render_store') as mock_store:
+            mock_store.lookup.return_value = None
+            mock_store.lookup_deepest.side_effect = lambda keys: next(
+                ((depth, url) for depth in range(len(keys), 0, -1) if (url := mock_store.lookup(keys[depth - 1]))),
+                (0, None)
+            )
+            mock_store.materialize_url.side_effect = lambda url: url
+            yield mock_store
+    
+    @pytest.fixture(autouse=True)
+    def mock_waveforms(self):
+        with patch('services.video_pipeline_service.waveform_service') as mock_waveforms:
+            yield mock_waveforms
+    
+    @pytest.fixture(autouse=True)
+    def mock_thumbnails(self):
+        with patch('services.video_pipeline_service.thumbnail_sprite_service') as mock_thumbnails:
+            yield mock_thumbnails
+    
+    @pytest.fixture
+    def service(self):
+        return VideoPipelineService()
+    
+    @patch('services.video_pipeline_service.video_editing_service')
+    def test_apply_edit_queue_single_pass(self, mock_editing, service):
+        mock_editing.render_edit_graph.return_value = {"status": "success", "video_url": "https://storage.googleapis.com/b/video.mp4"}
+        mock_editing.mux_layers.return_value = {"status": "success", "video_url": "https://storage.googleapis.com/b/out.mp4"}
+        queue = make_queue(
+            make_edit("1", "text_overlay", text="One", start_ms=0, end_ms=1000),
+            make_edit("2", "text_overlay", text="Two", start_ms=1000, end_ms=2000),
+        )
+        
+        result = service.apply_edit_queue(queue)
+        
+        assert result == "https://storage.googleapis.com/b/out.mp4"
+        assert queue.current_video_url == result
+        mock_editing.render_edit_graph.assert_called_once()
+        assert mock_editing.render_edit_graph.call_args.kwargs["layer"] == "video"
+        mock_editing.mux_layers.assert_called_once_with(
+            "https://storage.googleapis.com/b/video.mp4",
+            "gs://bucket/original.mp4",
+            cache_key=queue.compute_prefix_hashes()[-1]
+        )
+        mock_editing.add_text_overlay.assert_not_called()
+    
+    @patch('services.video_pipeline_service.video_editing_service')
+    def test_audio_only_change_reuses_video_layer(self, mock_editing, service, mock_render_store):
+        mock_editing.render_edit_graph.return_value = {"status": "success", "video_url": "https://storage.googleapis.com/b/audio.mp4"}
+        mock_editing.mux_layers.return_value = {"status": "success", "video_url": "https://storage.googleapis.com/b/out.mp4"}
+        voiceover = make_edit("2", "voiceover", text="Hi", start_ms=0, audio_path="/tmp/vo.mp3")
+        queue = make_queue(make_edit("1", "text_overlay", text="One", start_ms=0, end_ms=1000), voiceover)
+        video_layer_hash = queue.compute_layer_hashes("video")[-1]
+        audio_root_hash = queue.compute_layer_hashes("audio")[0]
+        stored = {
+            video_layer_hash: "https://storage.googleapis.com/b/video.mp4",
+            audio_root_hash: "https://storage.googleapis.com/b/track.mp4",
+        }
+        mock_render_store.lookup.side_effect = stored.get
+        
+        queue.update_edit("2", {"start_ms": 1500})
+        with patch('services.video_pipeline_service.os.path.exists', return_value=True):
+            result = service.apply_edit_queue(queue)
+        
+        assert result == "https://storage.googleapis.com/b/out.mp4"
+        mock_editing.render_edit_graph.assert_called_once()
+        call_kwargs = mock_editing.render_edit_graph.call_args.kwargs
+        assert call_kwargs["layer"] == "audio"
+        assert call_kwargs["video_url"] == "https://storage.googleapis.com/b/track.mp4"
+        assert [e.id for e in call_kwargs["edits"]] == ["2"]
+        mock_editing.mux_layers.assert_called_once_with(
+            "https://storage.googleapis.com/b/video.mp4",
+            "https://storage.googleapis.com/b/audio.mp4",
+            cache_key=queue.compute_prefix_hashes()[-1]
+        )
+    
+    @patch('services.video_pipeline_service.video_editing_service')
+    def test_proxy_profile_downscales_voiceover_only_queue(self, mock_editing, service):
+        mock_editing.render_edit_graph.side_effect = [
+            {"status": "success", "video_url": "https://storage.googleapis.com/b/track.mp4"},
+            {"status": "success", "video_url": "https://storage.googleapis.com/b/audio.mp4"},
+            {"status": "success", "video_url": "https://storage.googleapis.com/b/proxy_video.mp4"},
+        ]
+        mock_editing.mux_layers.return_value = {"status": "success", "video_url": "https://storage.googleapis.com/b/out.mp4"}
+        queue = make_queue(make_edit("1", "voiceover", text="Hi", start_ms=0, audio_path="/tmp/vo.mp3"))
+        
+        with patch('services.video_pipeline_service.os.path.exists', return_value=True):
+            result = service.apply_edit_queue(queue, profile=PROXY_PROFILE)
+        
+        assert result == "https://storage.googleapis.com/b/out.mp4"
+        video_call = mock_editing.render_edit_graph.call_args_list[-1].kwargs
+        assert video_call["layer"] == "video"
+        assert video_call["profile"] == PROXY_PROFILE
+        assert video_call["video_url"] == "gs://bucket/original.mp4"
+        assert video_call["cache_key"] == queue.compute_layer_hashes("video", "proxy")[-1]
+        assert mock_editing.mux_layers.call_args.kwargs["cache_key"] == queue.compute_prefix_hashes("proxy")[-1]
+    
+    def test_profiles_share_audio_layer_but_not_video(self):
+        queue = make_queue(make_edit("1", "text_overlay", text="One"), make_edit("2", "voiceover", text="Hi", start_ms=0))
+        
+        assert queue.compute_layer_hashes("audio", "proxy") == queue.compute_layer_hashes("audio")
+        assert queue.compute_layer_hashes("video", "proxy") != queue.compute_layer_hashes("video")
+        assert queue.compute_prefix_hashes("proxy") != queue.compute_prefix_hashes()
+    
+    def test_layer_hashes_ignore_other_layer(self):
+        first = make_queue(make_edit("1", "text_overlay", text="One"), make_edit("2", "voiceover", text="Hi", start_ms=0))
+        second = make_queue(make_edit("1", "text_overlay", text="One"), make_edit("2", "voiceover", text="Hi", start_ms=900))
+        
+        assert first.compute_layer_hashes("video") == second.compute_layer_hashes("video")
+        assert first.compute_layer_hashes("audio")[0] == second.compute_layer_hashes("audio")[0]
+        assert first.compute_layer_hashes("audio")[-1] != second.compute_layer_hashes("audio")[-1]
+    
+    @patch('services.video_pipeline_service.video_editing_service')
+    def test_apply_edit_queue_falls_back_to_per_edit(self, mock_editing, service):
+        mock_editing.render_edit_graph.return_value = {"status": "error", "message": "boom"}
+        mock_editing.mux_layers.return_value = {"status": "success", "video_url": "https://storage.googleapis.com/b/out.mp4"}
+        mock_editing.add_text_overlay.side_effect = [
+            {"status": "success", "video_url": "https://storage.googleapis.com/b/1.mp4"},
+            {"status": "success", "video_url": "https://storage.googleapis.com/b/2.mp4"},
+        ]
+        queue = make_queue(
+            make_edit("1", "text_overlay", text="One", start_ms=0, end_ms=1000),
+            make_edit("2", "text_overlay", text="Two", start_ms=1000, end_ms=2000),
+        )
+        
+        result = service.apply_edit_queue(queue)
+        
+        assert result == "https://storage.googleapis.com/b/2.mp4"
+        assert mock_editing.add_text_overlay.call_count == 2
+        uploads = [c.kwargs["upload"] for c in mock_editing.add_text_overlay.call_args_list]
+        assert uploads == [False, True]
+        assert mock_editing.add_text_overlay.call_args_list[1].kwargs["video_url"] == "https://storage.googleapis.com/b/1.mp4"
+    
+    @patch('services.video_pipeline_service.video_editing_service')
+    def test_proxy_fallback_is_cached_under_proxy_prefix(self, mock_editing, service):
+        mock_editing.render_edit_graph.return_value = {"status": "error", "message": "boom"}
+        mock_editing.add_text_overlay.return_value = {"status": "success", "video_url": "https://storage.googleapis.com/b/1.mp4"}
+        queue = make_queue(make_edit("1", "text_overlay", text="One", start_ms=0, end_ms=1000))
+        proxy_hash = queue.compute_prefix_hashes(PROXY_PROFILE.name)[-1]
+        
+        result = service.apply_edit_queue(queue, profile=PROXY_PROFILE)
+        
+        assert queue.render_cache[proxy_hash] == result
+        assert queue.render_cache[queue.compute_prefix_hashes()[-1]] == result
+        
+        mock_editing.reset_mock()
+        assert service.apply_edit_queue(queue, profile=PROXY_PROFILE) == result
+        mock_editing.render_edit_graph.assert_not_called()
+        mock_editing.add_text_overlay.assert_not_called()
+    
+    @patch('services.video_pipeline_service.video_editing_service')
+    def test_apply_edit_queue_renders_trims_edit_by_edit(self, mock_editing, service):
+        mock_editing.add_text_overlay.return_value = {"status": "success", "video_url": "https://storage.googleapis.com/b/1.mp4"}
+        mock_editing.trim_video.return_value = {"status": "success", "video_url": "https://storage.googleapis.com/b/2.mp4"}
+        queue = make_queue(
+            make_edit("1", "text_overlay", text="One", start_ms=0, end_ms=1000),
+            make_edit("2", "trim", start_ms=500, end_ms=30000),
+        )
+        
+        result = service.apply_edit_queue(queue)
+        
+        assert result == "https://storage.googleapis.com/b/2.mp4"
+        mock_editing.render_edit_graph.assert_not_called()
+        mock_editing.trim_video.assert_called_once_with(
+            video_url="https://storage.googleapis.com/b/1.mp4",
+            start_time=0.5,
+            end_time=30.0,
+            cache_key=queue.edits[1].prefix_hash,
+            upload=True
+        )
+    
+    @patch('services.video_pipeline_service.video_editing_service')
+    def test_proxy_profile_keeps_trims_in_layered_render(self, mock_editing, service):
+        mock_editing.render_edit_graph.return_value = {"status": "success", "video_url": "https://storage.googleapis.com/b/layer.mp4"}
+        mock_editing.mux_layers.return_value = {"status": "success", "video_url": "https://storage.googleapis.com/b/out.mp4"}
+        queue = make_queue(
+            make_edit("1", "text_overlay", text="One", start_ms=0, end_ms=1000),
+            make_edit("2", "trim", start_ms=500, end_ms=30000),
+        )
+        
+        result = service.apply_edit_queue(queue, profile=PROXY_PROFILE)
+        
+        assert result == "https://storage.googleapis.com/b/out.mp4"
+        mock_editing.trim_video.assert_not_called()
+        video_call = mock_editing.render_edit_graph.call_args_list[-1].kwargs
+        assert video_call["layer"] == "video"
+        assert video_call["profile"] == PROXY_PROFILE
+        assert [edit.type for edit in video_call["edits"]] == ["text_overlay", "trim"]
+    
+    @patch('services.video_pipeline_service.video_editing_service')
+    def test_apply_edit_queue_waits_for_upload_of_result(self, mock_editing, service):
+        mock_editing.render_edit_graph.return_value = {"status": "success", "video_url": "https://storage.googleapis.com/b/video.mp4"}
+        mock_editing.mux_layers.return_value = {"status": "success", "video_url": "https://storage.googleapis.com/b/1.mp4"}
+        queue = make_queue(make_edit("1", "text_overlay", text="One", start_ms=0, end_ms=1000))
+        
+        with patch('services.video_pipeline_service.render_store.materialize_url', return_value="https://storage.googleapis.com/b/up.mp4") as mock_materialize:
+            result = service.apply_edit_queue(queue)
+        
+        mock_materialize.assert_called_once_with("https://storage.googleapis.com/b/1.mp4")
+        assert result == "https://storage.googleapis.com/b/up.mp4"
+        assert queue.render_cache[queue.edits[0].prefix_hash] == result
+    
+    @patch('services.video_pipeline_service.video_editing_service')
+    def test_apply_single_filter_edit_renders_one_graph(self, mock_editing, service):
+        mock_editing.render_edit_graph.return_value = {"status": "success", "video_url": "https://storage.googleapis.com/b/graded.mp4"}
+        edit = make_edit("1", "filter", look="warm")
+        
+        result = service.apply_single_edit("gs://bucket/original.mp4", edit, cache_key="abc", upload=False)
+        
+        assert result == "https://storage.googleapis.com/b/graded.mp4"
+        assert mock_editing.render_edit_graph.call_args.kwargs["edits"] == [edit]
+        assert mock_editing.render_edit_graph.call_args.kwargs["cache_key"] == "abc"
+    
+    @patch('services.video_pipeline_service.text_to_speech_service')
+    @patch('services.video_pipeline_service.video_editing_service')
+    def test_apply_edit_queue_generates_voiceover_audio(self, mock_editing, mock_tts, service):
+        mock_tts.generate_speech.return_value = {"status": "success", "local_path": "/tmp/vo.mp3"}
+        mock_editing.render_edit_graph.return_value = {"status": "success", "video_url": "https://storage.googleapis.com/b/audio.mp4"}
+        mock_editing.mux_layers.return_value = {"status": "success", "video_url": "https://storage.googleapis.com/b/out.mp4"}
+        edit = make_edit("1", "voiceover", text="Hello", start_ms=500)
+        
+        with patch('services.video_pipeline_service.os.path.exists', return_value=True):
+            service.apply_edit_queue(make_queue(edit))
+        
+        assert edit.params["audio_path"] == "/tmp/vo.mp3"
+        mock_tts.generate_speech.assert_called_once_with("Hello")
+    
+    @patch('services.video_pipeline_service.video_editing_service')
+    def test_apply_edit_queue_reuses_longest_cached_prefix(self, mock_editing):
+        service = VideoPipelineService(single_pass=False)
+        mock_editing.add_text_overlay.return_value = {"status": "success", "video_url": "https://storage.googleapis.com/b/new.mp4"}
+        edits = [
+            make_edit(str(i), "text_overlay", text=f"Text {i}", start_ms=i * 1000, end_ms=i * 1000 + 500)
+            for i in range(10)
+        ]
+        queue = make_queue(*edits)
+        hashes = queue.compute_prefix_hashes()
+        for i, prefix_hash in enumerate(hashes):
+            queue.cache_render(prefix_hash, f"https://storage.googleapis.com/b/{i}.mp4")
+        
+        queue.update_edit("9", {"text": "Changed"})
+        result = service.apply_edit_queue(queue)
+        
+        assert result == "https://storage.googleapis.com/b/new.mp4"
+        mock_editing.add_text_overlay.assert_called_once()
+        call_kwargs = mock_editing.add_text_overlay.call_args.kwargs
+        assert call_kwargs["video_url"] == "https://storage.googleapis.com/b/8.mp4"
+        assert call_kwargs["text"] == "Changed"
+        assert edits[9].result_video_url == result
+    
+    @patch('services.video_pipeline_service.video_editing_service')
+    def test_apply_edit_queue_cached_queue_renders_nothing(self, mock_editing, service):
+        queue = make_queue(make_edit("1", "text_overlay", text="One", start_ms=0, end_ms=1000))
+        queue.cache_render(queue.compute_prefix_hashes()[-1], "https://storage.googleapis.com/b/cached.mp4")
+        
+        result = service.apply_edit_queue(queue)
+        
+        assert result == "https://storage.googleapis.com/b/cached.mp4"
+        mock_editing.render_edit_graph.assert_not_called()
+    
+    def test_apply_edit_queue_without_applied_edits_returns_original(self, service):
+        queue = make_queue(make_edit("1", "text_overlay", status="reverted", text="One"))
+        queue.current_video_url = "https://storage.googleapis.com/b/stale.mp4"
+        
+        result = service.apply_edit_queue(queue)
+        
+        assert result == "gs://bucket/original.mp4"
+    
+    def test_merge_derived_params_only_for_unchanged_edits(self):
+        rendered = make_queue(
+            make_edit("1", "voiceover", text="Hi", audio_path="/tmp/hi.mp3"),
+            make_edit("2", "voiceover", text="Old", audio_path="/tmp/old.mp3"),
+        )
+        stored = make_queue(make_edit("1", "voiceover", text="Hi"), make_edit("2", "voiceover", text="New"))
+        
+        stored.merge_derived_params(rendered)
+        
+        assert stored.edits[0].params["audio_path"] == "/tmp/hi.mp3"
+        assert "audio_path" not in stored.edits[1].params
+    
+    def test_prefix_hash_ignores_derived_params(self):
+        first = make_queue(make_edit("1", "voiceover", text="Hi", start_ms=0))
+        second = make_queue(make_edit("1", "voiceover", text="Hi", start_ms=0, audio_path="/tmp/vo.mp3"))
+        
+        assert first.compute_prefix_hashes() == second.compute_prefix_hashes()
+    
+    @patch('services.video_pipeline_service.video_editing_service')
+    def test_apply_edit_queue_uses_render_store_across_sessions(self, mock_editing, service, mock_render_store):
+        queue = make_queue(make_edit("1", "text_overlay", text="One", start_ms=0, end_ms=1000))
+        final_hash = queue.compute_prefix_hashes()[-1]
+        mock_render_store.lookup.side_effect = lambda key: "https://storage.googleapis.com/b/renders/shared.mp4" if key == final_hash else None
+        
+        result = service.apply_edit_queue(queue)
+        
+        assert result == "https://storage.googleapis.com/b/renders/shared.mp4"
+        assert queue.render_cache[final_hash] == result
+        mock_editing.render_edit_graph.assert_not_called()
+    
+    def test_get_edit_result_url_materializes_intermediate(self, service, mock_render_store, mock_thumbnails):
+        mock_render_store.materialize.return_value = "https://storage.googleapis.com/b/renders/first.mp4"
+        queue = make_queue(
+            make_edit("1", "text_overlay", text="One", start_ms=0, end_ms=1000),
+            make_edit("2", "text_overlay", text="Two", start_ms=1000, end_ms=2000),
+        )
+        
+        result = service.get_edit_result_url(queue, "1")
+        
+        assert result == "https://storage.googleapis.com/b/renders/first.mp4"
+        mock_render_store.materialize.assert_called_once_with(queue.edits[0].prefix_hash)
+        mock_thumbnails.submit.assert_called_once_with(queue.edits[0].prefix_hash)
+        assert queue.render_cache[queue.edits[0].prefix_hash] == result
+    
+    @patch('services.video_pipeline_service.video_editing_service')
+    def test_get_edit_result_url_renders_evicted_intermediate(self, mock_editing, service, mock_render_store):
+        mock_render_store.materialize.return_value = None
+        mock_editing.render_edit_graph.return_value = {"status": "success", "video_url": "gs://bucket/video_layer.mp4"}
+        mock_editing.mux_layers.return_value = {"status": "success", "video_url": "gs://bucket/first.mp4"}
+        queue = make_queue(
+            make_edit("1", "text_overlay", text="One", start_ms=0, end_ms=1000),
+            make_edit("2", "text_overlay", text="Two", start_ms=1000, end_ms=2000),
+        )
+        
+        result = service.get_edit_result_url(queue, "1")
+        
+        assert result == "gs://bucket/first.mp4"
+        assert [edit.params["text"] for edit in mock_editing.render_edit_graph.call_args.kwargs["edits"]] == ["One"]
+        assert mock_editing.mux_layers.call_args.kwargs["cache_key"] == queue.edits[0].prefix_hash
+        assert queue.render_cache[queue.edits[0].prefix_hash] == result
+        assert queue.current_video_url == "gs://bucket/original.mp4"
+        
+        mock_editing.reset_mock()
+        assert service.get_edit_result_url(queue, "1") == result
+        mock_editing.render_edit_graph.assert_not_called()
+    
+    def test_get_edit_result_url_unknown_edit(self, service):
+        queue = make_queue(make_edit("1", "text_overlay", status="reverted", text="One"))
+        
+        assert service.get_edit_result_url(queue, "1") is None
+        assert service.get_edit_result_url(queue, "missing") is None
+    
+    def test_prefix_queue_is_a_detached_recipe(self):
+        queue = make_queue(
+            make_edit("1", "text_overlay", text="One"),
+            make_edit("2", "trim", status="reverted", start_ms=0),
+            make_edit("3", "filter", look="warm"),
+            make_edit("4", "text_overlay", text="Four"),
+        )
+        hashes = queue.compute_prefix_hashes()
+        
+        prefix_queue = queue.prefix_queue("3")
+        
+        assert [edit.id for edit in prefix_queue.edits] == ["1", "3"]
+        assert prefix_queue.compute_prefix_hashes(PROXY_PROFILE.name)[-1] != hashes[1]
+        assert queue.edits[2].prefix_hash == hashes[1]
+        assert queue.prefix_queue("2") is None
+    
+    @patch('services.video_pipeline_service.hls_preview_service')
+    @patch('services.video_pipeline_service.video_editing_service')
+    def test_per_edit_render_previews_only_last_edit(self, mock_editing, mock_previews, service):
+        mock_editing.add_text_overlay.return_value = {"status": "success", "video_url": "gs://bucket/step.mp4"}
+        queue = make_queue(
+            make_edit("1", "text_overlay", text="One"),
+            make_edit("2", "text_overlay", text="Two"),
+        )
+        
+        service.apply_edit_queue(queue, single_pass=False)
+        
+        mock_previews.previewing.assert_called_once_with(queue.edits[1].prefix_hash)
@@ -0,0 +1,113 @@
+import numpy as np
+import pytest
+from unittest.mock import patch
+from services.media_probe_service import MediaProbe
+from services.waveform_service import PEAK_LEVELS, PeakAccumulator, WaveformPeaks, WaveformService, reduce_peaks
+
+
+def fake_decode(samples):
+    """ffmpeg_runner.run stand-in that writes ``samples`` as f32le in uneven chunks."""
+    def run(command, duration_seconds=None, output_stream=None):
+        data = np.asarray(samples, dtype="<f4").tobytes()
+        for start in range(0, len(data), 1000):
+            output_stream.write(data[start:start + 1000])
+    return run
+
+
+class TestWaveformService:
+    @pytest.fixture
+    def service(self, tmp_path):
+        return WaveformService(cache_dir=str(tmp_path))
+    
+    @pytest.fixture
+    def mock_probe(self):
+        with patch('services.waveform_service.media_probe_service') as mock_probe_service:
+            mock_probe_service.media_key.side_effect = lambda media: f"key:{media}"
+            mock_probe_service.probe.return_value = MediaProbe(duration=1.0, audio_codec="aac")
+            yield mock_probe_service
+    
+    def test_accumulator_is_independent_of_chunking(self):
+        samples = np.sin(np.linspace(0, 40, 64 * 10 + 5)).astype("<f4")
+        whole, chunked = PeakAccumulator(), PeakAccumulator()
+        
+        whole.write(samples.tobytes())
+        data = samples.tobytes()
+        for start in range(0, len(data), 7):
+            chunked.write(data[start:start + 7])
+        
+        assert np.array_equal(whole.finish(), chunked.finish())
+        assert len(PeakAccumulator().finish()) == 0
+    
+    def test_accumulator_keeps_min_and_max_per_block(self):
+        accumulator = PeakAccumulator(samples_per_peak=4)
+        
+        accumulator.write(np.array([0.1, -0.5, 0.3, 0.0, 0.9, 0.2], dtype="<f4").tobytes())
+        
+        assert np.allclose(accumulator.finish(), [[-0.5, 0.3], [0.2, 0.9]])
+    
+    def test_reduce_peaks_merges_groups(self):
+        peaks = np.array([[-1, 1], [-3, 2], [-2, 5], [0, 0], [-4, 1]], dtype=np.int8)
+        
+        assert reduce_peaks(peaks, 4).tolist() == [[-3, 5], [-4, 1]]
+    
+    def test_peaks_round_trip_through_bytes(self):
+        peaks = WaveformPeaks(
+            sample_rate=8000,
+            levels={64: np.array([[-5, 7], [-1, 2]], dtype=np.int8), 256: np.array([[-5, 7]], dtype=np.int8)}
+        )
+        
+        restored = WaveformPeaks.from_bytes(peaks.to_bytes())
+        single = WaveformPeaks.from_bytes(peaks.to_bytes(256))
+        
+        assert restored.sample_rate == 8000
+        assert {size: level.tolist() for size, level in restored.levels.items()} == {64: [[-5, 7], [-1, 2]], 256: [[-5, 7]]}
+        assert list(single.levels) == [256]
+    
+    def test_from_bytes_rejects_other_files(self):
+        with pytest.raises(ValueError):
+            WaveformPeaks.from_bytes(b"\x00" * 16)
+    
+    def test_compute_builds_every_level(self, service, mock_probe):
+        samples = np.tile([0.5, -0.25], 4096)
+        
+        with patch('services.waveform_service.ffmpeg_runner.run', side_effect=fake_decode(samples)) as mock_run:
+            peaks = service.compute("/tmp/clip.mp3")
+        
+        assert mock_run.call_args[0][0][-3:] == ["-f", "f32le", "pipe:1"]
+        assert list(peaks.levels) == list(PEAK_LEVELS)
+        assert [len(peaks.levels[size]) for size in PEAK_LEVELS] == [128, 32, 8, 2]
+        assert peaks.levels[64][0].tolist() == [-32, 64]
+        assert peaks.levels[4096].dtype == np.int8
+    
+    def test_silent_media_is_not_decoded(self, service, mock_probe):
+        mock_probe.probe.return_value = MediaProbe(duration=1.0, video_codec="h264")
+        
+        with patch('services.waveform_service.ffmpeg_runner.run') as mock_run:
+            peaks = service.compute("/tmp/silent.mp4")
+        
+        mock_run.assert_not_called()
+        assert all(len(level) == 0 for level in peaks.levels.values())
+    
+    def test_peaks_are_decoded_once_per_media(self, service, mock_probe):
+        with patch('services.waveform_service.ffmpeg_runner.run', side_effect=fake_decode(np.zeros(640))) as mock_run:
+            first = service.peaks("/tmp/clip.mp3")
+            again = WaveformService(cache_dir=str(service.cache_dir)).peaks("/tmp/clip.mp3")
+        
+        mock_run.assert_called_once()
+        assert again.levels[64].tolist() == first.levels[64].tolist()
+    
+    @patch('services.waveform_service.video_editing_service')
+    def test_source_url_is_opened_and_released(self, mock_editing, service, mock_probe):
+        mock_editing.open_source_video.return_value = "/tmp/downloaded.mp4"
+        
+        with patch('services.waveform_service.ffmpeg_runner.run', side_effect=fake_decode(np.zeros(640))) as mock_run:
+            service.peaks("gs://bucket/source.mp4")
+        
+        assert "/tmp/downloaded.mp4" in mock_run.call_args[0][0]
+        mock_editing.release_source_video.assert_called_once_with("/tmp/downloaded.mp4")
+    
+    def test_precompute_never_raises(self, service, mock_probe):
+        with patch('services.waveform_service.ffmpeg_runner.run', side_effect=OSError("ffmpeg missing")):
+            service.precompute("/tmp/clip.mp3")
+        
+        assert not service.cache_path("key:/tmp/clip.mp3").exists()
@@ -2,6 +2,7 @@ import React, { useState, useMemo, useEffect, useRef, useCallback } from 'react'
 import { Message as MessageType, Role, Feature, Recommendation, RecommendationStatus, Session, EditQueue as EditQueueType } from '../types';
 import * as geminiService from '../services/geminiService';
 import * as sessionService from '../services/sessionService';
+import * as renderJobService from '../services/renderJobService';
 import axios from 'axios';
 import Message from './Message';
 import ChatInput from './ChatInput';
@@ -31,6 +32,7 @@ const ChatWindow: React.FC<ChatWindowProps> = ({ featureToEdit, onClose, current
   const [isProcessingRecommendation, setIsProcessingRecommendation] = useState<boolean>(false);
   const [currentVideoIndex, setCurrentVideoIndex] = useState<number>(0);
   const [videoHistory, setVideoHistory] = useState<string[]>([]);
+  const [previewUrl, setPreviewUrl] = useState<string | null>(null);
   const [applyingRecommendationId, setApplyingRecommendationId] = useState<string | null>(null);
   const [editQueue, setEditQueue] = useState<EditQueueType | null>(null);
   const [isEditSidebarOpen, setIsEditSidebarOpen] = useState<boolean>(false);
@@ -39,6 +41,14 @@ const ChatWindow: React.FC<ChatWindowProps> = ({ featureToEdit, onClose, current
   const applyingRecommendationIdRef = useRef<string | null>(null);
   const messagesEndRef = useRef<HTMLDivElement>(null);
   const isInitialized = useRef<boolean>(false);
+  const renderAbortRef = useRef<AbortController | null>(null);
+
+  // Render polling belongs to the session on screen; leaving it stops the polls.
+  useEffect(() => {
+    const controller = new AbortController();
+    renderAbortRef.current = controller;
+    return () => controller.abort();
+  }, [currentSession?.session_id]);
 
   useEffect(() => {
     if (currentSession?.state) {
@@ -47,6 +57,8 @@ const ChatWindow: React.FC<ChatWindowProps> = ({ featureToEdit, onClose, current
       setMessages(savedMessages);
       setRecommendations(savedRecommendations);
       isInitialized.current = !!savedMessages.length;
+      // Replies saved while their video was still rendering pick the job back up.
+      savedMessages.filter(msg => msg.media?.render_job_id).forEach(msg => waitForRender(msg));
       
       if (featureToEdit?.videoUrl) {
         const acceptedVideos = savedRecommendations
@@ -156,6 +168,64 @@ const ChatWindow: React.FC<ChatWindowProps> = ({ featureToEdit, onClose, current
   }, [currentSession?.session_id]);
 
 
+  const recordAppliedVideo = (text: string, videoUrl: string, messageIndex: number) => {
+    setVideoHistory(prev => [...prev, videoUrl]);
+    setCurrentVideoIndex(prev => prev + 1);
+    
+    const newRec: Recommendation = {
+      id: `rec-${Date.now()}-${Math.random().toString(36).substr(2, 9)}`,
+      title: 'Video Edit Applied',
+      description: text.substring(0, 100) + (text.length > 100 ? '...' : ''),
+      status: RecommendationStatus.ACCEPTED,
+      videoUrl: videoUrl,
+      messageIndex: messageIndex,
+    };
+    setRecommendations(prevRecs => {
+      const isDuplicate = prevRecs.some(rec => {
+        const sameVideo = rec.videoUrl === newRec.videoUrl && rec.videoUrl !== undefined;
+        const sameAudio = JSON.stringify(rec.audioUrls) === JSON.stringify(newRec.audioUrls) && rec.audioUrls !== undefined;
+        const sameDesc = rec.description === newRec.description;
+        return sameDesc && (sameVideo || sameAudio);
+      });
+      return isDuplicate ? prevRecs : [...prevRecs, newRec];
+    });
+  };
+
+  const appendToVideoHistory = (videoUrl: string) => {
+    setVideoHistory(prev => {
+      const newHistory = [...prev, videoUrl];
+      setCurrentVideoIndex(newHistory.length - 1);
+      return newHistory;
+    });
+  };
+
+  const waitForRender = (
+    message: MessageType,
+    onRendered?: (videoUrl: string) => void,
+    onFailed?: () => void
+  ) => {
+    const signal = renderAbortRef.current?.signal;
+    renderJobService.resolveRenderedMedia(message.media, setPreviewUrl, signal)
+      .then(media => {
+        setMessages(prev => prev.map(msg => msg === message ? { ...msg, media } : msg));
+        if (media?.video_url && onRendered) {
+          onRendered(media.video_url);
+        }
+        fetchEditQueue();
+      })
+      .catch(e => {
+        if (signal?.aborted) return;
+        onFailed?.();
+        const errorMessage = e instanceof Error ? e.message : 'An unknown error occurred.';
+        setMessages(prev => prev.map(msg =>
+          msg === message ? { ...msg, media: undefined, text: `${msg.text}\n\nError: ${errorMessage}` } : msg
+        ));
+      })
+      .finally(() => {
+        if (!signal?.aborted) setPreviewUrl(null);
+      });
+  };
+
   const handleSendMessage = async (inputText: string) => {
     if (!inputText.trim() || isLoading) return;
 
@@ -217,29 +287,14 @@ const ChatWindow: React.FC<ChatWindowProps> = ({ featureToEdit, onClose, current
           });
         } else if (hasVideoUrl) {
           console.log('DEBUG: Non-question message with video_url - adding to history and marking ACCEPTED');
-          setVideoHistory(prev => [...prev, data.media.video_url]);
-          setCurrentVideoIndex(prev => prev + 1);
-          
-          const filteredMessagesCount = messages.filter(msg => msg.text !== INITIAL_MESSAGE).length;
-          const messageIndex = filteredMessagesCount;
-          const newRec: Recommendation = {
-            id: `rec-${Date.now()}-${Math.random().toString(36).substr(2, 9)}`,
-            title: 'Video Edit Applied',
-            description: data.text.substring(0, 100) + (data.text.length > 100 ? '...' : ''),
-            status: RecommendationStatus.ACCEPTED,
-            videoUrl: data.media.video_url,
-            messageIndex: messageIndex,
-          };
-          setRecommendations(prevRecs => [...prevRecs, newRec]);
-          setRecommendations(prevRecs => {
-            const isDuplicate = prevRecs.some(rec => {
-              const sameVideo = rec.videoUrl === newRec.videoUrl && rec.videoUrl !== undefined;
-              const sameAudio = JSON.stringify(rec.audioUrls) === JSON.stringify(newRec.audioUrls) && rec.audioUrls !== undefined;
-              const sameDesc = rec.description === newRec.description;
-              return sameDesc && (sameVideo || sameAudio);
-            });
-            return isDuplicate ? prevRecs : [...prevRecs, newRec];
-          });
+          recordAppliedVideo(data.text, data.media.video_url, messages.filter(msg => msg.text !== INITIAL_MESSAGE).length);
+        }
+        
+        if (data.media?.render_job_id) {
+          // The reply shows straight away with a rendering placeholder; the video lands when the job finishes.
+          const messageIndex = messages.filter(msg => msg.text !== INITIAL_MESSAGE).length;
+          const isEdit = !hasAudioUrls && !isQuestion;
+          waitForRender(botMessage, isEdit ? videoUrl => recordAppliedVideo(data.text, videoUrl, messageIndex) : undefined);
         }
       } else if (typeof data === 'string') {
         try {
@@ -361,32 +416,47 @@ const ChatWindow: React.FC<ChatWindowProps> = ({ featureToEdit, onClose, current
         
         console.log('DEBUG: Backend response after accepting:', data);
         
-        if (data.media?.video_url) {
-          setRecommendations(prev => 
-            prev.map(rec => 
-              rec.id === recommendationId 
-                ? { ...rec, videoUrl: data.media.video_url, status: RecommendationStatus.ACCEPTED }
-                : rec
-            )
-          );
-          
-          if (currentSession) {
-            try {
-              await sessionService.createVersion(currentSession.pk, data.media.video_url);
-              setVideoHistory(prev => [...prev, data.media.video_url]);
-              setCurrentVideoIndex(prev => prev + 1);
-            } catch (error) {
-              console.error('Error creating version snapshot:', error);
+        if (data.media?.video_url || data.media?.render_job_id) {
+          const acceptRenderedVideo = async (videoUrl: string) => {
+            setRecommendations(prev => 
+              prev.map(rec => 
+                rec.id === recommendationId 
+                  ? { ...rec, videoUrl: videoUrl, status: RecommendationStatus.ACCEPTED }
+                  : rec
+              )
+            );
+            
+            if (currentSession) {
+              try {
+                await sessionService.createVersion(currentSession.pk, videoUrl);
+                setVideoHistory(prev => [...prev, videoUrl]);
+                setCurrentVideoIndex(prev => prev + 1);
+              } catch (error) {
+                console.error('Error creating version snapshot:', error);
+              }
             }
-          }
+          };
           
           const followUpMessage: MessageType = { 
             role: Role.MODEL, 
-            text: "Great! I've applied the changes. Is there anything else you'd like me to adjust?"
+            text: "Great! I've applied the changes. Is there anything else you'd like me to adjust?",
+            media: data.media.render_job_id ? { render_job_id: data.media.render_job_id } : undefined
           };
           setMessages(prev => [...prev, followUpMessage]);
           
-          fetchEditQueue();
+          if (data.media.render_job_id) {
+            // The recommendation stays PROCESSING until its render lands.
+            waitForRender(followUpMessage, acceptRenderedVideo, () => setRecommendations(prev => 
+              prev.map(rec => 
+                rec.id === recommendationId 
+                  ? { ...rec, status: RecommendationStatus.PENDING }
+                  : rec
+              )
+            ));
+          } else {
+            await acceptRenderedVideo(data.media.video_url);
+            fetchEditQueue();
+          }
         } else {
           console.warn('DEBUG: No video_url in response, marking as ACCEPTED anyway');
           setRecommendations(prev => 
@@ -517,20 +587,21 @@ const ChatWindow: React.FC<ChatWindowProps> = ({ featureToEdit, onClose, current
           text: response.data.text || 'Sorry, I encountered an error while removing that edit. Please try again.',
         };
         setMessages(prev => [...prev.slice(0, -1), errorMessage]);
-      } else if (response.data.media?.video_url) {
-        setVideoHistory(prev => {
-          const newHistory = [...prev, response.data.media.video_url];
-          setCurrentVideoIndex(newHistory.length - 1);
-          return newHistory;
-        });
-        
+      } else if (response.data.media?.video_url || response.data.media?.render_job_id) {
+        const { video_url, render_job_id } = response.data.media;
         const successMessage: MessageType = { 
           role: Role.MODEL, 
           text: 'The edit has been removed and the video has been updated.',
-          media: { video_url: response.data.media.video_url },
+          media: render_job_id ? { render_job_id } : { video_url },
           isEditQueueSuccess: true
         };
         setMessages(prev => [...prev.slice(0, -1), successMessage]);
+        
+        if (render_job_id) {
+          waitForRender(successMessage, appendToVideoHistory);
+        } else {
+          appendToVideoHistory(video_url);
+        }
       } else {
         const successMessage: MessageType = { 
           role: Role.MODEL, 
@@ -582,20 +653,21 @@ const ChatWindow: React.FC<ChatWindowProps> = ({ featureToEdit, onClose, current
           text: response.data.text || 'Sorry, I encountered an error while reactivating that edit. Please try again.',
         };
         setMessages(prev => [...prev.slice(0, -1), errorMessage]);
-      } else if (response.data.media?.video_url) {
-        setVideoHistory(prev => {
-          const newHistory = [...prev, response.data.media.video_url];
-          setCurrentVideoIndex(newHistory.length - 1);
-          return newHistory;
-        });
-        
+      } else if (response.data.media?.video_url || response.data.media?.render_job_id) {
+        const { video_url, render_job_id } = response.data.media;
         const successMessage: MessageType = { 
           role: Role.MODEL, 
           text: 'The edit has been reactivated and the video has been updated.',
-          media: { video_url: response.data.media.video_url },
+          media: render_job_id ? { render_job_id } : { video_url },
           isEditQueueSuccess: true
         };
         setMessages(prev => [...prev.slice(0, -1), successMessage]);
+        
+        if (render_job_id) {
+          waitForRender(successMessage, appendToVideoHistory);
+        } else {
+          appendToVideoHistory(video_url);
+        }
       } else {
         const successMessage: MessageType = { 
           role: Role.MODEL, 
@@ -647,20 +719,21 @@ const ChatWindow: React.FC<ChatWindowProps> = ({ featureToEdit, onClose, current
           text: response.data.text || 'Sorry, I encountered an error while deactivating that edit. Please try again.',
         };
         setMessages(prev => [...prev.slice(0, -1), errorMessage]);
-      } else if (response.data.media?.video_url) {
-        setVideoHistory(prev => {
-          const newHistory = [...prev, response.data.media.video_url];
-          setCurrentVideoIndex(newHistory.length - 1);
-          return newHistory;
-        });
-        
+      } else if (response.data.media?.video_url || response.data.media?.render_job_id) {
+        const { video_url, render_job_id } = response.data.media;
         const successMessage: MessageType = { 
           role: Role.MODEL, 
           text: 'The edit has been deactivated and the video has been updated.',
-          media: { video_url: response.data.media.video_url },
+          media: render_job_id ? { render_job_id } : { video_url },
           isEditQueueSuccess: true
         };
         setMessages(prev => [...prev.slice(0, -1), successMessage]);
+        
+        if (render_job_id) {
+          waitForRender(successMessage, appendToVideoHistory);
+        } else {
+          appendToVideoHistory(video_url);
+        }
       } else {
         const successMessage: MessageType = { 
           role: Role.MODEL, 
@@ -706,6 +779,7 @@ const ChatWindow: React.FC<ChatWindowProps> = ({ featureToEdit, onClose, current
             user_id: userId,
             feature_id: featureToEdit.id,
             video_id: featureToEdit.videoId,
+            session_id: currentSession.session_id,
           },
         }
       );
@@ -824,7 +898,7 @@ const ChatWindow: React.FC<ChatWindowProps> = ({ featureToEdit, onClose, current
           <div className="p-4 overflow-y-auto flex-1">
             <div className="mb-4">
               <div className="relative">
-                {(isProcessingRecommendation && currentVideoIndex === videoHistory.length - 1) || isEditOperationLoading ? (
+                {!previewUrl && ((isProcessingRecommendation && currentVideoIndex === videoHistory.length - 1) || isEditOperationLoading) ? (
                   <div className="absolute inset-0 bg-black bg-opacity-50 rounded-lg flex items-center justify-center z-10">
                     <div className="text-white text-sm font-medium flex items-center space-x-2">
                       <svg className="animate-spin h-5 w-5" xmlns="http://www.w3.org/2000/svg" fill="none" viewBox="0 0 24 24">
@@ -835,7 +909,7 @@ const ChatWindow: React.FC<ChatWindowProps> = ({ featureToEdit, onClose, current
                     </div>
                   </div>
                 ) : null}
-                <ResponsiveVideoPlayer url={getCurrentVideoUrl()} key={getCurrentVideoUrl()} />
+                <ResponsiveVideoPlayer url={previewUrl ?? getCurrentVideoUrl()} key={previewUrl ?? getCurrentVideoUrl()} />
               </div>
               
               {videoHistory.length > 1 && (
@@ -133,6 +133,15 @@ const Message: React.FC<MessageProps> = ({ message, recommendation, onAcceptReco
                     </button>
                   </div>
                 )}
+                {message.media?.render_job_id && (
+                  <div className="flex items-center space-x-2 mt-3 pt-3 border-t border-gray-200 text-xs text-blue-700">
+                    <svg className="animate-spin h-4 w-4 text-blue-600" xmlns="http://www.w3.org/2000/svg" fill="none" viewBox="0 0 24 24">
+                      <circle className="opacity-25" cx="12" cy="12" r="10" stroke="currentColor" strokeWidth="4"></circle>
+                      <path className="opacity-75" fill="currentColor" d="M4 12a8 8 0 018-8V0C5.373 0 0 5.373 0 12h4zm2 5.291A7.962 7.962 0 014 12H0c0 3.042 1.135 5.824 3 7.938l3-2.647z"></path>
+                    </svg>
+                    <span>Rendering video...</span>
+                  </div>
+                )}
                 {isProcessing && (
                   <div className="mt-3 pt-3 border-t border-blue-300">
                     <div className="flex items-center space-x-2 text-xs text-blue-700">
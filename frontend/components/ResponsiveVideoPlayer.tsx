@@ -1,4 +1,6 @@
 import React, { useState, useRef, useEffect } from 'react';
+import Hls from 'hls.js';
+import { isHlsUrl, needsHlsJs } from '../services/hlsPlayback';
 
 interface ResponsiveVideoPlayerProps {
   url: string;
@@ -38,7 +40,26 @@ const ResponsiveVideoPlayer: React.FC<ResponsiveVideoPlayerProps> = ({ url, clas
     };
   }, [url]);
 
+  useEffect(() => {
+    const video = videoRef.current;
+    const videoUrl = convertGcsUrl(url);
+    if (!video || !needsHlsJs(videoUrl)) return;
+
+    const hls = new Hls();
+    hls.loadSource(videoUrl);
+    hls.attachMedia(video);
+
+    return () => {
+      hls.destroy();
+    };
+  }, [url]);
+
   const convertGcsUrl = (videoUrl: string): string => {
+    // Renders are served from the API host's render cache, ahead of their upload.
+    const renderMatch = videoUrl.match(/^(?:gs:\/\/|https:\/\/storage\.googleapis\.com\/)creative-audit-scratch-pad\/renders\/([0-9a-f]{64})\.mp4$/);
+    if (renderMatch) {
+      return `http://127.0.0.1:8000/api/media/renders/${renderMatch[1]}.mp4`;
+    }
     if (videoUrl.startsWith('gs://')) {
       const pathWithoutProtocol = videoUrl.substring(5);
       const bucketAndPath = pathWithoutProtocol.split('/');
@@ -97,7 +118,9 @@ const ResponsiveVideoPlayer: React.FC<ResponsiveVideoPlayerProps> = ({ url, clas
         } ${className}`}
         controls
       >
-        <source src={videoUrl} type="video/mp4" />
+        {!needsHlsJs(videoUrl) && (
+          <source src={videoUrl} type={isHlsUrl(videoUrl) ? 'application/vnd.apple.mpegurl' : 'video/mp4'} />
+        )}
         Your browser does not support the video tag.
       </video>
     );
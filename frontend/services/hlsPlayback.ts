@@ -0,0 +1,13 @@
+import Hls from 'hls.js';
+
+export const isHlsUrl = (url: string): boolean => url.split('?')[0].endsWith('.m3u8');
+
+// Safari, iOS and Chrome on Android play HLS in a plain <video>.
+export const playsHlsNatively = (): boolean =>
+  typeof document !== 'undefined' &&
+  document.createElement('video').canPlayType('application/vnd.apple.mpegurl') !== '';
+
+// Elsewhere hls.js feeds the playlist to the <video> through Media Source Extensions.
+export const needsHlsJs = (url: string): boolean => isHlsUrl(url) && !playsHlsNatively() && Hls.isSupported();
+
+export const canPlayHls = (): boolean => playsHlsNatively() || Hls.isSupported();
@@ -0,0 +1,87 @@
+import axios from 'axios';
+import { MediaAttachment, RenderJob } from '../types';
+import { canPlayHls } from './hlsPlayback';
+
+const API_BASE = 'http://127.0.0.1:8000/api';
+const POLL_INTERVAL_MS = 1000;
+// Proxy renders take seconds to a few minutes; past this the job is presumed lost.
+const RENDER_TIMEOUT_MS = 10 * 60 * 1000;
+// Each edit made while a render runs supersedes it; a chain this long means the client is chasing its own edits.
+const MAX_SUPERSEDED_JOBS = 50;
+
+export const getRenderJob = async (jobId: string, signal?: AbortSignal): Promise<RenderJob> => {
+  const response = await axios.get(`${API_BASE}/render-jobs/${jobId}`, { signal });
+  return response.data;
+};
+
+const abortError = (): Error => new DOMException('Render polling was aborted', 'AbortError');
+
+const sleep = (ms: number, signal?: AbortSignal): Promise<void> =>
+  new Promise((resolve, reject) => {
+    if (signal?.aborted) {
+      reject(abortError());
+      return;
+    }
+    const onAbort = () => {
+      clearTimeout(timer);
+      reject(abortError());
+    };
+    const timer = setTimeout(() => {
+      signal?.removeEventListener('abort', onAbort);
+      resolve();
+    }, ms);
+    signal?.addEventListener('abort', onAbort, { once: true });
+  });
+
+export const waitForRenderJob = async (
+  jobId: string,
+  onPreview?: (previewUrl: string) => void,
+  signal?: AbortSignal,
+  timeoutMs: number = RENDER_TIMEOUT_MS
+): Promise<RenderJob> => {
+  const deadline = Date.now() + timeoutMs;
+  let supersededCount = 0;
+  let previewShown = false;
+  while (true) {
+    if (signal?.aborted) {
+      throw abortError();
+    }
+    if (Date.now() > deadline) {
+      throw new Error('Timed out waiting for the video render');
+    }
+    const job = await getRenderJob(jobId, signal);
+    if (onPreview && !previewShown && job.status === 'rendering' && job.preview_url && canPlayHls()) {
+      previewShown = true;
+      onPreview(job.preview_url);
+    }
+    if (job.status === 'succeeded' || job.status === 'failed') {
+      return job;
+    }
+    // A newer edit replaced this render; follow the job that will finish.
+    if (job.status === 'superseded' && job.superseded_by) {
+      supersededCount += 1;
+      if (supersededCount > MAX_SUPERSEDED_JOBS) {
+        throw new Error('Video render kept being superseded by newer edits');
+      }
+      jobId = job.superseded_by;
+      continue;
+    }
+    await sleep(POLL_INTERVAL_MS, signal);
+  }
+};
+
+export const resolveRenderedMedia = async (
+  media?: MediaAttachment,
+  onPreview?: (previewUrl: string) => void,
+  signal?: AbortSignal
+): Promise<MediaAttachment | undefined> => {
+  if (!media?.render_job_id) return media;
+
+  const job = await waitForRenderJob(media.render_job_id, onPreview, signal);
+  if (job.status === 'failed') {
+    throw new Error(job.error || 'Video render failed');
+  }
+
+  const { render_job_id, ...rest } = media;
+  return { ...rest, video_url: job.video_url ?? undefined };
+};
@@ -6,6 +6,7 @@ export enum Role {
 export interface MediaAttachment {
   audio_urls?: string[];
   video_url?: string;
+  render_job_id?: string;
 }
 
 export interface Message {
@@ -82,6 +83,7 @@ export interface Edit {
   timestamp: string;
   status: EditStatus;
   result_video_url?: string;
+  prefix_hash?: string;
 }
 
 export interface EditQueue {
@@ -89,4 +91,32 @@ export interface EditQueue {
   original_video_url: string;
   edits: Edit[];
   current_video_url: string;
+  video_id?: string;
+  render_cache?: Record<string, string>;
+}
+
+export type RenderJobStatus = 'queued' | 'rendering' | 'succeeded' | 'failed' | 'superseded';
+
+export interface RenderJob {
+  id: string;
+  session_id: string | null;
+  status: RenderJobStatus;
+  video_url: string | null;
+  // HLS playlist of the render, playable while it is still encoding.
+  preview_url: string | null;
+  error: string | null;
+  created_at: string;
+  started_at: string | null;
+  finished_at: string | null;
+  progress_percent: number | null;
+  eta_seconds: number | null;
+  fps: number | null;
+  speed: number | null;
+  state_key: string | null;
+  superseded_by: string | null;
+  worker_id: string | null;
+  attempts: number;
+  // Scrubbing thumbnails of a succeeded render; null until they are stored.
+  sprite_url: string | null;
+  vtt_url: string | null;
 }